@@ -0,0 +1,39 @@
+# Generated by Django 4.2.18 on 2026-10-17 18:11
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ChunkSettings',
+            fields=[
+                ('id', models.BigAutoField(primary_key=True, serialize=False)),
+                ('enabled_content_extraction', models.BooleanField(default=True, verbose_name='Enable context extraction.')),
+                ('content_start_separator', models.CharField(default='<quick_question>', max_length=255, verbose_name='Content start separator.')),
+                ('content_end_separator', models.CharField(default='</quick_question>', max_length=255, verbose_name='Content end separator.')),
+                ('default_document_separator', models.CharField(default='~www.itechbusy.com~', max_length=255, verbose_name='Default document separator, Reserved field, not yet enabled.')),
+                ('enabled_same_level_segmentation', models.BooleanField(default=True, verbose_name='Enable title segmentation at the same level.')),
+                ('enabled_markdown_combine', models.BooleanField(default=True, verbose_name='Enable merging the output files into the same markdown.')),
+                ('enabled_markdown_split', models.BooleanField(default=True, verbose_name='Enable the split of the merged markdown into word.')),
+                ('enabled_title_compensation', models.BooleanField(default=True, verbose_name='Enable title compensation.')),
+                ('enabled_tag_reasoning', models.BooleanField(default=True, verbose_name='Enable tag compensation.')),
+                ('enabled_picture_reasoning', models.BooleanField(default=True, verbose_name='Enable picture reason.')),
+                ('picture_reasoning_model_id', models.BigIntegerField(default=0, verbose_name='A model for image reasoning is used when extracting the meaning of images in documents.')),
+                ('title_reasoning_model_id', models.BigIntegerField(default=0, verbose_name='A model used to extract titles from articles.')),
+                ('tag_reasoning_model_id', models.BigIntegerField(default=0, verbose_name='A model used to extract tags from articles.')),
+                ('picture_reasoning_prompt', models.TextField(verbose_name='When performing image reasoning, use the prompt words built into the system when they are empty.')),
+                ('title_hierarchy_reasoning_prompt', models.TextField(verbose_name='When performing title hierarchy reasoning, use the prompt words built into the system when they are empty.')),
+                ('tag_reasoning_prompt', models.TextField(verbose_name='When performing tag reasoning, use the prompt words built into the system when they are empty.')),
+            ],
+            options={
+                'db_table': 'chunk_settings',
+            },
+        ),
+    ]
@@ -0,0 +1,24 @@
+# Generated by Django 4.2.18 on 2026-10-17 18:11
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('application', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SettingsVersion',
+            fields=[
+                ('id', models.BigAutoField(primary_key=True, serialize=False)),
+                ('name', models.CharField(max_length=100, unique=True, verbose_name='Name of the settings group')),
+                ('version', models.BigIntegerField(default=0, verbose_name='Incremented on every change of the settings group')),
+            ],
+            options={
+                'db_table': 'settings_version',
+            },
+        ),
+    ]
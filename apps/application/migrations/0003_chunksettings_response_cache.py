@@ -0,0 +1,23 @@
+# Generated by Django 4.2.18 on 2026-10-17 18:11
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('application', '0002_settingsversion'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='chunksettings',
+            name='enabled_response_cache',
+            field=models.BooleanField(default=True, verbose_name='Enable reuse of cached AI answers for identical content.'),
+        ),
+        migrations.AddField(
+            model_name='chunksettings',
+            name='enabled_response_cache_refresh',
+            field=models.BooleanField(default=False, verbose_name='Ignore cached AI answers and overwrite them with fresh ones.'),
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 4.2.18 on 2026-10-17 18:11
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('application', '0003_chunksettings_response_cache'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='chunksettings',
+            name='enabled_batch_tag_reasoning',
+            field=models.BooleanField(default=False, verbose_name='Enable generating the tags of several shards in one request. Only used with the built-in tag prompt.'),
+        ),
+        migrations.AddField(
+            model_name='chunksettings',
+            name='tag_reasoning_batch_tokens',
+            field=models.IntegerField(default=2000, verbose_name='Estimated token budget of the shards packed into one tag request.'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 4.2.18 on 2026-10-17 18:11
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('application', '0004_chunksettings_batch_tag_reasoning'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='chunksettings',
+            name='title_reasoning_max_tokens',
+            field=models.IntegerField(default=8192, verbose_name='Title reasoning output is cut off above this number of tokens.'),
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 4.2.18 on 2026-10-17 18:11
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('application', '0005_chunksettings_title_reasoning_max_tokens'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='chunksettings',
+            name='enabled_image_dedup',
+            field=models.BooleanField(default=True, verbose_name='Enable reusing the description of identical or near identical images.'),
+        ),
+        migrations.AddField(
+            model_name='chunksettings',
+            name='image_dedup_distance',
+            field=models.IntegerField(default=4, verbose_name='Largest perceptual hash distance of near identical images, -1 only reuses identical images.'),
+        ),
+    ]
@@ -0,0 +1,38 @@
+# Generated by Django 4.2.18 on 2026-10-17 18:11
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('application', '0006_image_dedup'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='chunksettings',
+            name='enabled_image_preprocess',
+            field=models.BooleanField(default=True, verbose_name='Enable dropping decorative images and shrinking images before picture reasoning.'),
+        ),
+        migrations.AddField(
+            model_name='chunksettings',
+            name='image_jpeg_quality',
+            field=models.IntegerField(default=80, verbose_name='JPEG quality of the re-encoded images.'),
+        ),
+        migrations.AddField(
+            model_name='chunksettings',
+            name='image_max_edge',
+            field=models.IntegerField(default=1568, verbose_name='Longer images are scaled down to this edge in pixels, 0 keeps the size.'),
+        ),
+        migrations.AddField(
+            model_name='chunksettings',
+            name='image_min_edge',
+            field=models.IntegerField(default=32, verbose_name='Images with a shorter edge in pixels are dropped.'),
+        ),
+        migrations.AddField(
+            model_name='chunksettings',
+            name='image_min_entropy',
+            field=models.FloatField(default=1.0, verbose_name='Images whose gray level entropy in bits is lower are dropped as blank or decorative.'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 4.2.18 on 2026-10-17 18:12
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('application', '0007_chunksettings_image_preprocess'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='chunksettings',
+            name='enabled_image_archive',
+            field=models.BooleanField(default=False, verbose_name='Enable writing the extracted images to disk, they are passed to picture reasoning in memory.'),
+        ),
+    ]
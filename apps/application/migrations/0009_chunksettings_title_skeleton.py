@@ -0,0 +1,23 @@
+# Generated by Django 4.2.18 on 2026-10-17 18:12
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('application', '0008_chunksettings_image_archive'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='chunksettings',
+            name='enabled_title_skeleton',
+            field=models.BooleanField(default=False, verbose_name='Enable sending only the candidate heading lines to the title reasoning instead of the whole document.'),
+        ),
+        migrations.AddField(
+            model_name='chunksettings',
+            name='title_skeleton_window_tokens',
+            field=models.IntegerField(default=6000, verbose_name='Estimated token budget of the candidate heading lines sent in one title request.'),
+        ),
+    ]
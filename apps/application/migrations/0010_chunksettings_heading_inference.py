@@ -0,0 +1,18 @@
+# Generated by Django 4.2.18 on 2026-10-17 18:12
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('application', '0009_chunksettings_title_skeleton'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='chunksettings',
+            name='enabled_heading_inference',
+            field=models.BooleanField(default=True, verbose_name='Enable taking the title hierarchy from docx styles and pdf font sizes, the title model is only called when they are not conclusive.'),
+        ),
+    ]
@@ -1 +1,2 @@
 from .chunk_settings import *
+from .settings_version import *
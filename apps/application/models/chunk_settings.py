@@ -1,7 +1,8 @@
-from asgiref.sync import sync_to_async
 from common.action_result import ActionResult
 from django.db import models
 
+from application.models.settings_version import SettingsCache
+
 
 class ChunkSettings(models.Model):
     id = models.BigAutoField(primary_key=True)
@@ -19,8 +20,40 @@ class ChunkSettings(models.Model):
     enabled_markdown_split = models.BooleanField(default=True,
                                                  verbose_name='Enable the split of the merged markdown into word.')
     enabled_title_compensation = models.BooleanField(default=True, verbose_name='Enable title compensation.')
+    title_reasoning_max_tokens = models.IntegerField(default=8192,
+                                                     verbose_name='Title reasoning output is cut off above this number of tokens.')
+    enabled_heading_inference = models.BooleanField(default=True,
+                                                    verbose_name='Enable taking the title hierarchy from docx styles and pdf font sizes, the title model is only called when they are not conclusive.')
+    enabled_title_skeleton = models.BooleanField(default=False,
+                                                 verbose_name='Enable sending only the candidate heading lines to the title reasoning instead of the whole document.')
+    title_skeleton_window_tokens = models.IntegerField(default=6000,
+                                                       verbose_name='Estimated token budget of the candidate heading lines sent in one title request.')
     enabled_tag_reasoning = models.BooleanField(default=True, verbose_name='Enable tag compensation.')
+    enabled_batch_tag_reasoning = models.BooleanField(default=False,
+                                                      verbose_name='Enable generating the tags of several shards in one request. Only used with the built-in tag prompt.')
+    tag_reasoning_batch_tokens = models.IntegerField(default=2000,
+                                                     verbose_name='Estimated token budget of the shards packed into one tag request.')
     enabled_picture_reasoning = models.BooleanField(default=True, verbose_name='Enable picture reason.')
+    enabled_response_cache = models.BooleanField(default=True,
+                                                 verbose_name='Enable reuse of cached AI answers for identical content.')
+    enabled_response_cache_refresh = models.BooleanField(default=False,
+                                                         verbose_name='Ignore cached AI answers and overwrite them with fresh ones.')
+    enabled_image_dedup = models.BooleanField(default=True,
+                                              verbose_name='Enable reusing the description of identical or near identical images.')
+    image_dedup_distance = models.IntegerField(default=4,
+                                               verbose_name='Largest perceptual hash distance of near identical images, -1 only reuses identical images.')
+    enabled_image_archive = models.BooleanField(default=False,
+                                                verbose_name='Enable writing the extracted images to disk, they are passed to picture reasoning in memory.')
+    enabled_image_preprocess = models.BooleanField(default=True,
+                                                   verbose_name='Enable dropping decorative images and shrinking images before picture reasoning.')
+    image_min_edge = models.IntegerField(default=32,
+                                         verbose_name='Images with a shorter edge in pixels are dropped.')
+    image_min_entropy = models.FloatField(default=1.0,
+                                          verbose_name='Images whose gray level entropy in bits is lower are dropped as blank or decorative.')
+    image_max_edge = models.IntegerField(default=1568,
+                                         verbose_name='Longer images are scaled down to this edge in pixels, 0 keeps the size.')
+    image_jpeg_quality = models.IntegerField(default=80,
+                                             verbose_name='JPEG quality of the re-encoded images.')
     picture_reasoning_model_id = models.BigIntegerField(default=0,
                                                         verbose_name='A model for image reasoning is used when extracting the meaning of images in documents.')
     title_reasoning_model_id = models.BigIntegerField(default=0,
@@ -38,8 +71,10 @@ class ChunkSettings(models.Model):
         db_table = 'chunk_settings'
 
 
+CHUNK_SETTINGS_CACHE = SettingsCache('chunk_settings')
+
+
 async def get_chunk_settings():
-    @sync_to_async
     def select():
         settings = ChunkSettings.objects.filter(id=1).first()
         if settings is None:
@@ -47,10 +82,11 @@ async def get_chunk_settings():
             settings = ChunkSettings.objects.filter(id=1).first()
         return settings
 
-    return await select()
+    return await CHUNK_SETTINGS_CACHE.aget('settings', select)
 
 
 def update_chunk_settings(data):
     filtered_data = {k: v for k, v in data.items() if v is not None}
     ChunkSettings.objects.filter(id=1).update(**filtered_data)
+    CHUNK_SETTINGS_CACHE.invalidate()
     return ActionResult.success()
@@ -0,0 +1,104 @@
+import threading
+import time
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import models, IntegrityError
+from django.db.models import F
+
+
+class SettingsVersion(models.Model):
+    """
+    Version counter of a group of settings, every write bumps it so that all worker processes drop their cached copies
+    """
+    id = models.BigAutoField(primary_key=True)
+    name = models.CharField(max_length=100, unique=True, verbose_name='Name of the settings group')
+    version = models.BigIntegerField(default=0, verbose_name='Incremented on every change of the settings group')
+
+    class Meta:
+        db_table = 'settings_version'
+
+
+class SettingsCache:
+    """
+    In-process cache of settings rows.
+    Within the TTL entries are served from memory, after it the version counter is read once and the cache is
+    dropped only if another process changed the settings group in the meantime.
+    """
+
+    def __init__(self, name, ttl=None):
+        self.name = name
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._entries = {}
+        self._version = None
+        self._checked_at = 0.0
+        self._generation = 0
+
+    def _get_ttl(self):
+        if self.ttl is not None:
+            return self.ttl
+        return getattr(settings, 'SETTINGS_CACHE', {}).get('TTL', 5)
+
+    def _fresh(self):
+        return time.monotonic() - self._checked_at < self._get_ttl()
+
+    def _read_version(self):
+        return SettingsVersion.objects.filter(name=self.name).values_list('version', flat=True).first() or 0
+
+    def get(self, key, loader):
+        """
+        Get the cached value, the loader is only called on a miss
+        :param key: Cache key
+        :param loader: Function without parameters that queries the value from the database
+        :return: Cached or loaded value
+        """
+        with self._lock:
+            fresh = self._fresh()
+            if fresh and key in self._entries:
+                return self._entries[key]
+
+        if not fresh:
+            version = self._read_version()
+            with self._lock:
+                if version != self._version:
+                    self._entries.clear()
+                    self._version = version
+                    self._generation += 1
+                self._checked_at = time.monotonic()
+                if key in self._entries:
+                    return self._entries[key]
+
+        with self._lock:
+            generation = self._generation
+        value = loader()
+        with self._lock:
+            # Do not keep a value loaded while the settings were being changed
+            if generation == self._generation:
+                self._entries[key] = value
+        return value
+
+    async def aget(self, key, loader):
+        """
+        Asynchronous get, a hit inside the TTL does not leave the event loop
+        """
+        with self._lock:
+            if self._fresh() and key in self._entries:
+                return self._entries[key]
+        return await sync_to_async(self.get)(key, loader)
+
+    def invalidate(self):
+        """
+        Bump the version counter and drop the local entries, call it after the settings group was written
+        """
+        updated = SettingsVersion.objects.filter(name=self.name).update(version=F('version') + 1)
+        if not updated:
+            try:
+                SettingsVersion.objects.create(name=self.name, version=1)
+            except IntegrityError:
+                SettingsVersion.objects.filter(name=self.name).update(version=F('version') + 1)
+        with self._lock:
+            self._entries.clear()
+            self._version = None
+            self._checked_at = 0.0
+            self._generation += 1
@@ -0,0 +1,39 @@
+from django.test import TestCase
+
+from application.models import SettingsCache, SettingsVersion
+
+
+class SettingsCacheTests(TestCase):
+
+    def setUp(self):
+        self.loads = 0
+
+    def loader(self):
+        self.loads += 1
+        return self.loads
+
+    def test_hit_within_ttl_does_not_load(self):
+        cache = SettingsCache('test_settings', ttl=60)
+        self.assertEqual(cache.get('key', self.loader), 1)
+        self.assertEqual(cache.get('key', self.loader), 1)
+        self.assertEqual(self.loads, 1)
+
+    def test_unchanged_version_keeps_entries_after_ttl(self):
+        cache = SettingsCache('test_settings', ttl=0)
+        cache.get('key', self.loader)
+        self.assertEqual(cache.get('key', self.loader), 1)
+        self.assertEqual(self.loads, 1)
+
+    def test_invalidate_of_another_process_drops_entries(self):
+        cache = SettingsCache('test_settings', ttl=0)
+        other = SettingsCache('test_settings', ttl=0)
+        cache.get('key', self.loader)
+        other.invalidate()
+        self.assertEqual(cache.get('key', self.loader), 2)
+        self.assertEqual(SettingsVersion.objects.get(name='test_settings').version, 1)
+
+    def test_invalidate_bumps_existing_version(self):
+        cache = SettingsCache('test_settings')
+        cache.invalidate()
+        cache.invalidate()
+        self.assertEqual(SettingsVersion.objects.get(name='test_settings').version, 2)
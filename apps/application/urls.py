@@ -1,6 +1,7 @@
 # from django.conf import settings
 from application.views import chunk_views
 from application.views import model_views
+from application.views import picture_views
 from django.urls import path
 
 app_name = 'application'
@@ -10,6 +11,13 @@ urlpatterns = [
     path('create_model/', model_views.create_model),
     path('update_model/', model_views.update_model),
     path('delete_model/', model_views.delete_model),
+    path('get_client_pool_stats/', model_views.get_client_pool_stats),
+    path('get_response_cache_stats/', model_views.get_response_cache_stats),
+    path('get_request_broker_stats/', model_views.get_request_broker_stats),
+    path('get_token_usage_stats/', model_views.get_token_usage_stats),
+    path('get_model_router_stats/', model_views.get_model_router_stats),
+    path('get_hedge_stats/', model_views.get_hedge_stats),
+    path('picture_reasoning/', picture_views.picture_reasoning),
     path('get_chunk_settings/', chunk_views.get_chunk_settings),
     path('update_chunk_settings/', chunk_views.update_chunk_settings),
 ]
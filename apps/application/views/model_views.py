@@ -4,7 +4,13 @@ from common.action_result import ActionResult
 from django.shortcuts import HttpResponse
 from rest_framework.decorators import api_view
 
+from processor.client_pool import client_pool_stats
+from processor.hedging import REQUEST_HEDGER
+from processor.model_router import MODEL_ROUTER
 from processor.models import model_settings
+from processor.request_broker import REQUEST_BROKER
+from processor.response_cache import RESPONSE_CACHE
+from processor.token_accounting import TOKEN_LEDGER
 
 
 @api_view(['GET'])
@@ -28,3 +34,33 @@ def update_model(request):
 def delete_model(request):
     model_settings.delete_model(request.GET.get("id"))
     return HttpResponse(ActionResult.success())
+
+
+@api_view(['GET'])
+def get_client_pool_stats(request):
+    return HttpResponse(ActionResult.success(client_pool_stats()))
+
+
+@api_view(['GET'])
+def get_response_cache_stats(request):
+    return HttpResponse(ActionResult.success(RESPONSE_CACHE.stats()))
+
+
+@api_view(['GET'])
+def get_request_broker_stats(request):
+    return HttpResponse(ActionResult.success(REQUEST_BROKER.stats()))
+
+
+@api_view(['GET'])
+def get_token_usage_stats(request):
+    return HttpResponse(ActionResult.success(TOKEN_LEDGER.model_usage()))
+
+
+@api_view(['GET'])
+def get_model_router_stats(request):
+    return HttpResponse(ActionResult.success(MODEL_ROUTER.stats()))
+
+
+@api_view(['GET'])
+def get_hedge_stats(request):
+    return HttpResponse(ActionResult.success(REQUEST_HEDGER.stats()))
@@ -0,0 +1,46 @@
+import json
+
+from application.models.chunk_settings import get_chunk_settings
+from common.action_result import ActionResult
+from common.str_transcoding import str_decrypt
+from django.shortcuts import HttpResponse
+from rest_framework.decorators import api_view
+
+from processor.client_pool import run_async
+from processor.models.image_model import MultiplePictureModel
+from processor.processor import multiple_picture_reasoning
+from processor.prompt_templates import BASE_IMAGE_PROMPT_VL
+
+
+@api_view(['POST'])
+def picture_reasoning(request):
+    """
+    Reason a batch of pictures concurrently.
+    Body: images (list of image_id and url or base64_data with image_type), optional prompt, model_name,
+    timeout (seconds per picture) and max_concurrency
+    """
+    data = json.loads(request.body)
+    images = data.get("images")
+    if not images:
+        return HttpResponse(ActionResult.fail(400, "参数images不能为空 The parameter images cannot be empty."))
+    pictures = []
+    for i, image in enumerate(images):
+        if not image.get("url") and not (image.get("base64_data") and image.get("image_type")):
+            return HttpResponse(ActionResult.fail(400, f"第{i}张图片缺少url或base64_data和image_type "
+                                                       f"Image {i} needs a url or base64_data with image_type."))
+        pictures.append(MultiplePictureModel(image_id=image.get("image_id", i), url=image.get("url"),
+                                             base64_data=image.get("base64_data"),
+                                             image_type=image.get("image_type")))
+
+    async def reason():
+        prompt = data.get("prompt")
+        if not prompt:
+            prompt = (await get_chunk_settings()).picture_reasoning_prompt or str_decrypt(BASE_IMAGE_PROMPT_VL)
+        return await multiple_picture_reasoning(pictures, prompt, data.get("model_name"), data.get("timeout"),
+                                                data.get("max_concurrency"))
+
+    try:
+        results = run_async(reason())
+    except ValueError as e:
+        return HttpResponse(ActionResult.fail(400, str(e)))
+    return HttpResponse(ActionResult.success([result.to_dict() for result in results]))
@@ -1,7 +1,12 @@
 import os
 from pathlib import Path
 
+from settings.cache import SETTINGS_CACHE_SETTING, LLM_RESPONSE_CACHE_SETTING
+from settings.conversion import CONVERSION_JOB_SETTING, CONVERSION_SCHEDULER_SETTING
 from settings.database import DATABASE_SETTING
+from settings.extraction import DOCUMENT_EXTRACTION_SETTING
+from settings.llm import LLM_CLIENT_POOL_SETTING, LLM_BROKER_SETTING, LLM_ROUTER_SETTING, LLM_TOKEN_BUDGET_SETTING, \
+    LLM_HEDGE_SETTING
 from settings.logging import LOGGING_SETTING
 
 BASE_DIR = Path(__file__).resolve().parent.parent
@@ -105,6 +110,39 @@ FILE_UPLOAD_MAX_MEMORY_SIZE = 0
 # Maximum volume of POST request
 DATA_UPLOAD_MAX_MEMORY_SIZE = 1024 * 1024 * 1024 * 10
 
+# In-process cache of model and chunk settings
+SETTINGS_CACHE = SETTINGS_CACHE_SETTING
+
+# Persistent cache of model answers
+LLM_RESPONSE_CACHE = LLM_RESPONSE_CACHE_SETTING
+
+# Keep-alive pool limits of the model clients
+LLM_CLIENT_POOL = LLM_CLIENT_POOL_SETTING
+
+# Rate limits and adaptive concurrency of the model endpoints
+LLM_BROKER = LLM_BROKER_SETTING
+
+# Load balancing and circuit breaking across the enabled models of a type
+LLM_ROUTER = LLM_ROUTER_SETTING
+
+# Hedging of slow idempotent model requests
+LLM_HEDGE = LLM_HEDGE_SETTING
+
+# Input token budgets of the model calls per pipeline stage
+LLM_TOKEN_BUDGET = LLM_TOKEN_BUDGET_SETTING
+
+# Process pools of the document text and image extraction
+DOCUMENT_EXTRACTION = DOCUMENT_EXTRACTION_SETTING
+
+# Background conversion jobs
+CONVERSION_JOB = CONVERSION_JOB_SETTING
+
+# Fair sharing of the conversion file threads across upload batches
+CONVERSION_SCHEDULER = CONVERSION_SCHEDULER_SETTING
+
+# Tests are discovered from the apps directory: python manage.py test
+TEST_RUNNER = 'diankuibi.test_runner.AppsDiscoverRunner'
+
 REST_FRAMEWORK = {
     'DEFAULT_RENDERER_CLASSES': [
         'rest_framework.renderers.JSONRenderer',
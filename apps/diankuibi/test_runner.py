@@ -0,0 +1,12 @@
+from django.conf import settings
+from django.test.runner import DiscoverRunner
+
+
+class AppsDiscoverRunner(DiscoverRunner):
+    """
+    The apps directory is itself a package, tests are discovered with it as the top level so that the app modules
+    are imported under the names INSTALLED_APPS registers
+    """
+
+    def __init__(self, top_level=None, **kwargs):
+        super().__init__(top_level=top_level or str(settings.BASE_DIR), **kwargs)
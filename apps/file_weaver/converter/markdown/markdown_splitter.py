@@ -1,3 +1,5 @@
+import asyncio
+import json
 import logging
 import re
 import time
@@ -12,23 +14,126 @@ from file_weaver.constant import SPLIT_SEPARATOR
 from file_weaver.converter.markdown.markdown_weaver_reader import ContentNode, md_converter_trees, split_markdown
 from file_weaver.converter.markdown.markdown_weaver_writer import LineOpt, modify_markdown
 from processor.models import model_settings
-from processor.processor import text_reasoning
-from processor.prompt_templates import CHUNK_GENERATE_PROMPTS
+from processor.processor import text_reasoning, extract_json_content
+from processor.prompt_templates import CHUNK_GENERATE_PROMPTS, CHUNK_BATCH_GENERATE_PROMPT
+from processor.request_broker import estimate_tokens
 
 logging = logging.getLogger("markdown_splitter")
 
 
+async def _label_chunk(chunk, prompt, model_name, semaphore):
+    """
+    Generate the label of a single shard by AI. A failure is logged and leaves the shard without label.
+    :param chunk: Shard to be labeled
+    :param prompt: Custom prompt, the built-in prompt is used when it is empty
+    :param model_name: Name of the model used, the default model is used when it is None
+    :param semaphore: Limits the number of concurrent requests to the model
+    :return: Time spent waiting for the model in milliseconds
+    """
+    async with semaphore:
+        start = time.perf_counter()
+        try:
+            if prompt is None or prompt.strip() == "":
+                prompt = str_decrypt(CHUNK_GENERATE_PROMPTS).format(content=chunk.content)
+            chunk.labels = await text_reasoning(prompt=prompt, model_name=model_name)
+        except Exception as e:
+            chunk.labels = ''
+            logging.error(f"Label generation failed. Chunk lines: {chunk.start_line}-{chunk.end_line} e: {str(e)}")
+        latency = int((time.perf_counter() - start) * 1000)
+    logging.debug(f"Label generated. Chunk lines: {chunk.start_line}-{chunk.end_line} latency: {latency}ms")
+    return latency
+
+
+def _pack_batches(chunks, token_budget):
+    """
+    Pack consecutive shards into batches whose estimated tokens stay within the budget.
+    A shard larger than the budget forms a batch of its own.
+    """
+    batches = []
+    current = []
+    current_tokens = 0
+    for chunk in chunks:
+        tokens = estimate_tokens(chunk.content)
+        if current and current_tokens + tokens > token_budget:
+            batches.append(current)
+            current = []
+            current_tokens = 0
+        current.append(chunk)
+        current_tokens += tokens
+    if current:
+        batches.append(current)
+    return batches
+
+
+def _parse_batch_labels(answer):
+    """
+    Parse the labels returned for a batch
+    :param answer: AI answer, a json object with a labels list of id and labels
+    :return: Mapping of shard id to labels, empty when the answer can not be parsed
+    """
+    if not answer:
+        return {}
+    text = extract_json_content(answer)
+    text = answer[answer.find('{'):answer.rfind('}') + 1] if text is None else text.strip('`').removeprefix('json')
+    try:
+        items = json.loads(text).get('labels', [])
+    except (json.JSONDecodeError, AttributeError):
+        return {}
+
+    result = {}
+    for item in items if isinstance(items, list) else []:
+        try:
+            labels = item['labels']
+            if isinstance(labels, list):
+                labels = ';'.join(str(label) for label in labels)
+            result[int(item['id'])] = str(labels).strip()
+        except (KeyError, TypeError, ValueError):
+            continue
+    return result
+
+
+async def _label_batch(batch, model_name, semaphore):
+    """
+    Generate the labels of several shards in one AI request
+    :param batch: Shards to be labeled
+    :param model_name: Name of the model used, the default model is used when it is None
+    :param semaphore: Limits the number of concurrent requests to the model
+    :return: Shards whose labels are missing from the answer
+    """
+    content = json.dumps([{'id': i, 'content': chunk.content} for i, chunk in enumerate(batch)], ensure_ascii=False)
+    async with semaphore:
+        start = time.perf_counter()
+        try:
+            answer = await text_reasoning(prompt=str_decrypt(CHUNK_BATCH_GENERATE_PROMPT).format(content=content),
+                                          model_name=model_name)
+        except Exception as e:
+            answer = None
+            logging.error(f"Batch label generation failed. Chunks: {len(batch)} e: {str(e)}")
+        latency = int((time.perf_counter() - start) * 1000)
+
+    labels = _parse_batch_labels(answer)
+    failed = []
+    for i, chunk in enumerate(batch):
+        if labels.get(i):
+            chunk.labels = labels[i]
+        else:
+            failed.append(chunk)
+    logging.debug(f"Batch labels generated. Chunks: {len(batch)} unparsed: {len(failed)} latency: {latency}ms")
+    return failed
+
+
 async def _generate_labels(chunks, chunk_setting):
     """
      Context is generated for shards.
      Content less than 10 is directly regarded as a label, and more than 10 is summarized as a label by AI.
+     AI labels of all shards are requested concurrently, the context is then bound in document order.
+     In batch mode several shards share one request, only shards missing from the answer are requested one by one.
     :param chunks: All shards
     :param chunk_setting: Configuration requirements for sharding
     :return: No return value
     """
-    last_chunk = None
-
     new_chunks = []
+    reasoning_chunks = []
     for chunk in chunks:
         trip_content = chunk.content.strip()
         if trip_content == 'None': continue
@@ -38,18 +143,44 @@ async def _generate_labels(chunks, chunk_setting):
         if len(trip_content) <= 10:
             chunk.labels = trip_content.replace("#", "")
         else:
-            model = await model_settings.get_model_byid(chunk_setting.tag_reasoning_model_id)
-            prompt = chunk_setting.tag_reasoning_prompt
-            if prompt is None or prompt.strip() == "":
-                prompt = str_decrypt(CHUNK_GENERATE_PROMPTS).format(content=chunk.content)
-
-            chunk.labels = await text_reasoning(
-                prompt=prompt, model_name=None if model is None else model.model_name)
-        if last_chunk is not None and chunk_setting.enabled_content_extraction:
-            await _add_quick_questions(last_chunk, chunk, chunk_setting)
-            await _add_quick_questions(chunk, last_chunk, chunk_setting)
-        last_chunk = chunk
+            reasoning_chunks.append(chunk)
         new_chunks.append(chunk)
+
+    if reasoning_chunks:
+        model = await model_settings.get_model_byid(chunk_setting.tag_reasoning_model_id)
+        model_name = None if model is None else model.model_name
+        if model is None:
+            model = await model_settings.get_default_model(0)
+        semaphore = asyncio.Semaphore(max(1, model.max_concurrency) if model is not None else 1)
+        prompt = chunk_setting.tag_reasoning_prompt
+        batch_mode = chunk_setting.enabled_batch_tag_reasoning
+        if batch_mode and prompt is not None and prompt.strip() != "":
+            # The batch prompt would replace the custom prompt of the operator
+            batch_mode = False
+            logging.info(f"Batch tag reasoning skipped, a custom tag prompt is set. chunks: {len(reasoning_chunks)}")
+
+        single_chunks = reasoning_chunks
+        if batch_mode:
+            batches = _pack_batches(reasoning_chunks, chunk_setting.tag_reasoning_batch_tokens)
+            failed = await asyncio.gather(*(_label_batch(batch, model_name, semaphore) for batch in batches))
+            single_chunks = [chunk for batch_failed in failed for chunk in batch_failed]
+            logging.info(f"Batch labels generated. chunks: {len(reasoning_chunks)} requests: {len(batches)} "
+                         f"fallback: {len(single_chunks)}")
+
+        if single_chunks:
+            latencies = await asyncio.gather(
+                *(_label_chunk(chunk, prompt, model_name, semaphore) for chunk in single_chunks))
+            failed = sum(1 for chunk in single_chunks if not chunk.labels)
+            logging.info(f"Labels generated. chunks: {len(single_chunks)} failed: {failed} "
+                         f"avg latency: {sum(latencies) // len(latencies)}ms max latency: {max(latencies)}ms")
+
+    if chunk_setting.enabled_content_extraction:
+        last_chunk = None
+        for chunk in new_chunks:
+            if last_chunk is not None:
+                await _add_quick_questions(last_chunk, chunk, chunk_setting)
+                await _add_quick_questions(chunk, last_chunk, chunk_setting)
+            last_chunk = chunk
     return new_chunks
 
 
@@ -0,0 +1,143 @@
+import asyncio
+from types import SimpleNamespace
+from unittest import mock
+
+from django.test import SimpleTestCase
+
+from file_weaver.converter.markdown import markdown_splitter
+from file_weaver.converter.markdown.markdown_splitter import _generate_labels, _pack_batches, _parse_batch_labels
+
+
+def _chunk(content):
+    return SimpleNamespace(content=content, labels=None, start_line=0, end_line=1)
+
+
+class PackBatchesTests(SimpleTestCase):
+
+    def test_consecutive_chunks_share_a_batch_within_the_budget(self):
+        chunks = [_chunk('a' * 40), _chunk('b' * 40), _chunk('c' * 40)]
+        # 10 estimated tokens each
+        self.assertEqual(_pack_batches(chunks, 20), [chunks[:2], chunks[2:]])
+        self.assertEqual(_pack_batches(chunks, 30), [chunks])
+
+    def test_oversized_chunk_forms_its_own_batch(self):
+        chunks = [_chunk('a' * 40), _chunk('b' * 400), _chunk('c' * 40)]
+        self.assertEqual(_pack_batches(chunks, 20), [chunks[:1], chunks[1:2], chunks[2:]])
+
+    def test_empty(self):
+        self.assertEqual(_pack_batches([], 20), [])
+
+
+class ParseBatchLabelsTests(SimpleTestCase):
+
+    def test_fenced_json(self):
+        answer = '结果如下：\n```json\n{"labels": [{"id": 0, "labels": "标签1;标签2"}, {"id": 1, "labels": "标签3"}]}\n```'
+        self.assertEqual(_parse_batch_labels(answer), {0: '标签1;标签2', 1: '标签3'})
+
+    def test_bare_json_with_label_lists(self):
+        answer = 'ok {"labels": [{"id": "2", "labels": ["a", "b"]}]} done'
+        self.assertEqual(_parse_batch_labels(answer), {2: 'a;b'})
+
+    def test_invalid_items_are_skipped(self):
+        answer = '{"labels": [{"id": 0}, {"labels": "x"}, {"id": "y", "labels": "z"}, {"id": 3, "labels": " w "}]}'
+        self.assertEqual(_parse_batch_labels(answer), {3: 'w'})
+
+    def test_unparsable_answers(self):
+        self.assertEqual(_parse_batch_labels(None), {})
+        self.assertEqual(_parse_batch_labels('no json here'), {})
+        self.assertEqual(_parse_batch_labels('{"labels": 1}'), {})
+        self.assertEqual(_parse_batch_labels('[1, 2]'), {})
+
+
+class GenerateLabelsTests(SimpleTestCase):
+
+    def setUp(self):
+        model = SimpleNamespace(model_name='model', max_concurrency=2)
+        patches = [
+            mock.patch.object(markdown_splitter.model_settings, 'get_model_byid', mock.AsyncMock(return_value=model)),
+            mock.patch.object(markdown_splitter, 'text_reasoning', mock.AsyncMock()),
+        ]
+        for patch in patches:
+            patch.start()
+            self.addCleanup(patch.stop)
+        self.text_reasoning = markdown_splitter.text_reasoning
+
+    def chunk_setting(self, prompt):
+        return SimpleNamespace(tag_reasoning_model_id=1, tag_reasoning_prompt=prompt,
+                               enabled_batch_tag_reasoning=True, tag_reasoning_batch_tokens=2000,
+                               enabled_content_extraction=False)
+
+    def test_batch_mode_labels_several_chunks_per_request(self):
+        self.text_reasoning.return_value = '{"labels": [{"id": 0, "labels": "一"}, {"id": 1, "labels": "二"}]}'
+        chunks = [_chunk('第一段内容，超过十个字的正文'), _chunk('第二段内容，超过十个字的正文')]
+        asyncio.run(_generate_labels(chunks, self.chunk_setting('')))
+        self.assertEqual(self.text_reasoning.await_count, 1)
+        self.assertIn('第二段内容', self.text_reasoning.await_args.kwargs['prompt'])
+        self.assertEqual([chunk.labels for chunk in chunks], ['一', '二'])
+
+    def test_missing_chunks_fall_back_to_single_requests(self):
+        self.text_reasoning.side_effect = ['{"labels": [{"id": 0, "labels": "一"}]}', '二']
+        chunks = [_chunk('第一段内容，超过十个字的正文'), _chunk('第二段内容，超过十个字的正文')]
+        asyncio.run(_generate_labels(chunks, self.chunk_setting(None)))
+        self.assertEqual(self.text_reasoning.await_count, 2)
+        self.assertEqual([chunk.labels for chunk in chunks], ['一', '二'])
+
+    def test_custom_prompt_disables_batch_mode(self):
+        self.text_reasoning.return_value = '标签'
+        chunks = [_chunk('第一段内容，超过十个字的正文'), _chunk('第二段内容，超过十个字的正文')]
+        asyncio.run(_generate_labels(chunks, self.chunk_setting('custom prompt')))
+        self.assertEqual(self.text_reasoning.await_count, 2)
+        self.assertEqual({call.kwargs['prompt'] for call in self.text_reasoning.await_args_list}, {'custom prompt'})
+
+    def test_short_chunks_are_their_own_label(self):
+        chunks = [_chunk('## 短标题'), _chunk('   ')]
+        self.assertEqual([chunk.labels for chunk in asyncio.run(_generate_labels(chunks, self.chunk_setting('')))],
+                         [' 短标题'])
+        self.text_reasoning.assert_not_awaited()
+
+
+class ConcurrentLabelsTests(SimpleTestCase):
+
+    def setUp(self):
+        self.model = SimpleNamespace(model_name='model', max_concurrency=3)
+        patch = mock.patch.object(markdown_splitter.model_settings, 'get_model_byid',
+                                  mock.AsyncMock(return_value=self.model))
+        patch.start()
+        self.addCleanup(patch.stop)
+        self.chunk_setting = SimpleNamespace(tag_reasoning_model_id=1, tag_reasoning_prompt=None,
+                                             enabled_batch_tag_reasoning=False, tag_reasoning_batch_tokens=2000,
+                                             enabled_content_extraction=False)
+
+    def run_labels(self, chunks, text_reasoning):
+        with mock.patch.object(markdown_splitter, 'text_reasoning', text_reasoning):
+            return asyncio.run(_generate_labels(chunks, self.chunk_setting))
+
+    def test_requests_run_concurrently_within_the_model_limit(self):
+        running = 0
+        peak = 0
+
+        async def text_reasoning(prompt, model_name):
+            nonlocal running, peak
+            running += 1
+            peak = max(peak, running)
+            index = int(prompt.split('段落')[1].split('：')[0])
+            # Later chunks answer first
+            await asyncio.sleep(0.001 * (10 - index))
+            running -= 1
+            return f'标签{index}'
+
+        chunks = [_chunk(f'段落{i}：超过十个字的正文内容') for i in range(10)]
+        labeled = self.run_labels(chunks, text_reasoning)
+        self.assertEqual(peak, 3)
+        self.assertEqual([chunk.labels for chunk in labeled], [f'标签{i}' for i in range(10)])
+
+    def test_failed_request_leaves_its_chunk_without_label(self):
+        async def text_reasoning(prompt, model_name):
+            if '段落1' in prompt:
+                raise RuntimeError('model down')
+            return '标签'
+
+        chunks = [_chunk(f'段落{i}：超过十个字的正文内容') for i in range(3)]
+        with self.assertLogs('markdown_splitter', 'ERROR'):
+            labeled = self.run_labels(chunks, text_reasoning)
+        self.assertEqual([chunk.labels for chunk in labeled], ['标签', '', '标签'])
@@ -0,0 +1,256 @@
+import asyncio
+import concurrent.futures
+import contextvars
+import logging
+import threading
+
+import httpx
+from django.conf import settings
+from openai import AsyncOpenAI, OpenAI, DefaultAsyncHttpxClient, DefaultHttpxClient
+
+logging = logging.getLogger('client_pool')
+
+
+class PoolCounters:
+    """
+    Usage counters of the client pool
+    clients_created: Number of clients built
+    clients_reused: Number of times an existing client was handed out
+    requests: Number of HTTP requests sent by pooled clients
+    connections_opened: Number of new TCP connections, requests minus this value were served on a reused connection
+    """
+    __slots__ = ('clients_created', 'clients_reused', 'requests', 'connections_opened')
+
+    def __init__(self):
+        self.clients_created = 0
+        self.clients_reused = 0
+        self.requests = 0
+        self.connections_opened = 0
+
+
+_lock = threading.Lock()
+# key -> OpenAI, the sync client is thread safe and shared by every thread
+_sync_clients = {}
+# (key, id(loop)) -> (loop, AsyncOpenAI, close guard), httpx async connections are bound to the loop that opened them
+_async_clients = {}
+_counters = PoolCounters()
+# Long-lived event loop of the synchronous callers, see run_async
+_loop = None
+
+
+def _client_key(client_info):
+    return client_info.base_url, client_info.api_key, client_info.timeout, client_info.max_retries
+
+
+def _pool_limits():
+    pool_setting = getattr(settings, 'LLM_CLIENT_POOL', {})
+    return httpx.Limits(
+        max_connections=pool_setting.get('MAX_CONNECTIONS', 100),
+        max_keepalive_connections=pool_setting.get('MAX_KEEPALIVE_CONNECTIONS', 20),
+        keepalive_expiry=pool_setting.get('KEEPALIVE_EXPIRY', 60),
+    )
+
+
+def _count_request():
+    with _lock:
+        _counters.requests += 1
+
+
+def _count_connection(name):
+    if name == 'connection.connect_tcp.complete':
+        with _lock:
+            _counters.connections_opened += 1
+
+
+def _trace(name, info):
+    _count_connection(name)
+
+
+async def _async_trace(name, info):
+    _count_connection(name)
+
+
+def _on_request(request):
+    _count_request()
+    request.extensions['trace'] = _trace
+
+
+async def _on_async_request(request):
+    _count_request()
+    request.extensions['trace'] = _async_trace
+
+
+def _prune_closed_loops():
+    """
+    Drop the async clients whose event loop has been closed, their connections can no longer be used.
+    The clients are closed by their guard when the loop shuts down, see _close_with_loop, only loops closed without
+    shutting down their async generators leave a client open.
+    Must be called while holding the lock.
+    """
+    for key in [k for k, (loop, _, _) in _async_clients.items() if loop.is_closed()]:
+        _, client, _ = _async_clients.pop(key)
+        if not client.is_closed():
+            logging.warning("Async client of a closed event loop was not closed, its connections are released "
+                            "when it is garbage collected. Close loops with asyncio.run or loop.shutdown_asyncgens.")
+
+
+async def _close_with_loop(key, client):
+    """
+    Close guard of an async client. The guard is suspended at its yield for the life of the loop,
+    loop.shutdown_asyncgens, called by asyncio.run before the loop is closed, resumes it and the client is closed
+    on its own loop.
+    """
+    try:
+        yield
+    finally:
+        with _lock:
+            entry = _async_clients.get(key)
+            if entry is not None and entry[1] is client:
+                _async_clients.pop(key)
+        await client.close()
+
+
+async def _start_guard(guard):
+    await guard.__anext__()
+
+
+def get_client(client_info) -> OpenAI:
+    """
+    Get the long-lived sync client of the model
+    :param client_info: ModelSettings of the model to be called
+    :return: Pooled OpenAI client
+    """
+    key = _client_key(client_info)
+    with _lock:
+        client = _sync_clients.get(key)
+        if client is not None:
+            _counters.clients_reused += 1
+            return client
+
+        client = OpenAI(
+            api_key=client_info.api_key,
+            base_url=client_info.base_url,
+            timeout=client_info.timeout,
+            max_retries=client_info.max_retries,
+            http_client=DefaultHttpxClient(limits=_pool_limits(), event_hooks={'request': [_on_request]}),
+        )
+        _sync_clients[key] = client
+        _counters.clients_created += 1
+        return client
+
+
+def get_async_client(client_info) -> AsyncOpenAI:
+    """
+    Get the long-lived async client of the model for the running event loop
+    :param client_info: ModelSettings of the model to be called
+    :return: Pooled AsyncOpenAI client
+    """
+    loop = asyncio.get_running_loop()
+    key = (_client_key(client_info), id(loop))
+    with _lock:
+        _prune_closed_loops()
+        entry = _async_clients.get(key)
+        if entry is not None and entry[0] is loop and not entry[1].is_closed():
+            _counters.clients_reused += 1
+            return entry[1]
+
+        client = AsyncOpenAI(
+            api_key=client_info.api_key,
+            base_url=client_info.base_url,
+            timeout=client_info.timeout,
+            max_retries=client_info.max_retries,
+            http_client=DefaultAsyncHttpxClient(limits=_pool_limits(),
+                                                event_hooks={'request': [_on_async_request]}),
+        )
+        # The loop only tracks its async generators weakly, the entry holds the guard
+        guard = _close_with_loop(key, client)
+        _async_clients[key] = (loop, client, guard)
+        _counters.clients_created += 1
+    loop.create_task(_start_guard(guard))
+    return client
+
+
+def _get_loop():
+    global _loop
+    with _lock:
+        if _loop is None or _loop.is_closed():
+            _loop = asyncio.new_event_loop()
+            threading.Thread(target=_loop.run_forever, name='llm-client-loop', daemon=True).start()
+        return _loop
+
+
+def run_async(coro):
+    """
+    Run a coroutine from synchronous code and wait for its result.
+    The coroutines of all synchronous callers share one long-lived event loop, asyncio.run would build a new loop
+    and with it new async clients and connections on every call. The context variables of the caller, e.g. the
+    usage scope and the request priority, are passed on to the coroutine.
+    :param coro: Coroutine, must not block the event loop
+    :return: Result of the coroutine
+    """
+    try:
+        asyncio.get_running_loop()
+    except RuntimeError:
+        pass
+    else:
+        coro.close()
+        raise RuntimeError("run_async() cannot be called from a running event loop")
+    loop = _get_loop()
+    future = concurrent.futures.Future()
+
+    def done(task):
+        if task.cancelled():
+            future.set_exception(concurrent.futures.CancelledError())
+        elif task.exception() is not None:
+            future.set_exception(task.exception())
+        else:
+            future.set_result(task.result())
+
+    def start():
+        loop.create_task(coro).add_done_callback(done)
+
+    loop.call_soon_threadsafe(start, context=contextvars.copy_context())
+    return future.result()
+
+
+def evict_clients(client_info):
+    """
+    Close and drop every pooled client built from the model settings, called when the model row changes
+    :param client_info: ModelSettings before the change
+    """
+    key = _client_key(client_info)
+    with _lock:
+        sync_client = _sync_clients.pop(key, None)
+        async_entries = [_async_clients.pop(k) for k in [k for k in _async_clients if k[0] == key]]
+
+    if sync_client is not None:
+        sync_client.close()
+    for loop, client, guard in async_entries:
+        if loop.is_closed():
+            continue
+        try:
+            asyncio.run_coroutine_threadsafe(client.close(), loop)
+        except RuntimeError as e:
+            logging.warning(f"Async client could not be closed, it will be released with its loop. e: {e}")
+    logging.info(f"Evicted pooled clients of {client_info.base_url}")
+
+
+def client_pool_stats():
+    """
+    Pool size limits and connection reuse counters
+    """
+    limits = _pool_limits()
+    with _lock:
+        _prune_closed_loops()
+        return {
+            'max_connections': limits.max_connections,
+            'max_keepalive_connections': limits.max_keepalive_connections,
+            'keepalive_expiry': limits.keepalive_expiry,
+            'sync_clients': len(_sync_clients),
+            'async_clients': len(_async_clients),
+            'clients_created': _counters.clients_created,
+            'clients_reused': _counters.clients_reused,
+            'requests': _counters.requests,
+            'connections_opened': _counters.connections_opened,
+            'connections_reused': max(_counters.requests - _counters.connections_opened, 0),
+        }
@@ -0,0 +1,143 @@
+import asyncio
+import logging
+import math
+import threading
+import time
+from collections import deque
+
+from django.conf import settings
+
+logging = logging.getLogger('hedging')
+
+
+class _ModelLatency:
+    __slots__ = ('samples', 'requests', 'hedges', 'wins')
+
+    def __init__(self, window):
+        self.samples = deque(maxlen=window)
+        self.requests = 0
+        self.hedges = 0
+        self.wins = 0
+
+    def percentile(self, percentile):
+        ordered = sorted(self.samples)
+        return ordered[min(len(ordered) - 1, math.ceil(len(ordered) * percentile / 100) - 1)]
+
+
+class RequestHedger:
+    """
+    Hedging of idempotent model requests.
+    When a request is slower than the observed latency percentile of its model a duplicate is sent, the first answer
+    wins and the other request is cancelled. Duplicates are capped to a share of the requests. A cancelled primary
+    request is observed with the time it ran, a lower bound of its latency.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._models = {}
+
+    def _setting(self, name, default):
+        return getattr(settings, 'LLM_HEDGE', {}).get(name, default)
+
+    def enabled(self, stage):
+        return self._setting('ENABLED', False) and stage in self._setting('STAGES', ('tag', 'image'))
+
+    def _model(self, model_name):
+        model = self._models.get(model_name)
+        if model is None:
+            model = self._models[model_name] = _ModelLatency(self._setting('WINDOW', 200))
+        return model
+
+    def _delay(self, model_name):
+        """
+        Seconds to wait before hedging, None while too few latencies are known
+        """
+        with self._lock:
+            model = self._model(model_name)
+            model.requests += 1
+            if len(model.samples) < self._setting('MIN_SAMPLES', 20):
+                return None
+            return model.percentile(self._setting('PERCENTILE', 95))
+
+    def _try_hedge(self, model_name):
+        with self._lock:
+            model = self._model(model_name)
+            if model.hedges + 1 > model.requests * self._setting('MAX_EXTRA_RATIO', 0.1):
+                return False
+            model.hedges += 1
+            return True
+
+    def _observe(self, model_name, latency):
+        with self._lock:
+            self._model(model_name).samples.append(latency)
+
+    def _won(self, model_name):
+        with self._lock:
+            self._model(model_name).wins += 1
+
+    async def run(self, client_info, run, alternate=None):
+        """
+        Run a request, hedged when it takes longer than usual
+        :param client_info: ModelSettings of the primary request
+        :param run: Coroutine function making the request for the ModelSettings it receives
+        :param alternate: Coroutine function returning the ModelSettings of the duplicate, the primary model is used
+        when it is None or returns None
+        :return: Result of the request answering first
+        """
+        model_name = client_info.model_name
+
+        async def timed(info):
+            start = time.monotonic()
+            result = await run(info)
+            self._observe(info.model_name, time.monotonic() - start)
+            return result
+
+        start = time.monotonic()
+        primary = asyncio.ensure_future(timed(client_info))
+        backup = None
+        try:
+            delay = self._delay(model_name)
+            if delay is None:
+                return await primary
+            done, pending = await asyncio.wait({primary}, timeout=delay)
+            if done or not self._try_hedge(model_name):
+                return await primary
+
+            hedge_info = (await alternate() if alternate is not None else None) or client_info
+            logging.info(f"Request hedged after {delay:.2f}s. model: {model_name} "
+                         f"hedge model: {hedge_info.model_name}")
+            backup = asyncio.ensure_future(timed(hedge_info))
+            pending = {primary, backup}
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if not task.cancelled() and task.exception() is None:
+                        if task is backup:
+                            self._won(model_name)
+                        return task.result()
+            # Both failed, the error of the primary request is raised
+            return primary.result()
+        finally:
+            if backup is not None and not primary.done():
+                # The cancelled primary took at least this long. Leaving it out would keep only the requests that
+                # answered in time and shrink the percentile the hedging is triggered by.
+                self._observe(model_name, time.monotonic() - start)
+            # The losing request, or both when the caller is cancelled
+            for task in (primary, backup):
+                if task is not None:
+                    task.cancel()
+
+    def stats(self):
+        with self._lock:
+            return [{
+                'model_name': model_name,
+                'requests': model.requests,
+                'hedges': model.hedges,
+                'hedge_wins': model.wins,
+                'hedge_rate': round(model.hedges / model.requests, 4) if model.requests else 0,
+                'win_rate': round(model.wins / model.hedges, 4) if model.hedges else 0,
+                'p95_latency_ms': round(model.percentile(95) * 1000) if model.samples else None,
+            } for model_name, model in self._models.items()]
+
+
+REQUEST_HEDGER = RequestHedger()
@@ -0,0 +1,136 @@
+import hashlib
+import logging
+import threading
+from collections import OrderedDict
+
+import fitz
+
+logging = logging.getLogger('image_dedup')
+
+
+def content_hash(image_bytes):
+    """
+    Exact identity of an image
+    """
+    return hashlib.sha256(image_bytes).hexdigest()
+
+
+def perceptual_hash(image_bytes):
+    """
+    64 bit difference hash of an image, close images differ in few bits.
+    The image is decoded by fitz, scaled to 9x8 gray pixels and every pixel is compared with its right neighbour.
+    :param image_bytes: Encoded image
+    :return: Hash as 16 hex characters, None when fitz can not decode the image
+    """
+    try:
+        pix = fitz.Pixmap(image_bytes)
+        if pix.alpha:
+            pix = fitz.Pixmap(pix, 0)
+        if pix.n != 1:
+            pix = fitz.Pixmap(fitz.csGRAY, pix)
+        small = fitz.Pixmap(pix, 9, 8, None)
+    except Exception as e:
+        logging.debug(f"Perceptual hash skipped, image can not be decoded. e: {e}")
+        return None
+
+    samples = small.samples
+    stride = small.stride
+    value = 0
+    for row in range(8):
+        offset = row * stride
+        for col in range(8):
+            value = (value << 1) | (samples[offset + col] > samples[offset + col + 1])
+    return f'{value:016x}'
+
+
+def description_key(prompt, model_name):
+    """
+    Identity of the picture reasoning that produced a description, descriptions are only reused for the same key
+    :param prompt: Picture reasoning prompt
+    :param model_name: Name of the multimodal model
+    :return: Hex digest of the sha256 hash
+    """
+    return hashlib.sha256(f'{model_name or ""}\x00{prompt or ""}'.encode('utf-8')).hexdigest()
+
+
+def hash_distance(first, second):
+    """
+    Number of differing bits of two perceptual hashes
+    """
+    return bin(int(first, 16) ^ int(second, 16)).count('1')
+
+
+class DedupStats:
+    """
+    Deduplication counters of one file, persisted to its FileTask and summed per upload batch
+    images: Images seen
+    exact_duplicates: Images whose bytes were already described
+    near_duplicates: Images whose perceptual hash is close to an already described image
+    model_calls: Images sent to the picture model
+    """
+    __slots__ = ('images', 'exact_duplicates', 'near_duplicates', 'model_calls')
+
+    def __init__(self):
+        self.images = 0
+        self.exact_duplicates = 0
+        self.near_duplicates = 0
+        self.model_calls = 0
+
+    def count(self, images=0, exact_duplicates=0, near_duplicates=0, model_calls=0):
+        self.images += images
+        self.exact_duplicates += exact_duplicates
+        self.near_duplicates += near_duplicates
+        self.model_calls += model_calls
+
+    def to_dict(self):
+        return {
+            'images': self.images,
+            'exact_duplicates': self.exact_duplicates,
+            'near_duplicates': self.near_duplicates,
+            'model_calls': self.model_calls,
+            'model_calls_saved': self.exact_duplicates + self.near_duplicates,
+        }
+
+
+class ImageDedupRegistry:
+    """
+    Descriptions of the images already described by this process, shared by all documents of all batches.
+    Exact matches are looked up by content hash, near matches by the distance of the perceptual hashes, both only
+    among the descriptions made with the same prompt and model.
+    """
+
+    def __init__(self, max_entries=20000):
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+
+    def find(self, key, digest, phash, max_distance):
+        """
+        Find the description of the same or a near image
+        :param key: description_key of the prompt and model
+        :param digest: Content hash of the image
+        :param phash: Perceptual hash of the image, None to only look for the same image
+        :param max_distance: Largest number of differing hash bits regarded as the same image
+        :return: (description, exact) or None
+        """
+        with self._lock:
+            entry = self._entries.get((key, digest))
+            if entry is not None:
+                self._entries.move_to_end((key, digest))
+                return entry[1], True
+            if phash is None or max_distance < 0:
+                return None
+            for (other_key, other_digest), (other_phash, description) in reversed(self._entries.items()):
+                if other_key == key and other_phash is not None and hash_distance(phash, other_phash) <= max_distance:
+                    return description, False
+        return None
+
+    def add(self, key, digest, phash, description):
+        with self._lock:
+            self._entries[(key, digest)] = (phash, description)
+            self._entries.move_to_end((key, digest))
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+
+IMAGE_DEDUP_REGISTRY = ImageDedupRegistry()
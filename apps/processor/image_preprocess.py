@@ -0,0 +1,102 @@
+import logging
+import math
+
+import fitz
+
+logging = logging.getLogger('image_preprocess')
+
+# Leading bytes of the formats accepted by the picture models, the subtype is used in the data URL
+_SIGNATURES = (
+    (b'\xff\xd8\xff', 'jpeg'),
+    (b'\x89PNG\r\n\x1a\n', 'png'),
+    (b'GIF87a', 'gif'),
+    (b'GIF89a', 'gif'),
+    (b'BM', 'bmp'),
+    (b'II*\x00', 'tiff'),
+    (b'MM\x00*', 'tiff'),
+)
+
+# Formats the picture models accept in a data URL, the others are always re-encoded
+_ACCEPTED_SUBTYPES = ('jpeg', 'png', 'webp', 'gif')
+
+# Edge of the gray thumbnail the entropy of an image is measured on
+_ENTROPY_EDGE = 64
+
+
+def image_subtype(image_bytes):
+    """
+    Detect the image format from its leading bytes instead of trusting the file extension
+    :return: MIME subtype such as jpeg or png, None when the format is unknown
+    """
+    if image_bytes[:4] == b'RIFF' and image_bytes[8:12] == b'WEBP':
+        return 'webp'
+    for signature, subtype in _SIGNATURES:
+        if image_bytes[:len(signature)] == signature:
+            return subtype
+    return None
+
+
+def _entropy(pix):
+    """
+    Shannon entropy in bits of the gray levels of a small thumbnail of the image, 0 for a single color image
+    """
+    if pix.alpha:
+        pix = fitz.Pixmap(pix, 0)
+    if pix.n != 1:
+        pix = fitz.Pixmap(fitz.csGRAY, pix)
+    if pix.width > _ENTROPY_EDGE or pix.height > _ENTROPY_EDGE:
+        scale = _ENTROPY_EDGE / max(pix.width, pix.height)
+        pix = fitz.Pixmap(pix, max(1, round(pix.width * scale)), max(1, round(pix.height * scale)), None)
+    histogram = [0] * 256
+    samples = pix.samples
+    for row in range(pix.height):
+        offset = row * pix.stride
+        for value in samples[offset:offset + pix.width]:
+            histogram[value] += 1
+    total = pix.width * pix.height
+    return -sum(count / total * math.log2(count / total) for count in histogram if count)
+
+
+def preprocess_image(image_bytes, chunk_setting):
+    """
+    Prepare an extracted image for picture reasoning.
+    Tiny, blank and low entropy (decorative) images are dropped, larger images are scaled down to the maximum edge
+    and re-encoded as JPEG when that makes them smaller. PNG is kept for images with transparency.
+    :param image_bytes: Encoded image as extracted from the document
+    :param chunk_setting: ChunkSettings holding the thresholds
+    :return: (image bytes, MIME subtype), None when the image is dropped
+    """
+    subtype = image_subtype(image_bytes)
+    if not chunk_setting.enabled_image_preprocess:
+        return image_bytes, subtype or 'png'
+    try:
+        pix = fitz.Pixmap(image_bytes)
+    except Exception as e:
+        # Formats fitz can not decode (e.g. emf/wmf) are passed on unchanged, the model decides
+        logging.debug(f"Image can not be decoded, sent unchanged. e: {e}")
+        return image_bytes, subtype or 'png'
+
+    if min(pix.width, pix.height) < chunk_setting.image_min_edge:
+        logging.debug(f"Image dropped, too small. size: {pix.width}x{pix.height}")
+        return None
+    entropy = _entropy(pix)
+    if entropy < chunk_setting.image_min_entropy:
+        logging.debug(f"Image dropped, blank or decorative. entropy: {entropy:.2f}")
+        return None
+
+    max_edge = chunk_setting.image_max_edge
+    resized = max_edge > 0 and max(pix.width, pix.height) > max_edge
+    if resized:
+        scale = max_edge / max(pix.width, pix.height)
+        pix = fitz.Pixmap(pix, max(1, round(pix.width * scale)), max(1, round(pix.height * scale)), None)
+
+    if pix.alpha:
+        output, output_subtype = pix.tobytes('png'), 'png'
+    else:
+        if pix.colorspace is None or pix.colorspace.n not in (1, 3):
+            pix = fitz.Pixmap(fitz.csRGB, pix)
+        output, output_subtype = pix.tobytes('jpeg', jpg_quality=chunk_setting.image_jpeg_quality), 'jpeg'
+
+    if not resized and subtype in _ACCEPTED_SUBTYPES and len(output) >= len(image_bytes):
+        return image_bytes, subtype
+    return output, output_subtype
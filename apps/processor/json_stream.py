@@ -0,0 +1,119 @@
+import json
+import logging
+
+from processor.models.title_model import TitleInfo
+
+logging = logging.getLogger('json_stream')
+
+
+class TitleStreamParser:
+    """
+    Incremental parser of the title list answered by the title hierarchy reasoning.
+    Each delta is scanned once, a title is emitted as soon as its json object is closed, so the answer never needs to
+    be re-scanned and the stream can be stopped once the list is complete.
+    """
+    ARRAY_KEY = '"content"'
+
+    def __init__(self):
+        self.text = ''
+        self.titles = []
+        self.done = False
+        self._pos = 0
+        self._in_array = False
+        self._depth = 0
+        self._in_string = False
+        self._escape = False
+        self._object_start = -1
+
+    def feed(self, delta):
+        """
+        Consume the next piece of the answer
+        :param delta: Text of the stream chunk
+        :return: Titles completed by this piece
+        """
+        self.text += delta
+        completed = []
+        if self.done:
+            return completed
+        if not self._in_array and not self._find_array():
+            return completed
+
+        text = self.text
+        for i in range(self._pos, len(text)):
+            char = text[i]
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif char == '\\':
+                    self._escape = True
+                elif char == '"':
+                    self._in_string = False
+                continue
+            if char == '"':
+                self._in_string = True
+            elif char == '{':
+                if self._depth == 0:
+                    self._object_start = i
+                self._depth += 1
+            elif char == '}':
+                self._depth -= 1
+                if self._depth == 0 and self._object_start >= 0:
+                    title = self._parse_object(text[self._object_start:i + 1])
+                    if title is not None:
+                        completed.append(title)
+                    self._object_start = -1
+            elif char == ']' and self._depth == 0:
+                self.done = True
+                self._pos = i + 1
+                break
+        else:
+            self._pos = len(text)
+        self.titles.extend(completed)
+        return completed
+
+    def _find_array(self):
+        key_index = self.text.find(self.ARRAY_KEY)
+        if key_index == -1:
+            return False
+        array_index = self.text.find('[', key_index + len(self.ARRAY_KEY))
+        if array_index == -1:
+            return False
+        self._in_array = True
+        self._pos = array_index + 1
+        return True
+
+    @staticmethod
+    def _parse_object(text):
+        try:
+            item = json.loads(text)
+        except json.JSONDecodeError as e:
+            logging.error(f"Title can not be parsed. text: {text} e: {e}")
+            return None
+        if not isinstance(item, dict) or not item.get('text'):
+            return None
+        return TitleInfo(item['text'], item.get('lines'))
+
+    def to_context(self):
+        """
+        The titles in the format expected by replace_titles
+        """
+        return {'content': [title.to_dict() for title in self.titles]}
+
+
+def merge_title_parsers(parsers):
+    """
+    Merge the titles reasoned for consecutive windows of a document, titles repeated by overlapping windows are kept once
+    :return: TitleStreamParser holding the merged titles, done when every window was complete
+    """
+    merged = TitleStreamParser()
+    merged.done = all(parser.done for parser in parsers)
+    seen = set()
+    for parser in parsers:
+        for title in parser.titles:
+            key = (title.text, json.dumps(title.lines, ensure_ascii=False, sort_keys=True))
+            if key in seen:
+                continue
+            seen.add(key)
+            merged.titles.append(title)
+    merged.text = json.dumps(merged.to_context(), ensure_ascii=False)
+    return merged
@@ -0,0 +1,151 @@
+import logging
+import multiprocessing
+import os
+import resource
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+from django.conf import settings
+
+logging = logging.getLogger('markdown_converter')
+
+_pool = None
+_pool_files = {}
+_pool_lock = threading.Lock()
+_stats = {'files': 0, 'cpu_seconds': 0.0, 'max_rss_mb': 0.0, 'recycles': 0}
+
+# Warm converter of a worker process, see _init_worker
+_converter = None
+_converted = 0
+
+
+def _setting(name, default):
+    return getattr(settings, 'DOCUMENT_EXTRACTION', {}).get(name, default)
+
+
+class ConversionUsage:
+    """
+    Resources a worker process used for one file
+    cpu_seconds: CPU time of the conversion
+    rss_mb: Resident memory of the worker after the conversion
+    """
+    __slots__ = ('cpu_seconds', 'rss_mb', 'pid', 'worker_files')
+
+    def __init__(self, cpu_seconds, rss_mb, pid, worker_files):
+        self.cpu_seconds = cpu_seconds
+        self.rss_mb = rss_mb
+        self.pid = pid
+        self.worker_files = worker_files
+
+
+def _init_worker():
+    """
+    Import the converter stack once per worker process and keep a warm MarkItDown
+    """
+    global _converter
+    from markitdown import MarkItDown
+    _converter = MarkItDown()
+
+
+def _rss_mb():
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE') / 1024 / 1024
+    except (OSError, ValueError, IndexError):
+        # Peak instead of current resident memory, in KB on Linux
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def _convert(file_path):
+    global _converted
+    start = time.process_time()
+    text = _converter.convert(file_path).text_content
+    _converted += 1
+    return text, ConversionUsage(time.process_time() - start, _rss_mb(), os.getpid(), _converted)
+
+
+def _get_pool():
+    """
+    Process pool of the MarkItDown conversions, created on first use.
+    Parsing docx, pptx and xlsx files holds the GIL, in processes the conversions of several files run in parallel.
+    """
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ProcessPoolExecutor(max_workers=_setting('MARKDOWN_WORKERS', 4),
+                                        mp_context=multiprocessing.get_context('spawn'),
+                                        initializer=_init_worker)
+            _pool_files.clear()
+        return _pool
+
+
+def _recycle(pool, usage):
+    """
+    Replace the pool once one of its workers converted too many files or grew too large, the document libraries
+    leak memory. The files already submitted to the old pool still finish on it.
+    """
+    global _pool
+    max_files = _setting('MARKDOWN_MAX_FILES_PER_WORKER', 200)
+    max_rss_mb = _setting('MARKDOWN_MAX_RSS_MB', 1024)
+    with _pool_lock:
+        _stats['files'] += 1
+        _stats['cpu_seconds'] += usage.cpu_seconds
+        _stats['max_rss_mb'] = max(_stats['max_rss_mb'], usage.rss_mb)
+        if pool is not _pool:
+            return
+        _pool_files[usage.pid] = usage.worker_files
+        if (not max_files or usage.worker_files < max_files) and (not max_rss_mb or usage.rss_mb < max_rss_mb):
+            return
+        _pool = None
+        _stats['recycles'] += 1
+    logging.info(f"Markdown workers recycled. pid: {usage.pid} files: {usage.worker_files} "
+                 f"rss: {usage.rss_mb:.0f}MB")
+    pool.shutdown(wait=False)
+
+
+def _discard(pool):
+    global _pool
+    with _pool_lock:
+        if pool is _pool:
+            _pool = None
+    pool.shutdown(wait=False)
+
+
+def convert_markdown(file_path):
+    """
+    Convert a document to markdown in a worker process
+    :param file_path: Document file path, the worker reads it from the shared file system
+    :return: (Markdown text, ConversionUsage)
+    """
+    while True:
+        pool = _get_pool()
+        try:
+            future = pool.submit(_convert, file_path)
+            break
+        except BrokenProcessPool:
+            _discard(pool)
+            raise
+        except RuntimeError:
+            # The pool was recycled by another thread between _get_pool and submit
+            if pool is _pool:
+                raise
+    try:
+        text, usage = future.result()
+    except BrokenProcessPool:
+        # A worker died, e.g. killed for its memory, the next file starts a new pool
+        _discard(pool)
+        raise
+    _recycle(pool, usage)
+    return text, usage
+
+
+def stats():
+    with _pool_lock:
+        return {
+            **_stats,
+            'cpu_seconds': round(_stats['cpu_seconds'], 3),
+            'max_rss_mb': round(_stats['max_rss_mb'], 1),
+            'worker_files': dict(_pool_files),
+        }
@@ -0,0 +1,33 @@
+# Generated by Django 4.2.18 on 2026-10-17 18:11
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ModelSettings',
+            fields=[
+                ('id', models.BigAutoField(primary_key=True, serialize=False)),
+                ('name', models.CharField(max_length=100, verbose_name='The name presented to the user')),
+                ('model_name', models.CharField(max_length=100, unique=True, verbose_name='The name of the model')),
+                ('api_key', models.CharField(db_index=True, max_length=200, verbose_name='Model API Key')),
+                ('base_url', models.CharField(db_index=True, max_length=500, verbose_name='Model API Base URL')),
+                ('temperature', models.FloatField(default=0.7, verbose_name='Call the temperature of the model, which defaults to 0.7')),
+                ('enable', models.BooleanField(default=False, verbose_name='Enable this model')),
+                ('default_model', models.BooleanField(default=False, verbose_name='Default use this model')),
+                ('model_type', models.IntegerField(default=0, verbose_name='The model type. 0 LLM model, 1 Multimodal model')),
+                ('timeout', models.IntegerField(default=30, verbose_name='Model call timeout, default 30')),
+                ('max_retries', models.IntegerField(default=3, verbose_name='Model max retries , default 3')),
+            ],
+            options={
+                'db_table': 'model_settings',
+            },
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 4.2.18 on 2026-10-17 18:11
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('processor', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='modelsettings',
+            name='max_concurrency',
+            field=models.IntegerField(default=5, verbose_name='Maximum concurrent requests of one document, default 5'),
+        ),
+    ]
@@ -0,0 +1,181 @@
+import logging
+import random
+import threading
+import time
+
+import openai
+from django.conf import settings
+
+from processor.models.model_settings import get_default_model, get_model, list_enabled_models
+
+logging = logging.getLogger('model_router')
+
+# Circuit states of an endpoint
+CLOSED = 'closed'
+OPEN = 'open'
+HALF_OPEN = 'half_open'
+
+
+def _is_endpoint_failure(error):
+    """
+    Whether the error says something about the health of the endpoint, rejected requests do not
+    """
+    if isinstance(error, (openai.APIConnectionError, openai.APITimeoutError, openai.InternalServerError)):
+        return True
+    if isinstance(error, openai.APIStatusError):
+        return error.status_code >= 500
+    return False
+
+
+class EndpointHealth:
+    """
+    Observed health of one model (one ModelSettings row).
+    The latency is an exponentially weighted moving average, the circuit opens after consecutive failures and lets
+    a single probe request through once the open period has passed.
+    """
+
+    def __init__(self, model_name):
+        self.model_name = model_name
+        self.latency = None
+        self.failures = 0
+        self.state = CLOSED
+        self.opened_at = 0.0
+        self.probe_started = 0.0
+        self.requests = 0
+        self.errors = 0
+
+    def stats(self):
+        return {
+            'model_name': self.model_name,
+            'state': self.state,
+            'latency_ms': None if self.latency is None else round(self.latency * 1000),
+            'consecutive_failures': self.failures,
+            'requests': self.requests,
+            'errors': self.errors,
+        }
+
+
+class ModelRouter:
+    """
+    Chooses the model of a request among all enabled models of the requested type.
+    Healthy models are picked at random weighted by the inverse of their observed latency, models with an open
+    circuit are skipped. Callers naming a model are always served by that model.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._health = {}
+
+    def _setting(self, name, default):
+        return getattr(settings, 'LLM_ROUTER', {}).get(name, default)
+
+    def _endpoint(self, model_name):
+        health = self._health.get(model_name)
+        if health is None:
+            health = self._health[model_name] = EndpointHealth(model_name)
+        return health
+
+    def _available(self, health, now):
+        """
+        Whether the model may take a request, must be called while holding the lock
+        """
+        if health.state == CLOSED:
+            return True
+        open_seconds = self._setting('OPEN_SECONDS', 30)
+        if health.state == OPEN and now - health.opened_at >= open_seconds:
+            health.state = HALF_OPEN
+        # A probe that never reported back (e.g. answered from the cache) does not block the model forever
+        return health.state == HALF_OPEN and now - health.probe_started >= open_seconds
+
+    def _choose(self, candidates):
+        now = time.monotonic()
+        with self._lock:
+            healthy = [model for model in candidates if self._available(self._endpoint(model.model_name), now)]
+            if not healthy:
+                return None
+            known = [self._health[model.model_name].latency for model in healthy
+                     if self._health[model.model_name].latency is not None]
+            # Models without observations are weighted like an average one so that they receive traffic
+            default_latency = sum(known) / len(known) if known else 1.0
+            weights = [1.0 / max(self._health[model.model_name].latency or default_latency, 0.001)
+                       for model in healthy]
+            chosen = random.choices(healthy, weights=weights)[0]
+            health = self._health[chosen.model_name]
+            if health.state == HALF_OPEN:
+                health.probe_started = now
+            return chosen
+
+    async def resolve(self, model_type, model_name=None):
+        """
+        The model serving a request
+        :param model_type: 0 LLM model, 1 Multimodal model
+        :param model_name: Pinned model, routing is skipped when it is given
+        :return: ModelSettings, None when no model fits
+        """
+        if model_name is not None:
+            return await get_model(model_name=model_name)
+        if not self._setting('ENABLED', True):
+            return await get_default_model(model_type)
+        candidates = await list_enabled_models(model_type)
+        if len(candidates) <= 1:
+            return candidates[0] if candidates else await get_default_model(model_type)
+        chosen = self._choose(candidates)
+        if chosen is None:
+            # Every circuit is open, the default model is tried rather than failing without a request
+            logging.warning(f"No healthy model, the default model is used. model type: {model_type}")
+            return await get_default_model(model_type) or candidates[0]
+        return chosen
+
+    async def alternate(self, client_info):
+        """
+        Another healthy model of the same type, used for hedged duplicates of unpinned requests
+        :return: ModelSettings, None when there is no other healthy model
+        """
+        if not self._setting('ENABLED', True):
+            return None
+        candidates = [model for model in await list_enabled_models(client_info.model_type)
+                      if model.model_name != client_info.model_name]
+        return self._choose(candidates) if candidates else None
+
+    def observe(self, client_info, latency, error=None):
+        """
+        Record the outcome of a request
+        :param client_info: ModelSettings of the model called
+        :param latency: Seconds the request took
+        :param error: Exception raised by the request, None on success
+        """
+        alpha = self._setting('EWMA_ALPHA', 0.2)
+        with self._lock:
+            health = self._endpoint(client_info.model_name)
+            health.requests += 1
+            health.probe_started = 0.0
+            if error is None:
+                health.latency = latency if health.latency is None else alpha * latency + (1 - alpha) * health.latency
+                health.failures = 0
+                if health.state != CLOSED:
+                    logging.info(f"Circuit closed. model: {health.model_name}")
+                health.state = CLOSED
+                return
+            if not _is_endpoint_failure(error):
+                return
+            health.errors += 1
+            health.failures += 1
+            if health.state == HALF_OPEN or health.failures >= self._setting('FAILURE_THRESHOLD', 3):
+                if health.state != OPEN:
+                    logging.warning(f"Circuit opened after {health.failures} failures. model: {health.model_name}")
+                health.state = OPEN
+                health.opened_at = time.monotonic()
+
+    def stats(self):
+        with self._lock:
+            return [health.stats() for health in self._health.values()]
+
+
+MODEL_ROUTER = ModelRouter()
+
+
+async def resolve_model(model_type, model_name=None):
+    """
+    The model serving a request, see ModelRouter.resolve
+    """
+    return await MODEL_ROUTER.resolve(model_type, model_name)
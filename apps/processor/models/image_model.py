@@ -12,3 +12,7 @@ class PictureReasoningResult:
         self.interpretation = interpretation
         self.classify = classify
         self.successfully = successfully
+
+    def to_dict(self):
+        return {'image_id': self.image_id, 'interpretation': self.interpretation, 'classify': self.classify,
+                'successfully': self.successfully}
@@ -1,9 +1,11 @@
 import logging
 
-from asgiref.sync import sync_to_async
+from application.models.settings_version import SettingsCache
 from common.action_result import ActionResult
 from django.db import models, IntegrityError
 
+from processor.client_pool import evict_clients
+
 logging = logging.getLogger("model settings")
 
 
@@ -20,11 +22,16 @@ class ModelSettings(models.Model):
     model_type = models.IntegerField(default=0, verbose_name='The model type. 0 LLM model, 1 Multimodal model')
     timeout = models.IntegerField(default=30, verbose_name='Model call timeout, default 30')
     max_retries = models.IntegerField(default=3, verbose_name='Model max retries , default 3')
+    max_concurrency = models.IntegerField(default=5,
+                                          verbose_name='Maximum concurrent requests of one document, default 5')
 
     class Meta:
         db_table = 'model_settings'
 
 
+MODEL_SETTINGS_CACHE = SettingsCache('model_settings')
+
+
 def list_models(model_type, enable_model=True):
     if not model_type:
         return ModelSettings.objects.all()
@@ -32,31 +39,35 @@ def list_models(model_type, enable_model=True):
 
 
 async def get_model(model_name=None):
-    @sync_to_async
-    def select(m_name):
-        return ModelSettings.objects.filter(model_name=m_name, enable=True).first()
+    def select():
+        return ModelSettings.objects.filter(model_name=model_name, enable=True).first()
 
-    return await select(model_name)
+    return await MODEL_SETTINGS_CACHE.aget(('model_name', model_name), select)
 
 
 async def get_default_model(model_type):
-    @sync_to_async
-    def select(m_type):
-        return ModelSettings.objects.filter(model_type=m_type, default_model=True, enable=True).first()
+    def select():
+        return ModelSettings.objects.filter(model_type=model_type, default_model=True, enable=True).first()
+
+    return await MODEL_SETTINGS_CACHE.aget(('default_model', model_type), select)
+
+
+async def list_enabled_models(model_type):
+    def select():
+        return list(ModelSettings.objects.filter(model_type=model_type, enable=True).order_by('id'))
 
-    return await select(model_type)
+    return await MODEL_SETTINGS_CACHE.aget(('enabled', model_type), select)
 
 
 async def get_model_byid(model_id):
-    @sync_to_async
-    def select(m_id):
-        return ModelSettings.objects.filter(id=m_id, enable=True).first()
+    def select():
+        return ModelSettings.objects.filter(id=model_id, enable=True).first()
 
-    return await select(model_id)
+    return await MODEL_SETTINGS_CACHE.aget(('id', model_id), select)
 
 
 def create_model(name, model_name, api_key, base_url, enable, default_model,
-                 model_type, temperature=0.7, timeout=30, max_retries=3):
+                 model_type, temperature=0.7, timeout=30, max_retries=3, max_concurrency=5):
     if not api_key:
         return ActionResult.fail("No apiKey provided")
     if not base_url:
@@ -76,6 +87,7 @@ def create_model(name, model_name, api_key, base_url, enable, default_model,
             model_type=model_type,
             timeout=timeout,
             max_retries=max_retries,
+            max_concurrency=max_concurrency,
             model_name=model_name
         )
     except IntegrityError:
@@ -83,6 +95,7 @@ def create_model(name, model_name, api_key, base_url, enable, default_model,
         return ActionResult.fail(1, "The model name cannot be repeated.")
     if old_default_model is not None:
         ModelSettings.objects.filter(id=old_default_model.id).update(default_model=False)
+    MODEL_SETTINGS_CACHE.invalidate()
     return ActionResult.success()
 
 
@@ -104,12 +117,18 @@ def update_model(data):
     except IntegrityError:
         logging.error("The model name cannot be repeated.")
         return ActionResult.fail(1, "The model name cannot be repeated.")
+    evict_clients(org_data)
 
     if old_default_model is not None:
         if old_default_model.id != model_id:
             ModelSettings.objects.filter(id=old_default_model.id).update(default_model=False)
+    MODEL_SETTINGS_CACHE.invalidate()
     return ActionResult.success()
 
 
 def delete_model(model_id):
+    org_data = ModelSettings.objects.filter(id=model_id).first()
     ModelSettings.objects.filter(id=model_id).delete()
+    MODEL_SETTINGS_CACHE.invalidate()
+    if org_data is not None:
+        evict_clients(org_data)
@@ -0,0 +1,7 @@
+class TitleInfo:
+    def __init__(self, text, lines=None):
+        self.text = text
+        self.lines = lines
+
+    def to_dict(self):
+        return {'text': self.text, 'lines': self.lines}
@@ -0,0 +1,344 @@
+import logging
+import posixpath
+import re
+import zipfile
+from xml.etree.ElementTree import iterparse
+
+logging = logging.getLogger('ooxml_media')
+
+_PKG_REL = '{http://schemas.openxmlformats.org/package/2006/relationships}'
+_R = '{http://schemas.openxmlformats.org/officeDocument/2006/relationships}'
+_A = '{http://schemas.openxmlformats.org/drawingml/2006/main}'
+_W = '{http://schemas.openxmlformats.org/wordprocessingml/2006/main}'
+_P = '{http://schemas.openxmlformats.org/presentationml/2006/main}'
+_S = '{http://schemas.openxmlformats.org/spreadsheetml/2006/main}'
+_XDR = '{http://schemas.openxmlformats.org/drawingml/2006/spreadsheetDrawing}'
+
+_CELL_REF_PATTERN = re.compile(r'([A-Z]+)(\d+)')
+
+
+class OoxmlPackageError(Exception):
+    """
+    The package can not be read at zip level, e.g. a legacy binary file or a part missing
+    """
+
+
+def _column_index(letters):
+    index = 0
+    for letter in letters:
+        index = index * 26 + ord(letter) - ord('A') + 1
+    return index
+
+
+class _Package:
+    """
+    Parts of an OOXML zip package, read one at a time and never loaded as an object model
+    """
+
+    def __init__(self, zf):
+        self.zf = zf
+        self.names = set(zf.namelist())
+
+    def iterparse(self, part, events=('end',)):
+        if part not in self.names:
+            raise OoxmlPackageError(f"Part is missing: {part}")
+        with self.zf.open(part) as stream:
+            yield from iterparse(stream, events)
+
+    def rels(self, part):
+        """
+        Internal relationships of a part
+        :return: Mapping of relationship id to (type, part name)
+        """
+        directory, name = posixpath.split(part)
+        rels_part = posixpath.join(directory, '_rels', f'{name}.rels')
+        if rels_part not in self.names:
+            return {}
+        rels = {}
+        for event, elem in self.iterparse(rels_part):
+            if elem.tag != f'{_PKG_REL}Relationship' or elem.get('TargetMode') == 'External':
+                continue
+            target = elem.get('Target')
+            target = target[1:] if target.startswith('/') else posixpath.normpath(posixpath.join(directory, target))
+            rels[elem.get('Id')] = (elem.get('Type').rsplit('/', 1)[-1], target)
+        return rels
+
+    def media(self, rels, rel_id):
+        """
+        Bytes and extension of an embedded image, None for linked or missing images
+        """
+        rel = rels.get(rel_id)
+        if rel is None or rel[0] != 'image' or rel[1] not in self.names:
+            return None
+        return self.zf.read(rel[1]), posixpath.splitext(rel[1])[1][1:].lower()
+
+    def main_part(self, rel_type):
+        return next((target for kind, target in self.rels('').values() if kind == rel_type), None)
+
+
+def _text(elem, tag):
+    return ''.join(t.text or '' for t in elem.iter(tag))
+
+
+def _xlsx_images(package):
+    workbook = package.main_part('officeDocument')
+    if workbook is None:
+        raise OoxmlPackageError("Workbook part is missing")
+    workbook_rels = package.rels(workbook)
+    sheets = []
+    for event, elem in package.iterparse(workbook):
+        if elem.tag == f'{_S}sheet':
+            rel = workbook_rels.get(elem.get(f'{_R}id'))
+            if rel is not None and rel[0] == 'worksheet':
+                sheets.append((elem.get('name'), rel[1]))
+    shared_strings_part = next((target for kind, target in workbook_rels.values() if kind == 'sharedStrings'), None)
+
+    records = []
+    for sheet_name, sheet_part in sheets:
+        sheet_rels = package.rels(sheet_part)
+        drawings = [target for kind, target in sheet_rels.values() if kind == 'drawing']
+        if not drawings:
+            continue
+        preview = _sheet_preview(package, sheet_part, shared_strings_part)
+        for drawing in drawings:
+            drawing_rels = package.rels(drawing)
+            for event, elem in package.iterparse(drawing):
+                if elem.tag not in (f'{_XDR}twoCellAnchor', f'{_XDR}oneCellAnchor', f'{_XDR}absoluteAnchor'):
+                    continue
+                anchor_from = elem.find(f'{_XDR}from')
+                position = '' if anchor_from is None else \
+                    f"col={anchor_from.findtext(f'{_XDR}col')}, row={anchor_from.findtext(f'{_XDR}row')}"
+                for blip in elem.iter(f'{_A}blip'):
+                    media = package.media(drawing_rels, blip.get(f'{_R}embed'))
+                    if media is None:
+                        continue
+                    records.append((media, 'excel_sheet', {
+                        'sheet_name': sheet_name,
+                        'preview': preview,
+                        'position': f"单元格范围: {position}"
+                    }))
+                elem.clear()
+    return records
+
+
+def _sheet_preview(package, sheet_part, shared_strings_part):
+    """
+    First row of the worksheet, the parse stops as soon as the row is read
+    """
+    max_column = 0
+    cells = {}
+    for event, elem in package.iterparse(sheet_part):
+        if elem.tag == f'{_S}dimension':
+            refs = _CELL_REF_PATTERN.findall(elem.get('ref', ''))
+            if refs:
+                max_column = _column_index(refs[-1][0])
+        elif elem.tag == f'{_S}row':
+            if elem.get('r', '1') == '1':
+                for column, cell in enumerate(elem.iter(f'{_S}c'), start=1):
+                    match = _CELL_REF_PATTERN.match(cell.get('r', ''))
+                    cells[_column_index(match.group(1)) if match else column] = cell
+            break
+
+    shared_indexes = {int(cell.findtext(f'{_S}v')) for cell in cells.values()
+                      if cell.get('t') == 's' and cell.findtext(f'{_S}v')}
+    shared_strings = _shared_strings(package, shared_strings_part, max(shared_indexes)) if shared_indexes else []
+    values = []
+    for column in range(1, max(max_column, max(cells, default=1)) + 1):
+        cell = cells.get(column)
+        values.append('' if cell is None else str(_cell_value(cell, shared_strings) or ''))
+    return f"Row1: {' | '.join(values)}"[:300]
+
+
+def _shared_strings(package, part, last_index):
+    strings = []
+    if part is None:
+        return strings
+    for event, elem in package.iterparse(part):
+        if elem.tag != f'{_S}si':
+            continue
+        # Plain strings hold one t, rich strings one per run, the phonetic runs (rPh) are not part of the value
+        plain = elem.find(f'{_S}t')
+        strings.append(plain.text or '' if plain is not None else
+                       ''.join(run.findtext(f'{_S}t') or '' for run in elem.findall(f'{_S}r')))
+        elem.clear()
+        if len(strings) > last_index:
+            break
+    return strings
+
+
+def _cell_value(cell, shared_strings):
+    cell_type = cell.get('t')
+    formula = cell.findtext(f'{_S}f')
+    if formula:
+        return f'={formula}'
+    if cell_type == 'inlineStr':
+        return _text(cell, f'{_S}t')
+    value = cell.findtext(f'{_S}v')
+    if value is None:
+        return None
+    if cell_type == 's':
+        index = int(value)
+        return shared_strings[index] if index < len(shared_strings) else ''
+    if cell_type == 'b':
+        return value == '1'
+    if cell_type in ('str', 'e'):
+        return value
+    try:
+        return int(value)
+    except ValueError:
+        return float(value)
+
+
+def _docx_style_names(package, styles_part):
+    names = {}
+    if styles_part is None:
+        return names
+    for event, elem in package.iterparse(styles_part):
+        if elem.tag == f'{_W}style' and elem.get(f'{_W}type') == 'paragraph':
+            name = elem.find(f'{_W}name')
+            if name is not None:
+                name = name.get(f'{_W}val', '')
+                # Built-in styles are stored in lower case, Word shows them capitalized
+                names[elem.get(f'{_W}styleId')] = name[:1].upper() + name[1:]
+            if elem.get(f'{_W}default') == '1':
+                names[None] = names.get(elem.get(f'{_W}styleId'), 'Normal')
+    return names
+
+
+def _docx_images(package):
+    document = package.main_part('officeDocument')
+    if document is None:
+        raise OoxmlPackageError("Document part is missing")
+    document_rels = package.rels(document)
+    style_names = _docx_style_names(
+        package, next((target for kind, target in document_rels.values() if kind == 'styles'), None))
+
+    records = []
+    stack = []
+    paragraph_index = 0
+    for event, elem in package.iterparse(document, events=('start', 'end')):
+        if event == 'start':
+            stack.append(elem)
+            continue
+        stack.pop()
+        # Only the paragraphs of the body, like Document.paragraphs, table cells keep their own paragraphs
+        if elem.tag != f'{_W}p' or not stack or stack[-1].tag != f'{_W}body':
+            continue
+        paragraph_index += 1
+        runs = elem.findall(f'{_W}r')
+        paragraph_text = None
+        for run in runs:
+            if run.find(f'{_W}drawing') is None:
+                continue
+            for blip in run.iter(f'{_A}blip'):
+                media = package.media(document_rels, blip.get(f'{_R}embed'))
+                if media is None:
+                    continue
+                if paragraph_text is None:
+                    paragraph_text = ' '.join(_text(r, f'{_W}t') for r in runs)
+                style = elem.find(f'{_W}pPr/{_W}pStyle')
+                style_id = None if style is None else style.get(f'{_W}val')
+                records.append((media, 'word_paragraph', {
+                    'text': paragraph_text[:500],
+                    'style': style_names.get(style_id, style_names.get(None, 'Normal')),
+                    'position': f"段落位置: {paragraph_index}"
+                }))
+        stack[-1].remove(elem)
+    return records
+
+
+def _pptx_paragraph_lines(shape):
+    lines = []
+    for paragraph in shape.iter(f'{_A}p'):
+        line = []
+        for child in paragraph:
+            if child.tag in (f'{_A}r', f'{_A}fld'):
+                line.append(child.findtext(f'{_A}t') or '')
+            elif child.tag == f'{_A}br':
+                line.append('\n')
+        lines.extend(''.join(line).split('\n'))
+    return lines
+
+
+def _pptx_notes(package, notes_part):
+    if notes_part is None or notes_part not in package.names:
+        return ""
+    for event, elem in package.iterparse(notes_part):
+        if elem.tag != f'{_P}sp':
+            continue
+        placeholder = elem.find(f'{_P}nvSpPr/{_P}nvPr/{_P}ph')
+        if placeholder is not None and placeholder.get('type') == 'body':
+            return '\n'.join(''.join(r.findtext(f'{_A}t') or '' for r in p.iter(f'{_A}r'))
+                             for p in elem.iter(f'{_A}p'))
+    return ""
+
+
+def _pptx_images(package):
+    presentation = package.main_part('officeDocument')
+    if presentation is None:
+        raise OoxmlPackageError("Presentation part is missing")
+    presentation_rels = package.rels(presentation)
+    slides = []
+    for event, elem in package.iterparse(presentation):
+        if elem.tag == f'{_P}sldId':
+            rel = presentation_rels.get(elem.get(f'{_R}id'))
+            if rel is not None and rel[0] == 'slide':
+                slides.append(rel[1])
+
+    records = []
+    for slide_idx, slide in enumerate(slides):
+        slide_rels = package.rels(slide)
+        first_line = None
+        pictures = []
+        for event, elem in package.iterparse(slide):
+            if elem.tag == f'{_P}spTree':
+                # Only the top level shapes, like Slide.shapes
+                for shape in elem:
+                    if shape.tag == f'{_P}sp' and first_line is None:
+                        lines = _pptx_paragraph_lines(shape)
+                        if ''.join(lines).strip():
+                            first_line = lines[0]
+                    elif shape.tag == f'{_P}pic':
+                        blip = next(shape.iter(f'{_A}blip'), None)
+                        media = None if blip is None else package.media(slide_rels, blip.get(f'{_R}embed'))
+                        if media is not None:
+                            pictures.append(media)
+                break
+        if not pictures:
+            continue
+        notes = _pptx_notes(package, next((target for kind, target in slide_rels.values() if kind == 'notesSlide'),
+                                          None))
+        for media in pictures:
+            records.append((media, 'ppt_slide', {
+                'slide_number': slide_idx + 1,
+                'content': (first_line or '')[:300],
+                'notes': notes
+            }))
+    return records
+
+
+_EXTRACTORS = {
+    '.xlsx': _xlsx_images,
+    '.docx': _docx_images,
+    '.pptx': _pptx_images,
+}
+
+
+def extract_ooxml_images(file_path):
+    """
+    Extract the embedded images of an xlsx, docx or pptx file at zip level.
+    The media parts are read directly and their anchor context is resolved from the relationship and part XML with a
+    streaming parser, the workbook, document or presentation is never loaded as an object model.
+    :param file_path: Document file path
+    :return: List of ((image bytes, extension), context type, context data) in document order,
+    None when the file can not be read at zip level and the object model has to be used
+    """
+    extractor = _EXTRACTORS.get(posixpath.splitext(file_path)[1].lower())
+    if extractor is None or not zipfile.is_zipfile(file_path):
+        return None
+    try:
+        with zipfile.ZipFile(file_path) as zf:
+            return extractor(_Package(zf))
+    except Exception as e:
+        logging.warning(f"Zip level image extraction failed, the object model is used. file: {file_path} e: {e}")
+        return None
@@ -0,0 +1,109 @@
+import logging
+import multiprocessing
+import threading
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+
+import fitz
+from django.conf import settings
+
+logging = logging.getLogger('pdf_extractor')
+
+# Lines longer than this are body text, whatever their font
+MAX_HEADING_LENGTH = 60
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def _setting(name, default):
+    return getattr(settings, 'DOCUMENT_EXTRACTION', {}).get(name, default)
+
+
+def _get_pool():
+    """
+    Process pool shared by all file threads, created on first use.
+    Workers are spawned instead of forked, the web process runs threads that must not be copied into them.
+    """
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ProcessPoolExecutor(max_workers=_setting('PDF_WORKERS', 4),
+                                        mp_context=multiprocessing.get_context('spawn'))
+        return _pool
+
+
+def _page_font_lines(page):
+    """
+    Font statistics of a page, the heading hierarchy is inferred from them
+    :return: (characters per font size, [(text, font size)] of the lines short enough to be headings)
+    """
+    size_chars = Counter()
+    lines = []
+    for block in page.get_text("dict")["blocks"]:
+        if block.get("type") != 0:
+            continue
+        for line in block["lines"]:
+            spans = [span for span in line["spans"] if span["text"].strip()]
+            if not spans:
+                continue
+            for span in spans:
+                size_chars[round(span["size"], 1)] += len(span["text"])
+            text = ''.join(span["text"] for span in spans).strip()
+            if len(text) <= MAX_HEADING_LENGTH:
+                lines.append((text, round(max(span["size"] for span in spans), 1)))
+    return size_chars, lines
+
+
+def _extract_pages(file_path, start, stop):
+    """
+    Parse a range of pages, run in a worker process with its own document
+    :return: (page text, [(image bytes, extension)], font statistics) per page
+    """
+    pages = []
+    with fitz.open(file_path) as doc:
+        for page_num in range(start, stop):
+            page = doc.load_page(page_num)
+            page_images = []
+            for img in page.get_images(full=True):
+                try:
+                    base_image = doc.extract_image(img[0])
+                except Exception as e:
+                    logging.warning(f"PDF image can not be extracted. page: {page_num + 1} xref: {img[0]} e: {e}")
+                    continue
+                if base_image:
+                    page_images.append((base_image["image"], base_image["ext"]))
+            pages.append((page.get_text(), page_images, _page_font_lines(page)))
+    return pages
+
+
+def extract_pdf(file_path):
+    """
+    Extract the text and the embedded images of a PDF in one parse.
+    Large PDFs are split into page ranges parsed in parallel by the worker processes, the results are merged back
+    in page order.
+    :param file_path: PDF file path
+    :return: (text of all pages, [((image bytes, extension), 'pdf_page', context data)] in page order,
+    font statistics of every page for infer_headings)
+    """
+    with fitz.open(file_path) as doc:
+        page_count = len(doc)
+
+    if page_count < _setting('PDF_MIN_PAGES_PARALLEL', 64):
+        pages = _extract_pages(file_path, 0, page_count)
+    else:
+        shard = max(1, _setting('PDF_PAGES_PER_SHARD', 32))
+        futures = [_get_pool().submit(_extract_pages, file_path, start, min(start + shard, page_count))
+                   for start in range(0, page_count, shard)]
+        pages = [page for future in futures for page in future.result()]
+
+    media = []
+    for page_num, (page_text, page_images, font_lines) in enumerate(pages):
+        context_data = {
+            'page_number': page_num + 1,
+            'content': page_text[:300]
+        }
+        media.extend((image, 'pdf_page', dict(context_data)) for image in page_images)
+    logging.info(f"PDF extracted. file: {file_path} pages: {page_count} images: {len(media)}")
+    text = "\n\n".join(page[0].strip() for page in pages)
+    return text, media, [page[2] for page in pages]
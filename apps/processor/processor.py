@@ -3,23 +3,36 @@ import base64
 import json
 import logging
 import os
-from concurrent.futures import ThreadPoolExecutor, as_completed
+import time
+import uuid
 from pathlib import Path
 from typing import List
 
 import aiofiles
-import fitz
+from asgiref.sync import sync_to_async
 from docx import Document
-from openai import AsyncOpenAI
-from openai import OpenAI
 from openpyxl.reader.excel import load_workbook
 from pptx import Presentation
-from pydantic import UUID4
 
+from application.models.chunk_settings import get_chunk_settings
 from common.str_transcoding import str_decrypt
-from processor.models.image_model import MultiplePictureModel
-from processor.models.model_settings import get_model, get_default_model
+from processor.client_pool import get_async_client, get_client, run_async
+from processor.image_dedup import IMAGE_DEDUP_REGISTRY, content_hash, description_key, hash_distance, \
+    perceptual_hash
+from processor.image_preprocess import image_subtype, preprocess_image
+from processor.json_stream import TitleStreamParser, merge_title_parsers
+from processor.ooxml_media import extract_ooxml_images
+from processor.pdf_extractor import extract_pdf
+from processor.models.image_model import MultiplePictureModel, PictureReasoningResult
+from processor.models.model_settings import get_default_model
+from processor.hedging import REQUEST_HEDGER
+from processor.model_router import MODEL_ROUTER, resolve_model
 from processor.prompt_templates import *
+from processor.request_broker import REQUEST_BROKER, estimate_tokens
+from processor.response_cache import RESPONSE_CACHE, cache_policy, response_key
+from processor.title_skeleton import build_title_skeleton, skeleton_windows
+from processor.token_accounting import STAGE_CHAT, STAGE_IMAGE, STAGE_TAG, STAGE_TITLE, TOKEN_LEDGER, \
+    apply_token_budget, estimate_message_tokens, usage_tokens
 from task_flow.models import ImageInfo
 
 logging = logging.getLogger('processor')
@@ -30,17 +43,18 @@ async def chat(question=None, model_name=None):
 
 
 async def text_reasoning(prompt=None, model_name=None):
-    return await invoke_text_model(prompt, model_name, TEXT_REASON_SYSTEM)
+    return await invoke_text_model(prompt, model_name, TEXT_REASON_SYSTEM, cached=True, stage=STAGE_TAG)
 
 
-async def invoke_text_model(prompt, model_name, sys_template):
+async def invoke_text_model(prompt, model_name, sys_template, cached=False, stage=STAGE_CHAT):
     message = [{"role": "system", "content": f"{sys_template}"}, {"role": "user", "content": f"{prompt}"}]
 
-    model_info = await get_default_model(0) if model_name is None else await get_model(model_name=model_name)
+    model_info = await resolve_model(0, model_name)
     if model_info is None:
         logging.error(f"No model fits the criteria. model type 0 , model name {model_name}")
         raise ValueError(f"No model fits the criteria. model type 0 , model name {model_name}")
-    return await invoke_model(model_info, json.dumps(message))
+    return await invoke_model(model_info, json.dumps(message), cached=cached, stage=stage,
+                              pinned=model_name is not None)
 
 
 async def picture_reasoning(data: MultiplePictureModel, prompt=None, model_name=None):
@@ -59,12 +73,13 @@ async def picture_reasoning(data: MultiplePictureModel, prompt=None, model_name=
 
     content.append({"type": "text", "text": f"{prompt}"})
 
-    model_info = await get_default_model(1) if model_name is None else await get_model(model_name=model_name)
+    model_info = await resolve_model(1, model_name)
     if model_info is None:
         logging.error(f"No model fits the criteria. model type 1 , model name {model_name}")
         raise ValueError(f"No model fits the criteria. model type 1 , model name {model_name}")
 
-    return invoke_model(model_info, json.dumps([{"role": "user", "content": content}]))
+    return await invoke_model(model_info, json.dumps([{"role": "user", "content": content}]), cached=True,
+                              stage=STAGE_IMAGE, pinned=model_name is not None)
 
     # dict_data = asyncio.run(json_response_to_dict(response))
     # if type(dict_data) is not dict:
@@ -92,36 +107,120 @@ def json_response_to_dict(text):
         return None
 
 
-async def multiple_picture_reasoning(data: List[MultiplePictureModel], prompt=None, model_name=None):
+async def iter_picture_reasoning(data: List[MultiplePictureModel], prompt=None, model_name=None, timeout=None,
+                                 max_concurrency=None):
+    """
+    Reason several pictures concurrently and yield the results as they complete
+    :param data: Pictures to reason
+    :param prompt: Picture reasoning prompt
+    :param model_name: Name of the model used, the default multimodal model is used when it is None
+    :param timeout: Seconds one picture may take, including the wait for a free slot. The model timeout times
+    its retries when it is None
+    :param max_concurrency: Pictures reasoned at the same time, the max concurrency of the model when it is None
+    :return: Async generator of PictureReasoningResult in completion order, failed pictures are not successful
+    """
     if not data: raise ValueError("Parameter 'data' is empty.")
     if not prompt: raise ValueError("Prompt 'data' is empty.")
-    results = []
-    with ThreadPoolExecutor(max_workers=5) as executor:
-        futures = {executor.submit(picture_reasoning, task, prompt, model_name): task for task in data}
-        for future in as_completed(futures):
-            try:
-                results.append(future.result())
-            except Exception as e:
-                logging.error(f"Picture reasoning fail., error :{e}")
+    model_info = await resolve_model(1, model_name)
+    if model_info is None:
+        logging.error(f"No model fits the criteria. model type 1 , model name {model_name}")
+        raise ValueError(f"No model fits the criteria. model type 1 , model name {model_name}")
+    if timeout is None:
+        timeout = model_info.timeout * (model_info.max_retries + 1)
+    semaphore = asyncio.Semaphore(max(1, max_concurrency or model_info.max_concurrency))
+
+    async def reason(item):
+        async def call():
+            async with semaphore:
+                return await picture_reasoning(item, prompt=prompt, model_name=model_name)
+
+        try:
+            answer = await asyncio.wait_for(call(), timeout)
+        except asyncio.TimeoutError:
+            logging.error(f"Picture reasoning timed out. image id: {item.image_id} timeout: {timeout}")
+            return PictureReasoningResult(image_id=item.image_id, successfully=False)
+        except Exception as e:
+            logging.error(f"Picture reasoning fail. image id: {item.image_id} error: {e}")
+            return PictureReasoningResult(image_id=item.image_id, successfully=False)
+        if answer is None:
+            return PictureReasoningResult(image_id=item.image_id, successfully=False)
+        return PictureReasoningResult(image_id=item.image_id, interpretation=answer)
 
-    return results
+    tasks = [asyncio.ensure_future(reason(item)) for item in data]
+    try:
+        for next_done in asyncio.as_completed(tasks):
+            yield await next_done
+    finally:
+        # The consumer stopped early, the pictures not yet reasoned are abandoned
+        for task in tasks:
+            task.cancel()
+
+
+async def multiple_picture_reasoning(data: List[MultiplePictureModel], prompt=None, model_name=None, timeout=None,
+                                     max_concurrency=None):
+    """
+    Reason several pictures concurrently
+    :return: PictureReasoningResult of every picture, in completion order
+    """
+    return [result async for result in iter_picture_reasoning(data, prompt, model_name, timeout, max_concurrency)]
+
+
+async def invoke_model(client_info, message, cached=False, stage=STAGE_CHAT, pinned=True):
+    """
+    Call the chat completion of the model
+    :param client_info: ModelSettings of the model
+    :param message: Messages serialized as json
+    :param cached: Whether the answer may be served from and saved to the response cache
+    :param stage: Pipeline stage the tokens are accounted to and whose input budget applies
+    :param pinned: Whether the caller named the model, hedged duplicates of unpinned calls may go to another model
+    :return: Answer of the model, None when the answer is incomplete
+    """
+    messages = json.loads(message)
+    budget_messages = apply_token_budget(stage, messages)
+    if budget_messages is not messages:
+        messages = budget_messages
+        message = json.dumps(messages)
+    input_tokens = estimate_message_tokens(messages)
+    read_cache, write_cache = cache_policy(await get_chunk_settings()) if cached else (False, False)
+    cache_key = response_key(client_info.model_name, client_info.temperature, message) if cached else None
+    if read_cache:
+        answer = await RESPONSE_CACHE.aget(cache_key)
+        if answer is not None:
+            return answer
+
+    async def run(info):
+        async def create(client):
+            start = time.monotonic()
+            completion = await client.chat.completions.create(
+                model=info.model_name,
+                temperature=info.temperature,
+                messages=messages,
+                extra_body={"enable_thinking": False}
+            )
+            _record_usage(stage, info, completion.usage, input_tokens,
+                          completion.choices[0].message.content if completion.choices else '', start)
+            return completion
 
+        return await REQUEST_BROKER.submit(get_async_client(info), info, input_tokens, create)
+
+    if REQUEST_HEDGER.enabled(stage):
+        completion = await REQUEST_HEDGER.run(client_info, run,
+                                              None if pinned else lambda: MODEL_ROUTER.alternate(client_info))
+    else:
+        completion = await run(client_info)
+    answer = await extract_conversation_content(completion)
+    if write_cache:
+        await RESPONSE_CACHE.aput(cache_key, answer)
+    return answer
 
-async def invoke_model(client_info, message):
-    client = AsyncOpenAI(
-        api_key=client_info.api_key,
-        base_url=client_info.base_url,
-        timeout=client_info.timeout,
-        max_retries=client_info.max_retries,
-    )
 
-    completion = await client.chat.completions.create(
-        model=client_info.model_name,
-        temperature=client_info.temperature,
-        messages=json.loads(message),
-        extra_body={"enable_thinking": False}
-    )
-    return await extract_conversation_content(completion)
+def _record_usage(stage, client_info, usage, input_tokens, output_text, start):
+    """
+    Account a finished model call, the provider usage is preferred over the local estimates
+    """
+    input_tokens, output_tokens, estimated = usage_tokens(usage, input_tokens, output_text)
+    TOKEN_LEDGER.record(stage, client_info.model_name, input_tokens, output_tokens,
+                        (time.monotonic() - start) * 1000, estimated)
 
 
 async def extract_conversation_content(answer):
@@ -134,183 +233,378 @@ async def extract_conversation_content(answer):
         return None
 
 
-async def generate_image_description(image_path, picture_reasoning_prompt, picture_reasoning_model_id):
-    """Call Qwen VL to generate image descriptions (supports local files)"""
-    try:
-        # Base64 encoding processing (needs to adapt to different image formats)
-        with aiofiles.open(image_path, "rb") as img_file:
-            base64_image = base64.b64encode(await img_file.read()).decode('utf-8')
-            mime_type = "image/jpeg" if image_path.lower().endswith('.jpg') else "image/png"
-
-        response = picture_reasoning(MultiplePictureModel(
-            image_id=UUID4.hex,
-            base64_data=base64_image,
-            image_type=mime_type
-        ), prompt=str_decrypt(picture_reasoning_prompt), model_name=picture_reasoning_model_id)
-
-        return f"<--AI图片描述 AI image description：{response}-->"
-    except Exception as e:
-        logging.error(f"Call model failed : {str(e)}")
-        return ""
-
-
-def extract_and_process_images(file_path, output_dir, picture_reasoning_prompt, picture_reasoning_model_id):
-    """Extract embedded images, record context, generate descriptions and record them in the database"""
+async def generate_image_description(image_path, picture_reasoning_prompt, picture_reasoning_model_id,
+                                     image_data=None, image_type=None):
+    """
+    Call Qwen VL to generate image descriptions (supports local files)
+    :param image_data: Pre-processed image bytes, the file at image_path is sent unchanged when it is None
+    :param image_type: MIME subtype of image_data
+    :return: Image description, an exception is raised when the model call fails
+    """
+    if image_data is None:
+        async with aiofiles.open(image_path, "rb") as img_file:
+            image_data = await img_file.read()
+        image_type = image_subtype(image_data) or "png"
+    base64_image = base64.b64encode(image_data).decode('utf-8')
+
+    response = await picture_reasoning(MultiplePictureModel(
+        image_id=uuid.uuid4().hex,
+        base64_data=base64_image,
+        image_type=image_type
+    ), prompt=picture_reasoning_prompt, model_name=picture_reasoning_model_id)
+    if response is None:
+        raise ValueError(f"Incomplete answer of the picture reasoning. image path: {image_path}")
+
+    return f"<--AI图片描述 AI image description：{response}-->"
+
+
+async def archive_images(context_records):
+    """
+    Write the extracted images to their archive path, images already archived are skipped.
+    A temporary file is renamed into place so that concurrent documents sharing an image never see a partial file.
+    """
+    for record in context_records:
+        img_path = record['image_path']
+        if os.path.exists(img_path):
+            continue
+        os.makedirs(os.path.dirname(img_path), exist_ok=True)
+        temporary_path = f"{img_path}.{uuid.uuid4().hex}.tmp"
+        async with aiofiles.open(temporary_path, "wb") as img_file:
+            await img_file.write(record['image_data'])
+        os.replace(temporary_path, img_path)
+
+
+def _prepare_images(context_records, chunk_setting):
+    """
+    Pre-process the extracted images
+    :return: (image bytes, MIME subtype) per record, None for the images dropped as tiny, blank or decorative
+    """
+    prepared = []
+    for record in context_records:
+        image_bytes = record['image_data']
+        try:
+            prepared.append(preprocess_image(image_bytes, chunk_setting))
+        except Exception as e:
+            logging.warning(f"Image pre-processing failed, sent unchanged. image path: {record['image_path']} e: {e}")
+            prepared.append((image_bytes, image_subtype(image_bytes) or "png"))
+    return prepared
+
+
+async def _find_described_images(records, key, max_distance):
+    """
+    Look up the descriptions saved for the same images by earlier documents, also by other processes
+    :param key: description_key of the prompt and model, descriptions made with others are not reused
+    :param max_distance: Largest number of differing hash bits regarded as the same image, -1 for exact matches only
+    :return: Mapping of content hash and of perceptual hash to description
+    """
+
+    def select():
+        digests = {record['content_hash'] for record in records}
+        phashes = {record['perceptual_hash'] for record in records if record['perceptual_hash']}
+        described = ImageInfo.objects.filter(description_key=key, successfully=True)
+        by_digest = dict(described.filter(content_hash__in=digests).values_list('content_hash', 'image_description'))
+        by_phash = {}
+        if max_distance < 0 or not phashes:
+            return by_digest, by_phash
+        # The distance can not be computed by the database, the hashes of the prompt and model are scanned
+        saved = described.exclude(perceptual_hash='').order_by('-id').values_list('perceptual_hash',
+                                                                                  'image_description')
+        for other_phash, description in saved.iterator():
+            for phash in phashes - by_phash.keys():
+                if hash_distance(phash, other_phash) <= max_distance:
+                    by_phash[phash] = description
+            if len(by_phash) == len(phashes):
+                break
+        return by_digest, by_phash
+
+    return await sync_to_async(select)()
+
+
+async def describe_images(document_name, context_records, picture_reasoning_prompt, picture_reasoning_model_id,
+                          stats=None):
+    """
+    Generate the descriptions of all images of a document concurrently and save them in bulk.
+    A failed image is saved as unsuccessful instead of aborting the document.
+    Images identical or near identical to an already described image reuse its description without calling the model,
+    descriptions of earlier documents only when they were made with the same prompt and model and the response cache
+    policy allows reading.
+    :param document_name: Name of the document the images belong to
+    :param context_records: Extracted images with their context, in document order
+    :param picture_reasoning_prompt: Picture reasoning prompt
+    :param picture_reasoning_model_id: Name of the model used, the default multimodal model is used when it is None
+    :param stats: DedupStats the deduplication counters of the document are added to
+    :return: The descriptions in the order of context_records, an empty string for failed images
+    """
+    if not context_records:
+        return []
+    chunk_setting = await get_chunk_settings()
+    enabled_dedup = chunk_setting.enabled_image_dedup
+    max_distance = chunk_setting.image_dedup_distance
+    # Refreshing or bypassing the cached answers also skips the descriptions of earlier documents
+    read_described, write_described = cache_policy(chunk_setting)
+    default_model = None if picture_reasoning_model_id else await get_default_model(1)
+    key = description_key(picture_reasoning_prompt,
+                          picture_reasoning_model_id or (default_model.model_name if default_model else None))
+
+    # The images are archived alongside the reasoning, they are read from memory and not from the archive
+    archive = asyncio.create_task(archive_images(context_records)) if chunk_setting.enabled_image_archive else None
+
+    # Decoding and re-encoding is CPU bound, it is kept off the event loop
+    prepared = await asyncio.to_thread(_prepare_images, context_records, chunk_setting)
+
+    # Images of this document that need a description, the others point to one of them
+    representatives = []
+    duplicate_of = {}
+    exact_duplicates = 0
+    near_duplicates = 0
+    for i, record in enumerate(context_records):
+        if prepared[i] is None:
+            continue
+        if enabled_dedup:
+            for j in representatives:
+                other = context_records[j]
+                if other['content_hash'] == record['content_hash']:
+                    exact_duplicates += 1
+                elif (max_distance >= 0 and record['perceptual_hash'] and other['perceptual_hash'] and
+                      hash_distance(record['perceptual_hash'], other['perceptual_hash']) <= max_distance):
+                    near_duplicates += 1
+                else:
+                    continue
+                duplicate_of[i] = j
+                break
+            if i in duplicate_of:
+                continue
+        representatives.append(i)
+
+    # Reuse the descriptions of earlier documents
+    results = {}
+    if enabled_dedup and read_described:
+        by_digest, by_phash = await _find_described_images([context_records[i] for i in representatives], key,
+                                                           max_distance)
+        for i in representatives:
+            record = context_records[i]
+            found = IMAGE_DEDUP_REGISTRY.find(key, record['content_hash'], record['perceptual_hash'], max_distance)
+            if found is not None:
+                results[i] = (found[0], True)
+                exact_duplicates += 1 if found[1] else 0
+                near_duplicates += 0 if found[1] else 1
+            elif record['content_hash'] in by_digest:
+                results[i] = (by_digest[record['content_hash']], True)
+                exact_duplicates += 1
+            elif record['perceptual_hash'] in by_phash:
+                results[i] = (by_phash[record['perceptual_hash']], True)
+                near_duplicates += 1
+
+    model_info = await resolve_model(1, picture_reasoning_model_id)
+    semaphore = asyncio.Semaphore(max(1, model_info.max_concurrency) if model_info is not None else 1)
+
+    async def describe(record, image_data, image_type):
+        async with semaphore:
+            try:
+                return await generate_image_description(record['image_path'], picture_reasoning_prompt,
+                                                        picture_reasoning_model_id, image_data, image_type), True
+            except Exception as e:
+                logging.error(f"Call model failed. image path: {record['image_path']} e: {str(e)}")
+                return "", False
+
+    pending = [i for i in representatives if i not in results]
+    for i, result in zip(pending, await asyncio.gather(*(describe(context_records[i], *prepared[i]) for i in pending))):
+        results[i] = result
+        if result[1] and write_described:
+            record = context_records[i]
+            IMAGE_DEDUP_REGISTRY.add(key, record['content_hash'], record['perceptual_hash'], result[0])
+    for i, j in duplicate_of.items():
+        results[i] = results[j]
+
+    archived = False
+    if archive is not None:
+        try:
+            await archive
+            archived = True
+        except Exception as e:
+            logging.error(f"Image archive failed. document: {document_name} e: {e}")
+
+    image_infos = []
+    for i, record in enumerate(context_records):
+        # The bytes are not needed any more, the records outlive the reasoning
+        record.pop('image_data', None)
+        if i not in results:
+            # Dropped by the pre-processing, nothing is inserted for it
+            record['image_description'] = ''
+            continue
+        description, successfully = results[i]
+        record['image_description'] = description
+        image_infos.append(ImageInfo(
+            document_name=document_name,
+            image_path=record['image_path'] if archived else '',
+            context_text=str(record['context_data']),
+            image_description=description,
+            successfully=successfully,
+            description_key=key,
+            content_hash=record['content_hash'],
+            perceptual_hash=record['perceptual_hash'] or ''
+        ))
+    await sync_to_async(ImageInfo.objects.bulk_create)(image_infos)
+
+    if stats is not None:
+        stats.count(images=len(results), exact_duplicates=exact_duplicates, near_duplicates=near_duplicates,
+                    model_calls=len(pending))
+    failed = sum(1 for description, successfully in results.values() if not successfully)
+    if failed:
+        logging.warning(f"Picture reasoning failed for {failed} of {len(results)} images. document: {document_name}")
+    logging.info(f"Images described. document: {document_name} images: {len(context_records)} "
+                 f"dropped: {len(context_records) - len(results)} "
+                 f"model calls: {len(pending)} exact duplicates: {exact_duplicates} near duplicates: {near_duplicates}")
+    return [record['image_description'] for record in context_records]
+
+
+def _image_record(output_dir, img_bytes, ext):
+    """
+    Record of an extracted image, the bytes are handed to the reasoning stage in memory.
+    Identical images share one archive file named by their content hash.
+    :return: Image record without context
+    """
+    digest = content_hash(img_bytes)
+    return {
+        'image_path': os.path.join(output_dir, f"{digest}.{ext}"),
+        'image_data': img_bytes,
+        'content_hash': digest,
+        'perceptual_hash': perceptual_hash(img_bytes),
+    }
+
+
+def extract_images(file_path, output_dir, object_model=False, media=None):
+    """
+    Extract embedded images and record their context.
+    PDFs are parsed page parallel, xlsx, docx and pptx files are read at zip level. The object model is only loaded
+    for legacy formats, packages the zip level extraction can not read, or when object_model is set.
+    :param file_path: Document file path
+    :param output_dir: Directory the images are archived to when the archive is enabled
+    :param object_model: Load the full object model for the context even when the zip level extraction works
+    :param media: Images already extracted together with the text, see extract_pdf
+    :return: Image paths and context records holding the image bytes, in document order
+    """
     file_ext = os.path.splitext(file_path)[1].lower()
     images = []
     context_records = []
 
-    try:
-        if file_ext in ['.xlsx', '.xls']:
-            wb = load_workbook(file_path)
-            for sheet_idx, sheet in enumerate(wb.worksheets):
-                # Collect only the first row of the worksheet as context
-                sheet_context = []
-                for row in sheet.iter_rows(max_row=1):
-                    row_data = [str(cell.value or "") for cell in row]
-                    sheet_context.append(f"Row1: {' | '.join(row_data)}")
-                context_text = "\n".join(sheet_context)[:300]  # 限制长度
-
-                for img_idx, image in enumerate(sheet._images):
-                    # Save Picture
-                    img_bytes = image._data()
-                    img_name = f"excel_{sheet.title}_img{img_idx}.png"
-                    img_path = os.path.join(output_dir, img_name)
-                    with open(img_path, "wb") as f:
-                        f.write(img_bytes)
-                    images.append(img_path)
-
-                    # Record context
+    if media is None:
+        if file_ext == '.pdf':
+            media = extract_pdf(file_path)[1]
+        elif not object_model:
+            media = extract_ooxml_images(file_path)
+    if media is not None:
+        for (img_bytes, ext), context_type, context_data in media:
+            record = _image_record(output_dir, img_bytes, ext)
+            images.append(record['image_path'])
+            context_records.append({
+                **record,
+                'context_type': context_type,
+                'context_data': context_data
+            })
+
+    elif file_ext in ['.xlsx', '.xls']:
+        wb = load_workbook(file_path)
+        for sheet_idx, sheet in enumerate(wb.worksheets):
+            # Collect only the first row of the worksheet as context
+            sheet_context = []
+            for row in sheet.iter_rows(max_row=1):
+                row_data = [str(cell.value or "") for cell in row]
+                sheet_context.append(f"Row1: {' | '.join(row_data)}")
+            context_text = "\n".join(sheet_context)[:300]  # 限制长度
+
+            for img_idx, image in enumerate(sheet._images):
+                # Save Picture
+                record = _image_record(output_dir, image._data(), "png")
+                images.append(record['image_path'])
+
+                # Record context
+                context_records.append({
+                    **record,
+                    'context_type': 'excel_sheet',
+                    'context_data': {
+                        'sheet_name': sheet.title,
+                        'preview': context_text,
+                        'position': f"单元格范围: {image.anchor._from}"
+                    }
+                })
+
+    elif file_ext in ['.docx', '.doc']:
+        doc = Document(file_path)
+        # Establish a mapping between paragraphs and images
+        para_image_map = {}
+        for i, paragraph in enumerate(doc.paragraphs):
+            for run in paragraph.runs:
+                if run.element.xpath('.//w:drawing'):
+                    for rel_id in run.element.xpath('.//a:blip/@r:embed'):
+                        rel = doc.part.rels.get(rel_id)
+                        if rel and "image" in rel.reltype:
+                            parent_paragraph = paragraph
+                            para_text = ' '.join([run.text for run in parent_paragraph.runs])
+                            ext = rel.target_part.content_type.split('/')[-1]
+                            record = _image_record(output_dir, rel.target_part.blob, ext)
+                            images.append(record['image_path'])
+                            context_records.append({
+                                **record,
+                                'context_type': 'word_paragraph',
+                                'context_data': {
+                                    'text': para_text[:500],
+                                    'style': parent_paragraph.style.name,
+                                    'position': f"段落位置: {i + 1}"
+                                }
+                            })
+
+    elif file_ext in ['.pptx', '.ppt']:
+        prs = Presentation(file_path)
+        for slide_idx, slide in enumerate(prs.slides):
+            slide_text = []
+            for shape in slide.shapes:
+                if hasattr(shape, "text") and shape.text.strip():
+                    slide_text = shape.text.splitlines()[:1]
+                    break
+            context_text = "\n".join(slide_text)[:300]
+
+            for shape_idx, shape in enumerate(slide.shapes):
+                if hasattr(shape, "image"):
+                    record = _image_record(output_dir, shape.image.blob, shape.image.ext)
+                    images.append(record['image_path'])
                     context_records.append({
-                        'image_path': img_path,
-                        'context_type': 'excel_sheet',
+                        **record,
+                        'context_type': 'ppt_slide',
                         'context_data': {
-                            'sheet_name': sheet.title,
-                            'preview': context_text,
-                            'position': f"单元格范围: {image.anchor._from}"
+                            'slide_number': slide_idx + 1,
+                            'content': context_text,
+                            'notes': slide.notes_slide.notes_text_frame.text if slide.has_notes_slide else ""
                         }
                     })
 
-        elif file_ext in ['.docx', '.doc']:
-            doc = Document(file_path)
-            # Establish a mapping between paragraphs and images
-            para_image_map = {}
-            for i, paragraph in enumerate(doc.paragraphs):
-                for run in paragraph.runs:
-                    if run.element.xpath('.//w:drawing'):
-                        for rel_id in run.element.xpath('.//a:blip/@r:embed'):
-                            rel = doc.part.rels.get(rel_id)
-                            if rel and "image" in rel.reltype:
-                                parent_paragraph = paragraph
-                                para_text = ' '.join([run.text for run in parent_paragraph.runs])
-                                ext = rel.target_part.content_type.split('/')[-1]
-                                img_name = f"word_para_img{len(images)}.{ext}"
-                                img_path = os.path.join(output_dir, img_name)
-                                with open(img_path, "wb") as f:
-                                    f.write(rel.target_part.blob)
-                                images.append(img_path)
-                                context_records.append({
-                                    'image_path': img_path,
-                                    'context_type': 'word_paragraph',
-                                    'context_data': {
-                                        'text': para_text[:500],
-                                        'style': parent_paragraph.style.name,
-                                        'position': f"段落位置: {i + 1}"
-                                    }
-                                })
-
-        elif file_ext in ['.pptx', '.ppt']:
-            prs = Presentation(file_path)
-            for slide_idx, slide in enumerate(prs.slides):
-                slide_text = []
-                for shape in slide.shapes:
-                    if hasattr(shape, "text") and shape.text.strip():
-                        slide_text = shape.text.splitlines()[:1]
-                        break
-                context_text = "\n".join(slide_text)[:300]
-
-                for shape_idx, shape in enumerate(slide.shapes):
-                    if hasattr(shape, "image"):
-                        img_data = shape.image.blob
-                        img_name = f"ppt_slide{slide_idx}_img{shape_idx}.{shape.image.ext}"
-                        img_path = os.path.join(output_dir, img_name)
-                        with open(img_path, "wb") as f:
-                            f.write(img_data)
-
-                        images.append(img_path)
-                        context_records.append({
-                            'image_path': img_path,
-                            'context_type': 'ppt_slide',
-                            'context_data': {
-                                'slide_number': slide_idx + 1,
-                                'content': context_text,
-                                'notes': slide.notes_slide.notes_text_frame.text if slide.has_notes_slide else ""
-                            }
-                        })
-        elif file_ext in ['.pdf']:
-            doc = fitz.open(file_path)
-            for page_num in range(len(doc)):
-                page = doc.load_page(page_num)
-                page_text = page.get_text()[:300]
-                image_list = page.get_images(full=True)
-                for img_idx, img in enumerate(image_list, start=1):
-                    xref = img[0]
-                    base_image = doc.extract_image(xref)
-                    image_bytes = base_image["image"]
-                    img_ext = base_image["ext"]
-                    img_name = f"pdf_page{page_num + 1}_img{img_idx}.{img_ext}"
-                    img_path = os.path.join(output_dir, img_name)
-                    with open(img_path, "wb") as f:
-                        f.write(image_bytes)
-                    images.append(img_path)
-
-                    context_records.append({
-                        'image_path': img_path,
-                        'context_type': 'pdf_page',
-                        'context_data': {
-                            'page_number': page_num + 1,
-                            'content': page_text
-                        }
-                    })
-            doc.close()
-
-        # Generate image descriptions and record them in the database
-        document_name = os.path.basename(file_path)
-        for record in context_records:
-            image_path = record['image_path']
-            context_text = str(record['context_data'])
-            description = asyncio.run(
-                generate_image_description(image_path, picture_reasoning_prompt, picture_reasoning_model_id))
-            ImageInfo.objects.create(
-                document_name=document_name,
-                image_path=image_path,
-                context_text=context_text,
-                image_description=description
-            )
+    return images, context_records
 
-        return images, context_records
 
-    except Exception as e:
-        # Clean up created image files
-        for img in images:
-            if os.path.exists(img):
-                os.remove(img)
-        raise
+def extract_and_process_images(file_path, output_dir, picture_reasoning_prompt, picture_reasoning_model_id,
+                               stats=None, media=None):
+    """Extract embedded images, record context, generate descriptions and record them in the database"""
+    images, context_records = extract_images(file_path, output_dir, media=media)
+    run_async(describe_images(os.path.basename(file_path), context_records, picture_reasoning_prompt,
+                              picture_reasoning_model_id, stats))
+    return images, context_records
 
 
 def document_understanding(file_path, user_question, model_name=None):
-    client_info = asyncio.run(get_default_model(0)) if model_name is None else asyncio.run(
-        get_model(model_name=model_name))
+    client_info = run_async(resolve_model(0, model_name))
     if client_info is None:
         logging.error(f"No model fits the criteria. model type 0 , model name {model_name}")
         raise ValueError(f"No model fits the criteria. model type 0 , model name {model_name}")
     base_model_name = client_info.model_name
-    client = OpenAI(
-        api_key=client_info.api_key,
-        base_url=client_info.base_url,
-        timeout=client_info.timeout,
-        max_retries=client_info.max_retries,
-    )
+    read_cache, write_cache = cache_policy(run_async(get_chunk_settings()))
+    if read_cache or write_cache:
+        with open(file_path, 'rb') as file:
+            cache_key = response_key(base_model_name, client_info.temperature, user_question, file.read())
+    if read_cache:
+        answer = RESPONSE_CACHE.get(cache_key)
+        if answer is not None:
+            return answer
+    client = get_client(client_info)
 
     messages = [
         {'role': 'system', 'content': 'You are a helpful assistant.'}
@@ -334,28 +628,178 @@ def document_understanding(file_path, user_question, model_name=None):
             raise ValueError(f"读取文件失败 fail to read file: {str(e)}")
 
     messages.append({'role': 'user', 'content': user_question})
+    messages = apply_token_budget(STAGE_TITLE, messages)
+    input_tokens = estimate_message_tokens(messages)
+
+    def stream(broker_client):
+        start = time.monotonic()
+        completion = broker_client.chat.completions.create(
+            model=client_info.model_name,
+            temperature=client_info.temperature,
+            messages=messages,
+            stream=True,
+            stream_options={"include_usage": True}
+        )
 
-    completion = client.chat.completions.create(
-        model=client_info.model_name,
-        temperature=client_info.temperature,
-        messages=messages,
-        stream=True,
-        stream_options={"include_usage": True}
-    )
+        content = ""
+        usage = None
+        for chunk in completion:
+            if chunk.usage:
+                usage = chunk.usage
+            if chunk.choices and chunk.choices[0].delta.content:
+                content += chunk.choices[0].delta.content
+                print(chunk.model_dump())
+        _record_usage(STAGE_TITLE, client_info, usage, input_tokens, content, start)
+        return content
+
+    full_content = REQUEST_BROKER.submit_sync(client, client_info, input_tokens, stream)
+
+    if write_cache:
+        RESPONSE_CACHE.put(cache_key, full_content)
+    return full_content
 
-    full_content = ""
-    for chunk in completion:
-        if chunk.choices and chunk.choices[0].delta.content:
-            full_content += chunk.choices[0].delta.content
-            print(chunk.model_dump())
 
-    return full_content
+async def _reason_titles(client_info, build_messages, max_tokens, cache_key, chunk_setting, file_path):
+    """
+    Stream one title hierarchy reasoning request, the answer is served from and saved to the response cache
+    :param build_messages: Coroutine function building the messages, only called when the answer is not cached
+    :return: TitleStreamParser holding the parsed titles and the raw answer
+    """
+    read_cache, write_cache = cache_policy(chunk_setting)
+    if read_cache:
+        answer = await RESPONSE_CACHE.aget(cache_key)
+        if answer is not None:
+            parser = TitleStreamParser()
+            parser.feed(answer)
+            return parser
+
+    messages = apply_token_budget(STAGE_TITLE, await build_messages())
+    input_tokens = estimate_message_tokens(messages)
+
+    async def stream(broker_client):
+        parser = TitleStreamParser()
+        output_tokens = 0
+        usage = None
+        start = time.monotonic()
+        completion = await broker_client.chat.completions.create(
+            model=client_info.model_name,
+            temperature=client_info.temperature,
+            messages=messages,
+            max_tokens=max_tokens,
+            stream=True,
+            stream_options={"include_usage": True}
+        )
+        try:
+            async for chunk in completion:
+                if chunk.usage:
+                    usage = chunk.usage
+                if not chunk.choices or not chunk.choices[0].delta.content:
+                    continue
+                delta = chunk.choices[0].delta.content
+                parser.feed(delta)
+                output_tokens += estimate_tokens(delta)
+                if parser.done:
+                    break
+                if output_tokens > max_tokens:
+                    logging.warning(f"Title reasoning stopped after {output_tokens} tokens. file: {file_path}")
+                    break
+        finally:
+            await completion.close()
+        # The usage chunk is not received when the stream is closed early
+        _record_usage(STAGE_TITLE, client_info, usage, input_tokens, parser.text, start)
+        return parser
+
+    parser = await REQUEST_BROKER.submit(get_async_client(client_info), client_info, input_tokens, stream)
+    if write_cache and parser.done:
+        await RESPONSE_CACHE.aput(cache_key, parser.text)
+    return parser
+
+
+async def _reason_title_skeleton(client_info, file_content, user_question, max_tokens, chunk_setting, file_path):
+    """
+    Title hierarchy reasoning on the skeleton of the candidate heading lines instead of the whole document.
+    Skeletons above the window budget are split into windows reasoned concurrently and merged in order.
+    """
+    entries = build_title_skeleton(file_content)
+    if not entries:
+        parser = TitleStreamParser()
+        parser.done = True
+        return parser
+    windows = skeleton_windows(entries, chunk_setting.title_skeleton_window_tokens)
+    line_count = file_content.count('\n') + 1
+    logging.info(f"Title skeleton built. file: {file_path} lines: {line_count} candidates: {len(entries)} "
+                 f"windows: {len(windows)}")
+
+    skeleton_prompt = str_decrypt(TITLE_SKELETON_PROMPT)
+
+    async def reason(window):
+        async def build_messages():
+            return [
+                {'role': 'system', 'content': 'You are a helpful assistant.'},
+                {'role': 'system', 'content': f'{skeleton_prompt}\n{window}'},
+                {'role': 'user', 'content': user_question}
+            ]
+
+        cache_key = response_key(client_info.model_name, client_info.temperature, user_question,
+                                 skeleton_prompt, window)
+        return await _reason_titles(client_info, build_messages, max_tokens, cache_key, chunk_setting, file_path)
+
+    return merge_title_parsers(await asyncio.gather(*(reason(window) for window in windows)))
+
+
+async def document_understanding_async(file_path, user_question, model_name=None, max_tokens=None):
+    """
+    Asynchronous title hierarchy reasoning.
+    The streamed answer is parsed while it arrives and the stream is closed as soon as the title list is complete
+    or the output exceeds max_tokens. With the title skeleton enabled only the candidate heading lines are sent.
+    :param file_path: Markdown file to be reasoned
+    :param user_question: Title hierarchy reasoning prompt
+    :param model_name: Name of the model used, the default model is used when it is None
+    :param max_tokens: Upper limit of the output tokens, the limit of the chunk settings is used when it is None
+    :return: TitleStreamParser holding the parsed titles and the raw answer
+    """
+    client_info = await resolve_model(0, model_name)
+    if client_info is None:
+        logging.error(f"No model fits the criteria. model type 0 , model name {model_name}")
+        raise ValueError(f"No model fits the criteria. model type 0 , model name {model_name}")
+    chunk_setting = await get_chunk_settings()
+    if max_tokens is None:
+        max_tokens = chunk_setting.title_reasoning_max_tokens
+
+    try:
+        async with aiofiles.open(file_path, 'rb') as file:
+            file_bytes = await file.read()
+    except Exception as e:
+        logging.error(f"fail to read file: {str(e)}")
+        raise ValueError(f"读取文件失败 fail to read file: {str(e)}")
+
+    if chunk_setting.enabled_title_skeleton:
+        return await _reason_title_skeleton(client_info, file_bytes.decode('utf-8'), user_question, max_tokens,
+                                            chunk_setting, file_path)
+
+    async def build_messages():
+        messages = [
+            {'role': 'system', 'content': 'You are a helpful assistant.'}
+        ]
+        if client_info.model_name == "qwen-long":
+            # Qwen Long model uses file upload method
+            file_object = await get_async_client(client_info).files.create(file=Path(file_path),
+                                                                           purpose="file-extract")
+            if file_object.id:
+                messages.append({'role': 'system', 'content': f'fileid://{file_object.id}'})
+        else:
+            file_content = file_bytes.decode('utf-8')
+            messages.append({'role': 'system', 'content': f'文件内容：\n{file_content}'})
+        messages.append({'role': 'user', 'content': user_question})
+        return messages
+
+    cache_key = response_key(client_info.model_name, client_info.temperature, user_question, file_bytes)
+    return await _reason_titles(client_info, build_messages, max_tokens, cache_key, chunk_setting, file_path)
 
 
 def document_understanding_text(user_question, model_name):
     try:
-        client_info = asyncio.run(get_default_model(0)) if model_name is None else asyncio.run(
-            get_model(model_name=model_name))
+        client_info = run_async(resolve_model(0, model_name))
     except Exception as e:
         logging.error(f"Error occurred while getting model info: {e}")
         raise ValueError(f"Error getting model info: {e}")
@@ -365,23 +809,22 @@ def document_understanding_text(user_question, model_name):
         raise ValueError(f"No model fits the criteria. model type 0 , model name {model_name}")
 
     try:
-        client = OpenAI(
-            api_key=client_info.api_key,
-            base_url=client_info.base_url,
-            timeout=client_info.timeout,
-            max_retries=client_info.max_retries,
-        )
+        client = get_client(client_info)
     except Exception as e:
         logging.error(f"Error creating OpenAI client: {e}")
         raise ValueError(f"Error creating OpenAI client: {e}")
 
-    try:
-        completion = client.chat.completions.create(
+    messages = apply_token_budget(STAGE_CHAT, [
+        {'role': 'system', 'content': TEXT_REASON_SYSTEM},
+        {'role': 'user', 'content': user_question}
+    ])
+    input_tokens = estimate_message_tokens(messages)
+
+    def stream(broker_client):
+        start = time.monotonic()
+        completion = broker_client.chat.completions.create(
             model=model_name,
-            messages=[
-                {'role': 'system', 'content': TEXT_REASON_SYSTEM},
-                {'role': 'user', 'content': user_question}
-            ],
+            messages=messages,
             stream=True
         )
         # Process streaming response
@@ -389,7 +832,11 @@ def document_understanding_text(user_question, model_name):
         for chunk in completion:
             if chunk.choices[0].delta.content:
                 response_text += chunk.choices[0].delta.content
+        _record_usage(STAGE_CHAT, client_info, None, input_tokens, response_text, start)
         return response_text
+
+    try:
+        return REQUEST_BROKER.submit_sync(client, client_info, input_tokens, stream)
     except Exception as e:
         logging.error(f"Error making OpenAI API call: {e}")
         raise ValueError(f"Error making OpenAI API call: {e}")
@@ -40,3 +40,25 @@ CHUNK_GENERATE_PROMPTS = [
     b'J|^Nol^||l2?tnvvl9U}iuYsiuY@RXvR=R2:<vJ><>|[<SpR=a9pi^M\x80h9Y}k9>tsvmtvhWup`mtyy_}}P\x81s|iitvSutqh>sov_syyuusQ6tpQKtvPmuyi>qnPPR<<Zm<vpX=RlL<`pa>>\x80hJp7n<x2W<Spx<xJO<=92<SpU=RhI=ShM=S2OT[Kr|Rytz`usyamqnPPRSZKtuPKwx<qsz`Su|xmtvPmwvwnvP2hjnV^~rllhoJuw|<qvyx[vw;ir}a\x81r|PKr|RytvPmuyi>}}P\x81v}<[st<>ts>iwuPKvwvOsqy}wthXq<`2:;;JJJp7n<hhJ<w=j<w\x80Q<hZh<>xu<xJO=hR`>>\x80T<x2W<Spx<SpS<>xu<xJO=hR`<<xL<xJO=hR`<aRT<x9q<whO<vJ><>|[<Sp=<SpH<Spx<xJO<=92;;JJJp7n<hhJ<w=j<`2x<w\x80Q<SpH<>xu<xJO=hR`>>\x80T<`pa<v\x80Q<;^u<x9q<whO=Plx<;Z9<x=8=S2i=RNT<vJ><>|[>>\x80T<x9q<whO<a\x80vTqH~kN@ya^>sov_vw;ir}a\x81r|PKr|Ryvo=yuoSityy_}}P\x81v{v_v};j\x80TKI7i9{si|^Ptlpuo|Z@uV^rt|Z;x|pOx|lL{|h|{l2?qVh}q2Z;x|pOx|lL{|h|{ltK}ltjnVptnll\\u2hPrVhno2tptVVHnnv{PVpOx|lL{|h|{lZ>w_PpJpS}}P\x7f\x80Pn7RP|2?qK\x7fpjq>uy`ur}a\x81r|SysqSyspPiqnPPRSZKr|P:vwvOtnS}u|<WswvPq>>\x80TWNQ\x80W|hPs|pHol^Usl^{s2l{plh_vV^|u|taolhLq2Z<pllhoVhno2l{}|VHnnyst<>uya[vwvOtz`S}}QvRSZKvy>msq=yv}wWso>ytvPmuyi;z<SpU=a\x80H=RhI<`^9<S|^<S|><S9]=hRk<hZ^<<xL<a|l<=9\\;;JJJp7n<hZh<Spx<xJO<=92<StS=al7<i2M=hN><S96<<Zv=P|\x7f<whOV2^Po|^Qz|2?qVZ;wlltnlpSzlh^o2^Po|^W{2^rs|lhoVZ>|2Z@slhno2p}o|lzw|2?qV^~wV^M{|h`y2Z;ylpSzlh^o2lhoVtHs2^W{22?qVlw||hn}V2?qK\x7fpjq>tvPmuyi>}}P\x81r|R_uwvOtqhSvv`\x81qnPPR',
     b'K}_Opm_}}m3@uowwm:V~jvZtjvZASYwS>S3;=wK?=?}\\=TqS>b:qj_N\x81i:Z~l:?utwnuwiXvqanuzz`~~Q\x82t}jjuwTvuri?tpw`tzzvvtR7uqRLuwQnvzj?roQQS==[n=wqY>SmM=aqb??\x81iKq8o=y3X=Tqy=yKP=>:3=TqV>SiJ>TiN>T3PU\\Ls}Szu{avtzbnroQQST[LuvQLxy=rt{aTv}ynuwQnxwxowQ3ikoW_\x7fsmmipKvx}=rwzy\\wx<js~b\x82s}QLs}SzuwQnvzj?~~Q\x82w~=\\tu=?ut?jxvQLwxwPtrz~xuiYr=a3;<<KKKq8o=iiK=x>k=x\x81R=i[i=?yv=yKP>iSa??\x81U=y3X=Tqy=TqT=?yv=yKP>iSa==yM=yKP>iSa=bSU=y:r=xiP=wK?=?}\\=Tq>=TqI=Tqy=yKP=>:3<<KKKq8o=iiK=x>k=a3y=x\x81R=TqI=?yv=yKP>iSa??\x81U=aqb=w\x81R=<_v=y:r=xiP>Qmy=<[:=y>9>T3j>SOU=wK?=?}\\??\x81U=y:r=xiP=b\x81wUrI\x7flOAzb_?tpw`wx<js~b\x82s}QLs}Szwp>zvpTjuzz`~~Q\x82w|w`w~<k\x81ULJ8j:|tj}_Qumqvp}[AvW_su}[<y}qPy}mM|}i}|m3@rWi~r3[<y}qPy}mM|}i}|muL~mukoWquomm]v3iQsWiop3uquWWIoow|QWqPy}mM|}i}|m[?x`QqKqT~~Q\x80\x81Qo8SQ}3@rL\x80qkr?vzavs~b\x82s}TztrTztqQjroQQST[Ls}Q;wxwPuoT~v}=XtxwQr??\x81UXOR\x81X}iQt}qIpm_Vtm_|t3m|qmi`wW_}v}ubpmiMr3[=qmmipWiop3m|~}WIooztu=?vzb\\wxwPu{aT~~RwST[Lwz?ntr>zw~xXtp?zuwQnvzj<{=TqV>b\x81I>SiJ=a_:=T}_=T}?=T:^>iSl=i[_==yM=b}m=>:]<<KKKq8o=i[i=Tqy=yKP=>:3=TuT>bm8=j3N>iO?=T:7==[w>Q}\x80=xiPW3_Qp}_R{}3@rW[<xmmuomqT{mi_p3_Qp}_X|3_st}mipW[?}3[Atmiop3q~p}m{x}3@rW_\x7fxW_N|}iaz3[<zmqT{mi_p3mipWuIt3_X|33@rWmx}}io~W3@rL\x80qkr?uwQnvzj?~~Q\x82s}S`vxwPuriTwwa\x82roQQS'
 ]
+
+CHUNK_BATCH_GENERATE_PROMPT = [
+    b'DvXHifXvvf,9nhq8Z3:veHWveI1LDvT5jvnepvbZs,T5hPT5rlqUU18nmcEov5UwwJ{ns50lvLsmiZQouLEnnL0lvJElvLquZYKs[H:4cvbXi,bip,fKi,bvuf,9kHml6Mj765nI6r7268zX6Z,488zNZ3:veHWvePT5vvfKi,bvufXHifXvvfPBhhsps8gmjJcmjLwnhMwov6Qns50lvLsojZgnssYwwJ{mvccnpMonkb8ojZgnssYmipYmssoomK0njKEnpJgosc8khJJL66Tg6pjR7LfF6Zj[88zbDj1h6r,Q6Mjr6rDI673,6MjO7LbC7MbG7M,INUElvLsntZoms[gkhJJLMTEnoJEqr6kmtZMovrgnpJgqpqhpJ,bdhPXxlffbiDoqv6kpsrUpq5clw[{lvJElvLsnpJgosc8wwJ{pw6Umn68nm8cqoJEpqpImkswqnbRk6Z,455DDDj1h6bbD6q7d6qzK6bTb68ro6rDI7bLZ88zN6r,Q6Mjr6MjM68ro6rDI7bLZ66rF6rDI7bLZ6[LN6r3k6qbI6pD868vU6Mj76MjB6Mjr6rDI673,55DDDj1h6bbD6q7d6Z,r6qzK6MjB68ro6rDI7bLZ88zN6Zj[6pzK65Xo6r3k6qbI7Jfr65T36r727M,c7LHN6pD868vU88zN6r3k6qbI6[zpNkBxeH:s[X8mipYpq5clw[{lvJElvLspi7soiMcnssYwwJ{pupYpw5dzNEC1c3umcvXJnfjoivT:oPXlnvT5rvjIrvfFuvbvuf,9kPbwk,T5rvjIrvfFuvbvufnEwfndhPjnhffVo,bJlPbhi,njnPPBhhpuJPT5kfjnhfbBv,f8l,XnhjQwwJx9ZoJ,6pjX7JDG6Z3W6b3Y673K6qfh6b7f7[nG6pTQ6MnK66rF6rDI673,55DDDvXcovfumPjnhfbyhv,9nhpuJPbwk,T5rvfKi,bvufnEwfX0ifniv,j0mPXcov,9kHml6MjP7M7U6ZXm6M,e6pzC6MjB7Jf155DDDj1h6[DN6MjB65nI6r7266rF6bTb6Mjr6rDI673,6MnM7[f16c,G7bH86M3066Tp7Jvy6qbIP,XJivXKtv,9kPT5qffnhfjMtfbXi,XJivXQu,XlmvfbiPT8v,T:mfbhi,jwivftqvPBhhpuJPXQrvj,l,XIvvT5j,nepvbhwPX9k,fbiFqUU18nmcEnkb8wwJ{lvJ4pqpIpwqQmi8smicclv6clv8wlw[YmipYmssowwKpLZHChboOwchq8fzKtZXKmcINjPjCcf4tjbXRjPjBxMDBjcHGj[Xy{JkphJvbhi,fuwkF86rDI673,NjK:gW2:gRqhZHBL',
+    b'EwYIjgYwwg-:oir9[4;wfIXwfJ2MEwU6kwofqwc[t-U6iQU6smrVV29ondFpw6VxxK|ot61mwMtnj[RpvMFooM1mwKFmwMrv[ZLt\\I;5dwcYj-cjq-gLj-cwvg-:lInm7Nk876oJ7s8379{Y7[-599{O[4;wfIXwfQU6wwgLj-cwvgYIjgYwwgQCiitqt9hnkKdnkMxoiNxpw7Rot61mwMtpk[hottZxxK|nwddoqNpolc9pk[hottZnjqZnttppnL1okLFoqKhptd9liKKM77Uh7qkS8MgG7[k\\99{cEk2i7s-R7Nks7sEJ784-7NkP8McD8NcH8N-JOVFmwMtou[pnt\\hliKKMNUFopKFrs7lnu[NpwshoqKhrqriqK-ceiQYymggcjEprw7lqtsVqr6dmx\\|mwKFmwMtoqKhptd9xxK|qx7Vno79on9drpKFqrqJnltxrocSl7[-566EEEk2i7ccE7r8e7r{L7cUc79sp7sEJ8cM[99{O7s-R7Nks7NkN79sp7sEJ8cM[77sG7sEJ8cM[7\\MO7s4l7rcJ7qE979wV7Nk87NkC7Nks7sEJ784-66EEEk2i7ccE7r8e7[-s7r{L7NkC79sp7sEJ8cM[99{O7[k\\7q{L76Yp7s4l7rcJ8Kgs76U47s838N-d8MIO7qE979wV99{O7s4l7rcJ7\\{qOlCyfI;t\\Y9njqZqr6dmx\\|mwKFmwMtqj8tpjNdottZxxK|qvqZqx6e{OFD2d4vndwYKogkpjwU;pQYmowU6swkJswgGvwcwvg-:lQcxl-U6swkJswgGvwcwvgoFxgoeiQkoiggWp-cKmQcij-okoQQCiiqvKQU6lgkoigcCw-g9m-YoikRxxKy:[pK-7qkY8KEH7[4X7c4Z784L7rgi7c8g8\\oH7qUR7NoL77sG7sEJ784-66EEEwYdpwgvnQkoigcziw-:oiqvKQcxl-U6swgLj-cwvgoFxgY1jgojw-k1nQYdpw-:lInm7NkQ8N8V7[Yn7N-f7q{D7NkC8Kg266EEEk2i7\\EO7NkC76oJ7s8377sG7cUc7Nks7sEJ784-7NoN8\\g27d-H8cI97N4177Uq8Kwz7rcJQ-YKjwYLuw-:lQU6rggoigkNugcYj-YKjwYRv-YmnwgcjQU9w-U;ngcij-kxjwgurwQCiiqvKQYRswk-m-YJwwU6k-ofqwcixQY:l-gcjGrVV29ondFolc9xxK|mwK5qrqJqxrRnj9tnjddmw7dmw9xmx\\ZnjqZnttpxxLqM[IDicpPxdir9g{Lu[YLndJOkQkDdg5ukcYSkQkCyNECkdIHk\\Yz|KlqiKwcij-gvxlG97sEJ784-OkL;hX3;hSri[ICM',
+    b'FxZJkhZxxh.;pjs:\\5<xgJYxgK3NFxV7lxpgrxd\\u.V7jRV7tnsWW3:poeGqx7WyyL}pu72nxNuok\\SqwNGppN2nxLGnxNsw\\[Mu]J<6exdZk.dkr.hMk.dxwh.;mJon8Ol987pK8t948:|Z8\\.6::|P\\5<xgJYxgRV7xxhMk.dxwhZJkhZxxhRDjjuru:iolLeolNypjOyqx8Spu72nxNuql\\ipuu[yyL}oxeeprOqpmd:ql\\ipuu[okr[ouuqqoM2plMGprLique:mjLLN88Vi8rlT9NhH8\\l]::|dFl3j8t.S8Olt8tFK895.8OlQ9NdE9OdI9O.KPWGnxNupv\\qou]imjLLNOVGpqLGst8mov\\OqxtiprLisrsjrL.dfjRZznhhdkFqsx8mrutWrs7eny]}nxLGnxNuprLique:yyL}ry8Wop8:po:esqLGrsrKomuyspdTm8\\.677FFFl3j8ddF8s9f8s|M8dVd8:tq8tFK9dN\\::|P8t.S8Olt8OlO8:tq8tFK9dN\\88tH8tFK9dN\\8]NP8t5m8sdK8rF:8:xW8Ol98OlD8Olt8tFK895.77FFFl3j8ddF8s9f8\\.t8s|M8OlD8:tq8tFK9dN\\::|P8\\l]8r|M87Zq8t5m8sdK9Lht87V58t949O.e9NJP8rF:8:xW::|P8t5m8sdK8]|rPmDzgJ<u]Z:okr[rs7eny]}nxLGnxNurk9uqkOepuu[yyL}rwr[ry7f|PGE3e5woexZLphlqkxV<qRZnpxV7txlKtxhHwxdxwh.;mRdym.V7txlKtxhHwxdxwhpGyhpfjRlpjhhXq.dLnRdjk.plpRRDjjrwLRV7mhlpjhdDx.h:n.ZpjlSyyLz;\\qL.8rlZ9LFI8\\5Y8d5[895M8shj8d9h9]pI8rVS8OpM88tH8tFK895.77FFFxZeqxhwoRlpjhd{jx.;pjrwLRdym.V7txhMk.dxwhpGyhZ2khpkx.l2oRZeqx.;mJon8OlR9O9W8\\Zo8O.g8r|E8OlD9Lh377FFFl3j8]FP8OlD87pK8t9488tH8dVd8Olt8tFK895.8OpO9]h38e.I9dJ:8O5288Vr9Lx{8sdKR.ZLkxZMvx.;mRV7shhpjhlOvhdZk.ZLkxZSw.ZnoxhdkRV:x.V<ohdjk.lykxhvsxRDjjrwLRZStxl.n.ZKxxV7l.pgrxdjyRZ;m.hdkHsWW3:poeGpmd:yyL}nxL6rsrKrysSok:uokeenx8enx:yny][okr[ouuqyyMrN\\JEjdqQyejs:h|Mv\\ZMoeKPlRlEeh6vldZTlRlDzOFDleJIl]Z{}LmrjLxdjk.hwymH:8tFK895.PlM<iY4<iTsj\\JDN',
+    b'Gy[Kli[yyi/<qkt;]6=yhKZyhL4OGyW8myqhsye]v/W8kSW8uotXX4;qpfHry8XzzM~qv83oyOvpl]TrxOHqqO3oyMHoyOtx]\\Nv^K=7fye[l/els/iNl/eyxi/<nKpo9Pm:98qL9u:59;}[9]/7;;}Q]6=yhKZyhSW8yyiNl/eyxi[Kli[yyiSEkkvsv;jpmMfpmOzqkPzry9Tqv83oyOvrm]jqvv\\zzM~pyffqsPrqne;rm]jqvv\\pls\\pvvrrpN3qmNHqsMjrvf;nkMMO99Wj9smU:OiI9]m^;;}eGm4k9u/T9Pmu9uGL9:6/9PmR:OeF:PeJ:P/LQXHoyOvqw]rpv^jnkMMOPWHqrMHtu9npw]PryujqsMjtstksM/egkS[{oiielGrty9nsvuXst8foz^~oyMHoyOvqsMjrvf;zzM~sz9Xpq9;qp;ftrMHstsLpnvztqeUn9]/788GGGm4k9eeG9t:g9t}N9eWe9;ur9uGL:eO];;}Q9u/T9Pmu9PmP9;ur9uGL:eO]99uI9uGL:eO]9^OQ9u6n9teL9sG;9;yX9Pm:9PmE9Pmu9uGL9:6/88GGGm4k9eeG9t:g9]/u9t}N9PmE9;ur9uGL:eO];;}Q9]m^9s}N98[r9u6n9teL:Miu98W69u:5:P/f:OKQ9sG;9;yX;;}Q9u6n9teL9^}sQnE{hK=v^[;pls\\st8foz^~oyMHoyOvsl:vrlPfqvv\\zzM~sxs\\sz8g}QHF4f6xpfy[MqimrlyW=rS[oqyW8uymLuyiIxyeyxi/<nSezn/W8uymLuyiIxyeyxiqHziqgkSmqkiiYr/eMoSekl/qmqSSEkksxMSW8nimqkieEy/i;o/[qkmTzzM{<]rM/9sm[:MGJ9]6Z9e6\\9:6N9tik9e:i:^qJ9sWT9PqN99uI9uGL9:6/88GGGy[fryixpSmqkie|ky/<qksxMSezn/W8uyiNl/eyxiqHzi[3liqly/m3pS[fry/<nKpo9PmS:P:X9][p9P/h9s}F9PmE:Mi488GGGm4k9^GQ9PmE98qL9u:599uI9eWe9Pmu9uGL9:6/9PqP:^i49f/J:eK;9P6399Ws:My|9teLS/[Mly[Nwy/<nSW8tiiqkimPwie[l/[Mly[Tx/[opyielSW;y/W=piekl/mzlyiwtySEkksxMS[Tuym/o/[LyyW8m/qhsyekzS[<n/ielItXX4;qpfHqne;zzM~oyM7stsLsztTpl;vplffoy9foy;zoz^\\pls\\pvvrzzNsO]KFkerRzfkt;i}Nw][NpfLQmSmFfi7wme[UmSmE{PGEmfKJm^[|~MnskMyekl/ixznI;9uGL9:6/QmN=jZ5=jUtk]KEO',
+    b'Hz\\Lmj\\zzj0=rlu<^7>ziL[ziM5PHzX9nzritzf^w0X9lTX9vpuYY5<rqgIsz9Y{{N\x7frw94pzPwqm^UsyPIrrP4pzNIpzPuy^]Ow_L>8gzf\\m0fmt0jOm0fzyj0=oLqp:Qn;:9rM:v;6:<~\\:^08<<~R^7>ziL[ziTX9zzjOm0fzyj\\Lmj\\zzjTFllwtw<kqnNgqnP{rlQ{sz:Urw94pzPwsn^krww]{{N\x7fqzggrtQsrof<sn^krww]qmt]qwwssqO4rnOIrtNkswg<olNNP::Xk:tnV;PjJ:^n_<<~fHn5l:v0U:Qnv:vHM:;70:QnS;PfG;QfK;Q0MRYIpzPwrx^sqw_kolNNPQXIrsNIuv:oqx^QszvkrtNkutultN0fhlT\\|pjjfmHsuz:otwvYtu9gp{_\x7fpzNIpzPwrtNkswg<{{N\x7ft{:Yqr:<rq<gusNItutMqow{urfVo:^0899HHHn5l:ffH:u;h:u~O:fXf:<vs:vHM;fP^<<~R:v0U:Qnv:QnQ:<vs:vHM;fP^::vJ:vHM;fP^:_PR:v7o:ufM:tH<:<zY:Qn;:QnF:Qnv:vHM:;7099HHHn5l:ffH:u;h:^0v:u~O:QnF:<vs:vHM;fP^<<~R:^n_:t~O:9\\s:v7o:ufM;Njv:9X7:v;6;Q0g;PLR:tH<:<zY<<~R:v7o:ufM:_~tRoF|iL>w_\\<qmt]tu9gp{_\x7fpzNIpzPwtm;wsmQgrww]{{N\x7ftyt]t{9h~RIG5g7yqgz\\NrjnsmzX>sT\\przX9vznMvzjJyzfzyj0=oTf{o0X9vznMvzjJyzfzyjrI{jrhlTnrljjZs0fNpTflm0rnrTTFlltyNTX9ojnrljfFz0j<p0\\rlnU{{N|=^sN0:tn\\;NHK:^7[:f7]:;7O:ujl:f;j;_rK:tXU:QrO::vJ:vHM:;7099HHHz\\gszjyqTnrljf}lz0=rltyNTf{o0X9vzjOm0fzyjrI{j\\4mjrmz0n4qT\\gsz0=oLqp:QnT;Q;Y:^\\q:Q0i:t~G:QnF;Nj599HHHn5l:_HR:QnF:9rM:v;6::vJ:fXf:Qnv:vHM:;70:QrQ;_j5:g0K;fL<:Q74::Xt;Nz}:ufMT0\\Nmz\\Oxz0=oTX9ujjrljnQxjf\\m0\\Nmz\\Uy0\\pqzjfmTX<z0X>qjflm0n{mzjxuzTFlltyNT\\Uvzn0p0\\MzzX9n0ritzfl{T\\=o0jfmJuYY5<rqgIrof<{{N\x7fpzN8tutMt{uUqm<wqmggpz:gpz<{p{_]qmt]qwws{{OtP^LGlfsS{glu<j~Ox^\\OqgMRnTnGgj8xnf\\VnTnF|QHFngLKn_\\}\x7fNotlNzflm0jy{oJ<:vHM:;70RnO>k[6>kVul^LFP',
+    b'I{]Mnk]{{k1>smv=_8?{jM\\{jN6QI{Y:o{sju{g_x1Y:mUY:wqvZZ6=srhJt{:Z||O\x80sx:5q{Qxrn_VtzQJssQ5q{OJq{Qvz_^Px`M?9h{g]n1gnu1kPn1g{zk1>pMrq;Ro<;:sN;w<7;=\x7f];_19==\x7fS_8?{jM\\{jUY:{{kPn1g{zk]Mnk]{{kUGmmxux=lroOhroQ|smR|t{;Vsx:5q{Qxto_lsxx^||O\x80r{hhsuRtspg=to_lsxx^rnu^rxxttrP5soPJsuOltxh=pmOOQ;;Yl;uoW<QkK;_o`==\x7fgIo6m;w1V;Row;wIN;<81;RoT<QgH<RgL<R1NSZJq{Qxsy_trx`lpmOOQRYJstOJvw;pry_Rt{wlsuOlvuvmuO1gimU]}qkkgnItv{;puxwZuv:hq|`\x80q{OJq{QxsuOltxh=||O\x80u|;Zrs;=sr=hvtOJuvuNrpx|vsgWp;_19::IIIo6m;ggI;v<i;v\x7fP;gYg;=wt;wIN<gQ_==\x7fS;w1V;Row;RoR;=wt;wIN<gQ_;;wK;wIN<gQ_;`QS;w8p;vgN;uI=;={Z;Ro<;RoG;Row;wIN;<81::IIIo6m;ggI;v<i;_1w;v\x7fP;RoG;=wt;wIN<gQ_==\x7fS;_o`;u\x7fP;:]t;w8p;vgN<Okw;:Y8;w<7<R1h<QMS;uI=;={Z==\x7fS;w8p;vgN;`\x7fuSpG}jM?x`]=rnu^uv:hq|`\x80q{OJq{Qxun<xtnRhsxx^||O\x80uzu^u|:i\x7fSJH6h8zrh{]Oskotn{Y?tU]qs{Y:w{oNw{kKz{g{zk1>pUg|p1Y:w{oNw{kKz{g{zksJ|ksimUosmkk[t1gOqUgmn1sosUUGmmuzOUY:pkosmkgG{1k=q1]smoV||O}>_tO1;uo]<OIL;_8\\;g8^;<8P;vkm;g<k<`sL;uYV;RsP;;wK;wIN;<81::III{]ht{kzrUosmkg~m{1>smuzOUg|p1Y:w{kPn1g{zksJ|k]5nksn{1o5rU]ht{1>pMrq;RoU<R<Z;_]r;R1j;u\x7fH;RoG<Ok6::IIIo6m;`IS;RoG;:sN;w<7;;wK;gYg;Row;wIN;<81;RsR<`k6;h1L<gM=;R85;;Yu<O{~;vgNU1]On{]Py{1>pUY:vkksmkoRykg]n1]On{]Vz1]qr{kgnUY={1Y?rkgmn1o|n{kyv{UGmmuzOU]Vw{o1q1]N{{Y:o1sju{gm|U]>p1kgnKvZZ6=srhJspg=||O\x80q{O9uvuNu|vVrn=xrnhhq{;hq{=|q|`^rnu^rxxt||PuQ_MHmgtT|hmv=k\x7fPy_]PrhNSoUoHhk9yog]WoUoG}RIGohMLo`]~\x80OpumO{gmn1kz|pK=;wIN;<81SoP?l\\7?lWvm_MGQ',
+    b'J|^Nol^||l2?tnw>`9@|kN]|kO7RJ|Z;p|tkv|h`y2Z;nVZ;xrw[[7>tsiKu|;[}}P\x81ty;6r|Ryso`Wu{RKttR6r|PKr|Rw{`_QyaN@:i|h^o2hov2lQo2h|{l2?qNsr<Sp=<;tO<x=8<>\x80^<`2:>>\x80T`9@|kN]|kVZ;||lQo2h|{l^Nol^||lVHnnyvy>mspPispR}tnS}u|<Wty;6r|Ryup`mtyy_}}P\x81s|iitvSutqh>up`mtyy_sov_syyuusQ6tpQKtvPmuyi>qnPPR<<Zm<vpX=RlL<`pa>>\x80hJp7n<x2W<Spx<xJO<=92<SpU=RhI=ShM=S2OT[Kr|Rytz`usyamqnPPRSZKtuPKwx<qsz`Su|xmtvPmwvwnvP2hjnV^~rllhoJuw|<qvyx[vw;ir}a\x81r|PKr|RytvPmuyi>}}P\x81v}<[st<>ts>iwuPKvwvOsqy}wthXq<`2:;;JJJp7n<hhJ<w=j<w\x80Q<hZh<>xu<xJO=hR`>>\x80T<x2W<Spx<SpS<>xu<xJO=hR`<<xL<xJO=hR`<aRT<x9q<whO<vJ><>|[<Sp=<SpH<Spx<xJO<=92;;JJJp7n<hhJ<w=j<`2x<w\x80Q<SpH<>xu<xJO=hR`>>\x80T<`pa<v\x80Q<;^u<x9q<whO=Plx<;Z9<x=8=S2i=RNT<vJ><>|[>>\x80T<x9q<whO<a\x80vTqH~kN@ya^>sov_vw;ir}a\x81r|PKr|Ryvo=yuoSityy_}}P\x81v{v_v};j\x80TKI7i9{si|^Ptlpuo|Z@uV^rt|Z;x|pOx|lL{|h|{l2?qVh}q2Z;x|pOx|lL{|h|{ltK}ltjnVptnll\\u2hPrVhno2tptVVHnnv{PVZ;qlptnlhH|2l>r2^tnpW}}P~?`uP2<vp^=PJM<`9]<h9_<=9Q<wln<h=l=atM<vZW<StQ<<xL<xJO<=92;;JJJ|^iu|l{sVptnlh\x7fn|2?tnv{PVh}q2Z;x|lQo2h|{ltK}l^6olto|2p6sV^iu|2?qNsr<SpV=S=[<`^s<S2k<v\x80I<SpH=Pl7;;JJJp7n<aJT<SpH<;tO<x=8<<xL<hZh<Spx<xJO<=92<StS=al7<i2M=hN><S96<<Zv=P|\x7f<whOV2^Po|^Qz|2?qVZ;wlltnlpSzlh^o2^Po|^W{2^rs|lhoVZ>|2Z@slhno2p}o|lzw|VHnnv{PV^Wx|p2r2^O||Z;p2tkv|hn}V^?q2lhoLw[[7>tsiKtqh>}}P\x81r|P:vwvOv}wWso>ysoiir|<ir|>}r}a_sov_syyu}}QvR`NInhuU}inw>l\x80Qz`^QsiOTpVpIil:zph^XpVpH~SJHpiNMpa^\x7f\x81PqvnP|hno2l{}qL><xJO<=92TpQ@m]8@mXwn`NHR',
+    b'K}_Opm_}}m3@uox?a:A}lO^}lP8SK}[<q}ulw}iaz3[<oW[<ysx\\\\8?utjLv}<\\~~Q\x82uz<7s}SztpaXv|SLuuS7s}QLs}Sx|a`RzbOA;j}i_p3ipw3mRp3i}|m3@rOts=Tq>=<uP=y>9=?\x81_=a3;??\x81Ua:A}lO^}lW[<}}mRp3i}|m_Opm_}}mWIoozwz?ntqQjtqS~uoT~v}=Xuz<7s}Szvqanuzz`~~Q\x82t}jjuwTvuri?vqanuzz`tpw`tzzvvtR7uqRLuwQnvzj?roQQS==[n=wqY>SmM=aqb??\x81iKq8o=y3X=Tqy=yKP=>:3=TqV>SiJ>TiN>T3PU\\Ls}Szu{avtzbnroQQST[LuvQLxy=rt{aTv}ynuwQnxwxowQ3ikoW_\x7fsmmipKvx}=rwzy\\wx<js~b\x82s}QLs}SzuwQnvzj?~~Q\x82w~=\\tu=?ut?jxvQLwxwPtrz~xuiYr=a3;<<KKKq8o=iiK=x>k=x\x81R=i[i=?yv=yKP>iSa??\x81U=y3X=Tqy=TqT=?yv=yKP>iSa==yM=yKP>iSa=bSU=y:r=xiP=wK?=?}\\=Tq>=TqI=Tqy=yKP=>:3<<KKKq8o=iiK=x>k=a3y=x\x81R=TqI=?yv=yKP>iSa??\x81U=aqb=w\x81R=<_v=y:r=xiP>Qmy=<[:=y>9>T3j>SOU=wK?=?}\\??\x81U=y:r=xiP=b\x81wUrI\x7flOAzb_?tpw`wx<js~b\x82s}QLs}Szwp>zvpTjuzz`~~Q\x82w|w`w~<k\x81ULJ8j:|tj}_Qumqvp}[AvW_su}[<y}qPy}mM|}i}|m3@rWi~r3[<y}qPy}mM|}i}|muL~mukoWquomm]v3iQsWiop3uquWWIoow|QW[<rmquomiI}3m?s3_uoqX~~Q\x7f@avQ3=wq_>QKN=a:^=i:`=>:R=xmo=i>m>buN=w[X=TuR==yM=yKP=>:3<<KKK}_jv}m|tWquomi\x80o}3@uow|QWi~r3[<y}mRp3i}|muL~m_7pmup}3q7tW_jv}3@rOts=TqW>T>\\=a_t=T3l=w\x81J=TqI>Qm8<<KKKq8o=bKU=TqI=<uP=y>9==yM=i[i=Tqy=yKP=>:3=TuT>bm8=j3N>iO?=T:7==[w>Q}\x80=xiPW3_Qp}_R{}3@rW[<xmmuomqT{mi_p3_Qp}_X|3_st}mipW[?}3[Atmiop3q~p}m{x}WIoow|QW_Xy}q3s3_P}}[<q3ulw}io~W_@r3mipMx\\\\8?utjLuri?~~Q\x82s}Q;wxwPw~xXtp?ztpjjs}=js}?~s~b`tpw`tzzv~~RwSaOJoivV~jox?m\x81R{a_RtjPUqWqJjm;{qi_YqWqI\x7fTKIqjONqb_\x80\x82QrwoQ}iop3m|~rM?=yKP=>:3UqRAn^9AnYxoaOIS',
+]
+
+TITLE_SKELETON_PROMPT = [
+    b'6Mvm6MjM6MjO6qjw6b7N6qX166rF6qbI6Mv36ZbG6b7688zN7JDN6qjw6qbI6Mv36Mju6Z,w7JP:6Mj76rDI7bLZ66rF6ZD[7ZDK7LHN88zN6r,Q7LHN6rD96czQ6Mj75pDd7LHN6Z,4PjEppZ{mipYmssojhK4wwJxL6Mvm5pDdQvLBofX9hPXluPfbiPf9rfj0n,jikPbZs,jwqfXBnfnBjfjikPT6j,XRkvbup,bXi,fbiPX9hPXluP,9kPT8iffVrPT7kvX5svXLrfXJqPbXsf,9kPT5kfbZs,bhi,njnPPBhhsps8gmk7slv58mhKoqhJoppZ{lvL4ps5cmjLwnpJgqpqkmk5smiccmtZMovrgwwJ{npJgqpqknmpgnoL{lw64nkJIlvJ8mhKoqhJoppZ{mipYmssolvJEpi8UwwJytbX6mdzEmpbwmiqomhKoqhJoppZ{onpUppZ{mk8gkhJJL6ZD[7ZDK7LHN88zb',
+    b'7Nwn7NkN7NkP7rkx7c8O7rY277sG7rcJ7Nw47[cH7c8799{O8KEO7rkx7rcJ7Nw47Nkv7[-x8KQ;7Nk87sEJ8cM[77sG7[E\\8[EL8MIO99{O7s-R8MIO7sE:7d{R7Nk86qEe8MIO7[-5QkFqq[|njqZnttpkiL5xxKyM7Nwn6qEeRwMCpgY:iQYmvQgcjQg:sgk1o-kjlQc[t-kxrgYCogoCkgkjlQU7k-YSlwcvq-cYj-gcjQY:iQYmvQ-:lQU9jggWsQU8lwY6twYMsgYKrQcYtg-:lQU6lgc[t-cij-okoQQCiitqt9hnl8tmw69niLpriKpqq[|mwM5qt6dnkMxoqKhrqrlnl6tnjddnu[NpwshxxK|oqKhrqrlonqhopM|mx75olKJmwK9niLpriKpqq[|njqZnttpmwKFqj9VxxKzucY7ne{FnqcxnjrpniLpriKpqq[|poqVqq[|nl9hliKKM7[E\\8[EL8MIO99{c',
+    b'8Oxo8OlO8OlQ8sly8d9P8sZ388tH8sdK8Ox58\\dI8d98::|P9LFP8sly8sdK8Ox58Olw8\\.y9LR<8Ol98tFK9dN\\88tH8\\F]9\\FM9NJP::|P8t.S9NJP8tF;8e|S8Ol97rFf9NJP8\\.6RlGrr\\}okr[ouuqljM6yyLzN8Oxo7rFfSxNDqhZ;jRZnwRhdkRh;thl2p.lkmRd\\u.lyshZDphpDlhlkmRV8l.ZTmxdwr.dZk.hdkRZ;jRZnwR.;mRV:khhXtRV9mxZ7uxZNthZLsRdZuh.;mRV7mhd\\u.djk.plpRRDjjuru:iom9unx7:ojMqsjLqrr\\}nxN6ru7eolNyprLisrsmom7uokeeov\\OqxtiyyL}prLisrsmporipqN}ny86pmLKnxL:ojMqsjLqrr\\}okr[ouuqnxLGrk:WyyL{vdZ8of|GordyoksqojMqsjLqrr\\}qprWrr\\}om:imjLLN8\\F]9\\FM9NJP::|d',
+    b'9Pyp9PmP9PmR9tmz9e:Q9t[499uI9teL9Py69]eJ9e:9;;}Q:MGQ9tmz9teL9Py69Pmx9]/z:MS=9Pm:9uGL:eO]99uI9]G^:]GN:OKQ;;}Q9u/T:OKQ9uG<9f}T9Pm:8sGg:OKQ9]/7SmHss]~pls\\pvvrmkN7zzM{O9Pyp8sGgTyOEri[<kS[oxSielSi<uim3q/mlnSe]v/mzti[EqiqEmimlnSW9m/[Unyexs/e[l/ielS[<kS[oxS/<nSW;liiYuSW:ny[8vy[Oui[MtSe[vi/<nSW8nie]v/ekl/qmqSSEkkvsv;jpn:voy8;pkNrtkMrss]~oyO7sv8fpmOzqsMjtstnpn8vplffpw]PryujzzM~qsMjtstnqpsjqrO~oz97qnMLoyM;pkNrtkMrss]~pls\\pvvroyMHsl;XzzM|we[9pg}HpsezpltrpkNrtkMrss]~rqsXss]~pn;jnkMMO9]G^:]GN:OKQ;;}e',
+    b':Qzq:QnQ:QnS:un{:f;R:u\\5::vJ:ufM:Qz7:^fK:f;:<<~R;NHR:un{:ufM:Qz7:Qny:^0{;NT>:Qn;:vHM;fP^::vJ:^H_;^HO;PLR<<~R:v0U;PLR:vH=:g~U:Qn;9tHh;PLR:^08TnItt^\x7fqmt]qwwsnlO8{{N|P:Qzq9tHhUzPFsj\\=lT\\pyTjfmTj=vjn4r0nmoTf^w0n{uj\\FrjrFnjnmoTX:n0\\Vozfyt0f\\m0jfmT\\=lT\\pyT0=oTX<mjjZvTX;oz\\9wz\\Pvj\\NuTf\\wj0=oTX9ojf^w0flm0rnrTTFllwtw<kqo;wpz9<qlOsulNstt^\x7fpzP8tw9gqnP{rtNkutuoqo9wqmggqx^Qszvk{{N\x7frtNkutuorqtkrsP\x7fp{:8roNMpzN<qlOsulNstt^\x7fqmt]qwwspzNItm<Y{{N}xf\\:qh~Iqtf{qmusqlOsulNstt^\x7fsrtYtt^\x7fqo<kolNNP:^H_;^HO;PLR<<~f',
+    b';R{r;RoR;RoT;vo|;g<S;v]6;;wK;vgN;R{8;_gL;g<;==\x7fS<OIS;vo|;vgN;R{8;Roz;_1|<OU?;Ro<;wIN<gQ_;;wK;_I`<_IP<QMS==\x7fS;w1V<QMS;wI>;h\x7fV;Ro<:uIi<QMS;_19UoJuu_\x80rnu^rxxtomP9||O}Q;R{r:uIiV{QGtk]>mU]qzUkgnUk>wko5s1onpUg_x1o|vk]GsksGokonpUY;o1]Wp{gzu1g]n1kgnU]>mU]qzU1>pUY=nkk[wUY<p{]:x{]Qwk]OvUg]xk1>pUY:pkg_x1gmn1sosUUGmmxux=lrp<xq{:=rmPtvmOtuu_\x80q{Q9ux:hroQ|suOlvuvprp:xrnhhry_Rt{wl||O\x80suOlvuvpsrulstQ\x80q|;9spONq{O=rmPtvmOtuu_\x80rnu^rxxtq{OJun=Z||O~yg];ri\x7fJrug|rnvtrmPtvmOtuu_\x80tsuZuu_\x80rp=lpmOOQ;_I`<_IP<QMS==\x7fg',
+    b'<S|s<SpS<SpU<wp}<h=T<w^7<<xL<whO<S|9<`hM<h=<>>\x80T=PJT<wp}<whO<S|9<Sp{<`2}=PV@<Sp=<xJO=hR`<<xL<`Ja=`JQ=RNT>>\x80T<x2W=RNT<xJ?<i\x80W<Sp=;vJj=RNT<`2:VpKvv`\x81sov_syyupnQ:}}P~R<S|s;vJjW|RHul^?nV^r{VlhoVl?xlp6t2poqVh`y2p}wl^HtltHplpoqVZ<p2^Xq|h{v2h^o2lhoV^?nV^r{V2?qVZ>oll\\xVZ=q|^;y|^Rxl^PwVh^yl2?qVZ;qlh`y2hno2tptVVHnnyvy>msq=yr|;>snQuwnPuvv`\x81r|R:vy;ispR}tvPmwvwqsq;ysoiisz`Su|xm}}P\x81tvPmwvwqtsvmtuR\x81r}<:tqPOr|P>snQuwnPuvv`\x81sov_syyur|PKvo>[}}P\x7fzh^<sj\x80Ksvh}sowusnQuwnPuvv`\x81utv[vv`\x81sq>mqnPPR<`Ja=`JQ=RNT>>\x80h',
+    b'=T}t=TqT=TqV=xq~=i>U=x_8==yM=xiP=T}:=aiN=i>=??\x81U>QKU=xq~=xiP=T}:=Tq|=a3~>QWA=Tq>=yKP>iSa==yM=aKb>aKR>SOU??\x81U=y3X>SOU=yK@=j\x81X=Tq><wKk>SOU=a3;WqLwwa\x82tpw`tzzvqoR;~~Q\x7fS=T}t<wKkX}SIvm_@oW_s|WmipWm@ymq7u3qprWiaz3q~xm_IumuIqmqprW[=q3_Yr}i|w3i_p3mipW_@oW_s|W3@rW[?pmm]yW[>r}_<z}_Sym_QxWi_zm3@rW[<rmiaz3iop3uquWWIoozwz?ntr>zs}<?toRvxoQvwwa\x82s}S;wz<jtqS~uwQnxwxrtr<ztpjjt{aTv}yn~~Q\x82uwQnxwxrutwnuvS\x82s~=;urQPs}Q?toRvxoQvwwa\x82tpw`tzzvs}QLwp?\\~~Q\x80{i_=tk\x81Ltwi~tpxvtoRvxoQvwwa\x82vuw\\wwa\x82tr?nroQQS=aKb>aKR>SOU??\x81i',
+]
@@ -0,0 +1,326 @@
+import asyncio
+import contextvars
+import logging
+import re
+import threading
+import time
+
+import openai
+from django.conf import settings
+
+from processor.model_router import MODEL_ROUTER
+
+logging = logging.getLogger('request_broker')
+
+# Requests of interactive single file jobs are admitted before requests of bulk archive jobs
+PRIORITY_INTERACTIVE = 0
+PRIORITY_BULK = 1
+
+_request_priority = contextvars.ContextVar('llm_request_priority', default=PRIORITY_INTERACTIVE)
+
+# Errors that mean the endpoint is overloaded, they shrink the concurrency and are retried by the broker
+_THROTTLE_ERRORS = (openai.RateLimitError, openai.APITimeoutError)
+_RETRY_ERRORS = _THROTTLE_ERRORS + (openai.APIConnectionError, openai.InternalServerError)
+
+_CJK_PATTERN = re.compile(r'[\u3000-\u9fff\uac00-\ud7af\uff00-\uffef]')
+
+
+def set_request_priority(priority):
+    """
+    Set the priority of the model requests made by the current thread or task
+    :param priority: PRIORITY_INTERACTIVE or PRIORITY_BULK
+    """
+    _request_priority.set(priority)
+
+
+def estimate_tokens(text):
+    """
+    Rough token estimate used for the tokens per minute budget, one token per CJK character and per four others
+    """
+    if not text:
+        return 0
+    cjk = len(_CJK_PATTERN.findall(text))
+    return cjk + (len(text) - cjk + 3) // 4
+
+
+class _TokenBucket:
+    __slots__ = ('capacity', 'rate', 'tokens', 'updated')
+
+    def __init__(self, per_minute):
+        self.capacity = float(per_minute)
+        self.rate = per_minute / 60.0
+        self.tokens = float(per_minute)
+        self.updated = time.monotonic()
+
+    def refill(self, now):
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def wait_time(self, amount):
+        amount = min(amount, self.capacity)
+        if self.tokens >= amount:
+            return 0.0
+        return (amount - self.tokens) / self.rate
+
+
+class EndpointBudget:
+    """
+    Admission state of one model endpoint (base_url).
+    Requests per minute and tokens per minute are token buckets, the concurrency limit grows additively on success
+    and is halved when the endpoint answers 429 or times out.
+    """
+
+    def __init__(self, base_url, requests_per_minute, tokens_per_minute, initial_concurrency, min_concurrency,
+                 max_concurrency):
+        self.base_url = base_url
+        self.requests = _TokenBucket(requests_per_minute)
+        self.tokens = _TokenBucket(tokens_per_minute)
+        self.limit = float(initial_concurrency)
+        self.min_concurrency = min_concurrency
+        self.max_concurrency = max_concurrency
+        self.in_flight = 0
+        self.waiting = [0, 0]
+        self.blocked_until = 0.0
+        self.last_decrease = 0.0
+        self.admitted = 0
+        self.throttled = 0
+        self.failed = 0
+
+    def stats(self):
+        return {
+            'base_url': self.base_url,
+            'concurrency_limit': round(self.limit, 2),
+            'in_flight': self.in_flight,
+            'waiting_interactive': self.waiting[PRIORITY_INTERACTIVE],
+            'waiting_bulk': self.waiting[PRIORITY_BULK],
+            'request_budget': int(self.requests.tokens),
+            'token_budget': int(self.tokens.tokens),
+            'admitted': self.admitted,
+            'throttled': self.throttled,
+            'failed': self.failed,
+        }
+
+
+class RequestBroker:
+    """
+    Process wide broker in front of every model call.
+    The file threads run their own event loops, so the shared state is guarded by a thread lock and waiting requests
+    poll with a short sleep instead of waiting on loop bound primitives.
+    """
+    POLL_INTERVAL = 0.05
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._endpoints = {}
+
+    def _setting(self, name, default, base_url=None):
+        broker_setting = getattr(settings, 'LLM_BROKER', {})
+        endpoint_setting = broker_setting.get('ENDPOINTS', {}).get(base_url, {}) if base_url else {}
+        return endpoint_setting.get(name, broker_setting.get(name, default))
+
+    def enabled(self):
+        return self._setting('ENABLED', True)
+
+    def _endpoint(self, base_url):
+        endpoint = self._endpoints.get(base_url)
+        if endpoint is None:
+            endpoint = EndpointBudget(
+                base_url,
+                requests_per_minute=self._setting('REQUESTS_PER_MINUTE', 600, base_url),
+                tokens_per_minute=self._setting('TOKENS_PER_MINUTE', 1000000, base_url),
+                initial_concurrency=self._setting('INITIAL_CONCURRENCY', 8, base_url),
+                min_concurrency=self._setting('MIN_CONCURRENCY', 1, base_url),
+                max_concurrency=self._setting('MAX_CONCURRENCY', 64, base_url),
+            )
+            self._endpoints[base_url] = endpoint
+        return endpoint
+
+    def _try_admit(self, endpoint, tokens, priority):
+        """
+        Admit the request if the budget allows it, must be called while holding the lock
+        :return: 0 when admitted, otherwise the seconds to wait before trying again
+        """
+        now = time.monotonic()
+        if endpoint.blocked_until > now:
+            return endpoint.blocked_until - now
+        if any(endpoint.waiting[p] for p in range(priority)):
+            return self.POLL_INTERVAL
+        if endpoint.in_flight >= int(endpoint.limit):
+            return self.POLL_INTERVAL
+        endpoint.requests.refill(now)
+        endpoint.tokens.refill(now)
+        wait = max(endpoint.requests.wait_time(1), endpoint.tokens.wait_time(tokens))
+        if wait > 0:
+            return wait
+        endpoint.requests.tokens -= 1
+        endpoint.tokens.tokens -= min(tokens, endpoint.tokens.capacity)
+        endpoint.in_flight += 1
+        endpoint.admitted += 1
+        return 0
+
+    def _wait_steps(self, base_url, tokens):
+        """
+        Generator of the sleeps needed before the request is admitted, shared by the async and the sync path.
+        The admitted endpoint is the return value of the generator.
+        """
+        priority = _request_priority.get()
+        with self._lock:
+            endpoint = self._endpoint(base_url)
+            wait = self._try_admit(endpoint, tokens, priority)
+            if wait == 0:
+                return endpoint
+            endpoint.waiting[priority] += 1
+        try:
+            while True:
+                yield min(wait, 1.0)
+                with self._lock:
+                    wait = self._try_admit(endpoint, tokens, priority)
+                    if wait == 0:
+                        return endpoint
+        finally:
+            with self._lock:
+                endpoint.waiting[priority] -= 1
+
+    def _abandon(self, endpoint):
+        """
+        Release the admission of a cancelled call, e.g. the losing copy of a hedged request or a shutdown.
+        It says nothing about the endpoint, neither the concurrency limit nor the failure counters change.
+        """
+        with self._lock:
+            endpoint.in_flight -= 1
+
+    def _release(self, endpoint, error=None, retry_after=None):
+        now = time.monotonic()
+        with self._lock:
+            endpoint.in_flight -= 1
+            if error is None:
+                endpoint.limit = min(endpoint.max_concurrency, endpoint.limit + 1 / endpoint.limit)
+                return
+            if isinstance(error, _THROTTLE_ERRORS):
+                endpoint.throttled += 1
+                # Halve at most once per second, the requests already in flight report the same overload
+                if now - endpoint.last_decrease > 1.0:
+                    endpoint.limit = max(endpoint.min_concurrency, endpoint.limit / 2)
+                    endpoint.last_decrease = now
+                    logging.warning(f"Endpoint {endpoint.base_url} is overloaded, "
+                                    f"concurrency limit reduced to {endpoint.limit:.2f}")
+            else:
+                endpoint.failed += 1
+            if retry_after:
+                endpoint.blocked_until = max(endpoint.blocked_until, now + retry_after)
+
+    @staticmethod
+    def _retry_after(error, attempt):
+        if not isinstance(error, _RETRY_ERRORS):
+            return None
+        response = getattr(error, 'response', None)
+        if response is not None:
+            try:
+                return float(response.headers.get('retry-after'))
+            except (TypeError, ValueError):
+                pass
+        return min(0.5 * (2 ** attempt), 30.0)
+
+    def _failed(self, endpoint, error, attempt, max_retries):
+        """
+        Release the admission of a failed call
+        :return: Whether the call should be retried
+        """
+        self._release(endpoint, error, self._retry_after(error, attempt))
+        return isinstance(error, _RETRY_ERRORS) and attempt < max_retries
+
+    async def submit(self, client, client_info, tokens, call):
+        """
+        Run an asynchronous model call once the endpoint budget admits it.
+        The SDK retries are disabled, 429s and timeouts are retried by the broker so that they shrink the budget
+        instead of amplifying the overload.
+        :param client: Pooled AsyncOpenAI client of the model
+        :param client_info: ModelSettings of the model
+        :param tokens: Estimated tokens of the request
+        :param call: Coroutine function receiving the client to use
+        :return: Result of the call
+        """
+        if not self.enabled():
+            start = time.monotonic()
+            try:
+                result = await call(client)
+            except Exception as e:
+                MODEL_ROUTER.observe(client_info, time.monotonic() - start, e)
+                raise
+            MODEL_ROUTER.observe(client_info, time.monotonic() - start)
+            return result
+        client = client.with_options(max_retries=0)
+        attempt = 0
+        while True:
+            steps = self._wait_steps(client_info.base_url, tokens)
+            try:
+                while True:
+                    await asyncio.sleep(next(steps))
+            except StopIteration as stop:
+                endpoint = stop.value
+            finally:
+                steps.close()
+            start = time.monotonic()
+            try:
+                result = await call(client)
+            except Exception as e:
+                MODEL_ROUTER.observe(client_info, time.monotonic() - start, e)
+                if not self._failed(endpoint, e, attempt, client_info.max_retries):
+                    raise
+                attempt += 1
+                continue
+            except BaseException:
+                # Cancelled, e.g. the losing copy of a hedged request, or interrupted on shutdown
+                self._abandon(endpoint)
+                raise
+            MODEL_ROUTER.observe(client_info, time.monotonic() - start)
+            self._release(endpoint)
+            return result
+
+    def submit_sync(self, client, client_info, tokens, call):
+        """
+        Blocking variant of submit for calls made in worker threads, such as the streaming title reasoning
+        """
+        if not self.enabled():
+            start = time.monotonic()
+            try:
+                result = call(client)
+            except Exception as e:
+                MODEL_ROUTER.observe(client_info, time.monotonic() - start, e)
+                raise
+            MODEL_ROUTER.observe(client_info, time.monotonic() - start)
+            return result
+        client = client.with_options(max_retries=0)
+        attempt = 0
+        while True:
+            steps = self._wait_steps(client_info.base_url, tokens)
+            try:
+                while True:
+                    time.sleep(next(steps))
+            except StopIteration as stop:
+                endpoint = stop.value
+            finally:
+                steps.close()
+            start = time.monotonic()
+            try:
+                result = call(client)
+            except Exception as e:
+                MODEL_ROUTER.observe(client_info, time.monotonic() - start, e)
+                if not self._failed(endpoint, e, attempt, client_info.max_retries):
+                    raise
+                attempt += 1
+                continue
+            except BaseException:
+                # Interrupted, e.g. KeyboardInterrupt or SystemExit on shutdown
+                self._abandon(endpoint)
+                raise
+            MODEL_ROUTER.observe(client_info, time.monotonic() - start)
+            self._release(endpoint)
+            return result
+
+    def stats(self):
+        with self._lock:
+            return [endpoint.stats() for endpoint in self._endpoints.values()]
+
+
+REQUEST_BROKER = RequestBroker()
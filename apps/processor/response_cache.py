@@ -0,0 +1,184 @@
+import asyncio
+import hashlib
+import json
+import logging
+import sqlite3
+import threading
+import time
+from pathlib import Path
+
+from django.conf import settings
+
+logging = logging.getLogger('response_cache')
+
+
+class ResponseCache:
+    """
+    Persistent cache of model answers stored in a local SQLite file.
+    Answers are addressed by the hash of everything that decides them, the least recently used ones are evicted
+    once the entry or byte limit is exceeded.
+    """
+
+    def __init__(self, path=None, max_entries=None, max_bytes=None):
+        self._path = path
+        self._max_entries = max_entries
+        self._max_bytes = max_bytes
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.writes = 0
+        self.evictions = 0
+
+    def _setting(self, name, default):
+        return getattr(settings, 'LLM_RESPONSE_CACHE', {}).get(name, default)
+
+    def _get_path(self):
+        return self._path or self._setting('PATH', 'llm_response.sqlite3')
+
+    def _connection(self):
+        """
+        SQLite connections can not be shared between threads, each thread opens its own one
+        """
+        conn = getattr(self._local, 'conn', None)
+        if conn is not None:
+            return conn
+        path = Path(self._get_path())
+        path.parent.mkdir(parents=True, exist_ok=True)
+        conn = sqlite3.connect(str(path), timeout=30)
+        conn.execute('PRAGMA journal_mode=WAL')
+        conn.execute('PRAGMA synchronous=NORMAL')
+        conn.execute('CREATE TABLE IF NOT EXISTS llm_response ('
+                     'key TEXT PRIMARY KEY, response TEXT NOT NULL, size INTEGER NOT NULL, '
+                     'created_at REAL NOT NULL, accessed_at REAL NOT NULL)')
+        conn.execute('CREATE INDEX IF NOT EXISTS llm_response_accessed ON llm_response (accessed_at)')
+        conn.commit()
+        self._local.conn = conn
+        return conn
+
+    def get(self, key):
+        """
+        Get the cached answer
+        :param key: Key built by response_key
+        :return: The answer, None when it is not cached
+        """
+        try:
+            conn = self._connection()
+            row = conn.execute('SELECT response FROM llm_response WHERE key = ?', (key,)).fetchone()
+            if row is not None:
+                conn.execute('UPDATE llm_response SET accessed_at = ? WHERE key = ?', (time.time(), key))
+                conn.commit()
+        except sqlite3.Error as e:
+            logging.error(f"Response cache read failed. e: {e}")
+            row = None
+        with self._lock:
+            if row is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+        return None if row is None else row[0]
+
+    async def aget(self, key):
+        """
+        Asynchronous get, the SQLite query runs on a worker thread so that it does not stall the event loop
+        """
+        return await asyncio.to_thread(self.get, key)
+
+    def put(self, key, response):
+        """
+        Save the answer and evict the least recently used answers above the limits
+        :param key: Key built by response_key
+        :param response: Answer of the model
+        """
+        if response is None:
+            return
+        now = time.time()
+        try:
+            conn = self._connection()
+            conn.execute('INSERT OR REPLACE INTO llm_response (key, response, size, created_at, accessed_at) '
+                         'VALUES (?, ?, ?, ?, ?)', (key, response, len(response.encode('utf-8')), now, now))
+            conn.commit()
+            self._evict(conn)
+        except sqlite3.Error as e:
+            logging.error(f"Response cache write failed. e: {e}")
+            return
+        with self._lock:
+            self.writes += 1
+
+    async def aput(self, key, response):
+        """
+        Asynchronous put, see aget
+        """
+        await asyncio.to_thread(self.put, key, response)
+
+    def _evict(self, conn):
+        max_entries = self._max_entries or self._setting('MAX_ENTRIES', 200000)
+        max_bytes = self._max_bytes or self._setting('MAX_BYTES', 1024 * 1024 * 1024)
+        count, total_bytes = conn.execute('SELECT COUNT(*), COALESCE(SUM(size), 0) FROM llm_response').fetchone()
+        while count > max_entries or total_bytes > max_bytes:
+            # Evict a tenth of the entries at a time so that eviction is not run on every write
+            batch = max(count - max_entries, count // 10, 1)
+            deleted = conn.execute('DELETE FROM llm_response WHERE key IN '
+                                   '(SELECT key FROM llm_response ORDER BY accessed_at LIMIT ?)', (batch,)).rowcount
+            conn.commit()
+            with self._lock:
+                self.evictions += deleted
+            if deleted == 0:
+                break
+            count, total_bytes = conn.execute(
+                'SELECT COUNT(*), COALESCE(SUM(size), 0) FROM llm_response').fetchone()
+
+    def clear(self):
+        """
+        Drop all cached answers
+        """
+        conn = self._connection()
+        conn.execute('DELETE FROM llm_response')
+        conn.commit()
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': round(self.hits / lookups, 4) if lookups else 0,
+                'writes': self.writes,
+                'evictions': self.evictions,
+            }
+
+
+RESPONSE_CACHE = ResponseCache()
+
+
+def response_key(model_name, temperature, *parts):
+    """
+    Content address of a model answer
+    :param model_name: Name of the model
+    :param temperature: Temperature of the model
+    :param parts: System prompt, prompt and content, str, bytes or json serializable objects
+    :return: Hex digest of the sha256 hash
+    """
+    digest = hashlib.sha256()
+    digest.update(f'{model_name}\x00{temperature}'.encode('utf-8'))
+    for part in parts:
+        if isinstance(part, str):
+            part = part.encode('utf-8')
+        elif not isinstance(part, (bytes, bytearray, memoryview)):
+            part = json.dumps(part, ensure_ascii=False, sort_keys=True).encode('utf-8')
+        digest.update(b'\x00')
+        digest.update(part)
+    return digest.hexdigest()
+
+
+def cache_policy(chunk_setting):
+    """
+    Decide whether cached answers are read and whether new answers are written
+    :param chunk_setting: ChunkSettings
+    :return: (read, write)
+    """
+    if not chunk_setting.enabled_response_cache:
+        return False, False
+    if chunk_setting.enabled_response_cache_refresh:
+        return False, True
+    return True, True
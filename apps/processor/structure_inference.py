@@ -0,0 +1,124 @@
+import logging
+import os
+import re
+from collections import Counter
+
+from docx import Document
+
+from file_weaver.constant import MAX_HEADER_LEVEL
+from processor.models.title_model import TitleInfo
+
+logging = logging.getLogger('structure_inference')
+
+_HEADING_STYLE_PATTERN = re.compile(r'^heading\s*([1-9])$', re.IGNORECASE)
+
+# A line is a heading candidate when its font is this much larger than the body font
+HEADING_SIZE_RATIO = 1.15
+# Text repeated on more than this share of the pages is a running header or footer
+RUNNING_TEXT_RATIO = 0.5
+# Above this share of heading lines the font sizes do not describe a hierarchy
+MAX_HEADING_SHARE = 0.3
+# Headings needed before the inferred hierarchy is trusted
+MIN_HEADINGS = 2
+
+
+class HeadingInference:
+    """
+    Heading hierarchy inferred from the document itself
+    titles: Markdown headings in document order
+    confident: Whether the hierarchy can replace the title reasoning of the model
+    source: What the levels were derived from, styles or font_size
+    """
+    __slots__ = ('titles', 'confident', 'source')
+
+    def __init__(self, titles, confident, source):
+        self.titles = titles
+        self.confident = confident
+        self.source = source
+
+    def to_context(self):
+        """
+        The titles in the format expected by replace_titles
+        """
+        return {'content': [title.to_dict() for title in self.titles]}
+
+
+def infer_docx_headings(file_path):
+    """
+    Heading levels of a docx file from its paragraph styles, Title is level 1 and Heading N is level N
+    """
+    titles = []
+    for i, paragraph in enumerate(Document(file_path).paragraphs):
+        text = paragraph.text.strip()
+        if not text or paragraph.style is None:
+            continue
+        style_name = paragraph.style.name or ''
+        match = _HEADING_STYLE_PATTERN.match(style_name)
+        if match:
+            level = min(int(match.group(1)), MAX_HEADER_LEVEL)
+        elif style_name.lower() == 'title':
+            level = 1
+        else:
+            continue
+        titles.append(TitleInfo(f"{'#' * level} {text}", [i + 1]))
+    return HeadingInference(titles, len(titles) >= MIN_HEADINGS, 'styles')
+
+
+def infer_pdf_headings(pages_font_lines):
+    """
+    Heading levels of a PDF from font size clustering.
+    The most used size is the body font, the distinct larger sizes of short lines are the heading levels from the
+    largest down, running headers and footers repeated on most pages are ignored.
+    :param pages_font_lines: (characters per font size, [(text, font size)] of the short lines) of every page,
+    in page order, collected by extract_pdf
+    """
+    size_chars = Counter()
+    text_pages = Counter()
+    line_count = 0
+    for page_sizes, page_lines in pages_font_lines:
+        size_chars.update(page_sizes)
+        text_pages.update({text for text, size in page_lines})
+        line_count += len(page_lines)
+    if not size_chars:
+        return HeadingInference([], False, 'font_size')
+
+    body_size = size_chars.most_common(1)[0][0]
+    page_count = len(pages_font_lines)
+    candidates = []
+    for page_num, (page_sizes, page_lines) in enumerate(pages_font_lines):
+        for text, size in page_lines:
+            if size < body_size * HEADING_SIZE_RATIO or len(text) < 2 or text.isdigit():
+                continue
+            if page_count > 2 and text_pages[text] > page_count * RUNNING_TEXT_RATIO:
+                continue
+            candidates.append((text, size, page_num + 1))
+
+    heading_sizes = sorted({size for text, size, page in candidates}, reverse=True)
+    levels = {size: level for level, size in enumerate(heading_sizes[:MAX_HEADER_LEVEL], start=1)}
+    titles = [TitleInfo(f"{'#' * levels[size]} {text}", [page]) for text, size, page in candidates if size in levels]
+    confident = (len(titles) >= MIN_HEADINGS and len(heading_sizes) <= MAX_HEADER_LEVEL and
+                 len(titles) <= max(line_count, 1) * MAX_HEADING_SHARE)
+    return HeadingInference(titles, confident, 'font_size')
+
+
+def infer_headings(file_path, pdf_font_lines=None):
+    """
+    Infer the heading hierarchy of a document without the title model
+    :param file_path: Original document file path
+    :param pdf_font_lines: Font statistics collected by extract_pdf, for PDF files
+    :return: HeadingInference, None when the format carries no usable structure
+    """
+    file_ext = os.path.splitext(file_path)[1].lower()
+    try:
+        if file_ext == '.docx':
+            inference = infer_docx_headings(file_path)
+        elif file_ext == '.pdf' and pdf_font_lines is not None:
+            inference = infer_pdf_headings(pdf_font_lines)
+        else:
+            return None
+    except Exception as e:
+        logging.warning(f"Heading inference failed, the title model is used. file: {file_path} e: {e}")
+        return None
+    logging.info(f"Headings inferred. file: {file_path} source: {inference.source} titles: {len(inference.titles)} "
+                 f"confident: {inference.confident}")
+    return inference
@@ -0,0 +1,80 @@
+import asyncio
+import contextvars
+from types import SimpleNamespace
+
+from django.test import SimpleTestCase
+
+from processor import client_pool
+from processor.client_pool import client_pool_stats, evict_clients, get_async_client, run_async
+
+_request_id = contextvars.ContextVar('test_request_id', default=None)
+
+
+def _client_info(name):
+    return SimpleNamespace(base_url=f'http://127.0.0.1:9/{name}/v1', api_key='key', timeout=5, max_retries=0)
+
+
+async def _get(info):
+    return get_async_client(info)
+
+
+class RunAsyncTests(SimpleTestCase):
+
+    def test_result_exception_and_context_are_passed(self):
+        async def read():
+            await asyncio.sleep(0)
+            return _request_id.get()
+
+        async def fail():
+            raise ValueError('failed')
+
+        token = _request_id.set('request-1')
+        self.addCleanup(_request_id.reset, token)
+        self.assertEqual(run_async(read()), 'request-1')
+        with self.assertRaisesRegex(ValueError, 'failed'):
+            run_async(fail())
+
+    def test_called_from_a_running_loop(self):
+        async def nested():
+            with self.assertRaises(RuntimeError):
+                run_async(asyncio.sleep(0))
+
+        asyncio.run(nested())
+
+
+class AsyncClientPoolTests(SimpleTestCase):
+
+    def test_sync_callers_reuse_the_client(self):
+        info = _client_info('reuse')
+        reused = client_pool_stats()['clients_reused']
+        client = run_async(_get(info))
+        self.assertIs(run_async(_get(info)), client)
+        self.assertFalse(client.is_closed())
+        self.assertEqual(client_pool_stats()['clients_reused'], reused + 1)
+
+    def test_client_is_closed_with_its_loop(self):
+        info = _client_info('closed-loop')
+        client = asyncio.run(_get(info))
+        self.assertTrue(client.is_closed())
+        self.assertFalse(any(key[0][0] == info.base_url for key in client_pool._async_clients))
+        # A new loop gets a new client
+        other = asyncio.run(_get(info))
+        self.assertIsNot(other, client)
+
+    def test_loop_closed_without_shutdown_is_pruned(self):
+        info = _client_info('pruned')
+        loop = asyncio.new_event_loop()
+        client = loop.run_until_complete(_get(info))
+        loop.close()
+        with self.assertLogs('client_pool', 'WARNING'):
+            client_pool_stats()
+        self.assertFalse(any(key[0][0] == info.base_url for key in client_pool._async_clients))
+        self.assertFalse(client.is_closed())
+
+    def test_evicted_client_is_closed(self):
+        info = _client_info('evicted')
+        client = run_async(_get(info))
+        evict_clients(info)
+        run_async(asyncio.sleep(0.01))
+        self.assertTrue(client.is_closed())
+        self.assertIsNot(run_async(_get(info)), client)
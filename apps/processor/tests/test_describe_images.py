@@ -0,0 +1,71 @@
+import asyncio
+from types import SimpleNamespace
+from unittest import mock
+
+import fitz
+from asgiref.sync import async_to_sync
+from django.test import TestCase
+
+from processor import processor
+from processor.image_dedup import ImageDedupRegistry, content_hash, perceptual_hash
+from task_flow.models import ImageInfo
+
+
+def _image(value):
+    pix = fitz.Pixmap(fitz.csGRAY, 40, 40, bytes((value + x) % 256 for x in range(40 * 40)), False)
+    return pix.tobytes('png')
+
+
+class DescribeImagesConcurrencyTests(TestCase):
+
+    def setUp(self):
+        self.chunk_setting = SimpleNamespace(enabled_image_dedup=False, image_dedup_distance=-1,
+                                             enabled_image_archive=False, enabled_image_preprocess=False,
+                                             enabled_response_cache=False, enabled_response_cache_refresh=False)
+        self.running = 0
+        self.peak = 0
+        patches = [
+            mock.patch.object(processor, 'get_chunk_settings', mock.AsyncMock(return_value=self.chunk_setting)),
+            mock.patch.object(processor, 'resolve_model', mock.AsyncMock(return_value=SimpleNamespace(max_concurrency=2))),
+            mock.patch.object(processor, 'get_default_model', mock.AsyncMock(return_value=SimpleNamespace(model_name='vl'))),
+            mock.patch.object(processor, 'generate_image_description', self.generate),
+            mock.patch.object(processor, 'IMAGE_DEDUP_REGISTRY', ImageDedupRegistry()),
+        ]
+        for patch in patches:
+            patch.start()
+            self.addCleanup(patch.stop)
+
+    async def generate(self, image_path, prompt, model, image_data, image_type):
+        self.running += 1
+        self.peak = max(self.peak, self.running)
+        try:
+            # Later images answer first, the results still follow the document order
+            await asyncio.sleep(0.05 / int(image_path[0]))
+            if image_path.startswith('3'):
+                raise RuntimeError('model unavailable')
+            return f'description {image_path}'
+        finally:
+            self.running -= 1
+
+    def describe(self, count):
+        records = []
+        for i in range(count):
+            image = _image(i * 50)
+            records.append({'image_path': f'{i + 1}.png', 'context_data': '', 'image_data': image,
+                            'content_hash': content_hash(image), 'perceptual_hash': perceptual_hash(image)})
+        return async_to_sync(processor.describe_images)('document.docx', records, 'prompt', None)
+
+    def test_descriptions_follow_the_document_order(self):
+        self.assertEqual(self.describe(2), ['description 1.png', 'description 2.png'])
+
+    def test_concurrency_is_bounded_by_the_model(self):
+        self.describe(4)
+        self.assertEqual(self.peak, 2)
+
+    def test_failed_image_is_saved_as_unsuccessful(self):
+        with self.assertLogs('processor', level='ERROR'):
+            descriptions = self.describe(4)
+        self.assertEqual(descriptions, ['description 1.png', 'description 2.png', '', 'description 4.png'])
+        saved = ImageInfo.objects.filter(document_name='document.docx')
+        self.assertEqual(saved.count(), 4)
+        self.assertEqual(list(saved.filter(successfully=False).values_list('image_description', flat=True)), [''])
@@ -0,0 +1,93 @@
+import asyncio
+from types import SimpleNamespace
+
+from django.conf import settings
+from django.test import SimpleTestCase, override_settings
+
+from processor.hedging import RequestHedger
+
+
+@override_settings(LLM_HEDGE={'ENABLED': True, 'STAGES': ('tag',), 'PERCENTILE': 95, 'WINDOW': 50, 'MIN_SAMPLES': 5,
+                              'MAX_EXTRA_RATIO': 1.0})
+class RequestHedgerTests(SimpleTestCase):
+
+    def setUp(self):
+        self.hedger = RequestHedger()
+        self.primary = SimpleNamespace(model_name='primary')
+        self.backup = SimpleNamespace(model_name='backup')
+        self.started = []
+        self.cancelled = []
+
+    def learn(self, latency=0.02, count=5):
+        for _ in range(count):
+            self.hedger._observe('primary', latency)
+
+    def call(self, latencies, alternate=None):
+        """
+        Run one hedged request, the first call takes latencies[0] seconds and the duplicate latencies[1]
+        """
+        latencies = list(latencies)
+
+        async def run(info):
+            self.started.append(info.model_name)
+            try:
+                await asyncio.sleep(latencies.pop(0))
+            except asyncio.CancelledError:
+                self.cancelled.append(info.model_name)
+                raise
+            return info.model_name
+
+        return asyncio.run(self.hedger.run(self.primary, run, alternate))
+
+    def stats(self):
+        return self.hedger.stats()[0]
+
+    def test_enabled_only_for_the_configured_stages(self):
+        self.assertTrue(self.hedger.enabled('tag'))
+        self.assertFalse(self.hedger.enabled('title'))
+
+    def test_no_hedge_before_enough_latencies_are_known(self):
+        self.learn(count=4)
+        self.assertEqual(self.call([0.1]), 'primary')
+        self.assertEqual(self.started, ['primary'])
+
+    def test_no_hedge_when_the_primary_answers_within_the_delay(self):
+        self.learn(latency=0.1)
+        self.assertEqual(self.call([0.01]), 'primary')
+        self.assertEqual(self.stats()['hedges'], 0)
+
+    def test_slow_request_is_hedged_after_the_percentile_delay(self):
+        self.learn()
+
+        async def alternate():
+            return self.backup
+
+        with self.assertLogs('hedging', level='INFO') as logs:
+            self.assertEqual(self.call([1.0, 0.01], alternate), 'backup')
+        self.assertIn('hedged after 0.02s', logs.output[0])
+        self.assertEqual(self.started, ['primary', 'backup'])
+        self.assertEqual(self.cancelled, ['primary'])
+        stats = self.stats()
+        self.assertEqual((stats['requests'], stats['hedges'], stats['hedge_wins']), (1, 1, 1))
+
+    def test_hedges_are_capped_to_a_share_of_the_requests(self):
+        # Enough fast latencies that the slow primaries do not move the percentile
+        self.learn(count=40)
+        with self.settings(LLM_HEDGE={**settings.LLM_HEDGE, 'MAX_EXTRA_RATIO': 0.5}), \
+                self.assertLogs('hedging', level='INFO') as logs:
+            for _ in range(4):
+                self.call([0.1, 0.01])
+        self.assertEqual(len(logs.output), 2)
+        stats = self.stats()
+        self.assertEqual((stats['requests'], stats['hedges'], stats['hedge_rate']), (4, 2, 0.5))
+
+    def test_cancelled_primary_is_observed_with_the_time_it_ran(self):
+        self.learn()
+        with self.assertLogs('hedging', level='INFO'):
+            self.call([0.5, 0.05])
+        samples = sorted(self.hedger._models['primary'].samples)
+        # The winning duplicate and the cancelled primary, which ran at least as long as the duplicate
+        self.assertEqual(len(samples), 7)
+        self.assertGreaterEqual(samples[-1], 0.07)
+        self.assertLess(samples[-1], 0.5)
+        self.assertGreaterEqual(self.stats()['p95_latency_ms'], 70)
@@ -0,0 +1,79 @@
+import io
+import os
+import tempfile
+from types import SimpleNamespace
+from unittest import mock
+
+import docx
+import fitz
+from asgiref.sync import async_to_sync
+from django.test import TestCase
+
+from processor import processor
+from processor.image_dedup import ImageDedupRegistry, content_hash
+from task_flow.models import ImageInfo
+
+
+def _png(value):
+    pix = fitz.Pixmap(fitz.csGRAY, 40, 40, bytes((value + x * 3) % 256 for x in range(40 * 40)), False)
+    return pix.tobytes('png')
+
+
+class InMemoryImagesTests(TestCase):
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.output_dir = os.path.join(directory.name, 'extracted_images')
+        self.image = _png(0)
+        document = docx.Document()
+        document.add_paragraph('Before the picture')
+        document.add_picture(io.BytesIO(self.image))
+        self.file_path = os.path.join(directory.name, 'document.docx')
+        document.save(self.file_path)
+
+        self.chunk_setting = SimpleNamespace(enabled_image_dedup=False, image_dedup_distance=-1,
+                                             enabled_image_archive=False, enabled_image_preprocess=False,
+                                             enabled_response_cache=False, enabled_response_cache_refresh=False)
+        patches = [
+            mock.patch.object(processor, 'get_chunk_settings', mock.AsyncMock(return_value=self.chunk_setting)),
+            mock.patch.object(processor, 'resolve_model', mock.AsyncMock(return_value=SimpleNamespace(max_concurrency=2))),
+            mock.patch.object(processor, 'get_default_model', mock.AsyncMock(return_value=SimpleNamespace(model_name='vl'))),
+            mock.patch.object(processor, 'generate_image_description', mock.AsyncMock(return_value='description')),
+            mock.patch.object(processor, 'IMAGE_DEDUP_REGISTRY', ImageDedupRegistry()),
+        ]
+        for patch in patches:
+            patch.start()
+            self.addCleanup(patch.stop)
+
+    def describe(self):
+        records = processor.extract_images(self.file_path, self.output_dir)[1]
+        async_to_sync(processor.describe_images)('document.docx', records, 'prompt', None)
+        return records
+
+    def test_extraction_keeps_the_images_in_memory(self):
+        images, records = processor.extract_images(self.file_path, self.output_dir)
+        self.assertEqual(len(records), 1)
+        self.assertEqual(records[0]['image_data'], self.image)
+        self.assertEqual(images, [os.path.join(self.output_dir, f'{content_hash(self.image)}.png')])
+        self.assertFalse(os.path.exists(self.output_dir))
+
+    def test_nothing_is_written_when_the_archive_is_off(self):
+        records = self.describe()
+        self.assertNotIn('image_data', records[0])
+        self.assertFalse(os.path.exists(self.output_dir))
+        self.assertEqual(ImageInfo.objects.get(document_name='document.docx').image_path, '')
+
+    def test_archive_writes_the_image_once(self):
+        self.chunk_setting.enabled_image_archive = True
+        records = self.describe()
+        image_path = records[0]['image_path']
+        with open(image_path, 'rb') as f:
+            self.assertEqual(f.read(), self.image)
+        self.assertEqual(ImageInfo.objects.get(document_name='document.docx').image_path, image_path)
+
+        # A later document holding the same image finds it archived
+        with mock.patch.object(processor.aiofiles, 'open') as aiofiles_open:
+            self.describe()
+        aiofiles_open.assert_not_called()
+        self.assertEqual(os.listdir(self.output_dir), [os.path.basename(image_path)])
@@ -0,0 +1,149 @@
+from types import SimpleNamespace
+from unittest import mock
+
+import fitz
+from asgiref.sync import async_to_sync
+from django.test import SimpleTestCase, TestCase
+
+from processor import processor
+from processor.image_dedup import DedupStats, ImageDedupRegistry, content_hash, description_key, hash_distance, perceptual_hash
+from task_flow.models import ImageInfo
+
+
+def _gradient(width, height, inverted=False, output='png'):
+    samples = bytearray()
+    for y in range(height):
+        for x in range(width):
+            value = (x * 255 // (width - 1) + y * 64 // (height - 1)) % 256
+            samples.append(255 - value if inverted else value)
+    pix = fitz.Pixmap(fitz.csGRAY, width, height, bytes(samples), False)
+    return pix.tobytes(output)
+
+
+class PerceptualHashTests(SimpleTestCase):
+
+    def test_scaled_and_re_encoded_image_is_close(self):
+        original = perceptual_hash(_gradient(90, 80))
+        self.assertEqual(len(original), 16)
+        self.assertLessEqual(hash_distance(original, perceptual_hash(_gradient(180, 160))), 4)
+        self.assertLessEqual(hash_distance(original, perceptual_hash(_gradient(90, 80, output='jpg'))), 4)
+
+    def test_different_image_is_far(self):
+        self.assertGreater(hash_distance(perceptual_hash(_gradient(90, 80)),
+                                         perceptual_hash(_gradient(90, 80, inverted=True))), 32)
+
+    def test_undecodable_image(self):
+        self.assertIsNone(perceptual_hash(b'not an image'))
+
+    def test_hash_distance(self):
+        self.assertEqual(hash_distance('0000000000000000', '0000000000000000'), 0)
+        self.assertEqual(hash_distance('0000000000000000', '000000000000000f'), 4)
+        self.assertEqual(hash_distance('ffffffffffffffff', '0000000000000000'), 64)
+
+    def test_description_key(self):
+        self.assertEqual(description_key('prompt', 'vl'), description_key('prompt', 'vl'))
+        self.assertNotEqual(description_key('prompt', 'vl'), description_key('other prompt', 'vl'))
+        self.assertNotEqual(description_key('prompt', 'vl'), description_key('prompt', 'vl-max'))
+
+
+class ImageDedupRegistryTests(SimpleTestCase):
+
+    def setUp(self):
+        self.registry = ImageDedupRegistry(max_entries=2)
+        self.key = description_key('prompt', 'vl')
+        self.registry.add(self.key, 'digest', '0000000000000000', 'description')
+
+    def test_exact_match(self):
+        self.assertEqual(self.registry.find(self.key, 'digest', None, -1), ('description', True))
+
+    def test_near_match(self):
+        self.assertEqual(self.registry.find(self.key, 'other', '0000000000000003', 4), ('description', False))
+        self.assertIsNone(self.registry.find(self.key, 'other', '00000000000000ff', 4))
+        self.assertIsNone(self.registry.find(self.key, 'other', '0000000000000003', -1))
+
+    def test_other_prompt_or_model_does_not_match(self):
+        key = description_key('new prompt', 'vl')
+        self.assertIsNone(self.registry.find(key, 'digest', '0000000000000000', 4))
+
+    def test_least_recently_used_entries_are_evicted(self):
+        self.registry.add(self.key, 'second', None, 'second description')
+        self.registry.find(self.key, 'digest', None, -1)
+        self.registry.add(self.key, 'third', None, 'third description')
+        self.assertIsNone(self.registry.find(self.key, 'second', None, -1))
+        self.assertIsNotNone(self.registry.find(self.key, 'digest', None, -1))
+
+    def test_dedup_stats(self):
+        stats = DedupStats()
+        stats.count(images=3, exact_duplicates=1, model_calls=2)
+        stats.count(images=1, near_duplicates=1)
+        self.assertEqual(stats.to_dict(), {'images': 4, 'exact_duplicates': 1, 'near_duplicates': 1,
+                                           'model_calls': 2, 'model_calls_saved': 2})
+
+
+class DescribeImagesTests(TestCase):
+
+    def setUp(self):
+        self.image = _gradient(90, 80)
+        self.chunk_setting = SimpleNamespace(enabled_image_dedup=True, image_dedup_distance=4,
+                                             enabled_image_archive=False, enabled_image_preprocess=False,
+                                             enabled_response_cache=True, enabled_response_cache_refresh=False)
+        self.generate = mock.AsyncMock(return_value='new description')
+        patches = [
+            mock.patch.object(processor, 'get_chunk_settings', mock.AsyncMock(return_value=self.chunk_setting)),
+            mock.patch.object(processor, 'resolve_model', mock.AsyncMock(return_value=SimpleNamespace(max_concurrency=2))),
+            mock.patch.object(processor, 'get_default_model', mock.AsyncMock(return_value=SimpleNamespace(model_name='vl'))),
+            mock.patch.object(processor, 'generate_image_description', self.generate),
+            mock.patch.object(processor, 'IMAGE_DEDUP_REGISTRY', ImageDedupRegistry()),
+        ]
+        for patch in patches:
+            patch.start()
+            self.addCleanup(patch.stop)
+        ImageInfo.objects.create(document_name='earlier.docx', image_path='', context_text='', successfully=True,
+                                 image_description='earlier description', content_hash=content_hash(self.image),
+                                 perceptual_hash=perceptual_hash(self.image),
+                                 description_key=description_key('prompt', 'vl'))
+
+    def describe(self, prompt='prompt', model=None, image=None, stats=None):
+        image = image or self.image
+        record = {'image_path': 'image.png', 'context_data': '', 'image_data': image,
+                  'content_hash': content_hash(image), 'perceptual_hash': perceptual_hash(image)}
+        return async_to_sync(processor.describe_images)('document.docx', [record], prompt, model, stats)
+
+    def test_description_of_the_same_prompt_and_model_is_reused(self):
+        self.assertEqual(self.describe(), ['earlier description'])
+        self.generate.assert_not_awaited()
+
+    def test_changed_prompt_describes_again(self):
+        self.assertEqual(self.describe(prompt='new prompt'), ['new description'])
+        self.generate.assert_awaited_once()
+        saved = ImageInfo.objects.get(document_name='document.docx')
+        self.assertEqual(saved.description_key, description_key('new prompt', 'vl'))
+
+    def test_changed_model_describes_again(self):
+        self.assertEqual(self.describe(model='vl-max'), ['new description'])
+
+    def test_refresh_and_bypass_skip_the_earlier_descriptions(self):
+        self.chunk_setting.enabled_response_cache_refresh = True
+        self.assertEqual(self.describe(), ['new description'])
+        self.chunk_setting.enabled_response_cache_refresh = False
+        self.chunk_setting.enabled_response_cache = False
+        self.assertEqual(self.describe(), ['new description'])
+        self.assertEqual(self.generate.await_count, 2)
+
+    def test_descriptions_of_this_process_are_reused(self):
+        self.describe(prompt='new prompt')
+        self.assertEqual(self.describe(prompt='new prompt'), ['new description'])
+        self.generate.assert_awaited_once()
+
+    def test_near_image_of_an_earlier_document_is_reused(self):
+        near = _gradient(180, 160)
+        self.assertNotEqual(content_hash(near), content_hash(self.image))
+        stats = DedupStats()
+        self.assertEqual(self.describe(image=near, stats=stats), ['earlier description'])
+        self.generate.assert_not_awaited()
+        self.assertEqual((stats.images, stats.near_duplicates, stats.model_calls), (1, 1, 0))
+
+    def test_near_image_is_described_when_only_exact_matches_count(self):
+        self.chunk_setting.image_dedup_distance = -1
+        self.assertEqual(self.describe(image=_gradient(180, 160)), ['new description'])
+        self.assertEqual(self.describe(), ['earlier description'])
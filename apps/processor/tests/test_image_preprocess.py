@@ -0,0 +1,71 @@
+import random
+from types import SimpleNamespace
+
+import fitz
+from django.test import SimpleTestCase
+
+from processor.image_preprocess import image_subtype, preprocess_image
+
+
+def _noise(width, height, alpha=False):
+    rng = random.Random(width * height)
+    pix = fitz.Pixmap(fitz.csRGB, width, height, bytes(rng.randrange(256) for _ in range(width * height * 3)), False)
+    if alpha:
+        pix = fitz.Pixmap(pix, 1)
+    return pix
+
+
+def _solid(width, height):
+    return fitz.Pixmap(fitz.csRGB, width, height, bytes([200, 30, 30]) * (width * height), False)
+
+
+class ImageSubtypeTests(SimpleTestCase):
+
+    def test_subtype_comes_from_the_bytes(self):
+        self.assertEqual(image_subtype(_solid(8, 8).tobytes('png')), 'png')
+        self.assertEqual(image_subtype(_solid(8, 8).tobytes('jpeg')), 'jpeg')
+        self.assertEqual(image_subtype(b'RIFF\x00\x00\x00\x00WEBPVP8 '), 'webp')
+        self.assertIsNone(image_subtype(b'\x01\x00\x00\x00 emf'))
+
+
+class PreprocessImageTests(SimpleTestCase):
+
+    def setUp(self):
+        self.chunk_setting = SimpleNamespace(enabled_image_preprocess=True, image_min_edge=32, image_min_entropy=1.0,
+                                             image_max_edge=200, image_jpeg_quality=80)
+
+    def test_disabled_sends_the_image_unchanged(self):
+        self.chunk_setting.enabled_image_preprocess = False
+        image = _solid(8, 8).tobytes('png')
+        self.assertEqual(preprocess_image(image, self.chunk_setting), (image, 'png'))
+
+    def test_tiny_image_is_dropped(self):
+        self.assertIsNone(preprocess_image(_noise(20, 100).tobytes('png'), self.chunk_setting))
+
+    def test_blank_image_is_dropped(self):
+        self.assertIsNone(preprocess_image(_solid(100, 100).tobytes('png'), self.chunk_setting))
+
+    def test_large_image_is_scaled_down_to_the_maximum_edge(self):
+        output, subtype = preprocess_image(_noise(400, 100).tobytes('png'), self.chunk_setting)
+        self.assertEqual(subtype, 'jpeg')
+        pix = fitz.Pixmap(output)
+        self.assertEqual((pix.width, pix.height), (200, 50))
+
+    def test_png_is_re_encoded_when_jpeg_is_smaller(self):
+        image = _noise(150, 150).tobytes('png')
+        output, subtype = preprocess_image(image, self.chunk_setting)
+        self.assertEqual(subtype, 'jpeg')
+        self.assertLess(len(output), len(image))
+
+    def test_smaller_original_is_kept(self):
+        image = _noise(150, 150).tobytes('jpeg', jpg_quality=20)
+        self.assertEqual(preprocess_image(image, self.chunk_setting), (image, 'jpeg'))
+
+    def test_transparency_stays_png(self):
+        output, subtype = preprocess_image(_noise(400, 100, alpha=True).tobytes('png'), self.chunk_setting)
+        self.assertEqual(subtype, 'png')
+        self.assertTrue(fitz.Pixmap(output).alpha)
+
+    def test_undecodable_image_is_sent_unchanged(self):
+        image = b'\x01\x00\x00\x00 emf'
+        self.assertEqual(preprocess_image(image, self.chunk_setting), (image, 'png'))
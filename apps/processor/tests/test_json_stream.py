@@ -0,0 +1,78 @@
+from django.test import SimpleTestCase
+
+from processor.json_stream import TitleStreamParser, merge_title_parsers
+
+ANSWER = '```json\n{"content": [{"text": "第一章 总则", "lines": [1]}, {"text": "1.1 目的 {附录}", "lines": [3]}, ' \
+         '{"text": "引号\\"转义\\"]", "lines": [5]}]}\n```'
+
+
+def _feed_in_pieces(parser, text, size):
+    titles = []
+    for i in range(0, len(text), size):
+        titles.extend(parser.feed(text[i:i + size]))
+    return titles
+
+
+class TitleStreamParserTests(SimpleTestCase):
+
+    def test_whole_answer(self):
+        parser = TitleStreamParser()
+        parser.feed(ANSWER)
+        self.assertTrue(parser.done)
+        self.assertEqual([title.text for title in parser.titles], ['第一章 总则', '1.1 目的 {附录}', '引号"转义"]'])
+        self.assertEqual(parser.to_context()['content'][0], {'text': '第一章 总则', 'lines': [1]})
+
+    def test_any_split_of_the_stream_gives_the_same_titles(self):
+        for size in (1, 2, 3, 7, 50):
+            parser = TitleStreamParser()
+            titles = _feed_in_pieces(parser, ANSWER, size)
+            self.assertTrue(parser.done, size)
+            self.assertEqual([title.text for title in titles], ['第一章 总则', '1.1 目的 {附录}', '引号"转义"]'], size)
+
+    def test_title_is_emitted_once_its_object_closes(self):
+        parser = TitleStreamParser()
+        self.assertEqual(parser.feed('{"content": [{"text": "一", "li'), [])
+        completed = parser.feed('nes": [1]}, {"text"')
+        self.assertEqual([title.text for title in completed], ['一'])
+        self.assertFalse(parser.done)
+
+    def test_text_after_the_list_is_ignored(self):
+        parser = TitleStreamParser()
+        parser.feed('{"content": []} {"content": [{"text": "late"}]}')
+        self.assertTrue(parser.done)
+        self.assertEqual(parser.titles, [])
+        self.assertEqual(parser.feed('{"text": "more"}'), [])
+
+    def test_objects_without_text_or_invalid_json_are_skipped(self):
+        parser = TitleStreamParser()
+        parser.feed('{"content": [{"lines": [1]}, {"text": }, {"text": "ok"}]}')
+        self.assertEqual([title.text for title in parser.titles], ['ok'])
+
+    def test_incomplete_answer_is_not_done(self):
+        parser = TitleStreamParser()
+        parser.feed('{"content": [{"text": "一"}, {"text": "二"')
+        self.assertFalse(parser.done)
+        self.assertEqual([title.text for title in parser.titles], ['一'])
+
+
+class MergeTitleParsersTests(SimpleTestCase):
+
+    def parser(self, answer):
+        parser = TitleStreamParser()
+        parser.feed(answer)
+        return parser
+
+    def test_titles_of_overlapping_windows_are_kept_once(self):
+        first = self.parser('{"content": [{"text": "一", "lines": [1]}, {"text": "二", "lines": [9]}]}')
+        second = self.parser('{"content": [{"text": "二", "lines": [9]}, {"text": "三", "lines": [20]}]}')
+        merged = merge_title_parsers([first, second])
+        self.assertTrue(merged.done)
+        self.assertEqual([title.text for title in merged.titles], ['一', '二', '三'])
+        self.assertEqual([title.text for title in self.parser(merged.text).titles], ['一', '二', '三'])
+
+    def test_same_text_on_other_lines_is_kept(self):
+        first = self.parser('{"content": [{"text": "小结", "lines": [5]}]}')
+        second = self.parser('{"content": [{"text": "小结", "lines": [50]}')
+        merged = merge_title_parsers([first, second])
+        self.assertFalse(merged.done)
+        self.assertEqual(len(merged.titles), 2)
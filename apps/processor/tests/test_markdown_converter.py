@@ -0,0 +1,106 @@
+import os
+import tempfile
+from concurrent.futures.process import BrokenProcessPool
+from unittest import mock
+
+import docx
+from django.test import SimpleTestCase, override_settings
+
+from processor import markdown_converter
+from processor.markdown_converter import ConversionUsage, convert_markdown
+
+
+def _docx(directory):
+    file_path = os.path.join(directory, 'report.docx')
+    document = docx.Document()
+    document.add_heading('Report', 1)
+    document.add_paragraph('Body text.')
+    document.save(file_path)
+    return file_path
+
+
+class MarkdownConverterTestCase(SimpleTestCase):
+
+    def setUp(self):
+        patches = [
+            mock.patch.object(markdown_converter, '_pool', None),
+            mock.patch.object(markdown_converter, '_pool_files', {}),
+            mock.patch.object(markdown_converter, '_stats',
+                              {'files': 0, 'cpu_seconds': 0.0, 'max_rss_mb': 0.0, 'recycles': 0}),
+        ]
+        for patch in patches:
+            patch.start()
+            self.addCleanup(patch.stop)
+        self.addCleanup(self.shutdown_pool)
+
+    @staticmethod
+    def shutdown_pool():
+        if markdown_converter._pool is not None:
+            markdown_converter._pool.shutdown(wait=True)
+
+
+@override_settings(DOCUMENT_EXTRACTION={'MARKDOWN_WORKERS': 1})
+class ConvertMarkdownTests(MarkdownConverterTestCase):
+
+    def test_documents_are_converted_by_a_warm_worker_process(self):
+        with tempfile.TemporaryDirectory() as directory:
+            file_path = _docx(directory)
+            text, usage = convert_markdown(file_path)
+            second_text, second_usage = convert_markdown(file_path)
+
+        self.assertIn('# Report', text)
+        self.assertEqual(second_text, text)
+        self.assertNotEqual(usage.pid, os.getpid())
+        self.assertEqual((second_usage.pid, usage.worker_files, second_usage.worker_files), (usage.pid, 1, 2))
+        stats = markdown_converter.stats()
+        self.assertEqual((stats['files'], stats['recycles'], stats['worker_files']), (2, 0, {usage.pid: 2}))
+
+    def test_broken_pool_is_discarded(self):
+        pool = markdown_converter._get_pool()
+        future = mock.Mock()
+        future.result.side_effect = BrokenProcessPool('worker killed')
+        with mock.patch.object(pool, 'submit', return_value=future), self.assertRaises(BrokenProcessPool):
+            convert_markdown('report.docx')
+        self.assertIsNone(markdown_converter._pool)
+        self.assertIsNot(markdown_converter._get_pool(), pool)
+
+
+class RecycleTests(MarkdownConverterTestCase):
+
+    @override_settings(DOCUMENT_EXTRACTION={'MARKDOWN_WORKERS': 1, 'MARKDOWN_MAX_FILES_PER_WORKER': 2})
+    def test_workers_are_recycled_after_their_file_count(self):
+        with tempfile.TemporaryDirectory() as directory:
+            file_path = _docx(directory)
+            first = convert_markdown(file_path)[1]
+            pool = markdown_converter._pool
+            with self.assertLogs('markdown_converter', level='INFO'):
+                second = convert_markdown(file_path)[1]
+            self.assertIsNone(markdown_converter._pool)
+            third = convert_markdown(file_path)[1]
+
+        self.assertEqual((first.worker_files, second.worker_files, third.worker_files), (1, 2, 1))
+        self.assertNotEqual(third.pid, first.pid)
+        self.assertIsNot(markdown_converter._pool, pool)
+        stats = markdown_converter.stats()
+        self.assertEqual((stats['files'], stats['recycles'], stats['worker_files']), (3, 1, {third.pid: 1}))
+
+    @override_settings(DOCUMENT_EXTRACTION={'MARKDOWN_MAX_FILES_PER_WORKER': 0, 'MARKDOWN_MAX_RSS_MB': 500})
+    def test_workers_are_recycled_when_too_large(self):
+        pool = markdown_converter._get_pool()
+        markdown_converter._recycle(pool, ConversionUsage(0.1, 499, 1, 1000))
+        self.assertIs(markdown_converter._pool, pool)
+        with self.assertLogs('markdown_converter', level='INFO'):
+            markdown_converter._recycle(pool, ConversionUsage(0.1, 500, 1, 1001))
+        self.assertIsNone(markdown_converter._pool)
+
+    @override_settings(DOCUMENT_EXTRACTION={'MARKDOWN_MAX_FILES_PER_WORKER': 2})
+    def test_files_of_a_recycled_pool_do_not_recycle_its_successor(self):
+        old = markdown_converter._get_pool()
+        with self.assertLogs('markdown_converter', level='INFO'):
+            markdown_converter._recycle(old, ConversionUsage(0.1, 10, 1, 2))
+        pool = markdown_converter._get_pool()
+        # A file that was still running on the old pool
+        markdown_converter._recycle(old, ConversionUsage(0.1, 10, 2, 3))
+        self.assertIs(markdown_converter._pool, pool)
+        stats = markdown_converter.stats()
+        self.assertEqual((stats['files'], stats['recycles'], stats['worker_files']), (2, 1, {}))
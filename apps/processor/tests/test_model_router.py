@@ -0,0 +1,126 @@
+import asyncio
+from types import SimpleNamespace
+from unittest import mock
+
+import httpx
+import openai
+from django.test import SimpleTestCase, override_settings
+
+from processor import model_router
+from processor.model_router import CLOSED, HALF_OPEN, OPEN, ModelRouter
+
+
+def _model(model_name):
+    return SimpleNamespace(model_name=model_name, model_type=0)
+
+
+def _connection_error():
+    return openai.APIConnectionError(request=httpx.Request('POST', 'http://llm/v1/chat/completions'))
+
+
+@override_settings(LLM_ROUTER={'FAILURE_THRESHOLD': 3, 'OPEN_SECONDS': 30})
+class CircuitTests(SimpleTestCase):
+
+    def setUp(self):
+        self.router = ModelRouter()
+        self.primary = _model('primary')
+        self.now = 1000.0
+        patch = mock.patch.object(model_router.time, 'monotonic', lambda: self.now)
+        patch.start()
+        self.addCleanup(patch.stop)
+
+    def state(self):
+        return self.router._health['primary'].state
+
+    def fail(self, times=1):
+        for _ in range(times):
+            self.router.observe(self.primary, 1.0, _connection_error())
+
+    def test_circuit_opens_after_consecutive_failures(self):
+        self.fail(2)
+        self.router.observe(self.primary, 0.5)
+        self.fail(2)
+        self.assertEqual(self.state(), CLOSED)
+        with self.assertLogs('model_router', level='WARNING'):
+            self.fail()
+        self.assertEqual(self.state(), OPEN)
+        self.assertIsNone(self.router._choose([self.primary]))
+
+    def test_rejected_requests_do_not_count(self):
+        response = httpx.Response(400, request=httpx.Request('POST', 'http://llm'))
+        for _ in range(5):
+            self.router.observe(self.primary, 0.1, openai.BadRequestError('bad', response=response, body=None))
+            self.router.observe(self.primary, 0.1, ValueError('parse'))
+        self.assertEqual(self.state(), CLOSED)
+        self.assertEqual(self.router._health['primary'].errors, 0)
+
+    def test_open_half_open_closed(self):
+        with self.assertLogs('model_router', level='WARNING'):
+            self.fail(3)
+        self.now += 29
+        self.assertIsNone(self.router._choose([self.primary]))
+        self.now += 1
+        # A single probe is let through
+        self.assertIs(self.router._choose([self.primary]), self.primary)
+        self.assertEqual(self.state(), HALF_OPEN)
+        self.assertIsNone(self.router._choose([self.primary]))
+        with self.assertLogs('model_router', level='INFO'):
+            self.router.observe(self.primary, 0.2)
+        self.assertEqual(self.state(), CLOSED)
+        self.assertIs(self.router._choose([self.primary]), self.primary)
+
+    def test_failed_probe_opens_the_circuit_again(self):
+        with self.assertLogs('model_router', level='WARNING'):
+            self.fail(3)
+        self.now += 30
+        self.router._choose([self.primary])
+        self.now += 1
+        with self.assertLogs('model_router', level='WARNING'):
+            self.fail()
+        self.assertEqual(self.state(), OPEN)
+        self.assertEqual(self.router._health['primary'].opened_at, self.now)
+
+    def test_probe_that_never_reports_is_repeated(self):
+        with self.assertLogs('model_router', level='WARNING'):
+            self.fail(3)
+        self.now += 30
+        self.router._choose([self.primary])
+        self.now += 30
+        self.assertIs(self.router._choose([self.primary]), self.primary)
+
+    def test_open_model_is_skipped(self):
+        secondary = _model('secondary')
+        with self.assertLogs('model_router', level='WARNING'):
+            self.fail(3)
+        for _ in range(20):
+            self.assertIs(self.router._choose([self.primary, secondary]), secondary)
+
+    def test_every_circuit_open_falls_back_to_the_default_model(self):
+        secondary = _model('secondary')
+        with self.assertLogs('model_router', level='WARNING'):
+            self.fail(3)
+            for _ in range(3):
+                self.router.observe(secondary, 1.0, _connection_error())
+        models = mock.AsyncMock(return_value=[self.primary, secondary])
+        patches = [
+            mock.patch.object(model_router, 'list_enabled_models', models),
+            mock.patch.object(model_router, 'get_default_model', mock.AsyncMock(return_value=self.primary)),
+        ]
+        for patch in patches:
+            patch.start()
+            self.addCleanup(patch.stop)
+        with self.assertLogs('model_router', level='WARNING'):
+            self.assertIs(asyncio.run(self.router.resolve(0)), self.primary)
+
+
+class WeightingTests(SimpleTestCase):
+
+    def test_faster_model_receives_more_requests(self):
+        router = ModelRouter()
+        fast, slow = _model('fast'), _model('slow')
+        router.observe(fast, 0.1)
+        router.observe(slow, 0.9)
+        choose_first = mock.Mock(side_effect=lambda models, weights: [models[0]])
+        with mock.patch.object(model_router.random, 'choices', choose_first) as choices:
+            router._choose([fast, slow])
+        self.assertEqual(choices.call_args.kwargs['weights'], [10.0, 1 / 0.9])
@@ -0,0 +1,96 @@
+import io
+import os
+import tempfile
+import zipfile
+
+import docx
+import fitz
+import openpyxl
+import pptx
+from django.test import SimpleTestCase
+from openpyxl.drawing.image import Image as SheetImage
+from pptx.util import Inches
+
+from processor.ooxml_media import extract_ooxml_images
+from processor.processor import extract_images
+
+
+def _png(value):
+    pix = fitz.Pixmap(fitz.csGRAY, 40, 40, bytes((value + x * 3) % 256 for x in range(40 * 40)), False)
+    return pix.tobytes('png')
+
+
+class OoxmlMediaTests(SimpleTestCase):
+    """
+    The zip level extraction has to produce the records of the object model extraction
+    """
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.directory = directory.name
+
+    def path(self, name):
+        return os.path.join(self.directory, name)
+
+    def assertSameRecords(self, file_path, ignored=()):
+        zip_level = extract_images(file_path, self.directory)[1]
+        object_model = extract_images(file_path, self.directory, object_model=True)[1]
+        self.assertEqual(len(zip_level), len(object_model))
+        for record, expected in zip(zip_level, object_model):
+            self.assertEqual(record['image_data'], expected['image_data'])
+            self.assertEqual(record['context_type'], expected['context_type'])
+            self.assertEqual({key: value for key, value in record['context_data'].items() if key not in ignored},
+                             {key: value for key, value in expected['context_data'].items() if key not in ignored})
+        return zip_level
+
+    def test_docx(self):
+        document = docx.Document()
+        document.add_heading('Title', 1)
+        paragraph = document.add_paragraph('With picture ')
+        paragraph.add_run().add_picture(io.BytesIO(_png(0)))
+        document.add_paragraph('Between')
+        document.add_picture(io.BytesIO(_png(50)))
+        document.save(self.path('a.docx'))
+
+        records = self.assertSameRecords(self.path('a.docx'))
+        self.assertEqual([record['context_data']['position'] for record in records], ['段落位置: 2', '段落位置: 4'])
+        self.assertEqual(records[0]['context_data']['text'].strip(), 'With picture')
+
+    def test_pptx(self):
+        presentation = pptx.Presentation()
+        slide = presentation.slides.add_slide(presentation.slide_layouts[5])
+        slide.shapes.title.text = 'Slide one'
+        slide.shapes.add_picture(io.BytesIO(_png(0)), Inches(1), Inches(1))
+        slide.notes_slide.notes_text_frame.text = 'Speaker notes'
+        slide = presentation.slides.add_slide(presentation.slide_layouts[6])
+        slide.shapes.add_picture(io.BytesIO(_png(90)), Inches(1), Inches(1))
+        presentation.save(self.path('a.pptx'))
+
+        records = self.assertSameRecords(self.path('a.pptx'))
+        self.assertEqual([record['context_data']['slide_number'] for record in records], [1, 2])
+        self.assertEqual(records[0]['context_data']['notes'], 'Speaker notes')
+
+    def test_xlsx(self):
+        workbook = openpyxl.Workbook()
+        sheet = workbook.active
+        sheet.title = 'Data'
+        sheet.append(['name', 'value'])
+        sheet.add_image(SheetImage(io.BytesIO(_png(0))), 'C3')
+        workbook.create_sheet('Two').add_image(SheetImage(io.BytesIO(_png(70))), 'B2')
+        workbook.save(self.path('a.xlsx'))
+
+        # The object model states the anchor as the repr of the openpyxl marker
+        records = self.assertSameRecords(self.path('a.xlsx'), ignored=('position',))
+        self.assertEqual([record['context_data']['sheet_name'] for record in records], ['Data', 'Two'])
+        self.assertEqual(records[0]['context_data']['preview'], 'Row1: name | value')
+        self.assertEqual(records[0]['context_data']['position'], '单元格范围: col=2, row=2')
+
+    def test_unreadable_package_falls_back_to_the_object_model(self):
+        with open(self.path('legacy.docx'), 'wb') as f:
+            f.write(b'\xd0\xcf\x11\xe0 compound file')
+        self.assertIsNone(extract_ooxml_images(self.path('legacy.docx')))
+        with zipfile.ZipFile(self.path('broken.pptx'), 'w') as zf:
+            zf.writestr('[Content_Types].xml', '<Types/>')
+        with self.assertLogs('ooxml_media', level='WARNING'):
+            self.assertIsNone(extract_ooxml_images(self.path('broken.pptx')))
@@ -0,0 +1,58 @@
+import os
+import tempfile
+
+import fitz
+from django.test import SimpleTestCase, override_settings
+
+from processor import pdf_extractor
+from processor.pdf_extractor import extract_pdf
+
+
+def _png(value):
+    pix = fitz.Pixmap(fitz.csGRAY, 40, 40, bytes((value + x * 3) % 256 for x in range(40 * 40)), False)
+    return pix.tobytes('png')
+
+
+class ExtractPdfTests(SimpleTestCase):
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.file_path = os.path.join(directory.name, 'document.pdf')
+        self.images = {1: _png(0), 4: _png(60), 6: _png(120)}
+        with fitz.open() as doc:
+            for page_num in range(7):
+                page = doc.new_page()
+                page.insert_text((72, 72), f'Heading {page_num + 1}', fontsize=20)
+                page.insert_text((72, 120), f'Body of page {page_num + 1}', fontsize=10)
+                if page_num in self.images:
+                    page.insert_image(fitz.Rect(72, 200, 172, 300), stream=self.images[page_num])
+            doc.save(self.file_path)
+
+    def assertPageOrder(self, text, media, font_lines):
+        self.assertEqual(text.split('\n\n'), [f'Heading {n}\nBody of page {n}' for n in range(1, 8)])
+        self.assertEqual([context['page_number'] for image, context_type, context in media], [2, 5, 7])
+        self.assertEqual([context['content'].split('\n')[0] for image, context_type, context in media],
+                         ['Heading 2', 'Heading 5', 'Heading 7'])
+        self.assertEqual([lines[0][0] for size_chars, lines in font_lines],
+                         [f'Heading {n}' for n in range(1, 8)])
+
+    def test_small_pdf_is_parsed_in_process(self):
+        with override_settings(DOCUMENT_EXTRACTION={'PDF_MIN_PAGES_PARALLEL': 64}):
+            self.assertPageOrder(*extract_pdf(self.file_path))
+
+    def test_shards_are_merged_in_page_order(self):
+        self.addCleanup(self.shutdown_pool)
+        with override_settings(DOCUMENT_EXTRACTION={'PDF_MIN_PAGES_PARALLEL': 4, 'PDF_PAGES_PER_SHARD': 2,
+                                                    'PDF_WORKERS': 2}):
+            result = extract_pdf(self.file_path)
+        self.assertIsNotNone(pdf_extractor._pool)
+        self.assertPageOrder(*result)
+        with override_settings(DOCUMENT_EXTRACTION={'PDF_MIN_PAGES_PARALLEL': 64}):
+            self.assertEqual(result, extract_pdf(self.file_path))
+
+    @staticmethod
+    def shutdown_pool():
+        if pdf_extractor._pool is not None:
+            pdf_extractor._pool.shutdown()
+            pdf_extractor._pool = None
@@ -0,0 +1,80 @@
+import asyncio
+from types import SimpleNamespace
+from unittest import mock
+
+from django.test import SimpleTestCase
+
+from processor import processor
+from processor.models.image_model import MultiplePictureModel
+
+
+class IterPictureReasoningTests(SimpleTestCase):
+
+    def setUp(self):
+        self.running = 0
+        self.peak = 0
+        self.cancelled = []
+        model = SimpleNamespace(timeout=1, max_retries=0, max_concurrency=4)
+        patches = [
+            mock.patch.object(processor, 'resolve_model', mock.AsyncMock(return_value=model)),
+            mock.patch.object(processor, 'picture_reasoning', self.reason),
+        ]
+        for patch in patches:
+            patch.start()
+            self.addCleanup(patch.stop)
+
+    async def reason(self, item, prompt=None, model_name=None):
+        # The image id is the seconds the model takes, negative ids fail
+        self.running += 1
+        self.peak = max(self.peak, self.running)
+        try:
+            await asyncio.sleep(abs(item.image_id))
+        except asyncio.CancelledError:
+            self.cancelled.append(item.image_id)
+            raise
+        finally:
+            self.running -= 1
+        if item.image_id < 0:
+            raise RuntimeError('model unavailable')
+        return f'picture {item.image_id}'
+
+    @staticmethod
+    def pictures(*image_ids):
+        return [MultiplePictureModel(image_id=image_id, url=f'http://host/{image_id}.png') for image_id in image_ids]
+
+    def test_results_come_in_completion_order(self):
+        results = asyncio.run(processor.multiple_picture_reasoning(self.pictures(0.06, 0.02, 0.04), 'prompt'))
+        self.assertEqual([result.image_id for result in results], [0.02, 0.04, 0.06])
+        self.assertEqual(results[0].interpretation, 'picture 0.02')
+
+    def test_concurrency_is_bounded(self):
+        asyncio.run(processor.multiple_picture_reasoning(self.pictures(*[0.01] * 6), 'prompt', max_concurrency=2))
+        self.assertEqual(self.peak, 2)
+        asyncio.run(processor.multiple_picture_reasoning(self.pictures(*[0.01] * 6), 'prompt'))
+        self.assertEqual(self.peak, 4)
+
+    def test_slow_and_failed_pictures_are_not_successful(self):
+        with self.assertLogs('processor', level='ERROR') as logs:
+            results = asyncio.run(processor.multiple_picture_reasoning(self.pictures(0.01, -0.01, 0.5), 'prompt',
+                                                                       timeout=0.1))
+        by_id = {result.image_id: result.successfully for result in results}
+        self.assertEqual(by_id, {0.01: True, -0.01: False, 0.5: False})
+        self.assertTrue(any('timed out' in line for line in logs.output))
+
+    def test_timeout_includes_the_wait_for_a_slot(self):
+        with self.assertLogs('processor', level='ERROR'):
+            results = asyncio.run(processor.multiple_picture_reasoning(self.pictures(0.08, 0.08), 'prompt',
+                                                                       timeout=0.12, max_concurrency=1))
+        self.assertEqual([result.successfully for result in results], [True, False])
+
+    def test_consumer_stopping_early_cancels_the_rest(self):
+        async def first():
+            async for result in processor.iter_picture_reasoning(self.pictures(0.01, 0.5), 'prompt'):
+                return result
+
+        self.assertEqual(asyncio.run(first()).image_id, 0.01)
+        self.assertEqual(self.cancelled, [0.5])
+
+    def test_empty_request_is_rejected(self):
+        with self.assertRaises(ValueError):
+            asyncio.run(processor.multiple_picture_reasoning([], 'prompt'))
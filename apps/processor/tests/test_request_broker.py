@@ -0,0 +1,138 @@
+import asyncio
+import time
+from types import SimpleNamespace
+
+import httpx
+import openai
+from django.test import SimpleTestCase, override_settings
+
+from processor.model_router import MODEL_ROUTER
+from processor.request_broker import PRIORITY_BULK, PRIORITY_INTERACTIVE, RequestBroker, estimate_tokens
+
+BROKER_SETTING = {
+    'ENABLED': True,
+    'REQUESTS_PER_MINUTE': 600,
+    'TOKENS_PER_MINUTE': 6000,
+    'INITIAL_CONCURRENCY': 2,
+    'MIN_CONCURRENCY': 1,
+    'MAX_CONCURRENCY': 4,
+}
+
+
+class _Client:
+
+    def with_options(self, **kwargs):
+        return self
+
+
+def _client_info(name, max_retries=0):
+    return SimpleNamespace(base_url=f'http://{name}', model_name=name, model_type=1, max_retries=max_retries)
+
+
+@override_settings(LLM_BROKER=BROKER_SETTING)
+class TryAdmitTests(SimpleTestCase):
+
+    def setUp(self):
+        self.broker = RequestBroker()
+        self.endpoint = self.broker._endpoint('http://endpoint')
+
+    def test_estimate_tokens(self):
+        self.assertEqual(estimate_tokens(''), 0)
+        self.assertEqual(estimate_tokens('abcdefgh'), 2)
+        self.assertEqual(estimate_tokens('中文'), 2)
+
+    def test_admits_up_to_the_concurrency_limit(self):
+        self.assertEqual(self.broker._try_admit(self.endpoint, 10, PRIORITY_INTERACTIVE), 0)
+        self.assertEqual(self.broker._try_admit(self.endpoint, 10, PRIORITY_INTERACTIVE), 0)
+        self.assertEqual(self.broker._try_admit(self.endpoint, 10, PRIORITY_INTERACTIVE), RequestBroker.POLL_INTERVAL)
+        self.assertEqual(self.endpoint.in_flight, 2)
+        self.assertEqual(self.endpoint.admitted, 2)
+
+    def test_bulk_waits_for_waiting_interactive_requests(self):
+        self.endpoint.waiting[PRIORITY_INTERACTIVE] = 1
+        self.assertEqual(self.broker._try_admit(self.endpoint, 10, PRIORITY_BULK), RequestBroker.POLL_INTERVAL)
+        self.assertEqual(self.broker._try_admit(self.endpoint, 10, PRIORITY_INTERACTIVE), 0)
+
+    def test_token_budget(self):
+        self.assertEqual(self.broker._try_admit(self.endpoint, 6000, PRIORITY_INTERACTIVE), 0)
+        # 6000 tokens per minute refill 100 per second
+        wait = self.broker._try_admit(self.endpoint, 1000, PRIORITY_INTERACTIVE)
+        self.assertAlmostEqual(wait, 10, delta=0.1)
+        self.assertEqual(self.endpoint.in_flight, 1)
+
+    def test_blocked_endpoint(self):
+        self.endpoint.blocked_until = time.monotonic() + 5
+        self.assertGreater(self.broker._try_admit(self.endpoint, 10, PRIORITY_INTERACTIVE), 4)
+
+    def test_success_grows_the_limit_additively(self):
+        self.broker._try_admit(self.endpoint, 10, PRIORITY_INTERACTIVE)
+        self.broker._release(self.endpoint)
+        self.assertEqual(self.endpoint.limit, 2.5)
+        self.assertEqual(self.endpoint.in_flight, 0)
+
+    def test_throttling_halves_the_limit_once_per_second(self):
+        error = openai.APITimeoutError(request=httpx.Request('POST', 'http://endpoint'))
+        for _ in range(2):
+            self.broker._try_admit(self.endpoint, 10, PRIORITY_INTERACTIVE)
+        self.broker._release(self.endpoint, error)
+        self.broker._release(self.endpoint, error)
+        self.assertEqual(self.endpoint.limit, 1)
+        self.assertEqual(self.endpoint.throttled, 2)
+
+    def test_other_errors_do_not_shrink_the_limit(self):
+        self.broker._try_admit(self.endpoint, 10, PRIORITY_INTERACTIVE)
+        self.broker._release(self.endpoint, ValueError())
+        self.assertEqual(self.endpoint.limit, 2)
+        self.assertEqual(self.endpoint.failed, 1)
+
+
+@override_settings(LLM_BROKER=BROKER_SETTING)
+class SubmitTests(SimpleTestCase):
+
+    def setUp(self):
+        self.broker = RequestBroker()
+
+    def test_result(self):
+        async def call(client):
+            return 'answer'
+
+        result = asyncio.run(self.broker.submit(_Client(), _client_info('broker-result'), 10, call))
+        self.assertEqual(result, 'answer')
+        self.assertEqual(self.broker._endpoints['http://broker-result'].in_flight, 0)
+
+    def test_cancelled_call_is_not_a_failure(self):
+        info = _client_info('broker-cancelled')
+
+        async def call(client):
+            await asyncio.sleep(60)
+
+        async def run():
+            task = asyncio.create_task(self.broker.submit(_Client(), info, 10, call))
+            await asyncio.sleep(0.05)
+            task.cancel()
+            with self.assertRaises(asyncio.CancelledError):
+                await task
+
+        asyncio.run(run())
+        endpoint = self.broker._endpoints[info.base_url]
+        self.assertEqual(endpoint.in_flight, 0)
+        self.assertEqual(endpoint.limit, 2)
+        self.assertEqual(endpoint.failed, 0)
+        self.assertEqual(endpoint.throttled, 0)
+        self.assertNotIn(info.model_name, [health['model_name'] for health in MODEL_ROUTER.stats()])
+
+    def test_timeout_is_retried(self):
+        info = _client_info('broker-retry', max_retries=1)
+        calls = []
+
+        async def call(client):
+            calls.append(client)
+            if len(calls) == 1:
+                raise openai.APITimeoutError(request=httpx.Request('POST', info.base_url))
+            return 'answer'
+
+        self.assertEqual(asyncio.run(self.broker.submit(_Client(), info, 10, call)), 'answer')
+        endpoint = self.broker._endpoints[info.base_url]
+        self.assertEqual(len(calls), 2)
+        self.assertEqual(endpoint.throttled, 1)
+        self.assertEqual(endpoint.in_flight, 0)
@@ -0,0 +1,92 @@
+import asyncio
+import os
+import tempfile
+from types import SimpleNamespace
+
+from django.test import SimpleTestCase
+
+from processor.response_cache import ResponseCache, cache_policy, response_key
+
+
+class ResponseKeyTests(SimpleTestCase):
+
+    def test_same_content_same_key(self):
+        self.assertEqual(response_key('qwen', 0.7, 'prompt', b'content'),
+                         response_key('qwen', 0.7, 'prompt', b'content'))
+
+    def test_model_temperature_and_parts_change_the_key(self):
+        key = response_key('qwen', 0.7, 'prompt', 'content')
+        self.assertNotEqual(key, response_key('deepseek', 0.7, 'prompt', 'content'))
+        self.assertNotEqual(key, response_key('qwen', 0.2, 'prompt', 'content'))
+        self.assertNotEqual(key, response_key('qwen', 0.7, 'other prompt', 'content'))
+        self.assertNotEqual(key, response_key('qwen', 0.7, 'prompt', 'other content'))
+
+    def test_parts_are_separated(self):
+        self.assertNotEqual(response_key('qwen', 0.7, 'ab', 'c'), response_key('qwen', 0.7, 'a', 'bc'))
+
+    def test_json_parts_ignore_key_order(self):
+        self.assertEqual(response_key('qwen', 0.7, {'a': 1, 'b': 2}), response_key('qwen', 0.7, {'b': 2, 'a': 1}))
+        self.assertEqual(response_key('qwen', 0.7, 'text'), response_key('qwen', 0.7, b'text'))
+
+
+class CachePolicyTests(SimpleTestCase):
+
+    def policy(self, enabled, refresh):
+        return cache_policy(SimpleNamespace(enabled_response_cache=enabled, enabled_response_cache_refresh=refresh))
+
+    def test_policy(self):
+        self.assertEqual(self.policy(True, False), (True, True))
+        self.assertEqual(self.policy(True, True), (False, True))
+        self.assertEqual(self.policy(False, False), (False, False))
+        self.assertEqual(self.policy(False, True), (False, False))
+
+
+class ResponseCacheTests(SimpleTestCase):
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.path = os.path.join(directory.name, 'cache.sqlite3')
+
+    def test_get_put(self):
+        cache = ResponseCache(path=self.path)
+        self.assertIsNone(cache.get('key'))
+        cache.put('key', 'answer')
+        cache.put('none', None)
+        self.assertEqual(cache.get('key'), 'answer')
+        self.assertIsNone(cache.get('none'))
+        self.assertEqual(cache.stats()['hits'], 1)
+        self.assertEqual(cache.stats()['misses'], 2)
+        self.assertEqual(cache.stats()['writes'], 1)
+
+    def test_answers_survive_a_new_instance(self):
+        ResponseCache(path=self.path).put('key', 'answer')
+        self.assertEqual(ResponseCache(path=self.path).get('key'), 'answer')
+
+    def test_least_recently_used_entries_are_evicted(self):
+        cache = ResponseCache(path=self.path, max_entries=3)
+        for i in range(3):
+            cache.put(f'key{i}', f'answer{i}')
+        # key0 becomes the most recently used entry
+        cache.get('key0')
+        cache.put('key3', 'answer3')
+        self.assertIsNone(cache.get('key1'))
+        self.assertEqual(cache.get('key0'), 'answer0')
+        self.assertEqual(cache.get('key3'), 'answer3')
+        self.assertEqual(cache.stats()['evictions'], 1)
+
+    def test_byte_limit(self):
+        cache = ResponseCache(path=self.path, max_bytes=10)
+        cache.put('key0', '12345678')
+        cache.put('key1', '12345678')
+        self.assertIsNone(cache.get('key0'))
+        self.assertEqual(cache.get('key1'), '12345678')
+
+    def test_async_access(self):
+        cache = ResponseCache(path=self.path)
+
+        async def run():
+            await cache.aput('key', 'answer')
+            return await cache.aget('key')
+
+        self.assertEqual(asyncio.run(run()), 'answer')
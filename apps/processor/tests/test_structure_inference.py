@@ -0,0 +1,79 @@
+import os
+import tempfile
+from collections import Counter
+
+import docx
+from django.test import SimpleTestCase
+
+from processor.structure_inference import infer_docx_headings, infer_headings, infer_pdf_headings
+
+
+def _page(lines, body_chars=2000, body_size=10.0):
+    """
+    Font statistics of a page holding body text and the given (text, size) short lines
+    """
+    size_chars = Counter({body_size: body_chars})
+    for text, size in lines:
+        size_chars[size] += len(text)
+    return size_chars, list(lines) + [(f'body line {i}', body_size) for i in range(10)]
+
+
+class InferDocxHeadingsTests(SimpleTestCase):
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.file_path = os.path.join(directory.name, 'styled.docx')
+
+    def test_levels_come_from_the_styles(self):
+        document = docx.Document()
+        document.add_heading('Report', 0)
+        document.add_paragraph('Body text.')
+        document.add_heading('Intro', 1)
+        document.add_heading('Scope', 2)
+        document.add_heading('', 2)
+        document.save(self.file_path)
+
+        inference = infer_docx_headings(self.file_path)
+        self.assertTrue(inference.confident)
+        self.assertEqual(inference.source, 'styles')
+        self.assertEqual(inference.to_context()['content'], [
+            {'text': '# Report', 'lines': [1]},
+            {'text': '# Intro', 'lines': [3]},
+            {'text': '## Scope', 'lines': [4]},
+        ])
+
+    def test_unstyled_document_is_not_confident(self):
+        document = docx.Document()
+        document.add_paragraph('Only body text.')
+        document.save(self.file_path)
+        self.assertFalse(infer_docx_headings(self.file_path).confident)
+
+    def test_formats_without_structure(self):
+        self.assertIsNone(infer_headings('document.pptx'))
+        self.assertIsNone(infer_headings('document.pdf'))
+
+
+class InferPdfHeadingsTests(SimpleTestCase):
+
+    def test_larger_fonts_are_levels_from_the_largest_down(self):
+        pages = [
+            _page([('Annual report', 24.0), ('Company name', 8.0)]),
+            _page([('1 Overview', 16.0), ('1.1 Scope', 12.0), ('Company name', 8.0)]),
+            _page([('2 Results', 16.0), ('Company name', 8.0)]),
+        ]
+        inference = infer_pdf_headings(pages)
+        self.assertTrue(inference.confident)
+        self.assertEqual([(title.text, title.lines) for title in inference.titles], [
+            ('# Annual report', [1]), ('## 1 Overview', [2]), ('### 1.1 Scope', [2]), ('## 2 Results', [3]),
+        ])
+
+    def test_running_headers_and_page_numbers_are_ignored(self):
+        pages = [_page([(f'Chapter {n}', 14.0), ('Header', 14.0), (str(n), 14.0)]) for n in range(1, 4)]
+        self.assertEqual([title.text for title in infer_pdf_headings(pages).titles],
+                         ['# Chapter 1', '# Chapter 2', '# Chapter 3'])
+
+    def test_body_in_a_large_font_is_not_confident(self):
+        lines = [(f'line {i}', 14.0) for i in range(10)]
+        self.assertFalse(infer_pdf_headings([_page(lines, body_chars=10)]).confident)
+        self.assertFalse(infer_pdf_headings([]).confident)
@@ -0,0 +1,142 @@
+import asyncio
+import json
+import os
+import re
+import tempfile
+from types import SimpleNamespace
+from unittest import mock
+
+from django.test import SimpleTestCase
+
+from common.str_transcoding import str_decrypt
+from processor import processor
+from processor.prompt_templates import TITLE_SKELETON_PROMPT
+from processor.request_broker import estimate_tokens
+from processor.title_skeleton import build_title_skeleton, skeleton_windows
+
+
+def _tokens(window):
+    return sum(estimate_tokens(entry) + 1 for entry in window.split('\n'))
+
+
+class BuildTitleSkeletonTests(SimpleTestCase):
+
+    def test_candidates_keep_their_line_numbers(self):
+        content = "# 总则\n\n第一章 适用范围\n本办法适用于全体员工，自发布之日起施行。\n\n1.1 定义\n\n这是一个很长的句子。"
+        self.assertEqual(build_title_skeleton(content), [
+            '1: # 总则',
+            '3: 第一章 适用范围\n    > 本办法适用于全体员工，自发布之日起施行。',
+            '6: 1.1 定义\n    > 这是一个很长的句子。',
+        ])
+
+    def test_sentences_and_tables_are_not_candidates(self):
+        self.assertEqual(build_title_skeleton("\n这是一个句子。\n\n| a | b |\n"), [])
+
+
+class SkeletonWindowsTests(SimpleTestCase):
+
+    def setUp(self):
+        self.entries = [f'{i}: heading {i:02d}' for i in range(1, 11)]
+        # Every entry is estimated at five tokens with its line break
+        self.entry_tokens = estimate_tokens(self.entries[0]) + 1
+
+    def test_small_skeleton_is_one_window(self):
+        self.assertEqual(skeleton_windows(self.entries, 1000), ['\n'.join(self.entries)])
+        self.assertEqual(skeleton_windows([], 1000), [])
+
+    def test_windows_overlap_and_stay_within_budget(self):
+        windows = skeleton_windows(self.entries, self.entry_tokens * 5, overlap=2)
+        self.assertEqual([window.split('\n')[0] for window in windows], ['1: heading 01', '4: heading 04',
+                                                                         '7: heading 07'])
+        self.assertEqual(windows[-1].split('\n')[-1], '10: heading 10')
+        for previous, window in zip(windows, windows[1:]):
+            self.assertEqual(previous.split('\n')[-2:], window.split('\n')[:2])
+        for window in windows:
+            self.assertLessEqual(_tokens(window), self.entry_tokens * 5)
+
+    def test_no_window_holds_only_repeated_entries(self):
+        entries = self.entries[:6]
+        windows = skeleton_windows(entries, self.entry_tokens * 3, overlap=3)
+        self.assertEqual(windows, ['\n'.join(entries[i:i + 3]) for i in range(4)])
+        for window in windows:
+            self.assertLessEqual(_tokens(window), self.entry_tokens * 3)
+
+    def test_entry_above_the_budget_gets_its_own_window(self):
+        entries = ['1: a', f"2: {'x' * 400}", '3: b']
+        self.assertEqual(skeleton_windows(entries, 20), entries)
+
+
+class _Stream:
+
+    def __init__(self, answer):
+        self.chunks = [SimpleNamespace(usage=None, choices=[SimpleNamespace(delta=SimpleNamespace(content=piece))])
+                       for piece in (answer[i:i + 7] for i in range(0, len(answer), 7))]
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        if not self.chunks:
+            raise StopAsyncIteration
+        return self.chunks.pop(0)
+
+    async def close(self):
+        pass
+
+
+class ReasonTitleSkeletonTests(SimpleTestCase):
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.file_path = os.path.join(directory.name, 'document.md')
+        lines = []
+        for chapter in range(1, 7):
+            lines += [f'第{chapter}章 标题{chapter}', f'第{chapter}章的正文内容，说明了这一章的规定。', '']
+        with open(self.file_path, 'w', encoding='utf-8') as f:
+            f.write('\n'.join(lines))
+
+        self.requests = []
+        self.chunk_setting = SimpleNamespace(enabled_title_skeleton=True, title_skeleton_window_tokens=60,
+                                             title_reasoning_max_tokens=1000, enabled_response_cache=False,
+                                             enabled_response_cache_refresh=False)
+        client_info = SimpleNamespace(model_name='qwen-plus', temperature=0.1)
+        broker = SimpleNamespace(submit=self.submit)
+        patches = [
+            mock.patch.object(processor, 'resolve_model', mock.AsyncMock(return_value=client_info)),
+            mock.patch.object(processor, 'get_chunk_settings', mock.AsyncMock(return_value=self.chunk_setting)),
+            mock.patch.object(processor, 'get_async_client', mock.Mock()),
+            mock.patch.object(processor, 'REQUEST_BROKER', broker),
+        ]
+        for patch in patches:
+            patch.start()
+            self.addCleanup(patch.stop)
+
+    async def create(self, messages, **kwargs):
+        # Every skeleton line of the window is answered as a title
+        self.requests.append(messages)
+        titles = [{'text': text, 'lines': [int(number)]}
+                  for number, text in re.findall(r'^(\d+): (.+)$', messages[1]['content'], re.MULTILINE)]
+        return _Stream(json.dumps({'content': titles}, ensure_ascii=False))
+
+    async def submit(self, client, client_info, input_tokens, call):
+        completions = SimpleNamespace(create=self.create)
+        return await call(SimpleNamespace(chat=SimpleNamespace(completions=completions)))
+
+    def test_windows_are_reasoned_and_merged_in_order(self):
+        parser = asyncio.run(processor.document_understanding_async(self.file_path, 'question'))
+        self.assertGreater(len(self.requests), 1)
+        self.assertTrue(parser.done)
+        self.assertEqual([title.text for title in parser.titles], [f'第{n}章 标题{n}' for n in range(1, 7)])
+        self.assertEqual([title.lines for title in parser.titles], [[n * 3 - 2] for n in range(1, 7)])
+        for messages in self.requests:
+            self.assertTrue(messages[1]['content'].startswith(str_decrypt(TITLE_SKELETON_PROMPT)))
+            self.assertEqual(messages[2], {'role': 'user', 'content': 'question'})
+
+    def test_document_without_candidates_is_not_sent(self):
+        with open(self.file_path, 'w', encoding='utf-8') as f:
+            f.write('这是一个句子。\n')
+        parser = asyncio.run(processor.document_understanding_async(self.file_path, 'question'))
+        self.assertTrue(parser.done)
+        self.assertEqual(parser.titles, [])
+        self.assertEqual(self.requests, [])
@@ -0,0 +1,74 @@
+from django.test import SimpleTestCase, override_settings
+
+from processor.token_accounting import TOKEN_LEDGER, TokenBudgetExceeded, TokenLedger, apply_token_budget, \
+    estimate_message_tokens, set_usage_scope
+
+
+@override_settings(LLM_TOKEN_BUDGET={
+    'title': {'MAX_INPUT_TOKENS': 100, 'ACTION': 'truncate'},
+    'tag': {'MAX_INPUT_TOKENS': 100, 'ACTION': 'reject'},
+})
+class ApplyTokenBudgetTests(SimpleTestCase):
+
+    def setUp(self):
+        set_usage_scope(-1, 'test-budget-batch')
+        self.addCleanup(set_usage_scope)
+        self.messages = [
+            {'role': 'system', 'content': 'You are a helpful assistant.'},
+            {'role': 'system', 'content': 'x' * 2000},
+            {'role': 'user', 'content': 'question'},
+        ]
+
+    def test_prompt_within_the_budget_is_unchanged(self):
+        messages = self.messages[:1]
+        self.assertIs(apply_token_budget('title', messages), messages)
+        self.assertIs(apply_token_budget('chat', self.messages), self.messages)
+
+    def test_longest_text_is_cut_to_the_budget(self):
+        truncated = apply_token_budget('title', self.messages)
+        self.assertLessEqual(estimate_message_tokens(truncated), 100)
+        self.assertTrue(self.messages[1]['content'].startswith(truncated[1]['content']))
+        self.assertEqual(truncated[0], self.messages[0])
+        self.assertEqual(truncated[2], self.messages[2])
+        # The messages of the caller are left alone
+        self.assertEqual(len(self.messages[1]['content']), 2000)
+
+    def test_cut_is_logged_and_counted(self):
+        before = TOKEN_LEDGER.task_usage(-1)['total']['truncated_calls']
+        with self.assertLogs('token_accounting', 'WARNING') as logs:
+            apply_token_budget('title', self.messages)
+        self.assertIn('file task: -1', logs.output[0])
+        usage = TOKEN_LEDGER.task_usage(-1)
+        self.assertEqual(usage['total']['truncated_calls'], before + 1)
+        self.assertEqual(usage['stages']['title']['calls'], 0)
+        self.assertGreaterEqual(TOKEN_LEDGER.batch_usage('test-budget-batch')['total']['truncated_calls'], 1)
+
+    def test_rejecting_stage_raises(self):
+        with self.assertRaises(TokenBudgetExceeded):
+            apply_token_budget('tag', self.messages)
+
+    def test_image_parts_count_a_fixed_amount(self):
+        messages = [{'role': 'user', 'content': [
+            {'type': 'image_url', 'image_url': {'url': 'data:image/png;base64,AAAA'}},
+            {'type': 'text', 'text': 'abcd' * 10},
+        ]}]
+        self.assertEqual(estimate_message_tokens(messages), 1000 + 10 + 4)
+
+
+class TokenLedgerTests(SimpleTestCase):
+
+    def setUp(self):
+        self.ledger = TokenLedger()
+        set_usage_scope(7, 'batch')
+        self.addCleanup(set_usage_scope)
+
+    def test_new_attempt_starts_from_zero(self):
+        self.ledger.record('title', 'qwen', 100, 10, 50, False)
+        self.ledger.reset_task(7)
+        self.ledger.record('tag', 'qwen', 30, 3, 20, True)
+        usage = self.ledger.task_usage(7)
+        self.assertEqual(list(usage['stages']), ['tag'])
+        self.assertEqual((usage['total']['calls'], usage['total']['input_tokens']), (1, 30))
+        # The batch and model totals keep every call
+        self.assertEqual(self.ledger.batch_usage('batch')['total']['calls'], 2)
+        self.assertEqual(self.ledger.model_usage()['qwen']['calls'], 2)
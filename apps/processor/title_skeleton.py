@@ -0,0 +1,88 @@
+import re
+
+from file_weaver.constant import HEADER_PATTERN
+from processor.request_broker import estimate_tokens
+
+# Numbering that usually starts a heading: 第一章, 1.2, 一、, (一), Chapter 3
+_NUMBERING_PATTERN = re.compile(
+    r'^(第[一二三四五六七八九十百零\d]+[章节篇部分条]|'
+    r'\d+(\.\d+)*[.、\s]|'
+    r'[一二三四五六七八九十]+[、.]|'
+    r'[(（][一二三四五六七八九十\d]+[)）]|'
+    r'(chapter|section|part)\s+\d+)',
+    re.IGNORECASE)
+_BOLD_PATTERN = re.compile(r'^\*\*(.+)\*\*$')
+# A line ending like a sentence is body text, not a heading
+_SENTENCE_END = ('。', '；', ';', '，', ',', '！', '!', '？', '?')
+
+# Longest line still regarded as a heading candidate
+MAX_CANDIDATE_LENGTH = 60
+# Characters of the following line shown to the model as a hint
+NEIGHBOUR_LENGTH = 30
+
+
+def _is_candidate(line, previous_blank, next_blank):
+    if HEADER_PATTERN.match(line):
+        return True
+    if len(line) > MAX_CANDIDATE_LENGTH or line.endswith(_SENTENCE_END):
+        return False
+    if line.startswith(('|', '!', '>', '<', '-', '*  ', '```')) and not _BOLD_PATTERN.match(line):
+        return False
+    if _NUMBERING_PATTERN.match(line) or _BOLD_PATTERN.match(line):
+        return True
+    # A short line standing on its own between blank lines
+    return previous_blank and next_blank
+
+
+def build_title_skeleton(md_content):
+    """
+    Compact skeleton of the lines of a markdown document that may be headings.
+    Every candidate keeps its line number and is followed by the start of the next line, so the title model sees
+    the outline without the body text.
+    :param md_content: Markdown content
+    :return: One entry per candidate line, in document order
+    """
+    lines = [line.strip() for line in md_content.split('\n')]
+    entries = []
+    for i, line in enumerate(lines):
+        if not line:
+            continue
+        previous_blank = i == 0 or not lines[i - 1]
+        next_blank = i + 1 >= len(lines) or not lines[i + 1]
+        if not _is_candidate(line, previous_blank, next_blank):
+            continue
+        entry = f"{i + 1}: {line}"
+        neighbour = next((other for other in lines[i + 1:i + 4] if other), None)
+        if neighbour is not None and not _is_candidate(neighbour, False, False):
+            entry += f"\n    > {neighbour[:NEIGHBOUR_LENGTH]}"
+        entries.append(entry)
+    return entries
+
+
+def skeleton_windows(entries, max_tokens, overlap=3):
+    """
+    Split the skeleton into windows of at most max_tokens estimated tokens.
+    Each window repeats the last entries of the previous one so that the levels stay consistent across windows,
+    a window holding only repeated entries is not emitted.
+    :return: Text of every window
+    """
+    windows = []
+    current = []
+    current_tokens = 0
+    # Entries of the current window repeated from the previous one
+    repeated = 0
+    for entry in entries:
+        tokens = estimate_tokens(entry) + 1
+        if len(current) > repeated and current_tokens + tokens > max_tokens:
+            windows.append(current)
+            current = current[-overlap:] if overlap else []
+            current_tokens = sum(estimate_tokens(item) + 1 for item in current)
+            # Repeat only as many entries as fit next to the new one
+            while current and current_tokens + tokens > max_tokens:
+                current_tokens -= estimate_tokens(current.pop(0)) + 1
+            repeated = len(current)
+        current.append(entry)
+        current_tokens += tokens
+    if len(current) > repeated:
+        windows.append(current)
+    return ['\n'.join(window) for window in windows]
@@ -0,0 +1,242 @@
+import contextvars
+import copy
+import logging
+import threading
+from collections import OrderedDict
+
+from django.conf import settings
+
+from processor.request_broker import estimate_tokens
+
+logging = logging.getLogger('token_accounting')
+
+# Pipeline stages the model calls are accounted to
+STAGE_CHAT = 'chat'
+STAGE_TITLE = 'title'
+STAGE_TAG = 'tag'
+STAGE_IMAGE = 'image'
+
+# Estimated input tokens of one image, the base64 text says nothing about what the provider bills
+IMAGE_TOKENS = 1000
+# Overhead of the role and separators of one message
+MESSAGE_TOKENS = 4
+
+_usage_scope = contextvars.ContextVar('llm_usage_scope', default=(None, None))
+
+
+class TokenBudgetExceeded(ValueError):
+    """
+    The prompt is larger than the input budget of its stage and the stage rejects oversized prompts
+    """
+
+
+def set_usage_scope(file_task_id=None, batch=None):
+    """
+    Account the model calls made by the current thread or task to a file task and its upload batch
+    :param file_task_id: Id of the FileTask
+    :param batch: Upload batch (file suffix)
+    """
+    _usage_scope.set((file_task_id, batch))
+
+
+def _content_tokens(content):
+    if isinstance(content, str):
+        return estimate_tokens(content)
+    tokens = 0
+    for part in content or []:
+        if part.get('type') == 'text':
+            tokens += estimate_tokens(part.get('text', ''))
+        elif part.get('type') == 'image_url':
+            tokens += IMAGE_TOKENS
+    return tokens
+
+
+def estimate_message_tokens(messages):
+    """
+    Local estimate of the input tokens of chat messages, images count a fixed amount
+    """
+    return sum(_content_tokens(message.get('content')) + MESSAGE_TOKENS for message in messages)
+
+
+def _truncate_longest_text(messages, excess):
+    """
+    Shorten the longest text of the messages by about excess tokens, the end of the text is cut
+    :return: Whether anything could be cut
+    """
+    longest = None
+    for message in messages:
+        content = message.get('content')
+        if isinstance(content, str):
+            candidates = [(message, 'content', content)]
+        else:
+            candidates = [(part, 'text', part.get('text', '')) for part in content or [] if part.get('type') == 'text']
+        for holder, key, text in candidates:
+            if longest is None or len(text) > len(longest[2]):
+                longest = (holder, key, text)
+    if longest is None or not longest[2]:
+        return False
+    holder, key, text = longest
+    tokens = estimate_tokens(text)
+    keep = max(0, int(len(text) * (1 - (excess + 1) / max(tokens, 1))))
+    holder[key] = text[:keep]
+    return keep < len(text)
+
+
+def apply_token_budget(stage, messages):
+    """
+    Enforce the input budget of the stage before the prompt is sent
+    :param stage: Pipeline stage of the call
+    :param messages: Chat messages
+    :return: The messages, a truncated copy when the stage truncates oversized prompts. The cut is logged and
+    counted for the file task of the current scope
+    """
+    budget = getattr(settings, 'LLM_TOKEN_BUDGET', {}).get(stage)
+    if not budget:
+        return messages
+    max_tokens = budget.get('MAX_INPUT_TOKENS')
+    tokens = estimate_message_tokens(messages)
+    if not max_tokens or tokens <= max_tokens:
+        return messages
+    if budget.get('ACTION', 'truncate') == 'reject':
+        raise TokenBudgetExceeded(f"Prompt exceeds the {stage} budget. tokens: {tokens} budget: {max_tokens}")
+
+    original_tokens = tokens
+    messages = copy.deepcopy(messages)
+    while tokens > max_tokens and _truncate_longest_text(messages, tokens - max_tokens):
+        tokens = estimate_message_tokens(messages)
+    file_task_id, batch = _usage_scope.get()
+    logging.warning(f"Prompt truncated to the {stage} budget. file task: {file_task_id} batch: {batch} "
+                    f"tokens: {original_tokens} -> {tokens} budget: {max_tokens}")
+    TOKEN_LEDGER.record_truncation(stage)
+    return messages
+
+
+def usage_tokens(usage, input_estimate, output_text):
+    """
+    Input and output tokens of a call, taken from the provider usage when it was returned
+    :return: (input tokens, output tokens, whether the numbers are local estimates)
+    """
+    if usage is not None and getattr(usage, 'prompt_tokens', None) is not None:
+        return usage.prompt_tokens, usage.completion_tokens or 0, False
+    return input_estimate, estimate_tokens(output_text or ''), True
+
+
+class UsageTotals:
+    __slots__ = ('calls', 'input_tokens', 'output_tokens', 'estimated_calls', 'latency_ms', 'max_latency_ms',
+                 'truncated_calls')
+
+    def __init__(self):
+        self.calls = 0
+        self.input_tokens = 0
+        self.output_tokens = 0
+        self.estimated_calls = 0
+        self.latency_ms = 0
+        self.max_latency_ms = 0
+        self.truncated_calls = 0
+
+    def add(self, input_tokens, output_tokens, latency_ms, estimated):
+        self.calls += 1
+        self.input_tokens += input_tokens
+        self.output_tokens += output_tokens
+        self.estimated_calls += 1 if estimated else 0
+        self.latency_ms += latency_ms
+        self.max_latency_ms = max(self.max_latency_ms, latency_ms)
+
+    def to_dict(self):
+        return {
+            'calls': self.calls,
+            'input_tokens': self.input_tokens,
+            'output_tokens': self.output_tokens,
+            'estimated_calls': self.estimated_calls,
+            'avg_latency_ms': round(self.latency_ms / self.calls) if self.calls else 0,
+            'max_latency_ms': self.max_latency_ms,
+            'truncated_calls': self.truncated_calls,
+        }
+
+
+class TokenLedger:
+    """
+    Token usage of the model calls of this process, aggregated by file task, by upload batch and by model
+    """
+
+    def __init__(self, max_scopes=10000):
+        self.max_scopes = max_scopes
+        self._lock = threading.Lock()
+        self._tasks = OrderedDict()
+        self._batches = OrderedDict()
+        self._models = {}
+
+    def _stages(self, scopes, key):
+        stages = scopes.get(key)
+        if stages is None:
+            stages = scopes[key] = {}
+            while len(scopes) > self.max_scopes:
+                scopes.popitem(last=False)
+        return stages
+
+    def record(self, stage, model_name, input_tokens, output_tokens, latency_ms, estimated):
+        """
+        Account one model call to the file task and batch of the current scope
+        """
+        file_task_id, batch = _usage_scope.get()
+        latency_ms = int(latency_ms)
+        with self._lock:
+            targets = [self._models.setdefault(model_name, UsageTotals())]
+            if file_task_id is not None:
+                targets.append(self._stages(self._tasks, file_task_id).setdefault(stage, UsageTotals()))
+            if batch is not None:
+                targets.append(self._stages(self._batches, batch).setdefault(stage, UsageTotals()))
+            for totals in targets:
+                totals.add(input_tokens, output_tokens, latency_ms, estimated)
+        logging.debug(f"Model call accounted. stage: {stage} model: {model_name} input: {input_tokens} "
+                      f"output: {output_tokens} latency: {latency_ms}ms estimated: {estimated}")
+
+    def record_truncation(self, stage):
+        """
+        Count a prompt of the current scope cut to the input budget of its stage
+        """
+        file_task_id, batch = _usage_scope.get()
+        with self._lock:
+            if file_task_id is not None:
+                self._stages(self._tasks, file_task_id).setdefault(stage, UsageTotals()).truncated_calls += 1
+            if batch is not None:
+                self._stages(self._batches, batch).setdefault(stage, UsageTotals()).truncated_calls += 1
+
+    @staticmethod
+    def _summary(stages):
+        total = UsageTotals()
+        for totals in stages.values():
+            total.calls += totals.calls
+            total.input_tokens += totals.input_tokens
+            total.output_tokens += totals.output_tokens
+            total.estimated_calls += totals.estimated_calls
+            total.latency_ms += totals.latency_ms
+            total.max_latency_ms = max(total.max_latency_ms, totals.max_latency_ms)
+            total.truncated_calls += totals.truncated_calls
+        return {
+            'stages': {stage: totals.to_dict() for stage, totals in stages.items()},
+            'total': total.to_dict(),
+        }
+
+    def reset_task(self, file_task_id):
+        """
+        Forget the usage of a file task when a new conversion attempt of it starts, the usage of an attempt is
+        persisted with the file and must not carry the calls of the attempts before it
+        """
+        with self._lock:
+            self._tasks.pop(file_task_id, None)
+
+    def task_usage(self, file_task_id):
+        with self._lock:
+            return self._summary(self._tasks.get(file_task_id, {}))
+
+    def batch_usage(self, batch):
+        with self._lock:
+            return self._summary(self._batches.get(batch, {}))
+
+    def model_usage(self):
+        with self._lock:
+            return {model_name: totals.to_dict() for model_name, totals in self._models.items()}
+
+
+TOKEN_LEDGER = TokenLedger()
@@ -0,0 +1,17 @@
+import os
+from pathlib import Path
+
+BASE_DIR = Path(__file__).resolve().parent.parent.parent
+
+SETTINGS_CACHE_SETTING = {
+    # Seconds a cached settings row is trusted before the version counter is checked again
+    'TTL': 5,
+}
+
+LLM_RESPONSE_CACHE_SETTING = {
+    # SQLite file holding the cached model answers
+    'PATH': Path(os.environ.get('LLM_RESPONSE_CACHE_PATH', BASE_DIR / 'cache' / 'llm_response.sqlite3')),
+    # Least recently used answers are evicted above either of the limits
+    'MAX_ENTRIES': 200000,
+    'MAX_BYTES': 1024 * 1024 * 1024,
+}
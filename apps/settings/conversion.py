@@ -0,0 +1,34 @@
+import os
+
+CONVERSION_JOB_SETTING = {
+    # local: the serving process converts the queued files, worker: only conversion_worker processes do
+    'MODE': 'local',
+    # Extraction threads of a worker, the CPU stage
+    'WORKERS': 5,
+    # Files of a worker waiting for the model concurrently, the model stage
+    'MODEL_CONCURRENCY': 8,
+    # Extracted files waiting for the model stage, extraction blocks while it is full
+    'STAGE_QUEUE_SIZE': 4,
+    # A claimed file is requeued when its worker does not renew the lease within this time
+    'LEASE_SECONDS': 60,
+    'HEARTBEAT_SECONDS': 15,
+    # Seconds between two claims while the queue is empty
+    'POLL_SECONDS': 2,
+    # Seconds between two sweeps of the expired leases
+    'SWEEP_SECONDS': 30,
+    # A file whose worker was lost this many times is failed
+    'MAX_ATTEMPTS': 3,
+    # Start the local worker right after start-up so that queued work continues. Off unless the serving process is
+    # started with CONVERSION_RESUME_ON_START=true, other entry points such as scripts and shells never convert
+    'RESUME_ON_START': os.environ.get('CONVERSION_RESUME_ON_START', '').lower() in ('1', 'true'),
+    'RESUME_DELAY': 5,
+}
+
+CONVERSION_SCHEDULER_SETTING = {
+    # Jobs with at most this many files take the fast lane
+    'FAST_LANE_MAX_FILES': 3,
+    # Pipeline slots of every worker reserved for the fast lane
+    'FAST_LANE_SLOTS': 1,
+    # Pipeline slots one job may hold across all workers, 0 means no cap
+    'BATCH_MAX_CONCURRENCY': 16,
+}
@@ -0,0 +1,19 @@
+import os
+
+DOCUMENT_EXTRACTION_SETTING = {
+    # Worker processes of the page parallel PDF extraction, shared by all file threads
+    'PDF_WORKERS': max(1, (os.cpu_count() or 2) - 1),
+    # Pages parsed by one worker task
+    'PDF_PAGES_PER_SHARD': 32,
+    # Smaller PDFs are parsed in the calling thread, starting the shards would cost more than it saves
+    'PDF_MIN_PAGES_PARALLEL': 64,
+    # Use the text of the page parallel parse as the PDF markdown instead of converting the PDF with MarkItDown.
+    # Saves the second parse, the text layout differs from the MarkItDown output
+    'PDF_FITZ_TEXT': False,
+    # Worker processes of the MarkItDown conversion of the other formats
+    'MARKDOWN_WORKERS': max(1, (os.cpu_count() or 2) - 1),
+    # MarkItDown workers are replaced after one of them converted this many files, 0 means never
+    'MARKDOWN_MAX_FILES_PER_WORKER': 200,
+    # MarkItDown workers are replaced once one of them holds this much resident memory, 0 means no ceiling
+    'MARKDOWN_MAX_RSS_MB': 1024,
+}
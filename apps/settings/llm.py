@@ -0,0 +1,56 @@
+LLM_CLIENT_POOL_SETTING = {
+    # Upper limit of connections opened by one pooled client (one client per base_url/api_key/timeout/retries)
+    'MAX_CONNECTIONS': 100,
+    # Idle connections kept alive for reuse
+    'MAX_KEEPALIVE_CONNECTIONS': 20,
+    # Seconds an idle keep-alive connection is held before it is closed
+    'KEEPALIVE_EXPIRY': 60,
+}
+
+LLM_BROKER_SETTING = {
+    # Route every model request through the process wide broker, the SDK retries are disabled while it is enabled
+    'ENABLED': True,
+    # Budget of one endpoint (base_url)
+    'REQUESTS_PER_MINUTE': 600,
+    'TOKENS_PER_MINUTE': 1000000,
+    # Concurrency limit of one endpoint, adjusted between MIN and MAX when 429s or timeouts are seen
+    'INITIAL_CONCURRENCY': 8,
+    'MIN_CONCURRENCY': 1,
+    'MAX_CONCURRENCY': 64,
+    # Overrides of the values above by base_url, e.g. {'https://dashscope.aliyuncs.com/compatible-mode/v1': {...}}
+    'ENDPOINTS': {},
+}
+
+LLM_TOKEN_BUDGET_SETTING = {
+    # Estimated input tokens allowed per call of a stage. Oversized prompts are cut at the end of their longest text
+    # ('truncate') or refused before they are sent ('reject')
+    'title': {'MAX_INPUT_TOKENS': 100000, 'ACTION': 'truncate'},
+    'tag': {'MAX_INPUT_TOKENS': 16000, 'ACTION': 'truncate'},
+    'image': {'MAX_INPUT_TOKENS': 8000, 'ACTION': 'truncate'},
+    'chat': {'MAX_INPUT_TOKENS': 32000, 'ACTION': 'truncate'},
+}
+
+LLM_ROUTER_SETTING = {
+    # Spread requests that do not name a model over all enabled models of their type, weighted by observed latency
+    'ENABLED': True,
+    # Weight of the newest latency in the moving average
+    'EWMA_ALPHA': 0.2,
+    # Consecutive endpoint failures that open the circuit of a model
+    'FAILURE_THRESHOLD': 3,
+    # Seconds an open circuit waits before a probe request is let through
+    'OPEN_SECONDS': 30,
+}
+
+LLM_HEDGE_SETTING = {
+    # Send a duplicate of slow idempotent requests and take the first answer
+    'ENABLED': False,
+    # Stages whose requests are idempotent
+    'STAGES': ('tag', 'image'),
+    # A request is hedged once it is slower than this latency percentile of its model
+    'PERCENTILE': 95,
+    # Latencies kept per model, and needed before any request is hedged
+    'WINDOW': 200,
+    'MIN_SAMPLES': 20,
+    # Upper limit of duplicates per request of a model
+    'MAX_EXTRA_RATIO': 0.1,
+}
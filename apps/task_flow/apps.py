@@ -1,6 +1,27 @@
+import os
+import sys
+
 from django.apps import AppConfig
 
+# Management commands that serve requests, all others must not start conversions
+_SERVING_COMMANDS = ('runserver',)
+
+
+def _is_serving():
+    if os.path.basename(sys.argv[0]) != 'manage.py' or len(sys.argv) < 2:
+        # wsgi or asgi server, or any other entry point, the resume is only started when RESUME_ON_START is set
+        return True
+    if sys.argv[1] not in _SERVING_COMMANDS:
+        return False
+    # The autoreloader parent only watches files, the child started with RUN_MAIN serves
+    return os.environ.get('RUN_MAIN') == 'true' or '--noreload' in sys.argv
+
 
 class TaskFlowConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'task_flow'
+
+    def ready(self):
+        if _is_serving():
+            from task_flow.job_engine import JOB_ENGINE
+            JOB_ENGINE.resume_later()
@@ -0,0 +1,173 @@
+import io
+import os
+import random
+import zipfile
+
+import fitz
+from docx import Document
+from docx.shared import Inches
+from openpyxl import Workbook
+from openpyxl.drawing.image import Image as XlsxImage
+from pptx import Presentation
+from pptx.util import Inches as PptxInches
+
+FORMATS = ('docx', 'pptx', 'xlsx', 'pdf')
+
+_WORDS = ('data', 'model', 'report', 'system', 'process', 'result', 'value', 'table', 'figure', 'section', 'review',
+          'quality', 'service', 'customer', 'market', 'network', 'policy', 'design', 'budget', 'project', 'risk',
+          'analysis', 'storage', 'capacity', 'summary', 'target', 'growth', 'region', 'quarter', 'metric')
+
+
+class CorpusSpec:
+    """
+    Shape of the synthetic documents
+    sections: Level 1 headings of a document, each with two level 2 headings
+    paragraphs: Paragraphs below every heading
+    images: Images of a document, each one distinct
+    """
+
+    def __init__(self, sections=4, paragraphs=3, images=3):
+        self.sections = sections
+        self.paragraphs = paragraphs
+        self.images = images
+
+
+def _sentence(rng, words=12):
+    return ' '.join(rng.choice(_WORDS) for _ in range(words)).capitalize() + '.'
+
+
+def _paragraph(rng):
+    return ' '.join(_sentence(rng, rng.randint(8, 16)) for _ in range(rng.randint(3, 6)))
+
+
+def _outline(rng, spec):
+    """
+    (level, heading, paragraphs) in document order
+    """
+    outline = []
+    for section in range(1, spec.sections + 1):
+        outline.append((1, f"{section} {_sentence(rng, 3)[:-1]}", []))
+        for sub in range(1, 3):
+            outline.append((2, f"{section}.{sub} {_sentence(rng, 4)[:-1]}",
+                            [_paragraph(rng) for _ in range(spec.paragraphs)]))
+    return outline
+
+
+def synthetic_image(seed, width=320, height=240):
+    """
+    PNG of random colour blocks, the seed makes every image distinct so that deduplication does not hide the work
+    """
+    rng = random.Random(seed)
+    pix = fitz.Pixmap(fitz.csRGB, fitz.IRect(0, 0, width, height), False)
+    pix.clear_with(255)
+    for _ in range(12):
+        x, y = rng.randrange(0, width - 40), rng.randrange(0, height - 40)
+        pix.set_rect(fitz.IRect(x, y, x + rng.randint(20, 120), y + rng.randint(20, 120)),
+                     (rng.randrange(256), rng.randrange(256), rng.randrange(256)))
+    return pix.tobytes('png')
+
+
+def _image_positions(outline, spec):
+    """
+    Outline entries followed by an image
+    """
+    count = min(spec.images, len(outline))
+    return set(range(0, len(outline), max(1, len(outline) // count))[:count]) if count else set()
+
+
+def build_docx(path, rng, spec, seed):
+    document = Document()
+    outline = _outline(rng, spec)
+    positions = _image_positions(outline, spec)
+    for i, (level, heading, paragraphs) in enumerate(outline):
+        document.add_heading(heading, level=level)
+        for paragraph in paragraphs:
+            document.add_paragraph(paragraph)
+        if i in positions:
+            document.add_picture(io.BytesIO(synthetic_image(seed * 1000 + i)), width=Inches(3))
+    document.save(path)
+
+
+def build_pptx(path, rng, spec, seed):
+    presentation = Presentation()
+    outline = _outline(rng, spec)
+    positions = _image_positions(outline, spec)
+    for i, (level, heading, paragraphs) in enumerate(outline):
+        slide = presentation.slides.add_slide(presentation.slide_layouts[1])
+        slide.shapes.title.text = heading
+        slide.placeholders[1].text = '\n'.join(paragraph[:200] for paragraph in paragraphs) or heading
+        if i in positions:
+            slide.shapes.add_picture(io.BytesIO(synthetic_image(seed * 1000 + i)), PptxInches(6), PptxInches(4),
+                                     width=PptxInches(3))
+    presentation.save(path)
+
+
+def build_xlsx(path, rng, spec, seed):
+    workbook = Workbook()
+    workbook.remove(workbook.active)
+    for sheet_index in range(spec.sections):
+        sheet = workbook.create_sheet(f"Sheet{sheet_index + 1}")
+        sheet.append(['Region', 'Metric', 'Quarter', 'Value', 'Comment'])
+        for row in range(spec.paragraphs * 10):
+            sheet.append([rng.choice(_WORDS), rng.choice(_WORDS), f"Q{row % 4 + 1}", rng.randint(0, 100000),
+                          _sentence(rng, 6)])
+        if sheet_index < spec.images:
+            sheet.add_image(XlsxImage(io.BytesIO(synthetic_image(seed * 1000 + sheet_index))), 'G2')
+    workbook.save(path)
+
+
+def build_pdf(path, rng, spec, seed):
+    document = fitz.open()
+    outline = _outline(rng, spec)
+    positions = _image_positions(outline, spec)
+    page = document.new_page()
+    y = 72
+    for i, (level, heading, paragraphs) in enumerate(outline):
+        blocks = [(heading, 18 if level == 1 else 14)] + [(paragraph, 10) for paragraph in paragraphs]
+        for text, size in blocks:
+            rect = fitz.Rect(72, y, page.rect.width - 72, page.rect.height - 72)
+            # Nothing is written when the text does not fit, it then starts a new page
+            left = page.insert_textbox(rect, text, fontsize=size)
+            if left < 0:
+                page = document.new_page()
+                y = 72
+                rect = fitz.Rect(72, y, page.rect.width - 72, page.rect.height - 72)
+                left = page.insert_textbox(rect, text, fontsize=size)
+            y += rect.height - left + size * 0.5
+        if i in positions:
+            if y + 200 > page.rect.height - 72:
+                page = document.new_page()
+                y = 72
+            page.insert_image(fitz.Rect(72, y, 339, y + 200), stream=synthetic_image(seed * 1000 + i))
+            y += 210
+    document.save(path)
+    document.close()
+
+
+_BUILDERS = {'docx': build_docx, 'pptx': build_pptx, 'xlsx': build_xlsx, 'pdf': build_pdf}
+
+
+def build_corpus(output_dir, files, formats=FORMATS, spec=None, seed=0):
+    """
+    Write a synthetic corpus and the zip archive uploaded by the benchmark
+    :param output_dir: Directory of the documents
+    :param files: Number of documents, spread evenly over the formats
+    :param formats: Document formats to generate
+    :param spec: CorpusSpec of every document
+    :param seed: The same seed always generates the same corpus
+    :return: (archive path, document paths)
+    """
+    spec = spec or CorpusSpec()
+    os.makedirs(output_dir, exist_ok=True)
+    paths = []
+    for i in range(files):
+        file_format = formats[i % len(formats)]
+        path = os.path.join(output_dir, f"benchmark_{i:04d}.{file_format}")
+        _BUILDERS[file_format](path, random.Random(seed * 100003 + i), spec, seed * 100003 + i)
+        paths.append(path)
+
+    archive_path = os.path.join(output_dir, 'corpus.zip')
+    with zipfile.ZipFile(archive_path, 'w', zipfile.ZIP_DEFLATED) as archive:
+        for path in paths:
+            archive.write(path, os.path.basename(path))
+    return archive_path, paths
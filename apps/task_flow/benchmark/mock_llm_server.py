@@ -0,0 +1,313 @@
+import json
+import logging
+import math
+import random
+import re
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+logging = logging.getLogger('mock_llm_server')
+
+_HEADING_LINE = re.compile(r'^(?:(\d+):\s*)?(#{1,6}\s+\S.*)$')
+_CHUNK_ID = re.compile(r'"id":\s*(\d+)')
+# Characters of the answer sent in one stream chunk
+STREAM_CHUNK_SIZE = 16
+
+
+def parse_latency(spec):
+    """
+    Latency distribution of the mock answers
+    :param spec: constant:SECONDS, uniform:LOW,HIGH, exponential:MEAN or lognormal:MEDIAN,SIGMA
+    :return: Function without parameters returning a latency in seconds
+    """
+    kind, _, values = spec.partition(':')
+    try:
+        args = [float(value) for value in values.split(',')] if values else []
+    except ValueError:
+        raise ValueError(f"Invalid latency distribution: {spec}")
+    if kind == 'constant' and len(args) == 1:
+        return lambda: args[0]
+    if kind == 'uniform' and len(args) == 2:
+        return lambda: random.uniform(args[0], args[1])
+    if kind == 'exponential' and len(args) == 1:
+        return lambda: random.expovariate(1 / args[0]) if args[0] > 0 else 0.0
+    if kind == 'lognormal' and len(args) == 2:
+        return lambda: random.lognormvariate(math.log(args[0]), args[1]) if args[0] > 0 else 0.0
+    raise ValueError(f"Invalid latency distribution: {spec}")
+
+
+class MockBehaviour:
+    """
+    How the mock server answers
+    latency: Function returning the seconds an answer takes, streamed answers spread it over their chunks
+    error_rate: Share of requests answered with a 500 error
+    rate_limit_rate: Share of requests answered with a 429 error
+    max_concurrency: Requests in flight above this number are answered with a 429 error, 0 means no limit
+    retry_after: Retry-After seconds of the 429 answers
+    """
+
+    def __init__(self, latency=None, error_rate=0.0, rate_limit_rate=0.0, max_concurrency=0, retry_after=1):
+        self.latency = latency or (lambda: 0.0)
+        self.error_rate = error_rate
+        self.rate_limit_rate = rate_limit_rate
+        self.max_concurrency = max_concurrency
+        self.retry_after = retry_after
+
+
+class MockStats:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.counters = {}
+        self.in_flight = 0
+        self.max_in_flight = 0
+
+    def count(self, name):
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + 1
+
+    def enter(self):
+        with self._lock:
+            self.in_flight += 1
+            self.max_in_flight = max(self.max_in_flight, self.in_flight)
+            return self.in_flight
+
+    def leave(self):
+        with self._lock:
+            self.in_flight -= 1
+
+    def to_dict(self):
+        with self._lock:
+            return dict(self.counters, in_flight=self.in_flight, max_in_flight=self.max_in_flight)
+
+
+def _message_text(messages):
+    texts = []
+    images = 0
+    for message in messages or []:
+        content = message.get('content')
+        if isinstance(content, str):
+            texts.append(content)
+            continue
+        for part in content or []:
+            if part.get('type') == 'text':
+                texts.append(part.get('text', ''))
+            elif part.get('type') == 'image_url':
+                images += 1
+    return '\n'.join(texts), images
+
+
+def mock_answer(messages, stream):
+    """
+    Plausible answer for the pipeline stage that sent the messages.
+    Image requests get a description, batch label requests the labels json of every shard id, streamed requests are
+    title hierarchy reasoning and get the markdown headings of the prompt, anything else a short label.
+    """
+    text, images = _message_text(messages)
+    if images:
+        return f"Mock description of {images} image(s)."
+    if '"labels"' in text or "'labels'" in text:
+        ids = sorted({int(chunk_id) for chunk_id in _CHUNK_ID.findall(text)})
+        return json.dumps({'labels': [{'id': chunk_id, 'labels': [f'label {chunk_id}']} for chunk_id in ids]})
+    if stream:
+        titles = []
+        for i, line in enumerate(text.split('\n')):
+            match = _HEADING_LINE.match(line.strip())
+            if match:
+                titles.append({'text': match.group(2), 'lines': [int(match.group(1) or i + 1)]})
+        return json.dumps({'content': titles}, ensure_ascii=False)
+    return 'mock label'
+
+
+def _usage(messages, answer):
+    text, images = _message_text(messages)
+    prompt_tokens = len(text) // 2 + images * 1000
+    completion_tokens = len(answer) // 2
+    return {'prompt_tokens': prompt_tokens, 'completion_tokens': completion_tokens,
+            'total_tokens': prompt_tokens + completion_tokens}
+
+
+class MockLLMHandler(BaseHTTPRequestHandler):
+    """
+    OpenAI compatible endpoints used by the pipeline: chat completions, streaming or not, and file upload
+    """
+    protocol_version = 'HTTP/1.1'
+    server_version = 'MockLLM/1.0'
+
+    def log_message(self, format, *args):
+        logging.debug(format % args)
+
+    @property
+    def behaviour(self):
+        return self.server.behaviour
+
+    @property
+    def stats(self):
+        return self.server.stats
+
+    def _route(self):
+        path = self.path.split('?', 1)[0].rstrip('/')
+        return path[len('/v1'):] if path.startswith('/v1/') else path
+
+    def _read_body(self):
+        length = int(self.headers.get('Content-Length') or 0)
+        return self.rfile.read(length) if length else b''
+
+    def _send_json(self, status, body, headers=None):
+        data = json.dumps(body).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(data)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _send_error(self, status, message, headers=None):
+        self._send_json(status, {'error': {'message': message, 'type': 'mock_error', 'code': status}}, headers)
+
+    def _injected_error(self, in_flight):
+        behaviour = self.behaviour
+        if behaviour.max_concurrency and in_flight > behaviour.max_concurrency:
+            self.stats.count('rate_limited')
+            self._send_error(429, 'Too many concurrent requests.', {'Retry-After': str(behaviour.retry_after)})
+            return True
+        if random.random() < behaviour.rate_limit_rate:
+            self.stats.count('rate_limited')
+            self._send_error(429, 'Rate limit reached.', {'Retry-After': str(behaviour.retry_after)})
+            return True
+        if random.random() < behaviour.error_rate:
+            self.stats.count('errors')
+            self._send_error(500, 'Injected server error.')
+            return True
+        return False
+
+    def do_GET(self):
+        if self._route() == '/stats':
+            self._send_json(200, self.stats.to_dict())
+        else:
+            self._send_error(404, 'Not found.')
+
+    def do_POST(self):
+        body = self._read_body()
+        route = self._route()
+        if route not in ('/chat/completions', '/files'):
+            self._send_error(404, 'Not found.')
+            return
+        in_flight = self.stats.enter()
+        try:
+            self.stats.count('requests')
+            if self._injected_error(in_flight):
+                return
+            if route == '/files':
+                self._files(body)
+            else:
+                self._chat_completions(body)
+        finally:
+            self.stats.leave()
+
+    def _files(self, body):
+        match = re.search(rb'filename="([^"]*)"', body)
+        self.stats.count('files')
+        self._send_json(200, {
+            'id': f'file-mock-{uuid.uuid4().hex}',
+            'object': 'file',
+            'bytes': len(body),
+            'created_at': int(time.time()),
+            'filename': match.group(1).decode('utf-8', 'replace') if match else 'upload',
+            'purpose': 'file-extract',
+            'status': 'processed',
+        })
+
+    def _chat_completions(self, body):
+        try:
+            request = json.loads(body or b'{}')
+        except json.JSONDecodeError:
+            self._send_error(400, 'Invalid json body.')
+            return
+        stream = bool(request.get('stream'))
+        messages = request.get('messages', [])
+        answer = mock_answer(messages, stream)
+        latency = max(0.0, self.behaviour.latency())
+        completion_id = f'chatcmpl-mock-{uuid.uuid4().hex}'
+        model = request.get('model', 'mock')
+        usage = _usage(messages, answer)
+        if not stream:
+            time.sleep(latency)
+            self.stats.count('completions')
+            self._send_json(200, {
+                'id': completion_id,
+                'object': 'chat.completion',
+                'created': int(time.time()),
+                'model': model,
+                'choices': [{'index': 0, 'message': {'role': 'assistant', 'content': answer},
+                             'finish_reason': 'stop'}],
+                'usage': usage,
+            })
+            return
+
+        self.stats.count('streams')
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/event-stream')
+        self.send_header('Transfer-Encoding', 'chunked')
+        self.end_headers()
+        pieces = [answer[i:i + STREAM_CHUNK_SIZE] for i in range(0, len(answer), STREAM_CHUNK_SIZE)] or ['']
+        interval = latency / len(pieces)
+        try:
+            for piece in pieces:
+                time.sleep(interval)
+                self._send_event(self._stream_chunk(completion_id, model, {'content': piece}, None))
+            self._send_event(self._stream_chunk(completion_id, model, {}, 'stop'))
+            if (request.get('stream_options') or {}).get('include_usage'):
+                self._send_event(dict(self._stream_chunk(completion_id, model, None, None), usage=usage))
+            self._send_chunk(b'data: [DONE]\n\n')
+            self._send_chunk(b'')
+        except (BrokenPipeError, ConnectionResetError):
+            # The client closed the stream early, as the title reasoning does once the list is complete
+            self.stats.count('streams_closed_early')
+            self.close_connection = True
+
+    @staticmethod
+    def _stream_chunk(completion_id, model, delta, finish_reason):
+        return {
+            'id': completion_id,
+            'object': 'chat.completion.chunk',
+            'created': int(time.time()),
+            'model': model,
+            'choices': [] if delta is None else [{'index': 0, 'delta': delta, 'finish_reason': finish_reason}],
+        }
+
+    def _send_event(self, data):
+        self._send_chunk(f"data: {json.dumps(data, ensure_ascii=False)}\n\n".encode('utf-8'))
+
+    def _send_chunk(self, data):
+        self.wfile.write(f"{len(data):x}\r\n".encode('ascii') + data + b'\r\n')
+        self.wfile.flush()
+
+
+class MockLLMServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address, behaviour=None):
+        super().__init__(address, MockLLMHandler)
+        self.behaviour = behaviour or MockBehaviour()
+        self.stats = MockStats()
+
+    @property
+    def base_url(self):
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}/v1"
+
+
+def start_mock_server(host='127.0.0.1', port=0, behaviour=None):
+    """
+    Serve the mock endpoints from a background thread
+    :param port: 0 picks a free port, see MockLLMServer.base_url
+    :return: MockLLMServer, stopped with shutdown()
+    """
+    server = MockLLMServer((host, port), behaviour)
+    thread = threading.Thread(target=server.serve_forever, name='mock-llm-server', daemon=True)
+    thread.start()
+    logging.info(f"Mock LLM server listening. base url: {server.base_url}")
+    return server
@@ -0,0 +1,223 @@
+import asyncio
+import json
+import logging
+import os
+import resource
+import tempfile
+import time
+import tracemalloc
+from collections import Counter
+from contextlib import contextmanager
+
+from django.db import connection
+from django.test import Client
+from django.test.utils import setup_test_environment, teardown_test_environment
+
+from application.models import chunk_settings
+from processor.models import model_settings
+from processor.token_accounting import TOKEN_LEDGER
+from task_flow.benchmark.corpus import FORMATS, CorpusSpec, build_corpus
+from task_flow.benchmark.mock_llm_server import MockBehaviour, start_mock_server
+from task_flow.models import FileTask, JOB_FINISHED, JOB_FAILED
+
+logging = logging.getLogger('benchmark')
+
+API_PREFIX = '/api/task'
+# Status of a FileTask whose shards are labeled
+FILE_STATUS_DONE = 2
+JOB_POLL_SECONDS = 0.5
+JOB_TIMEOUT = 3600
+
+
+class BenchmarkOptions:
+    """
+    files: Documents in the corpus
+    formats: Document formats of the corpus
+    spec: CorpusSpec of every document
+    mock_url: Base url of a running mock server, an embedded one is started when it is None
+    behaviour: MockBehaviour of the embedded mock server
+    model_concurrency: max_concurrency of the benchmark models
+    picture_reasoning: Whether the images are described
+    use_current_db: Run against the configured database instead of a throwaway test database
+    trace_memory: Track the peak of the Python allocations of every stage, slows the run down
+    corpus_dir: Directory of the corpus, a temporary one when it is None
+    seed: Seed of the corpus
+    """
+
+    def __init__(self, files=8, formats=None, spec=None, mock_url=None, behaviour=None, model_concurrency=5,
+                 picture_reasoning=True, use_current_db=False, trace_memory=False, corpus_dir=None, seed=0):
+        self.files = files
+        self.formats = formats
+        self.spec = spec or CorpusSpec()
+        self.mock_url = mock_url
+        self.behaviour = behaviour or MockBehaviour()
+        self.model_concurrency = model_concurrency
+        self.picture_reasoning = picture_reasoning
+        self.use_current_db = use_current_db
+        self.trace_memory = trace_memory
+        self.corpus_dir = corpus_dir
+        self.seed = seed
+
+
+def _max_rss_mb(who):
+    # ru_maxrss is in kilobytes on Linux
+    return round(resource.getrusage(who).ru_maxrss / 1024, 1)
+
+
+class StageRecorder:
+    """
+    Wall time and memory peaks of the benchmark stages
+    """
+
+    def __init__(self, trace_memory):
+        self.trace_memory = trace_memory
+        self.stages = {}
+
+    @contextmanager
+    def stage(self, name):
+        if self.trace_memory:
+            tracemalloc.reset_peak()
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            stage = {
+                'seconds': round(time.perf_counter() - start, 3),
+                'max_rss_mb': _max_rss_mb(resource.RUSAGE_SELF),
+            }
+            if self.trace_memory:
+                stage['python_peak_mb'] = round(tracemalloc.get_traced_memory()[1] / 1024 / 1024, 1)
+            self.stages[name] = stage
+            logging.info(f"Benchmark stage finished. stage: {name} {stage}")
+
+
+def _result(response, stage):
+    try:
+        body = json.loads(response.content)
+    except ValueError:
+        raise RuntimeError(f"{stage} answered {response.status_code}: {response.content[:200]!r}")
+    if body.get('code') != 200:
+        raise RuntimeError(f"{stage} failed: {body.get('message')}")
+    return body.get('data')
+
+
+def _register_models(base_url, model_concurrency):
+    for name, model_type in (('benchmark-llm', 0), ('benchmark-vl', 1)):
+        model_settings.create_model(name=name, model_name=name, api_key='mock', base_url=base_url, enable=True,
+                                    default_model=True, model_type=model_type, timeout=60, max_retries=3,
+                                    max_concurrency=model_concurrency)
+
+
+def _configure(options, base_url):
+    _register_models(base_url, options.model_concurrency)
+    # The row is created on the first read
+    asyncio.run(chunk_settings.get_chunk_settings())
+    chunk_settings.update_chunk_settings({
+        'picture_reasoning_model_id': 0,
+        'title_reasoning_model_id': 0,
+        'enabled_picture_reasoning': options.picture_reasoning,
+    })
+
+
+def _drive(client, archive_path, recorder):
+    with recorder.stage('upload'):
+        with open(archive_path, 'rb') as archive:
+            upload = _result(client.post(f'{API_PREFIX}/get_file_list/', {'file': archive}), 'get_file_list')
+    suffix = upload['suffix']
+    with recorder.stage('conversion'):
+        job = _result(client.get(f'{API_PREFIX}/document_format_conversion/', {'suffix': suffix}),
+                      'document_format_conversion')
+        _wait_for_job(client, job['job_id'])
+    with recorder.stage('combination'):
+        _result(client.get(f'{API_PREFIX}/document_combination/', {'folder_path': suffix}), 'document_combination')
+    return suffix
+
+
+def _wait_for_job(client, job_id, timeout=JOB_TIMEOUT):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        job = _result(client.get(f'{API_PREFIX}/query_conversion_job/', {'job_id': job_id}), 'query_conversion_job')
+        if job['job_status'] in (JOB_FINISHED, JOB_FAILED):
+            return job
+        time.sleep(JOB_POLL_SECONDS)
+    raise RuntimeError(f"Conversion job {job_id} did not finish within {timeout}s")
+
+
+def _mock_stats(mock_url):
+    from urllib.request import urlopen
+    try:
+        with urlopen(f"{mock_url.rstrip('/')}/stats", timeout=5) as response:
+            return json.loads(response.read())
+    except OSError as e:
+        logging.warning(f"Mock server stats unavailable. e: {e}")
+        return None
+
+
+def _report(paths, suffix, recorder, server, mock_url):
+    statuses = Counter(FileTask.objects.filter(file_suffix=suffix).values_list('file_status', flat=True))
+    conversion_seconds = recorder.stages['conversion']['seconds']
+    return {
+        'files': len(paths),
+        'formats': dict(Counter(os.path.splitext(path)[1][1:] for path in paths)),
+        'files_done': statuses.get(FILE_STATUS_DONE, 0),
+        'file_statuses': dict(statuses),
+        'files_per_minute': round(len(paths) / conversion_seconds * 60, 2) if conversion_seconds else None,
+        'stages': recorder.stages,
+        'model_stages': TOKEN_LEDGER.batch_usage(suffix),
+        'mock_server': server.stats.to_dict() if server is not None else _mock_stats(mock_url),
+        'max_rss_mb': _max_rss_mb(resource.RUSAGE_SELF),
+        # PDF workers and other child processes
+        'children_max_rss_mb': _max_rss_mb(resource.RUSAGE_CHILDREN),
+    }
+
+
+def _run(options, corpus_dir):
+    recorder = StageRecorder(options.trace_memory)
+    with recorder.stage('corpus'):
+        archive_path, paths = build_corpus(corpus_dir, options.files, tuple(options.formats or FORMATS), options.spec,
+                                           options.seed)
+
+    server = None
+    mock_url = options.mock_url
+    if mock_url is None:
+        server = start_mock_server(behaviour=options.behaviour)
+        mock_url = server.base_url
+    try:
+        _configure(options, mock_url)
+        suffix = _drive(Client(), archive_path, recorder)
+        return _report(paths, suffix, recorder, server, mock_url)
+    finally:
+        if server is not None:
+            server.shutdown()
+            server.server_close()
+
+
+def run_benchmark(options):
+    """
+    Drive get_file_list, document_format_conversion and document_combination over a synthetic corpus with the model
+    calls served by the mock server
+    :param options: BenchmarkOptions
+    :return: Report dict with files per minute, stage timings, model stage latencies and memory peaks
+    """
+    if options.trace_memory:
+        tracemalloc.start()
+    old_name = None
+    if not options.use_current_db:
+        setup_test_environment()
+        old_name = connection.settings_dict['NAME']
+        connection.creation.create_test_db(verbosity=0, autoclobber=True)
+    try:
+        if options.corpus_dir:
+            return _run(options, options.corpus_dir)
+        with tempfile.TemporaryDirectory(prefix='diankuibi-benchmark-') as corpus_dir:
+            return _run(options, corpus_dir)
+    finally:
+        if old_name is not None:
+            try:
+                connection.creation.destroy_test_db(old_name, verbosity=0)
+            except Exception as e:
+                # Pooled connections of the conversion threads may still be open, the next run clobbers the database
+                logging.warning(f"Test database not dropped. e: {e}")
+            teardown_test_environment()
+        if options.trace_memory:
+            tracemalloc.stop()
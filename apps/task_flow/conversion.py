@@ -0,0 +1,392 @@
+import ast
+import asyncio
+import logging
+import os
+import re
+from html import unescape
+
+import aiofiles
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from application.models import chunk_settings
+from common.str_transcoding import str_decrypt
+from file_weaver.converter.markdown.markdown_splitter import markdown_sharding
+from processor.models import model_settings
+from processor.pdf_extractor import extract_pdf
+from processor.client_pool import run_async
+from processor.image_dedup import DedupStats
+from processor.markdown_converter import convert_markdown
+from processor.processor import describe_images, document_understanding_async, extract_images
+from processor.prompt_templates import BASE_IMAGE_PROMPT_QIAN_WEN_LONG, BASE_IMAGE_PROMPT_VL
+from processor.request_broker import PRIORITY_BULK, PRIORITY_INTERACTIVE, set_request_priority
+from processor.structure_inference import infer_headings
+from processor.token_accounting import TOKEN_LEDGER, set_usage_scope
+from task_flow.models import ImageInfo, FileTask, FILE_STAGE_EXTRACTING, FILE_STAGE_IMAGES, FILE_STAGE_TITLES, \
+    FILE_STAGE_SHARDING, FILE_STAGE_DONE, FILE_STAGE_FAILED
+from task_flow.leases import LeaseLost
+from task_flow.models.file_result import FileResult
+
+logging = logging.getLogger('conversion')
+
+SUPPORTED_EXTENSIONS = ('.doc', '.docx', '.txt', '.html', '.xls', '.xlsx', '.csv', '.ppt', '.pptx', '.pdf')
+
+
+class ConversionError(Exception):
+    """
+    The file can not be converted, the message is returned to the user
+    """
+
+
+def get_base_path():
+    current_script_dir = os.path.dirname(os.path.abspath(__file__))
+    project_root_parent = os.path.dirname(os.path.dirname(os.path.dirname(current_script_dir)))
+    return os.path.join(project_root_parent, "fileList")
+
+
+def replace_titles(file_context, md_content):
+    # Create title mapping: key is the text part of the title (without '#'), value is the full title
+    title_map = {}
+    for item in file_context["content"]:
+        raw_text = unescape(item["text"])
+        title_text = raw_text.lstrip('#').replace(' ', '').replace('\xa0', '').replace(r'\xa0', '').replace(u'\xa0', '')
+        title_map[title_text] = raw_text
+
+    # Process content line by line
+    lines = md_content.split('\n')
+    updated_lines = []
+
+    # Record the replaced titles
+    matched_titles = set()  # Record the replaced titles
+
+    for line in lines:
+        # Headings the converter already marked, e.g. of styled docx paragraphs, match without their '#'
+        stripped_line = re.sub(r'\s+', '',
+                               line.replace('*', '').replace('\xa0', '').replace(r'\xa0', '').replace(u'\xa0', ''))
+        stripped_line = stripped_line.lstrip('#')
+        if stripped_line in title_map:
+            matched_titles.add(stripped_line)
+            updated_lines.append(title_map[stripped_line])
+        else:
+            updated_lines.append(line)
+
+    # Find unmatched titles
+    unmatched_titles = {k: v for k, v in title_map.items() if k not in matched_titles}
+
+    # If there are no unmatched titles, return the result directly
+    if not unmatched_titles:
+        return '\n'.join(updated_lines)
+
+    # Insert unmatched title
+    final_lines = updated_lines.copy()
+
+    # Traverse each unmatched title and attempt to insert
+    for title_text, full_title in unmatched_titles.items():
+        inserted = False
+
+        # Determine the level of this title, such as # being 1, # # being 2, and so on
+        level = len(full_title) - len(full_title.lstrip('#'))
+
+        # Find insertion position: Insert in front of a title one level lower than it
+        for i, line in enumerate(final_lines):
+            if line.startswith('#' * (level + 1) + ' '):  # A title one level lower than the current title
+                final_lines.insert(i, full_title)
+                inserted = True
+                break
+
+        # If no lower level title is found, add it to the end
+        if not inserted:
+            final_lines.append(full_title)
+
+    # Return the merged content
+    return '\n'.join(final_lines)
+
+
+async def update_file_status(file_id, file_path, successfully, sharding_time):
+
+    @sync_to_async
+    def update_status_sync():
+        FileTask.objects.filter(id=file_id).update(file_status=2)
+
+    if successfully:
+        await update_status_sync()
+    else:
+        logging.error(f'File content format error. file id: {file_id}')
+
+
+def set_file_stage(file_id, stage, error_message=None):
+    """
+    Record the conversion stage a file entered
+    """
+    fields = {'stage': stage, 'stage_updated_at': timezone.now()}
+    if error_message is not None:
+        fields['error_message'] = error_message[:1000]
+    FileTask.objects.filter(id=file_id).update(**fields)
+
+
+class ConversionOptions:
+    """
+    Settings of one conversion job, read once when the job starts so that every file is converted the same way
+    """
+
+    def __init__(self, enabled_picture_reasoning, enabled_heading_inference, picture_reasoning_prompt,
+                 title_hierarchy_reasoning_prompt, picture_reasoning_model_id, title_reasoning_model_id,
+                 request_priority):
+        self.enabled_picture_reasoning = enabled_picture_reasoning
+        self.enabled_heading_inference = enabled_heading_inference
+        self.picture_reasoning_prompt = picture_reasoning_prompt
+        self.title_hierarchy_reasoning_prompt = title_hierarchy_reasoning_prompt
+        self.picture_reasoning_model_id = picture_reasoning_model_id
+        self.title_reasoning_model_id = title_reasoning_model_id
+        self.request_priority = request_priority
+
+
+def load_conversion_options(file_count):
+    """
+    :param file_count: Files of the job, single file jobs are interactive and their model requests are admitted
+    before those of archive batches
+    """
+    settings = asyncio.run(chunk_settings.get_chunk_settings())
+    picture_reasoning_prompt = settings.picture_reasoning_prompt
+    if not picture_reasoning_prompt:
+        picture_reasoning_prompt = str_decrypt(BASE_IMAGE_PROMPT_VL)
+    title_hierarchy_reasoning_prompt = settings.title_hierarchy_reasoning_prompt
+    if not title_hierarchy_reasoning_prompt:
+        title_hierarchy_reasoning_prompt = str_decrypt(BASE_IMAGE_PROMPT_QIAN_WEN_LONG)
+    model = asyncio.run(model_settings.get_model_byid(settings.picture_reasoning_model_id))
+    model_title = asyncio.run(model_settings.get_model_byid(settings.title_reasoning_model_id))
+    return ConversionOptions(
+        enabled_picture_reasoning=settings.enabled_picture_reasoning,
+        enabled_heading_inference=settings.enabled_heading_inference,
+        picture_reasoning_prompt=picture_reasoning_prompt,
+        title_hierarchy_reasoning_prompt=title_hierarchy_reasoning_prompt,
+        picture_reasoning_model_id=None if model is None else model.model_name,
+        title_reasoning_model_id=None if model_title is None else model_title.model_name,
+        request_priority=PRIORITY_INTERACTIVE if file_count == 1 else PRIORITY_BULK,
+    )
+
+
+def _insert_image_descriptions(file_path, md_content):
+    # Retrieve the image information of the file from the database
+    document_name = os.path.basename(file_path)
+    image_infos = ImageInfo.objects.filter(document_name=document_name, successfully=True).order_by('id')
+
+    # Insert image description into Markdown document
+    for info in image_infos:
+        context_text = info.context_text
+        image_description = info.image_description
+        try:
+            context_dict = ast.literal_eval(context_text)
+            # Extract key text information
+            content = context_dict.get('content', '')
+            if content in md_content:
+                index = md_content.index(content)
+                insert_index = index + len(content)
+                # Insert image description after contextual content
+                md_content = md_content[:insert_index] + f"\n\n{image_description}\n\n" + md_content[insert_index:]
+            else:
+                # If no matching context can be found, insert a description at the end of the document
+                md_content += f"\n\n{image_description}\n\n"
+        except (SyntaxError, ValueError):
+            continue
+    return md_content
+
+
+class ExtractedDocument:
+    """
+    Output of the CPU stage of a file, handed to its model stage
+    image_records: Extracted images with their context, None when picture reasoning is disabled
+    inference: HeadingInference of the document, None when it is disabled or the format has no usable structure
+    """
+    __slots__ = ('file', 'file_path', 'output_path', 'md_content', 'image_records', 'inference')
+
+    def __init__(self, file, file_path, output_path, md_content, image_records, inference):
+        self.file = file
+        self.file_path = file_path
+        self.output_path = output_path
+        self.md_content = md_content
+        self.image_records = image_records
+        self.inference = inference
+
+
+def extract_document(file, options):
+    """
+    CPU stage of a file: text, embedded images and heading inference, without any model call
+    :param file: FileTask
+    :param options: ConversionOptions of the job
+    :raise ConversionError: The file can not be converted
+    """
+    file_name = file.new_file_name
+    base_path = get_base_path()
+    fixed_path = os.path.join(base_path, file.file_suffix)
+    file_path = os.path.join(fixed_path, file_name)
+    file_extension = os.path.splitext(file_name)[1]
+    if file_extension not in SUPPORTED_EXTENSIONS:
+        raise ConversionError("未知文件格式 Unknown file format.")
+
+    # Extract file content
+    set_file_stage(file.id, FILE_STAGE_EXTRACTING)
+    # Images and font statistics already extracted together with the text
+    media = None
+    pdf_font_lines = None
+    fitz_text = file_extension == '.pdf' and getattr(settings, 'DOCUMENT_EXTRACTION', {}).get('PDF_FITZ_TEXT', False)
+    if fitz_text or (file_extension == '.pdf' and (options.enabled_picture_reasoning or
+                                                   options.enabled_heading_inference)):
+        # Images and font statistics come from one page parallel parse, its text only when PDF_FITZ_TEXT is set.
+        # The parse is skipped when none of them is used.
+        md_content, media, pdf_font_lines = extract_pdf(file_path)
+    if not fitz_text:
+        md_content, usage = convert_markdown(file_path)
+        FileTask.objects.filter(id=file.id).update(extract_cpu_seconds=round(usage.cpu_seconds, 3),
+                                                   extract_rss_mb=round(usage.rss_mb, 1))
+
+    # Save temporary files
+    temporary_path = os.path.join(fixed_path, "temporaryMd", file_name)
+    output_path = f"{os.path.splitext(temporary_path)[0]}.md"
+    os.makedirs(os.path.dirname(output_path), exist_ok=True)
+
+    context_records = None
+    if options.enabled_picture_reasoning:
+        output_dir = os.path.join(fixed_path, "extracted_images")
+        os.makedirs(output_dir, exist_ok=True)
+        try:
+            context_records = extract_images(file_path, output_dir, media=media)[1]
+        except Exception as e:
+            raise ConversionError(f"图片提取和处理失败 Image extraction and processing failed.: {str(e)}")
+
+    # Documents whose styles or fonts state the hierarchy skip the title model
+    inference = infer_headings(file_path, pdf_font_lines) if options.enabled_heading_inference else None
+    return ExtractedDocument(file, file_path, output_path, md_content, context_records, inference)
+
+
+def _titles_reasoned(file_id):
+    # Change task status
+    FileTask.objects.filter(id=file_id).update(file_status=1)
+    set_file_stage(file_id, FILE_STAGE_SHARDING)
+
+
+def _images_described(file_id, stats):
+    # Saved with the file, the web process has no access to the counters of the workers
+    FileTask.objects.filter(id=file_id).update(images=stats.images,
+                                               exact_duplicate_images=stats.exact_duplicates,
+                                               near_duplicate_images=stats.near_duplicates,
+                                               image_model_calls=stats.model_calls)
+
+
+def _save_usage(file, stage, error_message):
+    """
+    Save the usage of the attempt and the stage it ended in, if the worker still holds the lease of the file
+    :return: Whether the lease was still held, a requeued file belongs to the worker that claimed it again
+    """
+    # The usage of the attempt, the web process only sees what is saved with the file
+    usage = TOKEN_LEDGER.task_usage(file.id)['total']
+    return FileTask.objects.filter(id=file.id, lease_owner=file.lease_owner).update(
+        input_tokens=usage['input_tokens'],
+        output_tokens=usage['output_tokens'],
+        model_calls=usage['calls'],
+        truncated_calls=usage['truncated_calls'],
+        stage=stage,
+        stage_updated_at=timezone.now(),
+        error_message=error_message[:1000]) > 0
+
+
+def _file_converted(file, output_path):
+    with transaction.atomic():
+        if not _save_usage(file, FILE_STAGE_DONE, ''):
+            raise LeaseLost(f"Lease lost before the result was saved. file id: {file.id}")
+        # Save to database
+        file_result_name = os.path.splitext(file.new_file_name)
+        fixed = file_result_name[0]
+        FileResult.objects.create(
+            file_name=os.path.join(fixed, ".md"),
+            file_path=output_path,
+            file_suffix=file.file_suffix,
+            file_type=0
+        )
+
+
+async def understand_document(document, options):
+    """
+    Model stage of a file: image descriptions, title reasoning and shard labels
+    :param document: ExtractedDocument of the CPU stage
+    :param options: ConversionOptions of the job
+    :raise ConversionError: The file can not be converted
+    """
+    file = document.file
+    set_request_priority(options.request_priority)
+    TOKEN_LEDGER.reset_task(file.id)
+    set_usage_scope(file.id, file.file_suffix)
+    md_content = document.md_content
+
+    if document.image_records is not None:
+        await sync_to_async(set_file_stage)(file.id, FILE_STAGE_IMAGES)
+        stats = DedupStats()
+        try:
+            await describe_images(os.path.basename(document.file_path), document.image_records,
+                                  options.picture_reasoning_prompt, options.picture_reasoning_model_id, stats)
+        except Exception as e:
+            raise ConversionError(f"图片提取和处理失败 Image extraction and processing failed.: {str(e)}")
+        await sync_to_async(_images_described)(file.id, stats)
+        md_content = await sync_to_async(_insert_image_descriptions)(document.file_path, md_content)
+
+    async with aiofiles.open(document.output_path, 'w', encoding='utf-8') as f:
+        await f.write(md_content)
+    await sync_to_async(set_file_stage)(file.id, FILE_STAGE_TITLES)
+    inference = document.inference
+    if inference is not None and inference.confident:
+        file_context = inference.to_context()
+    else:
+        title_parser = await document_understanding_async(document.output_path,
+                                                          options.title_hierarchy_reasoning_prompt,
+                                                          options.title_reasoning_model_id)
+        file_context = title_parser.to_context()
+    combined_article = replace_titles(file_context, md_content)
+    async with aiofiles.open(document.output_path, 'w', encoding='utf-8') as f:
+        await f.write(combined_article)
+    await sync_to_async(_titles_reasoned)(file.id)
+    # Document knowledge extraction
+    await markdown_sharding(document.output_path, file.id, update_file_status)
+    await sync_to_async(_file_converted)(file, document.output_path)
+
+
+def convert_file(file, options):
+    """
+    Convert one uploaded file to markdown, reason its titles and label its shards, one stage after the other.
+    The stage the file is in is written to FileTask.stage as it progresses.
+    :param file: FileTask
+    :param options: ConversionOptions of the job
+    :raise ConversionError: The file can not be converted
+    """
+    run_async(understand_document(extract_document(file, options), options))
+
+
+def record_failure(file, e):
+    """
+    Record the error of a failed conversion on the FileTask, together with the tokens the attempt used
+    """
+    if isinstance(e, LeaseLost):
+        logging.warning(f"{e}")
+        return
+    if isinstance(e, ConversionError):
+        logging.error(f"File conversion failed. file id: {file.id} e: {e}")
+        error_message = str(e)
+    else:
+        logging.error(f"File processing exception. file id: {file.id} e: {e}")
+        error_message = f"文件转换失败 File conversion failed: {str(e)}"
+    if not _save_usage(file, FILE_STAGE_FAILED, error_message):
+        logging.warning(f"Lease lost before the failure was saved. file id: {file.id}")
+
+
+def run_conversion(file, options):
+    """
+    Convert a file, a failure is recorded on the FileTask instead of being raised
+    :return: Whether the file was converted
+    """
+    try:
+        convert_file(file, options)
+        return True
+    except Exception as e:
+        record_failure(file, e)
+        return False
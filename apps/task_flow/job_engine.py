@@ -0,0 +1,97 @@
+import logging
+import threading
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count
+from django.utils import timezone
+
+from task_flow.models import ConversionJob, FileTask, FILE_STAGE_QUEUED, JOB_QUEUED, JOB_RUNNING
+from task_flow.worker import ConversionWorker
+
+logging = logging.getLogger('job_engine')
+
+# The serving process converts the queued files itself
+MODE_LOCAL = 'local'
+# Only conversion_worker processes convert, the serving process queues
+MODE_WORKER = 'worker'
+
+
+class ConversionJobEngine:
+    """
+    Conversion jobs run outside of the HTTP request that submitted them.
+    Jobs and the stage of every file are persisted and the files are claimed by workers with leases, so work
+    interrupted by a restart or a dead node is picked up again by any running worker.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._worker = None
+
+    def _setting(self, name, default):
+        return getattr(settings, 'CONVERSION_JOB', {}).get(name, default)
+
+    def submit(self, file_suffix, weight=1):
+        """
+        Persist a conversion job of all files of an upload batch and queue its files.
+        A batch whose job is still queued or running is not submitted again, its files stay with the workers
+        converting them and the running job is returned.
+        :param weight: Share of the pipeline slots relative to the other jobs, see FairShareScheduler
+        :return: (ConversionJob, whether a new job was created)
+        """
+        with transaction.atomic():
+            files = FileTask.objects.filter(file_suffix=file_suffix)
+            # Locking the files of the batch serializes concurrent submits of the same batch
+            list(files.select_for_update().values_list('id', flat=True))
+            running = ConversionJob.objects.filter(file_suffix=file_suffix, job_status__in=(JOB_QUEUED, JOB_RUNNING)) \
+                .order_by('-id').first()
+            if running is not None:
+                logging.info(f"Conversion job already running, not submitted again. job id: {running.id} "
+                             f"batch: {file_suffix}")
+                return running, False
+            # A file still leased by a worker is left to it
+            files = files.filter(lease_owner='')
+            job = ConversionJob.objects.create(file_suffix=file_suffix, file_count=files.count(), weight=weight)
+            files.update(job_id=job.id, stage=FILE_STAGE_QUEUED, stage_updated_at=timezone.now(), error_message='',
+                         lease_expires_at=None, attempts=0)
+        logging.info(f"Conversion job submitted. job id: {job.id} batch: {file_suffix} files: {job.file_count}")
+        if self._setting('MODE', MODE_LOCAL) == MODE_LOCAL:
+            self.start_worker()
+        return job, True
+
+    def start_worker(self):
+        """
+        Start the conversion worker of this process, once
+        """
+        with self._lock:
+            if self._worker is None:
+                self._worker = ConversionWorker()
+                self._worker.start()
+            return self._worker
+
+    def resume_later(self):
+        """
+        Start the local worker shortly after start-up so that the work queued before the last shutdown continues,
+        from a background thread so that the app registry finishes loading first
+        """
+        if self._setting('MODE', MODE_LOCAL) != MODE_LOCAL or not self._setting('RESUME_ON_START', False):
+            return
+        timer = threading.Timer(self._setting('RESUME_DELAY', 5), self.start_worker)
+        timer.daemon = True
+        timer.start()
+
+    def stats(self):
+        """
+        Queue depth and the files held by every worker, of all nodes
+        """
+        leases = FileTask.objects.exclude(lease_owner='').values('lease_owner') \
+            .annotate(files=Count('id')).order_by('lease_owner')
+        return {
+            'mode': self._setting('MODE', MODE_LOCAL),
+            'queued_files': FileTask.objects.filter(stage=FILE_STAGE_QUEUED, lease_owner='').count(),
+            'workers': [{'owner': lease['lease_owner'], 'leased_files': lease['files']} for lease in leases],
+            'local_worker': self._worker.stats() if self._worker is not None else None,
+        }
+
+
+JOB_ENGINE = ConversionJobEngine()
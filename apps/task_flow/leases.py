@@ -0,0 +1,106 @@
+import logging
+from datetime import timedelta
+
+from django.db import transaction
+from django.db.models import F
+from django.db.models.functions import Now
+
+from task_flow.models import FileTask, FILE_STAGE_QUEUED, FILE_STAGE_DONE, FILE_STAGE_FAILED
+
+logging = logging.getLogger('leases')
+
+
+class LeaseLost(Exception):
+    """
+    The lease of a file expired and the file was requeued, the results of the worker that lost it are dropped
+    """
+
+
+def _expires(lease_seconds):
+    # Lease times come from the database clock so that the clocks of the worker nodes do not matter
+    return Now() + timedelta(seconds=lease_seconds)
+
+
+def claim_files(owner, limit, lease_seconds, job_id=None):
+    """
+    Claim queued files for a worker.
+    Rows locked by another worker are skipped instead of waited for, so any number of nodes can claim concurrently.
+    :param owner: Lease owner id of the worker
+    :param limit: Files to claim at most
+    :param lease_seconds: The files are requeued when the lease is not renewed within this time
+    :param job_id: Only claim files of this conversion job
+    :return: Claimed FileTasks
+    """
+    if limit <= 0:
+        return []
+    queued = FileTask.objects.filter(stage=FILE_STAGE_QUEUED, lease_owner='')
+    if job_id is not None:
+        queued = queued.filter(job_id=job_id)
+    with transaction.atomic():
+        ids = list(queued.select_for_update(skip_locked=True).order_by('id').values_list('id', flat=True)[:limit])
+        if not ids:
+            return []
+        # The lease_owner condition keeps the claim exclusive on databases without row locks
+        FileTask.objects.filter(id__in=ids, lease_owner='').update(lease_owner=owner,
+                                                                    lease_expires_at=_expires(lease_seconds),
+                                                                    attempts=F('attempts') + 1)
+    return list(FileTask.objects.filter(id__in=ids, lease_owner=owner).order_by('id'))
+
+
+def renew_leases(owner, file_ids, lease_seconds):
+    """
+    Heartbeat of a worker, extends the leases of the files it is converting
+    :return: Ids of the files whose lease was lost to another worker
+    """
+    if not file_ids:
+        return set()
+    FileTask.objects.filter(id__in=file_ids, lease_owner=owner).update(lease_expires_at=_expires(lease_seconds))
+    held = set(FileTask.objects.filter(id__in=file_ids, lease_owner=owner).values_list('id', flat=True))
+    return set(file_ids) - held
+
+
+def release_file(owner, file_id):
+    """
+    Release the lease of a file whose conversion ended
+    :return: Whether the worker still held the lease
+    """
+    return FileTask.objects.filter(id=file_id, lease_owner=owner).update(lease_owner='', lease_expires_at=None) > 0
+
+
+def requeue_files(owner, file_ids):
+    """
+    Hand claimed files back to the queue, e.g. when a worker stops before converting them
+    """
+    FileTask.objects.filter(id__in=file_ids, lease_owner=owner).update(stage=FILE_STAGE_QUEUED, lease_owner='',
+                                                                        lease_expires_at=None,
+                                                                        stage_updated_at=Now())
+
+
+def sweep_expired_leases(max_attempts):
+    """
+    Requeue the files of workers that stopped renewing their leases, i.e. nodes that died.
+    Files that were claimed max_attempts times are failed instead, they probably take their worker down.
+    Files whose conversion ended but whose worker did not release them are released and returned to be counted on
+    their job, their worker no longer counts them.
+    :return: (requeued FileTasks, failed FileTasks, ended FileTasks)
+    """
+    with transaction.atomic():
+        expired = list(FileTask.objects.select_for_update(skip_locked=True)
+                       .exclude(lease_owner='').filter(lease_expires_at__lt=Now()))
+        if not expired:
+            return [], [], []
+        ended = [file for file in expired if file.stage in (FILE_STAGE_DONE, FILE_STAGE_FAILED)]
+        expired = [file for file in expired if file.stage not in (FILE_STAGE_DONE, FILE_STAGE_FAILED)]
+        requeued = [file for file in expired if file.attempts < max_attempts]
+        failed = [file for file in expired if file.attempts >= max_attempts]
+        # The conversion ended but the lease was not released
+        FileTask.objects.filter(id__in=[file.id for file in ended]).update(lease_owner='', lease_expires_at=None)
+        FileTask.objects.filter(id__in=[file.id for file in requeued]).update(
+            stage=FILE_STAGE_QUEUED, lease_owner='', lease_expires_at=None, stage_updated_at=Now())
+        FileTask.objects.filter(id__in=[file.id for file in failed]).update(
+            stage=FILE_STAGE_FAILED, lease_owner='', lease_expires_at=None, stage_updated_at=Now(),
+            error_message=f"文件转换失败 File conversion failed: worker lost {max_attempts} times")
+    for file in expired:
+        logging.warning(f"Lease expired. file id: {file.id} owner: {file.lease_owner} attempts: {file.attempts} "
+                        f"{'requeued' if file.attempts < max_attempts else 'failed'}")
+    return requeued, failed, ended
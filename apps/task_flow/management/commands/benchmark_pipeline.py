@@ -0,0 +1,62 @@
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+
+from task_flow.benchmark.corpus import FORMATS, CorpusSpec
+from task_flow.benchmark.mock_llm_server import MockBehaviour, parse_latency
+from task_flow.benchmark.runner import BenchmarkOptions, run_benchmark
+
+
+class Command(BaseCommand):
+    help = ('End to end benchmark of get_file_list, document_format_conversion and document_combination over a '
+            'synthetic docx/pptx/xlsx/pdf corpus, the model calls are served by the mock LLM server. Reports files '
+            'per minute, stage timings and memory peaks. Runs in a throwaway test database unless --use-current-db.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--files', type=int, default=8, help='Documents in the corpus')
+        parser.add_argument('--formats', default=','.join(FORMATS), help='Comma separated document formats')
+        parser.add_argument('--sections', type=int, default=4, help='Level 1 headings of every document')
+        parser.add_argument('--paragraphs', type=int, default=3, help='Paragraphs below every heading')
+        parser.add_argument('--images', type=int, default=3, help='Images of every document')
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--corpus-dir', help='Keep the corpus in this directory')
+        parser.add_argument('--mock-url', help='Base url of a running mock_llm_server, an embedded one by default')
+        parser.add_argument('--latency', default='constant:0.2', help='Latency distribution of the embedded mock')
+        parser.add_argument('--error-rate', type=float, default=0.0)
+        parser.add_argument('--rate-limit-rate', type=float, default=0.0)
+        parser.add_argument('--mock-max-concurrency', type=int, default=0)
+        parser.add_argument('--model-concurrency', type=int, default=5, help='max_concurrency of the models')
+        parser.add_argument('--no-images', action='store_true', help='Disable picture reasoning')
+        parser.add_argument('--trace-memory', action='store_true', help='Track Python allocation peaks per stage')
+        parser.add_argument('--use-current-db', action='store_true')
+        parser.add_argument('--output', help='Also write the json report to this file')
+
+    def handle(self, *args, **options):
+        formats = tuple(f.strip() for f in options['formats'].split(',') if f.strip())
+        unknown = set(formats) - set(FORMATS)
+        if unknown or not formats:
+            raise CommandError(f"Unknown formats: {', '.join(sorted(unknown)) or options['formats']}")
+        try:
+            latency = parse_latency(options['latency'])
+        except ValueError as e:
+            raise CommandError(str(e))
+
+        report = run_benchmark(BenchmarkOptions(
+            files=options['files'],
+            formats=formats,
+            spec=CorpusSpec(options['sections'], options['paragraphs'], options['images']),
+            mock_url=options['mock_url'],
+            behaviour=MockBehaviour(latency, options['error_rate'], options['rate_limit_rate'],
+                                    options['mock_max_concurrency']),
+            model_concurrency=options['model_concurrency'],
+            picture_reasoning=not options['no_images'],
+            use_current_db=options['use_current_db'],
+            trace_memory=options['trace_memory'],
+            corpus_dir=options['corpus_dir'],
+            seed=options['seed'],
+        ))
+        text = json.dumps(report, indent=2, ensure_ascii=False)
+        if options['output']:
+            with open(options['output'], 'w', encoding='utf-8') as f:
+                f.write(text)
+        self.stdout.write(text)
@@ -0,0 +1,26 @@
+import signal
+
+from django.core.management.base import BaseCommand
+
+from task_flow.worker import ConversionWorker
+
+
+class Command(BaseCommand):
+    help = ('Convert queued files claimed from the database. Run any number of workers on nodes sharing the database '
+            'and the fileList volume, files of a dead worker are requeued once their lease expires. SIGTERM or Ctrl+C '
+            'stops claiming and finishes the files in flight.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, help='File threads, CONVERSION_JOB.WORKERS by default')
+
+    def handle(self, *args, **options):
+        worker = ConversionWorker(options['workers'])
+
+        def stop(signum, frame):
+            self.stdout.write(f"Stopping {worker.owner}, finishing the files in flight")
+            worker.stop()
+
+        signal.signal(signal.SIGTERM, stop)
+        signal.signal(signal.SIGINT, stop)
+        self.stdout.write(f"Conversion worker {worker.owner} started with {worker.workers} extraction threads")
+        worker.run()
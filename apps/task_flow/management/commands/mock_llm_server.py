@@ -0,0 +1,39 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from task_flow.benchmark.mock_llm_server import MockBehaviour, parse_latency, start_mock_server
+
+
+class Command(BaseCommand):
+    help = ('Serve an offline OpenAI compatible stand-in for the model provider, /v1/chat/completions (streaming '
+            'or not), /v1/files and /v1/stats. Point the base url of a model at it to run the pipeline offline.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--host', default='127.0.0.1')
+        parser.add_argument('--port', type=int, default=8765)
+        parser.add_argument('--latency', default='constant:0.2',
+                            help='constant:S, uniform:LOW,HIGH, exponential:MEAN or lognormal:MEDIAN,SIGMA seconds')
+        parser.add_argument('--error-rate', type=float, default=0.0, help='Share of requests answered with 500')
+        parser.add_argument('--rate-limit-rate', type=float, default=0.0, help='Share of requests answered with 429')
+        parser.add_argument('--max-concurrency', type=int, default=0,
+                            help='Requests in flight above this are answered with 429, 0 means no limit')
+        parser.add_argument('--retry-after', type=int, default=1, help='Retry-After seconds of the 429 answers')
+
+    def handle(self, *args, **options):
+        try:
+            latency = parse_latency(options['latency'])
+        except ValueError as e:
+            raise CommandError(str(e))
+        behaviour = MockBehaviour(latency, options['error_rate'], options['rate_limit_rate'],
+                                  options['max_concurrency'], options['retry_after'])
+        server = start_mock_server(options['host'], options['port'], behaviour)
+        self.stdout.write(f"Mock LLM server listening on {server.base_url}, stop with Ctrl+C")
+        try:
+            while True:
+                time.sleep(3600)
+        except KeyboardInterrupt:
+            pass
+        finally:
+            server.shutdown()
+            server.server_close()
@@ -0,0 +1,57 @@
+# Generated by Django 4.2.18 on 2026-10-17 18:11
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ImageInfo',
+            fields=[
+                ('id', models.BigAutoField(primary_key=True, serialize=False)),
+                ('document_name', models.CharField(db_index=True, max_length=300, verbose_name='document name')),
+                ('image_path', models.CharField(db_index=True, max_length=300, verbose_name='image path')),
+                ('context_text', models.CharField(db_index=True, verbose_name='context text')),
+                ('image_description', models.CharField(db_index=True, verbose_name='image description')),
+            ],
+            options={
+                'db_table': 'image_info',
+                'indexes': [models.Index(fields=['document_name'], name='document_name')],
+            },
+        ),
+        migrations.CreateModel(
+            name='FileTask',
+            fields=[
+                ('id', models.BigAutoField(primary_key=True, serialize=False)),
+                ('original_file_name', models.CharField(db_index=True, max_length=300, verbose_name='original file name')),
+                ('new_file_name', models.CharField(db_index=True, max_length=300, verbose_name='new file name')),
+                ('file_path', models.CharField(db_index=True, max_length=200, verbose_name='file path')),
+                ('file_suffix', models.CharField(db_index=True, max_length=200, verbose_name='file suffix')),
+                ('file_status', models.IntegerField(db_index=True, default=0, verbose_name='file status')),
+            ],
+            options={
+                'db_table': 'file_task',
+                'indexes': [models.Index(fields=['new_file_name'], name='file_name_index')],
+            },
+        ),
+        migrations.CreateModel(
+            name='FileResult',
+            fields=[
+                ('id', models.BigAutoField(primary_key=True, serialize=False)),
+                ('file_name', models.CharField(db_index=True, max_length=300, verbose_name='file name')),
+                ('file_path', models.CharField(db_index=True, max_length=200, verbose_name='file path')),
+                ('file_suffix', models.CharField(db_index=True, max_length=200, verbose_name='file suffix')),
+                ('file_type', models.IntegerField(db_index=True, verbose_name='file type')),
+            ],
+            options={
+                'db_table': 'file_result',
+                'indexes': [models.Index(fields=['file_name'], name='file_result_name_index')],
+            },
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 4.2.18 on 2026-10-17 18:11
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('task_flow', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='imageinfo',
+            name='successfully',
+            field=models.BooleanField(default=True, verbose_name='Whether the image description was generated'),
+        ),
+    ]
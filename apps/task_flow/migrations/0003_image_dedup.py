@@ -0,0 +1,28 @@
+# Generated by Django 4.2.18 on 2026-10-17 18:11
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('task_flow', '0002_imageinfo_successfully'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='imageinfo',
+            name='content_hash',
+            field=models.CharField(db_index=True, default='', max_length=64, verbose_name='sha256 of the image bytes'),
+        ),
+        migrations.AddField(
+            model_name='imageinfo',
+            name='description_key',
+            field=models.CharField(db_index=True, default='', max_length=64, verbose_name='sha256 of the prompt and model that made the description'),
+        ),
+        migrations.AddField(
+            model_name='imageinfo',
+            name='perceptual_hash',
+            field=models.CharField(db_index=True, default='', max_length=16, verbose_name='difference hash of the image, empty when it can not be decoded'),
+        ),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 4.2.18 on 2026-10-17 18:12
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('task_flow', '0003_image_dedup'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='filetask',
+            name='input_tokens',
+            field=models.BigIntegerField(default=0, verbose_name='input tokens of the model calls of the file'),
+        ),
+        migrations.AddField(
+            model_name='filetask',
+            name='model_calls',
+            field=models.IntegerField(default=0, verbose_name='model calls made for the file'),
+        ),
+        migrations.AddField(
+            model_name='filetask',
+            name='output_tokens',
+            field=models.BigIntegerField(default=0, verbose_name='output tokens of the model calls of the file'),
+        ),
+        migrations.AddField(
+            model_name='filetask',
+            name='truncated_calls',
+            field=models.IntegerField(default=0, verbose_name='model calls of the file whose prompt was cut to the token budget'),
+        ),
+    ]
@@ -0,0 +1,50 @@
+# Generated by Django 4.2.18 on 2026-10-17 18:12
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('task_flow', '0004_filetask_token_usage'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ConversionJob',
+            fields=[
+                ('id', models.BigAutoField(primary_key=True, serialize=False)),
+                ('file_suffix', models.CharField(db_index=True, max_length=200, verbose_name='file suffix of the upload batch')),
+                ('job_status', models.IntegerField(db_index=True, default=0, verbose_name='job status. 0 queued, 1 running, 2 finished, 3 failed')),
+                ('file_count', models.IntegerField(default=0, verbose_name='files of the job')),
+                ('finished_count', models.IntegerField(default=0, verbose_name='files converted successfully')),
+                ('failed_count', models.IntegerField(default=0, verbose_name='files whose conversion failed')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='time the job was submitted')),
+                ('started_at', models.DateTimeField(null=True, verbose_name='time the first file started')),
+                ('finished_at', models.DateTimeField(null=True, verbose_name='time the last file finished')),
+            ],
+            options={
+                'db_table': 'conversion_job',
+            },
+        ),
+        migrations.AddField(
+            model_name='filetask',
+            name='error_message',
+            field=models.CharField(default='', max_length=1000, verbose_name='error of a failed conversion'),
+        ),
+        migrations.AddField(
+            model_name='filetask',
+            name='job_id',
+            field=models.BigIntegerField(db_index=True, null=True, verbose_name='conversion job of the file'),
+        ),
+        migrations.AddField(
+            model_name='filetask',
+            name='stage',
+            field=models.CharField(db_index=True, default='', max_length=20, verbose_name='current conversion stage'),
+        ),
+        migrations.AddField(
+            model_name='filetask',
+            name='stage_updated_at',
+            field=models.DateTimeField(null=True, verbose_name='time the current stage started'),
+        ),
+    ]
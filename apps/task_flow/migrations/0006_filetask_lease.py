@@ -0,0 +1,28 @@
+# Generated by Django 4.2.18 on 2026-10-17 18:12
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('task_flow', '0005_conversionjob'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='filetask',
+            name='attempts',
+            field=models.IntegerField(default=0, verbose_name='times the file was claimed by a worker'),
+        ),
+        migrations.AddField(
+            model_name='filetask',
+            name='lease_expires_at',
+            field=models.DateTimeField(db_index=True, null=True, verbose_name='the file is requeued when the worker stops renewing it'),
+        ),
+        migrations.AddField(
+            model_name='filetask',
+            name='lease_owner',
+            field=models.CharField(db_index=True, default='', max_length=100, verbose_name='worker converting the file, empty while it is not claimed'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 4.2.18 on 2026-10-17 18:12
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('task_flow', '0006_filetask_lease'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='conversionjob',
+            name='weight',
+            field=models.IntegerField(default=1, verbose_name='share of the file threads relative to other jobs'),
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 4.2.18 on 2026-10-17 18:12
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('task_flow', '0007_conversionjob_weight'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='filetask',
+            name='extract_cpu_seconds',
+            field=models.FloatField(default=0, verbose_name='CPU time of the text extraction of the file'),
+        ),
+        migrations.AddField(
+            model_name='filetask',
+            name='extract_rss_mb',
+            field=models.FloatField(default=0, verbose_name='resident memory of the extraction worker after the file'),
+        ),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 4.2.18 on 2026-10-17 18:38
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('task_flow', '0008_filetask_extract_usage'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='filetask',
+            name='exact_duplicate_images',
+            field=models.IntegerField(default=0, verbose_name='images of the file whose bytes were already described'),
+        ),
+        migrations.AddField(
+            model_name='filetask',
+            name='image_model_calls',
+            field=models.IntegerField(default=0, verbose_name='images of the file sent to the picture model'),
+        ),
+        migrations.AddField(
+            model_name='filetask',
+            name='images',
+            field=models.IntegerField(default=0, verbose_name='images of the file kept after the pre-processing'),
+        ),
+        migrations.AddField(
+            model_name='filetask',
+            name='near_duplicate_images',
+            field=models.IntegerField(default=0, verbose_name='images of the file close to an already described image'),
+        ),
+    ]
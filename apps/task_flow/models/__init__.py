@@ -1,2 +1,3 @@
 from .file_task import *
 from .image_info import *
+from .conversion_job import *
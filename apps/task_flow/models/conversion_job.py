@@ -0,0 +1,38 @@
+from django.db import models
+
+# Status of a conversion job
+JOB_QUEUED = 0
+JOB_RUNNING = 1
+JOB_FINISHED = 2
+JOB_FAILED = 3
+
+
+class ConversionJob(models.Model):
+    id = models.BigAutoField(primary_key=True)
+    file_suffix = models.CharField(max_length=200, db_index=True, verbose_name='file suffix of the upload batch')
+    job_status = models.IntegerField(db_index=True, default=JOB_QUEUED,
+                                     verbose_name='job status. 0 queued, 1 running, 2 finished, 3 failed')
+    file_count = models.IntegerField(default=0, verbose_name='files of the job')
+    weight = models.IntegerField(default=1, verbose_name='share of the file threads relative to other jobs')
+    finished_count = models.IntegerField(default=0, verbose_name='files converted successfully')
+    failed_count = models.IntegerField(default=0, verbose_name='files whose conversion failed')
+    created_at = models.DateTimeField(auto_now_add=True, verbose_name='time the job was submitted')
+    started_at = models.DateTimeField(null=True, verbose_name='time the first file started')
+    finished_at = models.DateTimeField(null=True, verbose_name='time the last file finished')
+
+    class Meta:
+        db_table = 'conversion_job'
+
+    def to_dict(self):
+        return {
+            'job_id': self.id,
+            'file_suffix': self.file_suffix,
+            'job_status': self.job_status,
+            'file_count': self.file_count,
+            'weight': self.weight,
+            'finished_count': self.finished_count,
+            'failed_count': self.failed_count,
+            'created_at': self.created_at,
+            'started_at': self.started_at,
+            'finished_at': self.finished_at,
+        }
@@ -1,5 +1,14 @@
 from django.db import models
 
+# Conversion stages of a file, see FileTask.stage
+FILE_STAGE_QUEUED = 'queued'
+FILE_STAGE_EXTRACTING = 'extracting'
+FILE_STAGE_IMAGES = 'images'
+FILE_STAGE_TITLES = 'titles'
+FILE_STAGE_SHARDING = 'sharding'
+FILE_STAGE_DONE = 'done'
+FILE_STAGE_FAILED = 'failed'
+
 
 class FileTask(models.Model):
     id = models.BigAutoField(primary_key=True)
@@ -8,6 +17,29 @@ class FileTask(models.Model):
     file_path = models.CharField(max_length=200, db_index=True, verbose_name='file path')
     file_suffix = models.CharField(max_length=200, db_index=True, verbose_name='file suffix')
     file_status = models.IntegerField(db_index=True, verbose_name='file status', default=0)
+    input_tokens = models.BigIntegerField(default=0, verbose_name='input tokens of the model calls of the file')
+    output_tokens = models.BigIntegerField(default=0, verbose_name='output tokens of the model calls of the file')
+    model_calls = models.IntegerField(default=0, verbose_name='model calls made for the file')
+    truncated_calls = models.IntegerField(default=0,
+                                          verbose_name='model calls of the file whose prompt was cut to the token budget')
+    images = models.IntegerField(default=0, verbose_name='images of the file kept after the pre-processing')
+    exact_duplicate_images = models.IntegerField(default=0,
+                                                 verbose_name='images of the file whose bytes were already described')
+    near_duplicate_images = models.IntegerField(default=0,
+                                                verbose_name='images of the file close to an already described image')
+    image_model_calls = models.IntegerField(default=0, verbose_name='images of the file sent to the picture model')
+    extract_cpu_seconds = models.FloatField(default=0, verbose_name='CPU time of the text extraction of the file')
+    extract_rss_mb = models.FloatField(default=0,
+                                       verbose_name='resident memory of the extraction worker after the file')
+    job_id = models.BigIntegerField(null=True, db_index=True, verbose_name='conversion job of the file')
+    stage = models.CharField(max_length=20, default='', db_index=True, verbose_name='current conversion stage')
+    stage_updated_at = models.DateTimeField(null=True, verbose_name='time the current stage started')
+    error_message = models.CharField(max_length=1000, default='', verbose_name='error of a failed conversion')
+    lease_owner = models.CharField(max_length=100, default='', db_index=True,
+                                   verbose_name='worker converting the file, empty while it is not claimed')
+    lease_expires_at = models.DateTimeField(null=True, db_index=True,
+                                            verbose_name='the file is requeued when the worker stops renewing it')
+    attempts = models.IntegerField(default=0, verbose_name='times the file was claimed by a worker')
 
     class Meta:
         db_table = 'file_task'
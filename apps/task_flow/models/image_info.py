@@ -7,6 +7,12 @@ class ImageInfo(models.Model):
     image_path = models.CharField(max_length=300, db_index=True, verbose_name='image path')
     context_text = models.CharField(db_index=True, verbose_name='context text')
     image_description = models.CharField(db_index=True, verbose_name='image description')
+    content_hash = models.CharField(max_length=64, db_index=True, default='', verbose_name='sha256 of the image bytes')
+    perceptual_hash = models.CharField(max_length=16, db_index=True, default='',
+                                       verbose_name='difference hash of the image, empty when it can not be decoded')
+    description_key = models.CharField(max_length=64, db_index=True, default='',
+                                       verbose_name='sha256 of the prompt and model that made the description')
+    successfully = models.BooleanField(default=True, verbose_name='Whether the image description was generated')
 
     class Meta:
         db_table = 'image_info'
@@ -0,0 +1,121 @@
+import asyncio
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from django.db import close_old_connections
+
+from task_flow.conversion import extract_document, understand_document, record_failure
+
+logging = logging.getLogger('pipeline')
+
+
+class ConversionPipeline:
+    """
+    Converts files in two overlapping stages so that file N+1 is extracted while file N waits for the model.
+    The CPU stage runs on extraction threads that hand the parsing to the process pools, the model stage runs as
+    tasks of one event loop. A bounded queue sits between them: when the model stage falls behind, extraction
+    threads block on the full queue instead of piling up extracted documents in memory.
+    """
+
+    def __init__(self, extract_workers, model_concurrency, queue_size, on_done):
+        """
+        :param extract_workers: Files extracted concurrently
+        :param model_concurrency: Files in the model stage concurrently
+        :param queue_size: Extracted files waiting for the model stage
+        :param on_done: Called with the FileTask and whether it was converted, from a stage thread
+        """
+        self.extract_workers = extract_workers
+        self.model_concurrency = model_concurrency
+        self.queue_size = queue_size
+        self._on_done = on_done
+        self._extractor = ThreadPoolExecutor(max_workers=extract_workers, thread_name_prefix='conversion-extract')
+        self._loop = asyncio.new_event_loop()
+        self._queue = None
+        self._consumers = []
+        self._started = threading.Event()
+        self._thread = threading.Thread(target=self._run_loop, name='conversion-model', daemon=True)
+        self._thread.start()
+        self._started.wait()
+
+    @property
+    def capacity(self):
+        """
+        Files the pipeline holds at most, in any stage
+        """
+        return self.extract_workers + self.queue_size + self.model_concurrency
+
+    def _run_loop(self):
+        asyncio.set_event_loop(self._loop)
+        self._queue = asyncio.Queue(maxsize=self.queue_size)
+        self._consumers = [self._loop.create_task(self._consume()) for _ in range(self.model_concurrency)]
+        self._loop.call_soon(self._started.set)
+        self._loop.run_forever()
+
+    def submit(self, file, options):
+        """
+        Queue a file for the CPU stage
+        """
+        self._extractor.submit(self._extract, file, options)
+
+    def _extract(self, file, options):
+        close_old_connections()
+        try:
+            document = extract_document(file, options)
+        except Exception as e:
+            self._finish(file, e)
+            return
+        finally:
+            close_old_connections()
+        # Blocks while the model stage is saturated
+        asyncio.run_coroutine_threadsafe(self._queue.put((document, options)), self._loop).result()
+
+    async def _consume(self):
+        while True:
+            document, options = await self._queue.get()
+            try:
+                try:
+                    await understand_document(document, options)
+                    error = None
+                except Exception as e:
+                    error = e
+                # The bookkeeping queries block, they are kept off the event loop
+                await asyncio.to_thread(self._finish, document.file, error)
+            finally:
+                self._queue.task_done()
+
+    def _finish(self, file, error):
+        try:
+            if error is not None:
+                record_failure(file, error)
+            self._on_done(file, error is None)
+        except Exception as e:
+            logging.error(f"Conversion bookkeeping failed. file id: {file.id} e: {e}")
+        finally:
+            close_old_connections()
+
+    def stats(self):
+        return {
+            'extract_workers': self.extract_workers,
+            'model_concurrency': self.model_concurrency,
+            'queued_for_model': self._queue.qsize() if self._queue is not None else 0,
+            'queue_size': self.queue_size,
+        }
+
+    def shutdown(self):
+        """
+        Wait for the files in the pipeline, then stop the stages
+        """
+        self._extractor.shutdown(wait=True)
+        asyncio.run_coroutine_threadsafe(self._drain(), self._loop).result()
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join()
+        # Closes the pooled model clients of the loop, see client_pool._close_with_loop
+        self._loop.run_until_complete(self._loop.shutdown_asyncgens())
+        self._loop.close()
+
+    async def _drain(self):
+        await self._queue.join()
+        for consumer in self._consumers:
+            consumer.cancel()
+        await asyncio.gather(*self._consumers, return_exceptions=True)
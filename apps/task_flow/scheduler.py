@@ -0,0 +1,180 @@
+import logging
+import threading
+
+from django.conf import settings
+from django.db.models import Count, Min, Q
+from django.utils import timezone
+
+from task_flow.models import ConversionJob, FileTask, FILE_STAGE_QUEUED
+
+logging = logging.getLogger('scheduler')
+
+
+def _setting(name, default):
+    return getattr(settings, 'CONVERSION_SCHEDULER', {}).get(name, default)
+
+
+class BatchState:
+    """
+    Queued and running files of one conversion job (one upload batch) across all workers
+    """
+    __slots__ = ('job_id', 'file_suffix', 'weight', 'fast', 'queued', 'running', 'oldest_queued_at', 'planned')
+
+    def __init__(self, job_id, file_suffix, weight, fast, queued, running, oldest_queued_at):
+        self.job_id = job_id
+        self.file_suffix = file_suffix
+        self.weight = weight
+        self.fast = fast
+        self.queued = queued
+        self.running = running
+        self.oldest_queued_at = oldest_queued_at
+        self.planned = 0
+
+
+class WaitStats:
+    __slots__ = ('files', 'total_seconds', 'max_seconds')
+
+    def __init__(self):
+        self.files = 0
+        self.total_seconds = 0.0
+        self.max_seconds = 0.0
+
+    def add(self, seconds):
+        self.files += 1
+        self.total_seconds += seconds
+        self.max_seconds = max(self.max_seconds, seconds)
+
+    def to_dict(self):
+        return {
+            'claimed_files': self.files,
+            'avg_wait_seconds': round(self.total_seconds / self.files, 3) if self.files else 0,
+            'max_wait_seconds': round(self.max_seconds, 3),
+        }
+
+
+class FairShareScheduler:
+    """
+    Decides which batches the free pipeline slots of a worker are given to.
+    Small jobs go through a fast lane that is served first and has slots reserved for it. The other jobs
+    share the remaining slots by weighted fair queueing: every claimed file advances the virtual time of its
+    job by 1 / weight and the job with the smallest virtual time is served next, so one large upload can not
+    starve the others. A job never holds more than the per-batch cap of pipeline slots across all workers.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._virtual_time = {}
+        self._system_time = 0.0
+        self._waits = {}
+
+    def load_batches(self):
+        """
+        Batches with queued or running files, read from the database so that all workers see the same state
+        """
+        rows = FileTask.objects.filter(Q(stage=FILE_STAGE_QUEUED, lease_owner='') | ~Q(lease_owner='')) \
+            .exclude(job_id=None).values('job_id', 'file_suffix') \
+            .annotate(queued=Count('id', filter=Q(stage=FILE_STAGE_QUEUED, lease_owner='')),
+                      running=Count('id', filter=~Q(lease_owner='')),
+                      oldest_queued_at=Min('stage_updated_at', filter=Q(stage=FILE_STAGE_QUEUED, lease_owner='')))
+        rows = list(rows)
+        jobs = {job.id: job for job in ConversionJob.objects.filter(id__in=[row['job_id'] for row in rows])}
+        fast_lane_files = _setting('FAST_LANE_MAX_FILES', 3)
+        batches = []
+        for row in rows:
+            job = jobs.get(row['job_id'])
+            file_count = job.file_count if job is not None else row['queued'] + row['running']
+            batches.append(BatchState(row['job_id'], row['file_suffix'], max(1, job.weight if job else 1),
+                                      file_count <= fast_lane_files, row['queued'], row['running'],
+                                      row['oldest_queued_at']))
+        return batches
+
+    @staticmethod
+    def fast_lane_slots(workers):
+        """
+        Pipeline slots of a worker reserved for the fast lane, a worker always keeps one for large jobs
+        """
+        return max(0, min(_setting('FAST_LANE_SLOTS', 1), workers - 1))
+
+    def plan(self, free, bulk_free, batches=None):
+        """
+        Files to claim from every batch
+        :param free: Free pipeline slots of the worker
+        :param bulk_free: Free pipeline slots that are not reserved for the fast lane
+        :param batches: BatchStates, loaded from the database when None
+        :return: [(job_id, files, fast lane)] in the order the claims should be made
+        """
+        if free <= 0:
+            return []
+        batches = self.load_batches() if batches is None else batches
+        cap = _setting('BATCH_MAX_CONCURRENCY', 0)
+
+        def claimable(batch):
+            return batch.queued > batch.planned and (not cap or batch.running + batch.planned < cap)
+
+        plan = []
+        # Fast lane, oldest first
+        fast = sorted((batch for batch in batches if batch.fast and batch.queued), key=lambda b: b.oldest_queued_at)
+        for batch in fast:
+            while free > 0 and claimable(batch):
+                batch.planned += 1
+                free -= 1
+            if batch.planned:
+                plan.append((batch.job_id, batch.planned, True))
+
+        bulk = [batch for batch in batches if not batch.fast]
+        slots = min(free, bulk_free)
+        with self._lock:
+            active = {batch.job_id for batch in bulk}
+            for job_id in list(self._virtual_time):
+                if job_id not in active:
+                    del self._virtual_time[job_id]
+            for batch in bulk:
+                # A new job starts at the current virtual time, it neither waits for nor overtakes the others
+                self._virtual_time.setdefault(batch.job_id, self._system_time)
+            for _ in range(slots):
+                candidates = [batch for batch in bulk if claimable(batch)]
+                if not candidates:
+                    break
+                batch = min(candidates, key=lambda b: (self._virtual_time[b.job_id], b.job_id))
+                self._system_time = self._virtual_time[batch.job_id]
+                self._virtual_time[batch.job_id] += 1.0 / batch.weight
+                batch.planned += 1
+        plan.extend((batch.job_id, batch.planned, False) for batch in bulk if batch.planned)
+        return plan
+
+    def record_claims(self, files):
+        """
+        Record how long the claimed files waited in the queue
+        """
+        now = timezone.now()
+        with self._lock:
+            for file in files:
+                if file.stage_updated_at is None:
+                    continue
+                self._waits.setdefault(file.file_suffix, WaitStats()).add(
+                    max(0.0, (now - file.stage_updated_at).total_seconds()))
+            while len(self._waits) > 1000:
+                self._waits.pop(next(iter(self._waits)))
+
+    def stats(self):
+        """
+        Queue depth and wait time of every batch with queued or running files
+        """
+        now = timezone.now()
+        batches = self.load_batches()
+        with self._lock:
+            return [{
+                'job_id': batch.job_id,
+                'file_suffix': batch.file_suffix,
+                'weight': batch.weight,
+                'fast_lane': batch.fast,
+                'queued': batch.queued,
+                'running': batch.running,
+                'oldest_wait_seconds': round((now - batch.oldest_queued_at).total_seconds(), 3)
+                if batch.oldest_queued_at else 0,
+                'virtual_time': round(self._virtual_time.get(batch.job_id, 0.0), 3),
+                **self._waits.get(batch.file_suffix, WaitStats()).to_dict(),
+            } for batch in batches]
+
+
+SCHEDULER = FairShareScheduler()
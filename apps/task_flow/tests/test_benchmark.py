@@ -0,0 +1,109 @@
+import json
+import os
+import tempfile
+import threading
+import zipfile
+
+import httpx
+import openai
+from django.test import SimpleTestCase
+
+from processor.ooxml_media import extract_ooxml_images
+from processor.pdf_extractor import extract_pdf
+from task_flow.benchmark.corpus import CorpusSpec, build_corpus
+from task_flow.benchmark.mock_llm_server import MockBehaviour, mock_answer, parse_latency, start_mock_server
+
+
+class ParseLatencyTests(SimpleTestCase):
+
+    def test_distributions(self):
+        self.assertEqual(parse_latency('constant:0.25')(), 0.25)
+        for _ in range(20):
+            self.assertTrue(0.1 <= parse_latency('uniform:0.1,0.2')() <= 0.2)
+            self.assertGreater(parse_latency('lognormal:0.5,0.3')(), 0)
+        self.assertEqual(parse_latency('exponential:0')(), 0.0)
+
+    def test_invalid_spec(self):
+        for spec in ('constant', 'uniform:1', 'normal:1,2', 'constant:fast'):
+            with self.assertRaises(ValueError):
+                parse_latency(spec)
+
+
+class MockAnswerTests(SimpleTestCase):
+
+    def test_answer_follows_the_stage(self):
+        image = [{'role': 'user', 'content': [{'type': 'image_url', 'image_url': {'url': 'data:image/png;base64,A'}},
+                                              {'type': 'text', 'text': 'describe'}]}]
+        self.assertEqual(mock_answer(image, False), 'Mock description of 1 image(s).')
+        labels = [{'role': 'user', 'content': 'Answer {"labels": []} for [{"id": 3}, {"id": 1}]'}]
+        self.assertEqual(json.loads(mock_answer(labels, False))['labels'][0], {'id': 1, 'labels': ['label 1']})
+        titles = [{'role': 'system', 'content': '1: # Intro\nbody\n7: ## Detail'}]
+        self.assertEqual(json.loads(mock_answer(titles, True)),
+                         {'content': [{'text': '# Intro', 'lines': [1]}, {'text': '## Detail', 'lines': [7]}]})
+        self.assertEqual(mock_answer([{'role': 'user', 'content': 'hello'}], False), 'mock label')
+
+
+class MockServerTests(SimpleTestCase):
+
+    def start(self, behaviour=None):
+        server = start_mock_server(behaviour=behaviour)
+        self.addCleanup(server.server_close)
+        self.addCleanup(server.shutdown)
+        client = openai.OpenAI(api_key='mock', base_url=server.base_url, max_retries=0)
+        self.addCleanup(client.close)
+        return server, client
+
+    def test_completion_and_stream(self):
+        server, client = self.start()
+        completion = client.chat.completions.create(model='mock', messages=[{'role': 'user', 'content': 'hello'}])
+        self.assertEqual(completion.choices[0].message.content, 'mock label')
+        self.assertGreater(completion.usage.prompt_tokens, 0)
+
+        stream = client.chat.completions.create(model='mock', stream=True, stream_options={'include_usage': True},
+                                                messages=[{'role': 'system', 'content': '# A heading ' * 4}])
+        chunks = list(stream)
+        text = ''.join(chunk.choices[0].delta.content or '' for chunk in chunks if chunk.choices)
+        self.assertEqual(json.loads(text)['content'][0]['lines'], [1])
+        self.assertIsNotNone(chunks[-1].usage)
+        stats = httpx.get(f'{server.base_url}/stats').json()
+        self.assertEqual((stats['requests'], stats['completions'], stats['streams']), (2, 1, 1))
+
+    def test_injected_errors(self):
+        server, client = self.start(MockBehaviour(error_rate=1.0))
+        with self.assertRaises(openai.InternalServerError):
+            client.chat.completions.create(model='mock', messages=[{'role': 'user', 'content': 'hello'}])
+        server.behaviour = MockBehaviour(rate_limit_rate=1.0, retry_after=7)
+        response = httpx.post(f'{server.base_url}/chat/completions', json={'messages': []})
+        self.assertEqual((response.status_code, response.headers['Retry-After']), (429, '7'))
+
+    def test_requests_above_the_concurrency_are_rate_limited(self):
+        server = self.start(MockBehaviour(latency=parse_latency('constant:0.2'), max_concurrency=2))[0]
+        statuses = []
+
+        def post():
+            statuses.append(httpx.post(f'{server.base_url}/chat/completions', json={'messages': []}).status_code)
+
+        threads = [threading.Thread(target=post) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(sorted(statuses), [200, 200, 429, 429])
+        self.assertEqual(server.stats.to_dict()['rate_limited'], 2)
+
+
+class CorpusTests(SimpleTestCase):
+
+    def test_every_format_holds_the_requested_images(self):
+        with tempfile.TemporaryDirectory() as directory:
+            archive_path, paths = build_corpus(directory, 4, spec=CorpusSpec(sections=2, paragraphs=1, images=2))
+            self.assertEqual([os.path.splitext(path)[1] for path in paths], ['.docx', '.pptx', '.xlsx', '.pdf'])
+            with zipfile.ZipFile(archive_path) as archive:
+                self.assertEqual(archive.namelist(), [os.path.basename(path) for path in paths])
+            for path in paths[:3]:
+                media = extract_ooxml_images(path)
+                self.assertEqual(len(media), 2, path)
+                self.assertNotEqual(media[0][0], media[1][0])
+            text, media, font_lines = extract_pdf(paths[3])
+            self.assertEqual(len(media), 2)
+            self.assertIn('1.1 ', text)
@@ -0,0 +1,139 @@
+import os
+import tempfile
+from unittest import mock
+
+import docx
+from django.test import SimpleTestCase, TestCase, override_settings
+from markitdown import MarkItDown
+
+from processor.markdown_converter import ConversionUsage
+from task_flow import conversion
+from processor.structure_inference import infer_docx_headings
+from processor.token_accounting import TOKEN_LEDGER, set_usage_scope
+from task_flow.conversion import ConversionError, ConversionOptions, _file_converted, extract_document, \
+    record_failure, replace_titles
+from task_flow.leases import LeaseLost
+from task_flow.models import FileTask
+from task_flow.models.file_result import FileResult
+
+
+def _options(enabled_picture_reasoning=False, enabled_heading_inference=False):
+    return ConversionOptions(enabled_picture_reasoning, enabled_heading_inference, 'prompt', 'prompt', None, None, 0)
+
+
+class ExtractDocumentTests(TestCase):
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.file = FileTask.objects.create(original_file_name='a.pdf', new_file_name='a.pdf', file_path='',
+                                            file_suffix='batch')
+        self.extract_pdf = mock.Mock(return_value=('fitz text', [], []))
+        usage = ConversionUsage(0.5, 80, 1, 1)
+        patches = [
+            mock.patch.object(conversion, 'get_base_path', return_value=directory.name),
+            mock.patch.object(conversion, 'extract_pdf', self.extract_pdf),
+            mock.patch.object(conversion, 'convert_markdown', return_value=('markdown text', usage)),
+            mock.patch.object(conversion, 'extract_images', return_value=([], [])),
+        ]
+        for patch in patches:
+            patch.start()
+            self.addCleanup(patch.stop)
+
+    def test_pdf_is_not_parsed_when_nothing_uses_it(self):
+        document = extract_document(self.file, _options())
+        self.extract_pdf.assert_not_called()
+        self.assertEqual(document.md_content, 'markdown text')
+
+    def test_pdf_is_parsed_for_images_or_headings(self):
+        extract_document(self.file, _options(enabled_picture_reasoning=True))
+        self.assertEqual(conversion.extract_images.call_args.kwargs['media'], [])
+        document = extract_document(self.file, _options(enabled_heading_inference=True))
+        self.assertEqual(self.extract_pdf.call_count, 2)
+        self.assertEqual(document.md_content, 'markdown text')
+
+    @override_settings(DOCUMENT_EXTRACTION={'PDF_FITZ_TEXT': True})
+    def test_fitz_text_replaces_markitdown(self):
+        document = extract_document(self.file, _options())
+        self.assertEqual(document.md_content, 'fitz text')
+        conversion.convert_markdown.assert_not_called()
+
+
+class ReplaceTitlesTests(SimpleTestCase):
+
+    def test_styled_docx_headings_appear_once(self):
+        with tempfile.TemporaryDirectory() as directory:
+            file_path = os.path.join(directory, 'styled.docx')
+            document = docx.Document()
+            document.add_heading('Report', 0)
+            document.add_heading('Intro', 1)
+            document.add_paragraph('Body text.')
+            document.add_heading('Scope and aims', 2)
+            document.add_paragraph('More text.')
+            document.add_heading('Results', 1)
+            document.save(file_path)
+            md_content = MarkItDown().convert(file_path).text_content
+            inference = infer_docx_headings(file_path)
+
+        self.assertIn('# Intro', md_content.split('\n'))
+        lines = replace_titles(inference.to_context(), md_content).split('\n')
+        headings = [line for line in lines if line.startswith('#')]
+        self.assertEqual(headings, ['# Report', '# Intro', '## Scope and aims', '# Results'])
+        self.assertEqual(lines.count('Report'), 0)
+
+    def test_heading_level_is_replaced(self):
+        context = {'content': [{'text': '## Intro', 'lines': [1]}]}
+        self.assertEqual(replace_titles(context, '# Intro\n\nBody'), '## Intro\n\nBody')
+
+    def test_missing_title_is_inserted_before_the_next_lower_level(self):
+        context = {'content': [{'text': '# Part', 'lines': [1]}, {'text': '## Detail', 'lines': [3]}]}
+        self.assertEqual(replace_titles(context, 'Intro\n**Detail**\nBody'), 'Intro\n# Part\n## Detail\nBody')
+
+
+class SaveUsageTests(TestCase):
+
+    def test_failed_attempt_saves_its_usage(self):
+        file = FileTask.objects.create(original_file_name='a.docx', new_file_name='a.docx', file_path='',
+                                       file_suffix='batch')
+        self.addCleanup(TOKEN_LEDGER.reset_task, file.id)
+        set_usage_scope(file.id, 'batch')
+        self.addCleanup(set_usage_scope)
+        TOKEN_LEDGER.record('title', 'qwen', 100, 10, 50, False)
+        with self.assertLogs('conversion', level='ERROR'):
+            record_failure(file, ConversionError('broken'))
+        file.refresh_from_db()
+        self.assertEqual((file.stage, file.error_message), ('failed', 'broken'))
+        self.assertEqual((file.model_calls, file.input_tokens, file.output_tokens), (1, 100, 10))
+
+
+class LostLeaseTests(TestCase):
+
+    def setUp(self):
+        # Claimed by node-1, expired and claimed again by node-2
+        self.file = FileTask.objects.create(original_file_name='a.docx', new_file_name='a.docx', file_path='',
+                                            file_suffix='batch', stage='titles', lease_owner='node-1')
+        FileTask.objects.filter(id=self.file.id).update(lease_owner='node-2')
+
+    def assertUntouched(self):
+        self.file.refresh_from_db()
+        self.assertEqual((self.file.stage, self.file.error_message, self.file.lease_owner), ('titles', '', 'node-2'))
+
+    def test_stale_worker_saves_no_result(self):
+        with self.assertRaises(LeaseLost):
+            _file_converted(self.file, '/fileList/a.md')
+        self.assertFalse(FileResult.objects.exists())
+        self.assertUntouched()
+
+    def test_stale_worker_saves_no_failure(self):
+        with self.assertLogs('conversion', level='WARNING') as logs:
+            record_failure(self.file, ConversionError('broken'))
+            record_failure(self.file, LeaseLost('lost'))
+        self.assertIn('Lease lost before the failure was saved', logs.output[1])
+        self.assertUntouched()
+
+    def test_result_is_saved_while_the_lease_is_held(self):
+        self.file.lease_owner = 'node-2'
+        _file_converted(self.file, '/fileList/a.md')
+        self.file.refresh_from_db()
+        self.assertEqual(self.file.stage, 'done')
+        self.assertEqual(FileResult.objects.get().file_path, '/fileList/a.md')
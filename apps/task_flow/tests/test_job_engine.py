@@ -0,0 +1,91 @@
+import json
+
+from django.core.signals import request_finished
+from django.db import close_old_connections
+from django.test import RequestFactory, TestCase, override_settings
+
+from task_flow.job_engine import ConversionJobEngine
+from task_flow.models import ConversionJob, FileTask, FILE_STAGE_QUEUED, JOB_FINISHED
+from task_flow.views.file_task_views import query_conversion_job, query_image_dedup_stats, query_token_usage
+
+
+def _file_task(file_suffix, **fields):
+    return FileTask.objects.create(original_file_name='a.docx', new_file_name='a.docx', file_path='',
+                                   file_suffix=file_suffix, **fields)
+
+
+@override_settings(CONVERSION_JOB={'MODE': 'worker'})
+class SubmitTests(TestCase):
+
+    def setUp(self):
+        self.engine = ConversionJobEngine()
+        self.idle = _file_task('batch')
+        self.leased = _file_task('batch', stage='titles', lease_owner='node-1', attempts=1)
+
+    def test_submit_queues_the_files_that_are_not_leased(self):
+        job, created = self.engine.submit('batch', 2)
+        self.assertTrue(created)
+        self.assertEqual((job.file_count, job.weight), (1, 2))
+        self.idle.refresh_from_db()
+        self.assertEqual((self.idle.job_id, self.idle.stage), (job.id, FILE_STAGE_QUEUED))
+        self.leased.refresh_from_db()
+        self.assertEqual((self.leased.stage, self.leased.lease_owner, self.leased.attempts), ('titles', 'node-1', 1))
+
+    def test_running_job_is_returned_instead_of_resubmitted(self):
+        job, created = self.engine.submit('batch')
+        _file_task('batch', stage='titles', lease_owner='node-2', job_id=job.id)
+        again, created = self.engine.submit('batch')
+        self.assertFalse(created)
+        self.assertEqual(again.id, job.id)
+        self.assertEqual(ConversionJob.objects.filter(file_suffix='batch').count(), 1)
+        self.assertEqual(FileTask.objects.get(lease_owner='node-2').stage, 'titles')
+
+    def test_finished_batch_can_be_submitted_again(self):
+        job, created = self.engine.submit('batch')
+        ConversionJob.objects.filter(id=job.id).update(job_status=JOB_FINISHED)
+        again, created = self.engine.submit('batch')
+        self.assertTrue(created)
+        self.assertNotEqual(again.id, job.id)
+
+
+class QueryValidationTests(TestCase):
+
+    def setUp(self):
+        # HttpResponse closes the wrapped ActionResult, which would close the connection of the test transaction
+        request_finished.disconnect(close_old_connections)
+        self.addCleanup(request_finished.connect, close_old_connections)
+
+    def get(self, view, **params):
+        return json.loads(view(RequestFactory().get('/', params)).content)
+
+    def test_query_conversion_job(self):
+        self.assertEqual(self.get(query_conversion_job, job_id='abc')['code'], 400)
+        self.assertEqual(self.get(query_conversion_job, job_id='-1')['code'], 400)
+        self.assertEqual(self.get(query_conversion_job, job_id='123456')['code'], 404)
+        job = ConversionJob.objects.create(file_suffix='batch', file_count=1)
+        _file_task('batch', job_id=job.id)
+        data = self.get(query_conversion_job, job_id=str(job.id))
+        self.assertEqual(data['data']['job_id'], job.id)
+        self.assertEqual(len(data['data']['files']), 1)
+
+    def test_query_token_usage(self):
+        self.assertEqual(self.get(query_token_usage, file_task_id='1.5')['code'], 400)
+        self.assertEqual(self.get(query_token_usage)['code'], 400)
+        self.assertEqual(self.get(query_token_usage, file_task_id='123456')['code'], 404)
+        file = _file_task('batch', input_tokens=100, output_tokens=10, model_calls=2, truncated_calls=1)
+        _file_task('batch', input_tokens=50, output_tokens=5, model_calls=1)
+        self.assertEqual(self.get(query_token_usage, file_task_id=str(file.id))['data']['total'],
+                         {'calls': 2, 'input_tokens': 100, 'output_tokens': 10, 'truncated_calls': 1})
+        self.assertEqual(self.get(query_token_usage, file_suffix='batch')['data']['total'],
+                         {'calls': 3, 'input_tokens': 150, 'output_tokens': 15, 'truncated_calls': 1})
+        self.assertEqual(self.get(query_token_usage, file_suffix='empty')['data']['total']['calls'], 0)
+
+    def test_query_image_dedup_stats(self):
+        self.assertEqual(self.get(query_image_dedup_stats)['code'], 400)
+        _file_task('batch', images=4, exact_duplicate_images=1, near_duplicate_images=1, image_model_calls=2)
+        _file_task('batch', images=2, image_model_calls=2)
+        _file_task('other', images=5, image_model_calls=5)
+        self.assertEqual(self.get(query_image_dedup_stats, file_suffix='batch')['data'],
+                         {'images': 6, 'exact_duplicates': 1, 'near_duplicates': 1, 'model_calls': 4,
+                          'model_calls_saved': 2})
+        self.assertEqual(self.get(query_image_dedup_stats, file_suffix='empty')['data']['images'], 0)
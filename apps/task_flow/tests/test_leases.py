@@ -0,0 +1,95 @@
+from datetime import timedelta
+
+from django.test import TestCase
+from django.utils import timezone
+
+from task_flow.leases import claim_files, release_file, renew_leases, requeue_files, sweep_expired_leases
+from task_flow.models import FileTask, FILE_STAGE_DONE, FILE_STAGE_FAILED, FILE_STAGE_QUEUED
+
+
+def _file_task(**fields):
+    fields.setdefault('stage', FILE_STAGE_QUEUED)
+    return FileTask.objects.create(original_file_name='a.docx', new_file_name='a.docx', file_path='',
+                                   file_suffix='batch', **fields)
+
+
+class ClaimTests(TestCase):
+
+    def test_claim_takes_queued_files_in_order(self):
+        files = [_file_task(job_id=1) for _ in range(3)]
+        _file_task(stage='titles')
+        _file_task(lease_owner='node-2')
+        claimed = claim_files('node-1', 2, 60)
+        self.assertEqual([file.id for file in claimed], [file.id for file in files[:2]])
+        for file in claimed:
+            self.assertEqual((file.lease_owner, file.attempts), ('node-1', 1))
+            self.assertGreater(file.lease_expires_at, timezone.now())
+        self.assertEqual([file.id for file in claim_files('node-2', 5, 60)], [files[2].id])
+        self.assertEqual(claim_files('node-3', 5, 60), [])
+
+    def test_claim_of_a_job(self):
+        _file_task(job_id=1)
+        other = _file_task(job_id=2)
+        self.assertEqual([file.id for file in claim_files('node-1', 5, 60, job_id=2)], [other.id])
+        self.assertEqual(claim_files('node-1', 0, 60), [])
+
+
+class RenewAndReleaseTests(TestCase):
+
+    def setUp(self):
+        _file_task()
+        _file_task()
+        self.files = claim_files('node-1', 2, 60)
+
+    def test_renew_extends_the_held_leases(self):
+        FileTask.objects.update(lease_expires_at=timezone.now())
+        ids = [file.id for file in self.files]
+        self.assertEqual(renew_leases('node-1', ids, 60), set())
+        for file in FileTask.objects.all():
+            self.assertGreater(file.lease_expires_at, timezone.now() + timedelta(seconds=30))
+
+    def test_renew_reports_lost_leases(self):
+        lost = self.files[0]
+        FileTask.objects.filter(id=lost.id).update(lease_owner='node-2')
+        self.assertEqual(renew_leases('node-1', [file.id for file in self.files], 60), {lost.id})
+        self.assertEqual(renew_leases('node-1', [], 60), set())
+
+    def test_release_and_requeue_only_touch_own_leases(self):
+        first, second = self.files
+        self.assertFalse(release_file('node-2', first.id))
+        self.assertEqual(FileTask.objects.get(id=first.id).lease_owner, 'node-1')
+        self.assertTrue(release_file('node-1', first.id))
+        self.assertEqual(FileTask.objects.get(id=first.id).lease_owner, '')
+        FileTask.objects.filter(id=second.id).update(stage='titles')
+        requeue_files('node-1', [second.id])
+        second.refresh_from_db()
+        self.assertEqual((second.stage, second.lease_owner, second.lease_expires_at),
+                         (FILE_STAGE_QUEUED, '', None))
+
+
+class SweepTests(TestCase):
+
+    def expired(self, **fields):
+        return _file_task(lease_owner='node-1', lease_expires_at=timezone.now() - timedelta(seconds=1), **fields)
+
+    def test_sweep_requeues_and_fails_the_files_of_lost_workers(self):
+        requeue = self.expired(stage='titles', attempts=1)
+        fail = self.expired(stage='titles', attempts=3)
+        ended = self.expired(stage=FILE_STAGE_DONE, attempts=1)
+        alive = _file_task(stage='titles', lease_owner='node-2', lease_expires_at=timezone.now() + timedelta(60))
+
+        requeued, failed, ended_files = sweep_expired_leases(3)
+        self.assertEqual([file.id for file in requeued], [requeue.id])
+        self.assertEqual([file.id for file in failed], [fail.id])
+        self.assertEqual([file.id for file in ended_files], [ended.id])
+
+        requeue.refresh_from_db()
+        self.assertEqual((requeue.stage, requeue.lease_owner), (FILE_STAGE_QUEUED, ''))
+        fail.refresh_from_db()
+        self.assertEqual((fail.stage, fail.lease_owner), (FILE_STAGE_FAILED, ''))
+        self.assertIn('worker lost 3 times', fail.error_message)
+        ended.refresh_from_db()
+        self.assertEqual((ended.stage, ended.lease_owner), (FILE_STAGE_DONE, ''))
+        alive.refresh_from_db()
+        self.assertEqual(alive.lease_owner, 'node-2')
+        self.assertEqual(sweep_expired_leases(3), ([], [], []))
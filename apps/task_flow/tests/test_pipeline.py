@@ -0,0 +1,98 @@
+import threading
+import time
+from types import SimpleNamespace
+from unittest import mock
+
+from django.test import SimpleTestCase
+
+from task_flow import pipeline
+from task_flow.conversion import ConversionError
+from task_flow.pipeline import ConversionPipeline
+
+
+class ConversionPipelineTests(SimpleTestCase):
+
+    def setUp(self):
+        self.extracted = []
+        self.done = []
+        self.extract_document = mock.Mock(side_effect=self.extract)
+        self.understand_document = mock.AsyncMock(side_effect=self.understand)
+        self.record_failure = mock.Mock()
+        patches = [
+            mock.patch.object(pipeline, 'extract_document', self.extract_document),
+            mock.patch.object(pipeline, 'understand_document', self.understand_document),
+            mock.patch.object(pipeline, 'record_failure', self.record_failure),
+        ]
+        for patch in patches:
+            patch.start()
+            self.addCleanup(patch.stop)
+
+    def extract(self, file, options):
+        self.extracted.append(file.id)
+        if file.id == 'broken':
+            raise ConversionError('broken')
+        return SimpleNamespace(file=file)
+
+    async def understand(self, document, options):
+        if document.file.id == 'unanswered':
+            raise ConversionError('model failed')
+
+    def start(self):
+        return ConversionPipeline(1, 1, 1, lambda file, successfully: self.done.append((file.id, successfully)))
+
+    def test_files_pass_both_stages(self):
+        conversion = self.start()
+        for file_id in ('a', 'broken', 'unanswered', 'b'):
+            conversion.submit(SimpleNamespace(id=file_id), 'options')
+        conversion.shutdown()
+        self.assertEqual(sorted(self.done), [('a', True), ('b', True), ('broken', False), ('unanswered', False)])
+        self.assertEqual(sorted(str(call.args[1]) for call in self.record_failure.call_args_list),
+                         ['broken', 'model failed'])
+        self.assertEqual(self.understand_document.await_count, 3)
+        self.assertEqual(conversion.capacity, 3)
+
+    def test_next_file_is_extracted_while_the_model_stage_waits(self):
+        second_extracted = threading.Event()
+
+        async def understand(document, options):
+            if document.file.id == 'first':
+                # Only answers once the next file was extracted
+                self.assertTrue(await pipeline.asyncio.to_thread(second_extracted.wait, 5))
+
+        def extract(file, options):
+            if file.id == 'second':
+                second_extracted.set()
+            return SimpleNamespace(file=file)
+
+        self.understand_document.side_effect = understand
+        self.extract_document.side_effect = extract
+        conversion = self.start()
+        conversion.submit(SimpleNamespace(id='first'), 'options')
+        conversion.submit(SimpleNamespace(id='second'), 'options')
+        conversion.shutdown()
+        self.assertEqual(self.done, [('first', True), ('second', True)])
+
+    def test_full_queue_holds_back_extraction(self):
+        in_model = threading.Event()
+        release = threading.Event()
+
+        async def understand(document, options):
+            in_model.set()
+            await pipeline.asyncio.to_thread(release.wait, 5)
+
+        self.understand_document.side_effect = understand
+        conversion = self.start()
+        for file_id in range(5):
+            conversion.submit(SimpleNamespace(id=file_id), 'options')
+        self.assertTrue(in_model.wait(5))
+        # One file in the model stage, one in the queue, the extraction thread blocks on the third
+        for _ in range(50):
+            if len(self.extracted) == 3 and conversion.stats()['queued_for_model'] == 1:
+                break
+            time.sleep(0.02)
+        time.sleep(0.1)
+        self.assertEqual(self.extracted, [0, 1, 2])
+        self.assertEqual(self.done, [])
+        release.set()
+        conversion.shutdown()
+        self.assertEqual(self.done, [(file_id, True) for file_id in range(5)])
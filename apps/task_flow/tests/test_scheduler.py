@@ -0,0 +1,85 @@
+from datetime import datetime, timedelta, timezone
+
+from django.test import SimpleTestCase, TestCase, override_settings
+
+from task_flow.models import ConversionJob, FileTask, FILE_STAGE_QUEUED
+from task_flow.scheduler import BatchState, FairShareScheduler
+
+_START = datetime(2026, 1, 1, tzinfo=timezone.utc)
+
+
+def _batch(job_id, queued, weight=1, fast=False, running=0, age=0):
+    return BatchState(job_id, f'batch-{job_id}', weight, fast, queued, running, _START - timedelta(seconds=age))
+
+
+@override_settings(CONVERSION_SCHEDULER={'BATCH_MAX_CONCURRENCY': 0})
+class PlanTests(SimpleTestCase):
+
+    def setUp(self):
+        self.scheduler = FairShareScheduler()
+
+    def claims(self, rounds, slots, batches):
+        """
+        Plan rounds of the given slots as if the planned files were claimed and converted in between
+        """
+        claimed = {batch.job_id: 0 for batch in batches}
+        for _ in range(rounds):
+            for batch in batches:
+                batch.planned = 0
+            for job_id, count, fast in self.scheduler.plan(slots, slots, batches):
+                claimed[job_id] += count
+            for batch in batches:
+                batch.queued -= batch.planned
+        return claimed
+
+    def test_no_free_slot(self):
+        self.assertEqual(self.scheduler.plan(0, 0, [_batch(1, 5)]), [])
+
+    def test_large_job_does_not_starve_a_later_one(self):
+        large = _batch(1, 1000)
+        self.assertEqual(self.claims(1, 4, [large]), {1: 4})
+        small = _batch(2, 10)
+        self.assertEqual(self.claims(2, 4, [large, small]), {1: 4, 2: 4})
+
+    def test_slots_are_shared_by_weight(self):
+        self.assertEqual(self.claims(10, 4, [_batch(1, 1000, weight=3), _batch(2, 1000, weight=1)]), {1: 30, 2: 10})
+
+    def test_fast_lane_is_served_first_oldest_first(self):
+        plan = self.scheduler.plan(3, 1, [_batch(1, 100), _batch(2, 2, fast=True), _batch(3, 2, fast=True, age=10)])
+        self.assertEqual(plan, [(3, 2, True), (2, 1, True)])
+
+    def test_reserved_slots_stay_free_for_the_fast_lane(self):
+        plan = self.scheduler.plan(4, 3, [_batch(1, 100)])
+        self.assertEqual(plan, [(1, 3, False)])
+
+    @override_settings(CONVERSION_SCHEDULER={'BATCH_MAX_CONCURRENCY': 5})
+    def test_batch_cap_counts_the_running_files(self):
+        plan = self.scheduler.plan(8, 8, [_batch(1, 100, running=3), _batch(2, 100)])
+        self.assertEqual(plan, [(1, 2, False), (2, 5, False)])
+
+    def test_finished_jobs_are_forgotten(self):
+        self.claims(1, 2, [_batch(1, 10)])
+        self.claims(1, 2, [_batch(2, 10)])
+        self.assertEqual(set(self.scheduler._virtual_time), {2})
+
+    def test_fast_lane_slots(self):
+        self.assertEqual(FairShareScheduler.fast_lane_slots(1), 0)
+        self.assertEqual(FairShareScheduler.fast_lane_slots(8), 1)
+
+
+@override_settings(CONVERSION_SCHEDULER={'FAST_LANE_MAX_FILES': 3})
+class LoadBatchesTests(TestCase):
+
+    def test_queued_and_running_files_per_job(self):
+        large = ConversionJob.objects.create(file_suffix='large', file_count=10, weight=2)
+        small = ConversionJob.objects.create(file_suffix='small', file_count=2)
+        for stage, owner in ((FILE_STAGE_QUEUED, ''), (FILE_STAGE_QUEUED, ''), ('titles', 'node-1'), ('done', '')):
+            FileTask.objects.create(original_file_name='a.docx', new_file_name='a.docx', file_path='',
+                                    file_suffix='large', job_id=large.id, stage=stage, lease_owner=owner)
+        FileTask.objects.create(original_file_name='b.docx', new_file_name='b.docx', file_path='',
+                                file_suffix='small', job_id=small.id, stage=FILE_STAGE_QUEUED)
+        batches = {batch.job_id: batch for batch in FairShareScheduler().load_batches()}
+        self.assertEqual(set(batches), {large.id, small.id})
+        self.assertEqual((batches[large.id].queued, batches[large.id].running, batches[large.id].weight,
+                          batches[large.id].fast), (2, 1, 2, False))
+        self.assertEqual((batches[small.id].queued, batches[small.id].fast), (1, True))
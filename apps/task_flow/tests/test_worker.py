@@ -0,0 +1,97 @@
+from datetime import timedelta
+from unittest import mock
+
+from django.test import TestCase
+from django.utils import timezone
+
+from task_flow import worker
+from task_flow.models import ConversionJob, FileTask, FILE_STAGE_DONE, FILE_STAGE_FAILED, FILE_STAGE_QUEUED, \
+    JOB_FINISHED, JOB_RUNNING
+from task_flow.scheduler import FairShareScheduler
+from task_flow.worker import ConversionWorker
+
+
+def _queued_files(job, count):
+    return [FileTask.objects.create(original_file_name='a.docx', new_file_name='a.docx', file_path='',
+                                    file_suffix=job.file_suffix, job_id=job.id, stage=FILE_STAGE_QUEUED)
+            for _ in range(count)]
+
+
+class FileDoneTests(TestCase):
+
+    def setUp(self):
+        self.worker = ConversionWorker(workers=1)
+        self.job = ConversionJob.objects.create(file_suffix='batch', file_count=2)
+
+    def file_task(self, owner, **fields):
+        return FileTask.objects.create(original_file_name='a.docx', new_file_name='a.docx', file_path='',
+                                       file_suffix='batch', job_id=self.job.id, lease_owner=owner, **fields)
+
+    def test_held_file_is_counted_and_released(self):
+        file = self.file_task(self.worker.owner)
+        self.worker._in_flight[file.id] = False
+        self.worker._file_done(file, True)
+        self.job.refresh_from_db()
+        self.assertEqual((self.job.finished_count, self.job.failed_count), (1, 0))
+        self.assertEqual(FileTask.objects.get(id=file.id).lease_owner, '')
+        self.assertEqual((self.worker.converted, self.worker._in_flight), (1, {}))
+
+    def test_lost_file_is_not_counted(self):
+        file = self.file_task('node-2')
+        self.worker._in_flight[file.id] = False
+        with self.assertLogs('conversion_worker', level='WARNING'):
+            self.worker._file_done(file, False)
+        self.job.refresh_from_db()
+        self.assertEqual((self.job.finished_count, self.job.failed_count), (0, 0))
+        self.assertEqual(FileTask.objects.get(id=file.id).lease_owner, 'node-2')
+        self.assertEqual((self.worker.converted, self.worker.failed, self.worker._in_flight), (0, 0, {}))
+
+    def test_sweep_counts_ended_files_that_were_not_released(self):
+        expired = timezone.now() - timedelta(seconds=1)
+        self.file_task('node-2', stage=FILE_STAGE_DONE, lease_expires_at=expired)
+        self.file_task('node-2', stage=FILE_STAGE_FAILED, lease_expires_at=expired)
+        self.worker._sweep()
+        self.job.refresh_from_db()
+        self.assertEqual((self.job.finished_count, self.job.failed_count, self.job.job_status), (1, 1, JOB_FINISHED))
+
+
+class ClaimTests(TestCase):
+
+    def setUp(self):
+        self.worker = ConversionWorker(workers=1)
+        self.worker._pipeline = mock.Mock(capacity=3)
+        patches = [
+            mock.patch.object(worker, 'SCHEDULER', FairShareScheduler()),
+            mock.patch.object(worker, 'load_conversion_options', return_value='options'),
+        ]
+        for patch in patches:
+            patch.start()
+            self.addCleanup(patch.stop)
+
+    def test_claims_fill_the_pipeline_and_keep_the_fast_lane_slot(self):
+        large = ConversionJob.objects.create(file_suffix='large', file_count=5)
+        _queued_files(large, 5)
+        self.assertEqual(self.worker._claim(60), 2)
+        small = ConversionJob.objects.create(file_suffix='small', file_count=1)
+        _queued_files(small, 1)
+        self.assertEqual(self.worker._claim(60), 1)
+        self.assertEqual(self.worker._claim(60), 0)
+
+        submitted = [call.args for call in self.worker._pipeline.submit.call_args_list]
+        self.assertEqual([file.job_id for file, options in submitted], [large.id, large.id, small.id])
+        self.assertEqual(ConversionJob.objects.get(id=large.id).job_status, JOB_RUNNING)
+        self.assertEqual(FileTask.objects.filter(lease_owner=self.worker.owner).count(), 3)
+
+        # A finished file frees its slot
+        file = submitted[0][0]
+        self.worker._file_done(file, True)
+        self.assertEqual(self.worker._claim(60), 1)
+
+    def test_files_claimed_after_the_stop_are_requeued(self):
+        job = ConversionJob.objects.create(file_suffix='large', file_count=5)
+        _queued_files(job, 5)
+        self.worker.stop()
+        self.assertEqual(self.worker._claim(60), 2)
+        self.worker._pipeline.submit.assert_not_called()
+        self.assertEqual(self.worker._in_flight, {})
+        self.assertFalse(FileTask.objects.exclude(lease_owner='').exists())
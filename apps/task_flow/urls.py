@@ -7,9 +7,14 @@ app_name = 'task_flow'
 urlpatterns = [
     path('get_file_list/', file_task_views.get_file_list),
     path('document_format_conversion/', file_task_views.document_format_conversion),
+    path('query_conversion_job/', file_task_views.query_conversion_job),
+    path('query_conversion_workers/', file_task_views.query_conversion_workers),
+    path('query_scheduler_stats/', file_task_views.query_scheduler_stats),
     path('document_combination/', file_task_views.document_combination),
     path('query_task_status/', file_task_views.query_task_status),
     path('query_result_list/', file_task_views.query_result_list),
+    path('query_image_dedup_stats/', file_task_views.query_image_dedup_stats),
+    path('query_token_usage/', file_task_views.query_token_usage),
     path('file_download/', file_task_views.file_download),
     path('read_file_content/', file_task_views.read_file_content),
 ]
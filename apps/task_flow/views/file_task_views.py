@@ -1,97 +1,32 @@
-import ast
 import asyncio
 import logging
 import os
-import re
 import tarfile
 import uuid
 import zipfile
-from concurrent.futures import ThreadPoolExecutor
-from html import unescape
 from pathlib import Path
 
 from application.models import chunk_settings
-from asgiref.sync import sync_to_async
 from common.action_result import ActionResult
 from django.core.files.base import ContentFile
 from django.core.files.storage import default_storage
+from django.db.models import Sum
 from django.http import HttpResponse, FileResponse
-from markitdown import MarkItDown
 from rest_framework.decorators import api_view
 
 from common.constant import BASE_CHUNK_TAGS
 from common.str_transcoding import str_decrypt
-from file_weaver.converter.markdown.markdown_splitter import markdown_sharding
-from processor.models import model_settings
-from processor.processor import extract_and_process_images, document_understanding, extract_json_content, \
-    json_response_to_dict
-from processor.prompt_templates import BASE_IMAGE_PROMPT_QIAN_WEN_LONG, BASE_IMAGE_PROMPT_VL
-from task_flow.models import ImageInfo, FileTask
+from processor.image_dedup import DedupStats
+from task_flow.conversion import get_base_path
+from task_flow.job_engine import JOB_ENGINE
+from task_flow.models import ConversionJob, FileTask
+from task_flow.scheduler import SCHEDULER
 from task_flow.models.file_result import FileResult
 
 logging = logging.getLogger('file_task')
 
-
-def replace_titles(file_context, md_content):
-    # Create title mapping: key is the text part of the title (without '#'), value is the full title
-    title_map = {}
-    for item in file_context["content"]:
-        raw_text = unescape(item["text"])
-        title_text = raw_text.lstrip('#').replace(' ', '').replace('\xa0', '').replace(r'\xa0', '').replace(u'\xa0', '')
-        title_map[title_text] = raw_text
-
-    # Process content line by line
-    lines = md_content.split('\n')
-    updated_lines = []
-
-    # Record the replaced titles
-    matched_titles = set()  # Record the replaced titles
-
-    for line in lines:
-        stripped_line = re.sub(r'\s+', '',
-                               line.replace('*', '').replace('\xa0', '').replace(r'\xa0', '').replace(u'\xa0', ''))
-        if stripped_line in title_map:
-            matched_titles.add(stripped_line)
-            updated_lines.append(title_map[stripped_line])
-        else:
-            updated_lines.append(line)
-
-    # Find unmatched titles
-    unmatched_titles = {k: v for k, v in title_map.items() if k not in matched_titles}
-
-    # If there are no unmatched titles, return the result directly
-    if not unmatched_titles:
-        return '\n'.join(updated_lines)
-
-    # Insert unmatched title
-    final_lines = updated_lines.copy()
-
-    # Traverse each unmatched title and attempt to insert
-    for title_text, full_title in unmatched_titles.items():
-        inserted = False
-
-        # Determine the level of this title, such as # being 1, # # being 2, and so on
-        level = len(full_title) - len(full_title.lstrip('#'))
-
-        # Find insertion position: Insert in front of a title one level lower than it
-        for i, line in enumerate(final_lines):
-            if line.startswith('#' * (level + 1) + ' '):  # A title one level lower than the current title
-                final_lines.insert(i, full_title)
-                inserted = True
-                break
-
-        # If no lower level title is found, add it to the end
-        if not inserted:
-            final_lines.append(full_title)
-
-    # Return the merged content
-    return '\n'.join(final_lines)
-
-
-def get_base_path():
-    current_script_dir = os.path.dirname(os.path.abspath(__file__))
-    project_root_parent = os.path.dirname(os.path.dirname(os.path.dirname(os.path.dirname(current_script_dir))))
-    return os.path.join(project_root_parent, "fileList")
+# Largest share of the file threads a conversion job may ask for
+MAX_JOB_WEIGHT = 10
 
 
 @api_view(['POST'])
@@ -205,147 +140,49 @@ def get_file_list(request):
 
 @api_view(['GET'])
 def document_format_conversion(request):
-    """Document format conversion"""
+    """Document format conversion, submitted as a background job whose id is returned immediately"""
     params = request.GET
     suffix = params.get("suffix")
     # Determine file format
     if not suffix:
         return HttpResponse(ActionResult.fail(400, "任务id不能为空 Task ID cannot be empty."))
-    files = FileTask.objects.filter(file_suffix=suffix)
-    if not files:
+    if not FileTask.objects.filter(file_suffix=suffix).exists():
         return HttpResponse(ActionResult.fail(500, "任务不存在 Task does not exist."))
+    weight = params.get("weight", "1")
+    if not weight.isdigit() or not 1 <= int(weight) <= MAX_JOB_WEIGHT:
+        return HttpResponse(ActionResult.fail(400, f"参数weight必须是1到{MAX_JOB_WEIGHT}的整数 "
+                                                   f"The parameter weight must be an integer from 1 to {MAX_JOB_WEIGHT}."))
 
-    settings = asyncio.run(chunk_settings.get_chunk_settings())
-    enabled_picture_reasoning = settings.enabled_picture_reasoning
-    picture_reasoning_prompt = settings.picture_reasoning_prompt
-    if not picture_reasoning_prompt:
-        picture_reasoning_prompt = str_decrypt(BASE_IMAGE_PROMPT_VL)
-    title_hierarchy_reasoning_prompt = settings.title_hierarchy_reasoning_prompt
-    if not title_hierarchy_reasoning_prompt:
-        title_hierarchy_reasoning_prompt = str_decrypt(BASE_IMAGE_PROMPT_QIAN_WEN_LONG)
-    picture_reasoning_model_id = settings.picture_reasoning_model_id
-    model = asyncio.run(model_settings.get_model_byid(picture_reasoning_model_id))
-    picture_reasoning_model_id = None if model is None else model.model_name
-    title_reasoning_model_id = settings.title_reasoning_model_id
-    model_title = asyncio.run(model_settings.get_model_byid(title_reasoning_model_id))
-    title_reasoning_model_id = None if model_title is None else model_title.model_name
-
-    def process_file(file):
-        file_name = file.new_file_name
-        base_path = get_base_path()
-        fixed_path = os.path.join(base_path, file.file_suffix)
-        file_path = os.path.join(fixed_path, file_name)
-        file_extension = os.path.splitext(file_name)[1]
-
-        # Extract file content
-        # Different things may be handled separately later, please handle them uniformly for now
-        md = MarkItDown()
-        if file_extension in ['.doc', '.docx', '.txt', '.html']:
-            result = md.convert(
-                file_path
-            )
-        elif file_extension in ['.xls', '.xlsx', '.csv']:
-            result = md.convert(
-                file_path
-            )
-        elif file_extension in ['.ppt', '.pptx']:
-            result = md.convert(
-                file_path
-            )
-        elif file_extension == '.pdf':
-            result = md.convert(
-                file_path
-            )
-        else:
-            return HttpResponse(ActionResult.fail(500, "未知文件格式 Unknown file format."))
-
-        md_content = result.text_content
-
-        # Save temporary files
-        temporary_path = os.path.join(fixed_path, "temporaryMd", file_name)
-        output_path = f"{os.path.splitext(temporary_path)[0]}.md"
-        output_dir = os.path.dirname(output_path)
-        if not os.path.exists(output_dir):
-            os.makedirs(output_dir)
-
-        if enabled_picture_reasoning:
-            output_dir = os.path.join(fixed_path, "extracted_images")
-            if not os.path.exists(output_dir):
-                os.makedirs(output_dir, exist_ok=True)
-            try:
-                extract_and_process_images(file_path, output_dir, picture_reasoning_prompt, picture_reasoning_model_id)
-            except Exception as e:
-                return HttpResponse(ActionResult.fail(500, f"图片提取和处理失败 Image extraction and processing failed.: {str(e)}"))
-
-            # Retrieve the image information of the file from the database
-            document_name = os.path.basename(file_path)
-            image_infos = ImageInfo.objects.filter(document_name=document_name)
-
-            # Insert image description into Markdown document
-            for info in image_infos:
-                context_text = info.context_text
-                image_description = info.image_description
-                try:
-                    context_dict = ast.literal_eval(context_text)
-                    # Extract key text information
-                    content = context_dict.get('content', '')
-                    if content in md_content:
-                        index = md_content.index(content)
-                        insert_index = index + len(content)
-                        # Insert image description after contextual content
-                        md_content = md_content[:insert_index] + f"\n\n{image_description}\n\n" + md_content[
-                                                                                                  insert_index:]
-                    else:
-                        # If no matching context can be found, insert a description at the end of the document
-                        md_content += f"\n\n{image_description}\n\n"
-                except (SyntaxError, ValueError):
-                    continue
-
-        try:
-            with open(output_path, 'w', encoding='utf-8') as f:
-                f.write(md_content)
-            file_context = document_understanding(output_path, title_hierarchy_reasoning_prompt,
-                                                  title_reasoning_model_id)
-            # Remove meaningless text from AI returned data and only retain the JSON string portion
-            file_context = extract_json_content(file_context)
-            file_context = json_response_to_dict(file_context)
-            combined_article = replace_titles(file_context, md_content)
-            with open(output_path, 'w', encoding='utf-8') as f:
-                f.write(combined_article)
-            # Change task status
-            FileTask.objects.filter(id=file.id).update(file_status=1)
-            # Document knowledge extraction
-            asyncio.run(markdown_sharding(output_path, file.id, update_file_status))
-            # Save to database
-            file_result_name = os.path.splitext(file_name)
-            fixed = file_result_name[0]
-            FileResult.objects.create(
-                file_name=os.path.join(fixed, ".md"),
-                file_path=output_path,
-                file_suffix=file.file_suffix,
-                file_type=0
-            )
-            return HttpResponse(ActionResult.success("文件转换成功 File conversion successful."))
-        except Exception as e:
-            logging.error(f"File processing exception: {e}")
-            return HttpResponse(ActionResult.fail(500, f"文件转换失败 File conversion failed: {str(e)}"))
-
-    with ThreadPoolExecutor(max_workers=5) as executor:
-        list(executor.map(process_file, files))
-
-    return HttpResponse(ActionResult.success("所有文件转换成功 All files converted successfully."))
-
-
-async def update_file_status(file_id, file_path, successfully, sharding_time):
+    job, created = JOB_ENGINE.submit(suffix, int(weight))
+    if not created:
+        return HttpResponse(ActionResult.success(job.to_dict(),
+                                                 message="转换任务已在进行中 The conversion job is already running."))
+    return HttpResponse(ActionResult.success(job.to_dict(), message="转换任务已提交 Conversion job submitted."),
+                        status=202)
 
-    @sync_to_async
-    def update_status_sync():
-        FileTask.objects.filter(id=file_id).update(file_status=2)
 
-    if successfully:
-        await update_status_sync()
-    else:
-        logging.error(f'{file_id:File content format error}')
+@api_view(['GET'])
+def query_conversion_job(request):
+    """Progress of a conversion job and the stage of each of its files"""
+    params = request.GET
+    job_id = params.get("job_id")
+    if not job_id:
+        return HttpResponse(ActionResult.fail(400, "参数job_id不能为空 The parameter job_id cannot be empty."))
+    if not job_id.isdigit():
+        return HttpResponse(ActionResult.fail(400, "参数job_id必须是整数 The parameter job_id must be an integer."))
+    job = ConversionJob.objects.filter(id=job_id).first()
+    if job is None:
+        return HttpResponse(ActionResult.fail(404, "转换任务不存在 Conversion job does not exist."))
+    data = job.to_dict()
+    data['files'] = [{
+        'id': file.id,
+        'original_file_name': file.original_file_name,
+        'file_status': file.file_status,
+        'stage': file.stage,
+        'stage_updated_at': file.stage_updated_at,
+        'error_message': file.error_message,
+    } for file in FileTask.objects.filter(job_id=job.id).order_by('id')]
+    return HttpResponse(ActionResult.success(data))
 
 
 @api_view(['GET'])
@@ -459,6 +296,18 @@ def document_combination(request):
         return HttpResponse(ActionResult.success(data=output_file_path, message="文档组合成功 Document combination successful."))
 
 
+@api_view(['GET'])
+def query_conversion_workers(request):
+    """Queued files and the files held by every conversion worker"""
+    return HttpResponse(ActionResult.success(JOB_ENGINE.stats()))
+
+
+@api_view(['GET'])
+def query_scheduler_stats(request):
+    """Queue depth and wait time of every batch with queued or running files"""
+    return HttpResponse(ActionResult.success(SCHEDULER.stats()))
+
+
 @api_view(['GET'])
 def query_task_status(request):
     """Task status query"""
@@ -475,12 +324,57 @@ def query_task_status(request):
             'new_file_name': file.new_file_name,
             'file_path': file.file_path,
             'file_status': file.file_status,
-            'file_suffix': file.file_suffix
+            'file_suffix': file.file_suffix,
+            'job_id': file.job_id,
+            'stage': file.stage,
+            'error_message': file.error_message,
+            'truncated_calls': file.truncated_calls,
+            'extract_cpu_seconds': file.extract_cpu_seconds,
+            'extract_rss_mb': file.extract_rss_mb,
         }
         data_list.append(data)
     return HttpResponse(ActionResult.success(data_list))
 
 
+@api_view(['GET'])
+def query_image_dedup_stats(request):
+    """Image deduplication counters of a batch"""
+    params = request.GET
+    file_suffix = params.get("file_suffix")
+    if not file_suffix:
+        return HttpResponse(ActionResult.fail(400, "参数file_suffix不能为空 The parameter file_suffix cannot be empty."))
+    totals = FileTask.objects.filter(file_suffix=file_suffix).aggregate(
+        images=Sum('images'), exact_duplicates=Sum('exact_duplicate_images'),
+        near_duplicates=Sum('near_duplicate_images'), model_calls=Sum('image_model_calls'))
+    stats = DedupStats()
+    stats.count(**{name: value or 0 for name, value in totals.items()})
+    return HttpResponse(ActionResult.success(stats.to_dict()))
+
+
+@api_view(['GET'])
+def query_token_usage(request):
+    """Token usage of a file task or of a batch, as saved by the conversion attempts of the files"""
+    params = request.GET
+    file_task_id = params.get("file_task_id")
+    file_suffix = params.get("file_suffix")
+    fields = {'calls': Sum('model_calls'), 'input_tokens': Sum('input_tokens'),
+              'output_tokens': Sum('output_tokens'), 'truncated_calls': Sum('truncated_calls')}
+    if file_task_id:
+        if not file_task_id.isdigit():
+            return HttpResponse(ActionResult.fail(400, "参数file_task_id必须是整数 "
+                                                       "The parameter file_task_id must be an integer."))
+        files = FileTask.objects.filter(id=int(file_task_id))
+        if not files.exists():
+            return HttpResponse(ActionResult.fail(404, "文件任务不存在 File task does not exist."))
+    elif file_suffix:
+        files = FileTask.objects.filter(file_suffix=file_suffix)
+    else:
+        return HttpResponse(ActionResult.fail(400, "参数file_task_id或file_suffix不能为空 "
+                                                   "The parameter file_task_id or file_suffix cannot be empty."))
+    totals = files.aggregate(**fields)
+    return HttpResponse(ActionResult.success({'total': {name: value or 0 for name, value in totals.items()}}))
+
+
 @api_view(['GET'])
 def query_result_list(request):
     """result file query"""
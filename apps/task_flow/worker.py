@@ -0,0 +1,237 @@
+import logging
+import os
+import socket
+import threading
+import time
+import uuid
+
+from django.conf import settings
+from django.db import close_old_connections, transaction
+from django.db.models import F
+from django.utils import timezone
+
+from processor import markdown_converter
+from task_flow.conversion import load_conversion_options
+from task_flow.leases import claim_files, renew_leases, release_file, requeue_files, sweep_expired_leases
+from task_flow.models import ConversionJob, FILE_STAGE_DONE, JOB_QUEUED, JOB_RUNNING, JOB_FINISHED, JOB_FAILED
+from task_flow.pipeline import ConversionPipeline
+from task_flow.scheduler import SCHEDULER
+
+logging = logging.getLogger('conversion_worker')
+
+
+def _setting(name, default):
+    return getattr(settings, 'CONVERSION_JOB', {}).get(name, default)
+
+
+def record_file_result(job_id, successfully):
+    """
+    Count a converted or failed file on its job and close the job after its last file
+    """
+    if job_id is None:
+        return
+    if successfully:
+        ConversionJob.objects.filter(id=job_id).update(finished_count=F('finished_count') + 1)
+    else:
+        ConversionJob.objects.filter(id=job_id).update(failed_count=F('failed_count') + 1)
+    job = ConversionJob.objects.filter(id=job_id).first()
+    if job is None or job.finished_count + job.failed_count < job.file_count:
+        return
+    status = JOB_FAILED if job.file_count and job.failed_count == job.file_count else JOB_FINISHED
+    updated = ConversionJob.objects.filter(id=job_id, job_status__in=(JOB_QUEUED, JOB_RUNNING)) \
+        .update(job_status=status, finished_at=timezone.now())
+    if updated:
+        logging.info(f"Conversion job finished. job id: {job_id} finished: {job.finished_count} "
+                     f"failed: {job.failed_count}")
+
+
+class ConversionWorker:
+    """
+    Claims queued files from the database and converts them on a ConversionPipeline.
+    Every claimed file is held by a lease renewed by a heartbeat, files of a worker that dies are requeued by the
+    other workers once their lease expires. Any number of workers may run behind the same database and the same
+    shared fileList volume.
+    """
+
+    def __init__(self, workers=None):
+        self.workers = workers or _setting('WORKERS', 5)
+        self.owner = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:6]}"
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._slot_freed = threading.Event()
+        self._drained = threading.Event()
+        self._in_flight = {}
+        self._options = {}
+        self._pipeline = None
+        self._thread = None
+        self.claimed = 0
+        self.converted = 0
+        self.failed = 0
+        self.leases_lost = 0
+
+    def start(self):
+        """
+        Run the worker on a background thread of this process
+        """
+        self._thread = threading.Thread(target=self.run, name='conversion-worker', daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """
+        Stop claiming files, the files in flight are finished
+        """
+        self._stop.set()
+        self._slot_freed.set()
+
+    def run(self):
+        lease_seconds = _setting('LEASE_SECONDS', 60)
+        self._pipeline = ConversionPipeline(self.workers, _setting('MODEL_CONCURRENCY', 8),
+                                            _setting('STAGE_QUEUE_SIZE', 4), self._file_done)
+        heartbeat = threading.Thread(target=self._heartbeat, args=(lease_seconds,), name='conversion-heartbeat',
+                                     daemon=True)
+        heartbeat.start()
+        logging.info(f"Conversion worker started. owner: {self.owner} workers: {self.workers} "
+                     f"capacity: {self._pipeline.capacity}")
+        last_sweep = 0.0
+        try:
+            while not self._stop.is_set():
+                try:
+                    if time.monotonic() - last_sweep >= _setting('SWEEP_SECONDS', 30):
+                        last_sweep = time.monotonic()
+                        self._sweep()
+                    claimed = self._claim(lease_seconds)
+                except Exception as e:
+                    logging.error(f"Claiming files failed. owner: {self.owner} e: {e}")
+                    claimed = 0
+                finally:
+                    close_old_connections()
+                if claimed:
+                    continue
+                # Nothing to claim or no free slot, wait for a finished file or the next poll
+                self._slot_freed.wait(_setting('POLL_SECONDS', 2))
+                self._slot_freed.clear()
+        finally:
+            self._pipeline.shutdown()
+            self._stop.set()
+            self._drained.set()
+            heartbeat.join()
+            logging.info(f"Conversion worker stopped. owner: {self.owner} converted: {self.converted} "
+                         f"failed: {self.failed}")
+
+    def _claim(self, lease_seconds):
+        """
+        Claim files for the free pipeline slots, the scheduler shares them among the batches
+        """
+        capacity = self._pipeline.capacity
+        with self._lock:
+            free = capacity - len(self._in_flight)
+            # Slots reserved for the fast lane are never taken by large jobs
+            bulk_free = capacity - SCHEDULER.fast_lane_slots(capacity) - \
+                sum(1 for fast in self._in_flight.values() if not fast)
+        if free <= 0:
+            return 0
+        claimed = 0
+        for job_id, count, fast in SCHEDULER.plan(free, bulk_free):
+            files = claim_files(self.owner, count, lease_seconds, job_id)
+            SCHEDULER.record_claims(files)
+            for file in files:
+                with self._lock:
+                    self._in_flight[file.id] = fast
+                    self.claimed += 1
+                self._submit(file)
+            claimed += len(files)
+        return claimed
+
+    def _job_options(self, job_id):
+        with self._lock:
+            options = self._options.get(job_id)
+        if options is None:
+            job = ConversionJob.objects.filter(id=job_id).first()
+            options = load_conversion_options(job.file_count if job is not None else 0)
+            with self._lock:
+                self._options[job_id] = options
+                # Options of finished jobs are not needed any more
+                while len(self._options) > 100:
+                    self._options.pop(next(iter(self._options)))
+        return options
+
+    def _submit(self, file):
+        try:
+            if self._stop.is_set():
+                # Claimed right before the stop, another worker converts it
+                requeue_files(self.owner, [file.id])
+                self._forget(file.id)
+                return
+            ConversionJob.objects.filter(id=file.job_id, job_status=JOB_QUEUED).update(job_status=JOB_RUNNING,
+                                                                                       started_at=timezone.now())
+            self._pipeline.submit(file, self._job_options(file.job_id))
+        except Exception as e:
+            logging.error(f"Submitting file failed. file id: {file.id} e: {e}")
+            # The lease expires and the file is requeued by a sweep
+            self._forget(file.id)
+
+    def _file_done(self, file, successfully):
+        """
+        Called by the pipeline once a file was converted or failed
+        """
+        try:
+            # Counted by the worker holding the lease, or by the sweep that took it
+            with transaction.atomic():
+                if release_file(self.owner, file.id):
+                    record_file_result(file.job_id, successfully)
+                else:
+                    logging.warning(f"Lease lost, the file is not counted. file id: {file.id} owner: {self.owner}")
+                    successfully = None
+        except Exception as e:
+            logging.error(f"Conversion bookkeeping failed. file id: {file.id} e: {e}")
+        finally:
+            self._forget(file.id, successfully)
+
+    def _forget(self, file_id, successfully=None):
+        with self._lock:
+            self._in_flight.pop(file_id, None)
+            if successfully:
+                self.converted += 1
+            elif successfully is not None:
+                self.failed += 1
+        self._slot_freed.set()
+
+    def _heartbeat(self, lease_seconds):
+        interval = _setting('HEARTBEAT_SECONDS', max(1, lease_seconds // 4))
+        while True:
+            with self._lock:
+                file_ids = list(self._in_flight)
+            if self._stop.is_set() and not file_ids:
+                return
+            try:
+                lost = renew_leases(self.owner, file_ids, lease_seconds)
+                if lost:
+                    self.leases_lost += len(lost)
+                    logging.warning(f"Leases lost, the files may be converted twice. owner: {self.owner} "
+                                    f"file ids: {sorted(lost)}")
+            except Exception as e:
+                logging.error(f"Lease renewal failed. owner: {self.owner} e: {e}")
+            finally:
+                close_old_connections()
+            self._drained.wait(interval)
+
+    def _sweep(self):
+        requeued, failed, ended = sweep_expired_leases(_setting('MAX_ATTEMPTS', 3))
+        for file in failed:
+            record_file_result(file.job_id, False)
+        for file in ended:
+            record_file_result(file.job_id, file.stage == FILE_STAGE_DONE)
+
+    def stats(self):
+        with self._lock:
+            return {
+                'owner': self.owner,
+                'workers': self.workers,
+                'in_flight': len(self._in_flight),
+                'claimed': self.claimed,
+                'converted': self.converted,
+                'failed': self.failed,
+                'leases_lost': self.leases_lost,
+                'pipeline': self._pipeline.stats() if self._pipeline is not None else None,
+                'markdown_converter': markdown_converter.stats(),
+            }